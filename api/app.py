@@ -1,14 +1,22 @@
 from __future__ import annotations
 
 import os
+import re
 import sys
+import json
+import time
+import uuid
+import asyncio
+import threading
 import subprocess
 import shutil
+import concurrent.futures
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Literal, Tuple, Union
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 # ---------------------------------------------------------
@@ -34,13 +42,21 @@ except Exception as e:
 # 1. Definición del Mock (Fallback seguro)
 class MockMainApp:
     """Clase Mock para simular la ejecución de código sin la dependencia de 'main'."""
-    def submit(self, language: str, code: str, timeout: int, memory_mb: int) -> Dict[str, Any]:
+    def submit(self, language: str, code: str, timeout: int, memory_mb: int, **_inputs) -> Dict[str, Any]:
         return {
             "exit_code": 0,
             "mode": f"gozolite/{language}",
             "stdout": "Mock execution successful: {{last}}",
             "stderr": "TotyLabs Mock Service active. (Execution Mode: " + language + ")",
         }
+    def stream(self, language: str, code: str, timeout: int, memory_mb: int, **_inputs):
+        res = self.submit(language, code, timeout, memory_mb)
+        yield {"event": "stdout", "data": res["stdout"]}
+        yield {"event": "exit", "exit_code": 0, "mode": res["mode"], "stderr": res["stderr"], "time_ms": 0}
+    def judge(self, language: str, code: str, cases: list, timeout: int, memory_mb: int, **_opts) -> Dict[str, Any]:
+        return {"ok": True, "exit_code": 0, "mode": f"gozolite/{language}", "stdout": "", "stderr": "",
+                "passed": len(cases), "total": len(cases),
+                "cases": [{"index": i, "verdict": "accepted"} for i in range(len(cases))]}
     def history(self): return []
     def status(self, job_id): return {"job_id": job_id, "state": "mocked", "detail": "N/A"}
 
@@ -59,6 +75,16 @@ except Exception as e:
     main = MockMainApp()
     print(f"ERROR: Fallo al inicializar MainApp. Usando Mock. Detalle: {e}")
 
+from core2.orchestrators.canary import CanaryMonitor
+from core2.orchestrators.gozo_lite import GozoLite, pump_output
+from core2.orchestrators.supervisor import supervisor, CANCELLED_EXIT, Job
+from core2.orchestrators.input_spool import InputSpool, InputTooLarge
+from core2.orchestrators.dataset_store import DatasetStore, DatasetTooLarge
+from core2.orchestrators.sessions import SessionError
+from core2.orchestrators.workspace_index import WorkspaceIndex
+from workers.fair_scheduler import FairScheduler, SchedulerRejected, UnknownApiKey
+from api.uds import UdsServer, UDS_PATH
+
 # ---------------------------------------------------------
 # App & Configuration - TotyLabs GozoLite
 # ---------------------------------------------------------
@@ -73,15 +99,39 @@ app = FastAPI(
 DEFAULT_WS = Path(__file__).resolve().parents[2] 
 WORKSPACE = Path(os.getenv("GOZOLITE_WORKSPACE_DIR", DEFAULT_WS)).resolve()
 
+# Spool de entradas grandes (stdin/archivos) subidas vía /inputs
+spool = InputSpool()
+
+# Datasets por contenido (subidos una vez; cada job los ve montados sólo lectura, sin copia, salvo que el kernel no permita user namespaces)
+datasets = DatasetStore()
+
+# Canaries por lenguaje (sólo con GozoLite local; en modo dispatcher cada agente corre los suyos)
+_base = getattr(main, "base", None)
+canary = CanaryMonitor(_base) if isinstance(_base, GozoLite) else None
+READY_LANGS = [l.strip().lower() for l in os.getenv("GOZOLITE_READY_LANGS", "python").split(",") if l.strip()]
+
+# Reparto justo entre tenants (X-API-Key => tenant, ver GOZOLITE_TENANTS)
+scheduler = FairScheduler()
+
 # Mapeo de Extensiones
 _EXT_MAP: Dict[str, str] = {
     ".py": "python", ".js": "node", ".c": "c", ".cpp": "cpp", ".cc": "cpp",
     ".go": "go", ".rs": "rust", ".java": "java", ".sql": "sql",
 }
 
+# Índice de scripts del workspace (script_path): contenido cacheado por mtime y prebuild de compilados
+workspace = WorkspaceIndex(WORKSPACE, _EXT_MAP, prebuild=getattr(_base, "prebuild", None))
+
 # ---------------------------------------------------------
 # Schemas
 # ---------------------------------------------------------
+_JOB_ID = r"^[A-Za-z0-9_.:-]{1,64}$"
+
+class ProjectSpec(BaseModel):
+    files: Optional[Dict[str, str]] = Field(default=None, description="Mapa {ruta_relativa: contenido} del proyecto.")
+    archive: Optional[str] = Field(default=None, description="Proyecto empaquetado (.tar, .tar.gz o .zip) en base64.")
+    entry: Optional[str] = Field(default=None, description="Entry point: archivo (main.py, src/main.rs), clase Java (com.acme.App) o paquete Go (./cmd/app).")
+
 class ExecReq(BaseModel):
     # language + code (Modo principal: Polyglot/Inline)
     language: Optional[str] = Field(default=None, description="Lenguaje principal (ej: python) o vacío para 'auto' (Polyglot Pipeline).")
@@ -91,17 +141,78 @@ class ExecReq(BaseModel):
     script_path: Optional[str] = Field(default=None, description="Ruta relativa al workspace (ej: tools/build.sh)")
     args: Optional[List[str]] = Field(default=None, description="Argumentos de línea de comandos para el script.")
 
+    # proyecto multi-archivo (Modo proyecto, con build incremental)
+    project: Optional[ProjectSpec] = Field(default=None, description="Proyecto multi-archivo; requiere 'language'.")
+
     # comando shell (Modo de utilidad)
     command: Optional[str] = Field(default=None, description="Comando shell directo (ej: 'bash build.sh').")
 
+    # entradas (stdin inline para casos chicos; ids de /inputs para casos grandes)
+    stdin: Optional[str] = Field(default=None, description="stdin inline (chico). Para entradas grandes usar stdin_id.")
+    stdin_id: Optional[str] = Field(default=None, description="input_id devuelto por POST /inputs, usado como stdin del job.")
+    files: Optional[Dict[str, str]] = Field(default=None, description="Archivos de entrada {nombre: input_id} montados sólo lectura en el workdir (copiados si el kernel no permite montarlos).")
+    datasets: Optional[Dict[str, str]] = Field(default=None, description="Datasets {nombre: sha256|nombre} de /datasets, montados sólo lectura en el workdir (copiados si el kernel no permite montarlos).")
+    fixture: Optional[str] = Field(default=None, description="language='sql': base precargada (GET /sql/fixtures) clonada en memoria para el job.")
+
     timeout: int = Field(default=10, ge=1, le=30, description="Tiempo máximo de ejecución en segundos.")
     memory_mb: int = Field(default=256, ge=16, le=1024, description="Límite de memoria en MB.")
 
+    # nivel de compilación (lenguajes compilados)
+    compile_tier: Literal["auto", "quick", "opt"] = Field(default="auto", description="quick (-O0, compila rápido), opt (optimizado) o auto (quick; opt si el programa corre mucho o se repite).")
+
+    # diagnóstico
+    profile: bool = Field(default=False, description="Adjunta un timeline de CPU/RSS/threads/IO del job (fases compile y run).")
+    profile_interval_ms: Optional[int] = Field(default=None, ge=10, le=1000, description="Período de muestreo del profile (por defecto GOZOLITE_PROFILE_INTERVAL_MS).")
+
+    # planificación (cola por tenant)
+    priority: Literal["interactive", "batch"] = Field(default="interactive", description="Carril: interactive se despacha antes que batch.")
+    deadline_ms: Optional[int] = Field(default=None, ge=1, description="Plazo extremo a extremo (cola + ejecución); si no llega, 429 inmediato.")
+
+    # cancelación (DELETE /jobs/{job_id}); si falta se genera uno y vuelve en X-Job-Id
+    job_id: Optional[str] = Field(default=None, regex=_JOB_ID, description="Id del job para cancelarlo con DELETE /jobs/{job_id}.")
+
+class JudgeCase(BaseModel):
+    stdin: Optional[str] = Field(default=None, description="stdin inline del caso.")
+    stdin_id: Optional[str] = Field(default=None, description="input_id de /inputs (stdin grande).")
+    expected: Optional[str] = Field(default=None, description="Salida esperada; si falta, solo se exige exit 0.")
+
+class JudgeReq(BaseModel):
+    language: str = Field(description="Lenguaje del programa.")
+    code: str
+    cases: List[JudgeCase] = Field(description="Casos de prueba (stdin, expected).")
+    compare: Literal["exact", "whitespace", "float"] = Field(default="exact", description="Modo de comparación de la salida.")
+    float_tol: float = Field(default=1e-6, gt=0, description="Tolerancia abs/rel para compare=float.")
+    stop_on_fail: bool = Field(default=False, description="Cortar en el primer caso fallido (el resto queda 'skipped').")
+    parallelism: Optional[int] = Field(default=None, ge=1, description="Casos simultáneos (tope: GOZOLITE_JUDGE_PARALLELISM).")
+    compile_tier: Literal["auto", "quick", "opt"] = Field(default="auto", description="Nivel de compilación; auto compila optimizado si hay varios casos.")
+    timeout: int = Field(default=2, ge=1, le=30, description="Tiempo máximo por caso en segundos.")
+    memory_mb: int = Field(default=256, ge=16, le=1024, description="Límite de memoria por caso en MB.")
+    priority: Literal["interactive", "batch"] = Field(default="interactive", description="Carril: interactive se despacha antes que batch.")
+    deadline_ms: Optional[int] = Field(default=None, ge=1, description="Plazo extremo a extremo (cola + ejecución); si no llega, 429 inmediato.")
+
+    # cancelación (DELETE /jobs/{job_id}); si falta se genera uno y vuelve en X-Job-Id
+    job_id: Optional[str] = Field(default=None, regex=_JOB_ID, description="Id del job para cancelarlo con DELETE /jobs/{job_id}.")
+
+class SessionOpenReq(BaseModel):
+    language: str = Field(description="Intérprete del kernel: python, ruby, perl, lua, r o php.")
+    memory_mb: int = Field(default=256, ge=16, le=1024, description="Límite de memoria del kernel en MB.")
+
+class SessionCellReq(BaseModel):
+    code: str = Field(description="Celda a ejecutar sobre el estado de la sesión.")
+    timeout: int = Field(default=10, ge=1, le=30, description="Tiempo máximo de la celda en segundos.")
+    priority: Literal["interactive", "batch"] = Field(default="interactive", description="Carril: interactive se despacha antes que batch.")
+    deadline_ms: Optional[int] = Field(default=None, ge=1, description="Plazo extremo a extremo (cola + ejecución); si no llega, 429 inmediato.")
+    # cancelación (DELETE /jobs/{job_id}); si falta se genera uno y vuelve en X-Job-Id
+    job_id: Optional[str] = Field(default=None, regex=_JOB_ID, description="Id del job para cancelarlo con DELETE /jobs/{job_id}.")
+
 class ExecResult(BaseModel):
     exit_code: int = Field(description="Código de salida del proceso.")
     mode: str = Field(description="Modo de ejecución (shell, python, gozolite/auto, etc.).")
     stdout: str = Field(description="Salida estándar limpia.")
     stderr: str = Field(description="Errores de ejecución o logs de seguridad.")
+    blocks: Optional[List[Dict[str, Any]]] = Field(default=None, description="Resultado por bloque (solo language='auto').")
+    result_sets: Optional[List[Dict[str, Any]]] = Field(default=None, description="Filas estructuradas por consulta (solo language='sql').")
+    profile: Optional[Dict[str, Any]] = Field(default=None, description="Timeline de recursos (solo con profile=true).")
 
 # ---------------------------------------------------------
 # Core Helpers
@@ -113,6 +224,9 @@ def _normalize_out(data: Dict[str, Any]) -> ExecResult:
         mode=str(data.get("mode", "ERR")),
         stdout=str(data.get("stdout", "")),
         stderr=str(data.get("stderr", "")),
+        blocks=data.get("blocks"),
+        result_sets=data.get("result_sets"),
+        profile=data.get("profile"),
     )
 
 
@@ -131,41 +245,36 @@ def _infer_lang_from_extension(path: Path) -> Optional[str]:
     return _EXT_MAP.get(path.suffix.lower())
 
 
-def _run_command(command: str, timeout: int) -> ExecResult:
-    """Ejecuta un comando shell con aislamiento de contexto."""
+def _shell_cmd(command: str) -> Tuple[Optional[List[str]], str]:
+    """Arma el argv del shell disponible (bash/pwsh) para un comando."""
     # Simulación de detección de shell bash/pwsh
     if os.name == "nt":
         shell = shutil.which("pwsh") or shutil.which("powershell")
-        cmd = [shell, "-NoProfile", "-Command", command] if shell else None
-        shell_name = "pwsh"
-    else:
-        sh = shutil.which("bash") or shutil.which("sh")
-        cmd = [sh, "-lc", command] if sh else None
-        shell_name = "bash"
+        return ([shell, "-NoProfile", "-Command", command] if shell else None), "pwsh"
+    sh = shutil.which("bash") or shutil.which("sh")
+    return ([sh, "-lc", command] if sh else None), "bash"
+
 
+def _run_command(command: str, timeout: int) -> ExecResult:
+    """Ejecuta un comando shell con aislamiento de contexto."""
+    cmd, shell_name = _shell_cmd(command)
     if not cmd:
         return _normalize_out({"exit_code": 127, "mode": "shell", "stderr": f"Error: No encuentro el shell ({shell_name}/sh)"})
 
     try:
-        proc = subprocess.run(
-            cmd,
-            cwd=str(WORKSPACE),
-            capture_output=True,
-            text=True,
-            timeout=timeout,
-        )
+        proc = supervisor.run(cmd, cwd=str(WORKSPACE), timeout=timeout)
+        if proc.timed_out:
+            return _normalize_out({"exit_code": 124, "mode": shell_name, "stderr": "Execution Timeout."})
         return _normalize_out({
             "exit_code": proc.returncode, "mode": shell_name,
             "stdout": proc.stdout, "stderr": proc.stderr,
         })
-    except subprocess.TimeoutExpired:
-        return _normalize_out({"exit_code": 124, "mode": shell_name, "stderr": "Execution Timeout."})
     except Exception as e:
         return _normalize_out({"exit_code": 500, "mode": shell_name, "stderr": f"Shell Execution Error: {type(e).__name__}: {e}"})
 
 
-def _run_script_path(script_path: str, language_hint: Optional[str], timeout: int, memory_mb: int) -> ExecResult:
-    """Ejecuta código desde una ruta de archivo validada."""
+def _load_script(script_path: str, language_hint: Optional[str]) -> Union[Tuple[str, str], ExecResult]:
+    """Valida la ruta y devuelve (lenguaje, código), o un ExecResult con el error."""
     rel = Path(script_path)
     p = _assert_inside_workspace(rel)
 
@@ -174,56 +283,431 @@ def _run_script_path(script_path: str, language_hint: Optional[str], timeout: in
     if not p.exists():
         return _normalize_out({"exit_code": 404, "mode": "script", "stderr": f"Resource Not Found: El archivo {p.name} no existe."})
 
-    lang = language_hint or _infer_lang_from_extension(p)
-    if not lang:
+    if not (language_hint or _infer_lang_from_extension(p)):
         return _normalize_out({"exit_code": 400, "mode": "script", "stderr": f"Language Not Specified: No se pudo inferir el lenguaje de la extensión {p.suffix}."})
 
     try:
-        code = p.read_text(encoding="utf-8")
+        script = workspace.load(p)  # sin cambios desde la última vez: no se relee
     except Exception as e:
         return _normalize_out({"exit_code": 500, "mode": "script", "stderr": f"I/O Error: No se pudo leer el archivo: {e}"})
 
-    return _run_code(lang, code, timeout, memory_mb)
+    return language_hint or script.language, script.code
+
+
+def _run_script_path(script_path: str, language_hint: Optional[str], timeout: int, memory_mb: int, **inputs) -> ExecResult:
+    """Ejecuta código desde una ruta de archivo validada."""
+    loaded = _load_script(script_path, language_hint)
+    if isinstance(loaded, ExecResult):
+        return loaded
+    lang, code = loaded
+    return _run_code(lang, code, timeout, memory_mb, **inputs)
+
+
+def _job_inputs(req: ExecReq) -> Union[Dict[str, Any], ExecResult]:
+    """Resuelve stdin/stdin_id/files/datasets/fixture del request a kwargs para MainApp.submit (rutas del spool)."""
+    inputs: Dict[str, Any] = {}
+    if req.stdin is not None:
+        inputs["stdin"] = req.stdin
+    if req.fixture:
+        inputs["fixture"] = req.fixture
+    if req.compile_tier != "auto":
+        inputs["compile_tier"] = req.compile_tier
+    if req.profile:
+        inputs["profile"] = True
+        if req.profile_interval_ms:
+            inputs["profile_interval_ms"] = req.profile_interval_ms
+    try:
+        if req.stdin_id:
+            inputs["stdin_path"] = str(spool.resolve({"stdin": req.stdin_id})["stdin"])
+        if req.files:
+            inputs["files"] = {name: str(p) for name, p in spool.resolve(req.files).items()}
+    except KeyError as e:
+        return _normalize_out({"exit_code": 404, "mode": "API", "stderr": f"Resource Not Found: input_id {e.args[0]} no existe o expiró."})
+    if req.datasets:
+        try:
+            inputs["datasets"] = {name: str(p) for name, p in datasets.resolve(req.datasets).items()}
+        except KeyError as e:
+            return _normalize_out({"exit_code": 404, "mode": "API", "stderr": f"Resource Not Found: dataset {e.args[0]} no existe o fue desalojado."})
+    return inputs
 
 
-def _run_code(language: Optional[str], code: str, timeout: int, memory_mb: int) -> ExecResult:
+def _run_code(language: Optional[str], code: str, timeout: int, memory_mb: int, **inputs) -> ExecResult:
     """Delega la ejecución de código (inline/polyglot) al orquestador GozoLite."""
     lang = (language or "").strip() or "auto" # 'auto' activa el modo Polyglot/Multilenguaje
     try:
-        res = main.submit(language=lang, code=code, timeout=timeout, memory_mb=memory_mb)
+        res = main.submit(language=lang, code=code, timeout=timeout, memory_mb=memory_mb, **inputs)
         return _normalize_out(res)
     except Exception as e:
         return _normalize_out({"exit_code": 500, "mode": "gozolite", "stderr": f"GozoLite Core Submission Failed: {type(e).__name__}: {e}"})
 
+
+def _sse(evt: Dict[str, Any]) -> str:
+    """Serializa un evento como Server-Sent Event (data en JSON, una línea)."""
+    name = evt.get("event", "message")
+    data = {k: v for k, v in evt.items() if k != "event"}
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _stream_command(command: str, timeout: int) -> Iterator[Dict[str, Any]]:
+    """Versión streaming de _run_command."""
+    cmd, shell_name = _shell_cmd(command)
+    if not cmd:
+        yield {"event": "exit", "exit_code": 127, "mode": "shell", "stderr": f"Error: No encuentro el shell ({shell_name}/sh)"}
+        return
+    started = time.monotonic()
+    proc = supervisor.popen(cmd, cwd=str(WORKSPACE), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        stopped = yield from pump_output(proc, timeout)
+    finally:
+        if supervisor.poll(proc) is None:
+            supervisor.kill_tree(proc)
+        else:
+            supervisor.finish(proc)
+    elapsed = int((time.monotonic() - started) * 1000)
+    if stopped:
+        yield {"event": "exit", "exit_code": 124, "mode": shell_name, "stderr": "Execution Timeout.", "time_ms": elapsed}
+    else:
+        yield {"event": "exit", "exit_code": proc.returncode, "mode": shell_name, "time_ms": elapsed}
+
+
+def _stream_code(language: Optional[str], code: str, timeout: int, memory_mb: int, **inputs) -> Iterator[Dict[str, Any]]:
+    """Versión streaming de _run_code."""
+    lang = (language or "").strip() or "auto"
+    try:
+        yield from main.stream(language=lang, code=code, timeout=timeout, memory_mb=memory_mb, **inputs)
+    except Exception as e:
+        yield {"event": "exit", "exit_code": 500, "mode": "gozolite", "stderr": f"GozoLite Core Submission Failed: {type(e).__name__}: {e}"}
+
+def _tenant(api_key: Optional[str]) -> str:
+    try:
+        return scheduler.identify(api_key)
+    except UnknownApiKey as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+
+def _admission(priority: str, deadline_ms: Optional[int], service: str) -> Dict[str, Any]:
+    """Carril, deadline y clave del historial de duración con que el job entra a la cola."""
+    return {"lane": priority, "deadline_s": None if deadline_ms is None else deadline_ms / 1000.0,
+            "service": service}
+
+
+def _exec_service(req: ExecReq) -> str:
+    if req.command:
+        return "shell"
+    return ((req.language or "").strip().lower() or "auto") + (":project" if req.project is not None else "")
+
+
+def _rejected(e: SchedulerRejected) -> JSONResponse:
+    """429 + Retry-After: presupuesto de CPU o cola agotados, o el job no llegaría a su deadline."""
+    return JSONResponse(
+        _normalize_out({"exit_code": 429, "mode": "scheduler", "stderr": str(e)}).dict(),
+        status_code=429,
+        headers={"Retry-After": str(e.retry_after_s), "X-Reject-Reason": e.reason},
+    )
+
+DISCONNECT_POLL_S = 0.25  # cada cuánto /execute y /judge miran si el cliente sigue conectado
+SSE_BUFFER = 64            # eventos en vuelo entre el hilo del stream y la respuesta
+
+
+def _open_job(tenant: str, job_id: Optional[str]) -> Job:
+    try:
+        return supervisor.open_job(job_id or uuid.uuid4().hex, owner=tenant)
+    except KeyError:
+        raise HTTPException(status_code=409, detail=f"job_id {job_id} ya está en curso")
+
+
+def _cancelled_out(job: Job, mode: str = "API") -> Dict[str, Any]:
+    return {"exit_code": CANCELLED_EXIT, "mode": mode, "stderr": f"Job cancelado ({job.cancelled})"}
+
+
+async def _until_done(request: Request, job: Job, fn):
+    """
+    Corre `fn` (bloqueante: cola + ejecución) en el threadpool como procesos de `job`. Si el cliente
+    se desconecta antes de que termine, cancela el job: su árbol muere en el acto y el hilo libera
+    slot y workdir enseguida, en vez de seguir hasta el timeout para nadie.
+    """
+    def _work():
+        with supervisor.running(job):
+            return fn()
+
+    task = asyncio.ensure_future(run_in_threadpool(_work))
+    task.add_done_callback(lambda _: supervisor.close_job(job))  # cuando el hilo termina de verdad
+    while not task.done():
+        await asyncio.wait({task}, timeout=DISCONNECT_POLL_S)
+        if not task.done() and await request.is_disconnected():
+            supervisor.cancel(job.id, job.owner, reason="disconnect")
+            break
+    res = await task
+    if job.cancelled and isinstance(res, ExecResult) and res.exit_code != CANCELLED_EXIT:
+        res = _normalize_out(_cancelled_out(job, res.mode))  # p. ej. `command`, que no pasa por GozoLite
+    if isinstance(res, Response):
+        res.headers["X-Job-Id"] = job.id
+    return res
+
+
+async def _sse_body(job: Job, events: Iterator[Dict[str, Any]]):
+    """
+    Cuerpo SSE de un stream ya admitido. Los eventos se producen en un hilo propio (dentro de `job`);
+    si el cliente se desconecta, Starlette cancela este generador: se cancela el job y el hilo drena
+    el resto, así el árbol muere en el acto y slot y workdir se liberan sin esperar al timeout.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_BUFFER)
+    gone = threading.Event()
+
+    def _deliver(item: Optional[Dict[str, Any]]) -> None:
+        if gone.is_set():
+            return
+        try:
+            fut = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:  # loop cerrado (apagado)
+            gone.set()
+            return
+        while not gone.is_set():
+            try:
+                fut.result(timeout=DISCONNECT_POLL_S)
+                return
+            except concurrent.futures.TimeoutError:
+                continue
+        fut.cancel()
+
+    def _pump() -> None:
+        try:
+            while True:
+                with supervisor.running(job):
+                    evt = next(events, None)
+                if evt is None:
+                    break
+                if evt.get("event") == "exit" and job.cancelled:
+                    evt = {"event": "exit", **_cancelled_out(job, str(evt.get("mode", "API"))), "time_ms": evt.get("time_ms")}
+                _deliver(evt)
+        except Exception as e:
+            _deliver({"event": "exit", **(_cancelled_out(job) if job.cancelled else
+                      {"exit_code": 500, "mode": "API", "stderr": f"Internal API Error: {type(e).__name__}: {e}"})})
+        finally:
+            with supervisor.running(job):
+                events.close()  # libera el slot (scheduler.stream) aunque el stream se corte a mitad
+            supervisor.close_job(job)
+            _deliver(None)
+
+    threading.Thread(target=_pump, name="gozolite-sse", daemon=True).start()
+    finished = False
+    try:
+        while True:
+            evt = await queue.get()
+            if evt is None:
+                finished = True
+                return
+            yield _sse(evt)
+    finally:
+        if not finished:
+            gone.set()
+            supervisor.cancel(job.id, job.owner, reason="disconnect")
+
+
+# Opciones de /execute que el socket Unix acepta tal cual en `meta`
+_UDS_OPTIONS = ("fixture", "compile_tier", "profile", "profile_interval_ms")
+_UDS_INLINE_STDIN = 64 * 1024  # más grande (o binario) => spool + stdin_path
+
+
+def _uds_submit(meta: Dict[str, Any], code: str, stdin: bytes) -> Dict[str, Any]:
+    """
+    Un SUBMIT del socket Unix: mismo camino que /execute (tenant por api_key, cola justa, job cancelable
+    con DELETE /jobs/{job_id}, MainApp.submit con SecureMiddleware) pero sin HTTP, pydantic ni ExecResult.
+    stdin que no es UTF-8 válido (o es grande) se spoolea y entra como stdin_path, sin tocar sus bytes.
+    """
+    def _err(code_: int, msg: str, mode: str = "uds") -> Dict[str, Any]:
+        return {"ok": False, "exit_code": code_, "stderr": msg, "time_ms": 0, "mode": mode}
+
+    language = str(meta.get("language") or "").strip() or "auto"
+    try:
+        timeout = int(meta.get("timeout") or 10)
+        memory_mb = int(meta.get("memory_mb") or 256)
+    except (TypeError, ValueError):
+        return _err(400, "timeout/memory_mb deben ser enteros")
+    if not 1 <= timeout <= 30 or not 16 <= memory_mb <= 1024:
+        return _err(400, "timeout fuera de [1, 30] o memory_mb fuera de [16, 1024]")
+    priority = meta.get("priority") or "interactive"
+    if priority not in ("interactive", "batch"):
+        return _err(400, f"priority inválida: {priority!r}")
+    try:
+        tenant = scheduler.identify(meta.get("api_key"))
+    except UnknownApiKey as e:
+        return _err(401, str(e))
+    job_id = meta.get("job_id") or uuid.uuid4().hex
+    if not isinstance(job_id, str) or not re.match(_JOB_ID, job_id):
+        return _err(400, f"job_id inválido: {job_id!r}")
+
+    inputs: Dict[str, Any] = {k: meta[k] for k in _UDS_OPTIONS if meta.get(k) is not None}
+    spooled: Optional[str] = None
+    try:
+        if meta.get("stdin_id"):
+            inputs["stdin_path"] = str(spool.resolve({"stdin": meta["stdin_id"]})["stdin"])
+        if meta.get("files"):
+            inputs["files"] = {name: str(p) for name, p in spool.resolve(meta["files"]).items()}
+        if meta.get("datasets"):
+            inputs["datasets"] = {name: str(p) for name, p in datasets.resolve(meta["datasets"]).items()}
+    except KeyError as e:
+        return _err(404, f"Resource Not Found: {e.args[0]} no existe o expiró.")
+    except (AttributeError, TypeError):
+        return _err(400, "stdin_id/files/datasets mal formados")
+    if stdin:
+        text: Optional[str] = None
+        if len(stdin) <= _UDS_INLINE_STDIN:
+            try:
+                text = stdin.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        if text is not None:
+            inputs["stdin"] = text
+        else:
+            try:
+                spooled, _size = spool.write([stdin])
+            except InputTooLarge as e:
+                return _err(413, str(e))
+            inputs["stdin_path"] = str(spool.path(spooled))
+
+    try:
+        job = supervisor.open_job(job_id, owner=tenant)
+    except KeyError:
+        if spooled is not None:
+            spool.discard(spooled)
+        return _err(409, f"job_id {job_id} ya está en curso")
+    try:
+        with supervisor.running(job), \
+                scheduler.slot(tenant, **_admission(priority, meta.get("deadline_ms"), language.lower())):
+            res = main.submit(language=language, code=code, timeout=timeout, memory_mb=memory_mb, **inputs)
+        if job.cancelled and res.get("exit_code") != CANCELLED_EXIT:
+            res = dict(res, **_cancelled_out(job, str(res.get("mode") or "uds")), ok=False)
+    except SchedulerRejected as e:
+        res = _err(429, str(e), mode="scheduler")
+        res.update(retry_after_s=e.retry_after_s, reason=e.reason)
+    finally:
+        supervisor.close_job(job)
+        if spooled is not None:
+            spool.discard(spooled)
+    return dict(res, job_id=job_id)
+
+
+def _uds_cancel(meta: Dict[str, Any]) -> None:
+    """El cliente del socket cortó con este SUBMIT en curso: se cancela como un /execute desconectado."""
+    try:
+        tenant = scheduler.identify(meta.get("api_key"))
+    except UnknownApiKey:
+        return
+    supervisor.cancel(str(meta.get("job_id")), owner=tenant, reason="disconnect")
+
+
+# Segundo listener (socket Unix, framing binario) para clientes en el mismo host; ver api/uds.py
+uds = UdsServer(UDS_PATH, _uds_submit, cancel=_uds_cancel) if UDS_PATH else None
+
 # ---------------------------------------------------------
 # Endpoints Públicos
 # ---------------------------------------------------------
 @app.get("/", summary="Estado de la Plataforma")
 def root():
     """Información básica de TotyLabs GozoLite."""
-    return {"app": "TotyLabs GozoLite", "version": app.version, "status": "Ready", "workspace": str(WORKSPACE)}
+    return {"app": "TotyLabs GozoLite", "version": app.version, "status": "Ready", "workspace": str(WORKSPACE),
+            "jobs": supervisor.snapshot(),
+            "compile_tiers": _base.tiers.snapshot() if hasattr(_base, "tiers") else None,
+            "syntax_check": _base.syntax.snapshot() if hasattr(_base, "syntax") else None,
+            "sandbox": _base.sandbox.snapshot() if hasattr(_base, "sandbox") else None,
+            "jvm_cds": _base.jvm.snapshot() if hasattr(_base, "jvm") else None,
+            "uds": uds.snapshot() if uds is not None else None,
+            "workspace_index": workspace.snapshot(),
+            "capture": main.recorder.snapshot() if getattr(main, "recorder", None) is not None else None}
 
-@app.get("/health", summary="Chequeo de Integridad del Runtime", response_model=ExecResult)
+
+@app.on_event("startup")
+def _start_canaries() -> None:
+    if canary is not None:
+        canary.start()
+    if uds is not None:
+        uds.start()
+    workspace.start()
+    if hasattr(_base, "jvm"):
+        _base.jvm.prewarm()  # archivos CDS de los JVM instalados, en background
+
+
+@app.on_event("shutdown")
+def _kill_jobs_on_shutdown() -> None:
+    # Ningún árbol de procesos de un job sobrevive al apagado de la API
+    if canary is not None:
+        canary.stop()
+    if uds is not None:
+        uds.stop()
+    workspace.stop()
+    if getattr(main, "recorder", None) is not None:
+        main.recorder.flush()  # el último lote de la captura
+    sessions = getattr(_base, "sessions", None)
+    if sessions is not None:
+        sessions.shutdown()
+    if hasattr(_base, "syntax"):
+        _base.syntax.close()
+    if hasattr(_base, "sandbox"):
+        _base.sandbox.close()
+    supervisor.shutdown()
+
+@app.get("/health", summary="Liveness (instantáneo, sin ejecutar código)")
 def health():
-    """Ejecuta una prueba simple de Python para asegurar que el executor funciona."""
-    try:
-        # Usamos el mock o el MainApp para una prueba de ejecución simple
-        res = _run_code("python", "print('1')", timeout=2, memory_mb=128)
-        if res.exit_code == 0 and ('1' in res.stdout or main is MockMainApp):
-            return res
-        raise Exception("Health check failed on output verification.")
-    except Exception as e:
-        raise HTTPException(
-            status_code=503,
-            detail=f"CRITICAL: GozoLite runtime is unhealthy. Detail: {str(e)}",
-        )
+    """
+    Liveness: la API responde. No ejecuta nada; incluye el resumen cacheado de los canaries
+    y los lenguajes degradados. La disponibilidad real de lenguajes está en /ready.
+    """
+    return {
+        "status": "ok",
+        "version": app.version,
+        "canary": canary.summary() if canary is not None else None,
+        "degraded": canary.degraded() if canary is not None else [],
+    }
+
+
+@app.get("/ready", summary="Readiness: estado cacheado por lenguaje (canaries)")
+def ready():
+    """
+    200 si los lenguajes de GOZOLITE_READY_LANGS pasaron su último canary (modo local) o si hay
+    al menos un agente sano (modo dispatcher); 503 si no. Responde desde la cache, sin ejecutar código.
+    """
+    if canary is not None:
+        ok, pending = canary.readiness(READY_LANGS)
+        body = {"ready": ok, "required": READY_LANGS, "pending": pending, "degraded": canary.degraded(),
+                **canary.snapshot()}
+    elif hasattr(_base, "status"):
+        agents = _base.status()
+        ok = any(a["healthy"] for a in agents)
+        body = {"ready": ok, "agents": agents}
+    else:
+        ok, body = True, {"ready": True, "mode": "mock"}
+    return JSONResponse(body, status_code=200 if ok else 503)
+
 
 @app.post("/execute", summary="Ejecutar Código Seguro y Políglota", response_model=ExecResult)
-def execute(req: ExecReq):
+async def execute(req: ExecReq, request: Request, response: Response, x_api_key: Optional[str] = Header(default=None)):
     """
     Ejecuta código, script o comando según la prioridad:
     1. command (shell) -> 2. script_path (archivo) -> 3. code (inline/polyglot)
+    El job espera su turno en la cola justa del tenant (X-API-Key), en su carril (`priority`);
+    con `deadline_ms`, si no llegaría a terminar a tiempo se rechaza de inmediato (429 + Retry-After).
+    Se cancela con DELETE /jobs/{X-Job-Id} o cuando el cliente corta la conexión (exit 130).
     """
+    tenant = _tenant(x_api_key)
+    job = _open_job(tenant, req.job_id)
+    response.headers["X-Job-Id"] = job.id
+
+    def _admitted():
+        try:
+            with scheduler.slot(tenant, **_admission(req.priority, req.deadline_ms, _exec_service(req))):
+                return _execute(req)
+        except SchedulerRejected as e:
+            return _rejected(e)
+    return await _until_done(request, job, _admitted)
+
+
+# /execute y /execute/stream sin ningún modo de ejecución
+_NO_EXEC_MODE = "TotyLabs: Solicitud de ejecución inválida. Requiere 'code', 'project', 'script_path', o 'command'."
+
+
+def _execute(req: ExecReq):
     try:
         # Validación de Pydantic ya maneja los límites de timeout/memory
         timeout = req.timeout
@@ -232,18 +716,25 @@ def execute(req: ExecReq):
         if req.command:
             return _run_command(req.command, timeout)
 
+        inputs = _job_inputs(req)
+        if isinstance(inputs, ExecResult):
+            return JSONResponse(inputs.dict(), status_code=404)
+
+        if req.project is not None:
+            return _run_code(req.language, req.code or "", timeout, memory_mb, project=req.project.dict(), **inputs)
+
         if req.script_path:
-            return _run_script_path(req.script_path, req.language, timeout, memory_mb)
+            return _run_script_path(req.script_path, req.language, timeout, memory_mb, **inputs)
 
         if req.code is not None:
-            return _run_code(req.language, req.code, timeout, memory_mb)
+            return _run_code(req.language, req.code, timeout, memory_mb, **inputs)
 
         # Si no se envió ningún modo de ejecución
         return JSONResponse(
             _normalize_out({
                 "exit_code": 400,
                 "mode": "API",
-                "stderr": "TotyLabs: Solicitud de ejecución inválida. Requiere 'code', 'script_path', o 'command'.",
+                "stderr": _NO_EXEC_MODE,
             }).dict(),
             status_code=400,
         )
@@ -260,6 +751,233 @@ def execute(req: ExecReq):
         )
 
 
+@app.post("/judge", summary="Juez: compilar una vez y correr N casos en paralelo")
+async def judge(req: JudgeReq, request: Request, response: Response, x_api_key: Optional[str] = Header(default=None)):
+    """
+    Compila el programa una sola vez (cache por contenido) y lo ejecuta contra cada caso
+    con límites de tiempo/memoria propios. Devuelve veredicto por caso y el total aprobado.
+    Cancelable como /execute (DELETE /jobs/{X-Job-Id} o desconexión del cliente).
+    """
+    cases: List[Dict[str, Any]] = []
+    for i, case in enumerate(req.cases):
+        item: Dict[str, Any] = {"stdin": case.stdin, "expected": case.expected}
+        if case.stdin_id:
+            path = spool.path(case.stdin_id)
+            if path is None:
+                raise HTTPException(status_code=404, detail=f"caso {i}: input_id {case.stdin_id} no existe o expiró")
+            item["stdin_path"] = str(path)
+        cases.append(item)
+    tenant = _tenant(x_api_key)
+    job = _open_job(tenant, req.job_id)
+    response.headers["X-Job-Id"] = job.id
+
+    def _admitted():
+        try:
+            with scheduler.slot(tenant, **_admission(req.priority, req.deadline_ms, f"judge:{req.language.lower()}")):
+                return main.judge(
+                    language=req.language, code=req.code, cases=cases, timeout=req.timeout, memory_mb=req.memory_mb,
+                    compare=req.compare, float_tol=req.float_tol, stop_on_fail=req.stop_on_fail, parallelism=req.parallelism,
+                    compile_tier=None if req.compile_tier == "auto" else req.compile_tier,
+                )
+        except SchedulerRejected as e:
+            return _rejected(e)
+        except Exception as e:
+            return JSONResponse(
+                _normalize_out({"exit_code": 500, "mode": "API", "stderr": f"Internal API Error: {type(e).__name__}: {e}"}).dict(),
+                status_code=500,
+            )
+    return await _until_done(request, job, _admitted)
+
+
+@app.post("/inputs", summary="Subir stdin/archivo de entrada (body crudo, streaming)")
+async def upload_input(request: Request, x_api_key: Optional[str] = Header(default=None)):
+    """
+    Guarda el body (application/octet-stream) en el spool por chunks, sin cargarlo en memoria.
+    Devuelve un `input_id` para usar como `stdin_id` o en `files` de /execute; sólo el tenant que
+    la subió puede descartarla.
+    """
+    tenant = _tenant(x_api_key)
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > spool.max_bytes:
+        raise HTTPException(status_code=413, detail=f"Entrada demasiado grande (> {spool.max_bytes} bytes)")
+    try:
+        input_id, size = await spool.write_async(request.stream(), owner=tenant)
+    except InputTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"input_id": input_id, "bytes": size}
+
+
+@app.post("/datasets", summary="Subir un dataset (body crudo, streaming; direccionado por sha256)")
+async def upload_dataset(request: Request, name: Optional[str] = None, x_api_key: Optional[str] = Header(default=None)):
+    """
+    Guarda el body en el store de datasets por chunks, hasheando al vuelo. Contenido repetido no se
+    duplica. `name` (opcional) queda como alias del sha256. En /execute: `datasets` = {nombre: ref}.
+    El tenant queda como dueño del blob y del alias; un alias de otro tenant no se pisa (403).
+    """
+    tenant = _tenant(x_api_key)
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > datasets.max_bytes:
+        raise HTTPException(status_code=413, detail=f"Dataset demasiado grande (> {datasets.max_bytes} bytes)")
+    try:
+        return await datasets.put_async(request.stream(), name=name, owner=tenant)
+    except DatasetTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/datasets", summary="Datasets del tenant (sha256, alias, tamaño, uso)")
+def list_datasets(x_api_key: Optional[str] = Header(default=None)):
+    return {"datasets": datasets.list(owner=_tenant(x_api_key)), "usage": datasets.usage()}
+
+
+@app.delete("/datasets/{ref}", summary="Borrar un dataset (sha256) o sólo su alias (nombre) del tenant")
+def delete_dataset(ref: str, x_api_key: Optional[str] = Header(default=None)):
+    if not datasets.delete(ref, owner=_tenant(x_api_key)):
+        raise HTTPException(status_code=404, detail="dataset inexistente")
+    return {"ref": ref, "deleted": True}
+
+
+def _session_call(fn_name: str, **kwargs: Any) -> Any:
+    fn = getattr(main, fn_name, None)
+    if fn is None:
+        raise HTTPException(status_code=501, detail="Sesiones no disponibles en este modo")
+    try:
+        return fn(**kwargs)
+    except SessionError as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+
+
+@app.post("/sessions", status_code=201, summary="Abrir una sesión con intérprete persistente (estilo notebook)")
+def open_session(req: SessionOpenReq, x_api_key: Optional[str] = Header(default=None)):
+    """
+    Arranca un kernel de larga vida en su propio workdir; las celdas de /sessions/{id}/execute comparten
+    su estado. Cupo global GOZOLITE_MAX_SESSIONS; se cierra tras GOZOLITE_SESSION_IDLE_S sin uso.
+    """
+    return _session_call("session_open", language=req.language, memory_mb=req.memory_mb, owner=_tenant(x_api_key))
+
+
+@app.post("/sessions/{session_id}/execute", summary="Ejecutar una celda en la sesión")
+async def execute_cell(session_id: str, req: SessionCellReq, request: Request, response: Response,
+                       x_api_key: Optional[str] = Header(default=None)):
+    """
+    Cada celda es un job más en la cola justa del tenant; al vencer el timeout se interrumpe el kernel.
+    Se cancela con DELETE /jobs/{X-Job-Id} o cuando el cliente corta la conexión (exit 130, misma interrupción).
+    """
+    tenant = _tenant(x_api_key)
+    job = _open_job(tenant, req.job_id)
+    response.headers["X-Job-Id"] = job.id
+
+    def _admitted():
+        try:
+            with scheduler.slot(tenant, **_admission(req.priority, req.deadline_ms, "session")):
+                return _session_call("session_execute", session_id=session_id, code=req.code, timeout=req.timeout,
+                                     owner=tenant)
+        except SchedulerRejected as e:
+            return _rejected(e)
+    return await _until_done(request, job, _admitted)
+
+
+@app.delete("/sessions/{session_id}", summary="Cerrar una sesión (mata el kernel y borra su workdir)")
+def close_session(session_id: str, x_api_key: Optional[str] = Header(default=None)):
+    if not _session_call("session_close", session_id=session_id, owner=_tenant(x_api_key)):
+        raise HTTPException(status_code=404, detail="sesión inexistente")
+    return {"session_id": session_id, "closed": True}
+
+
+@app.get("/sessions", summary="Sesiones vivas del tenant y cupo global")
+def list_sessions(x_api_key: Optional[str] = Header(default=None)):
+    return _session_call("sessions", owner=_tenant(x_api_key))
+
+
+@app.get("/sql/fixtures", summary="Bases SQL precargadas disponibles como `fixture`")
+def sql_fixtures():
+    sql = getattr(_base, "sql", None)
+    if sql is None:
+        return {"fixtures": [], "detail": "motor SQL in-process no disponible en este modo"}
+    return {"fixtures": sql.fixtures(), "stats": dict(sql.stats)}
+
+
+@app.get("/tenants", summary="Colas por tenant: profundidad, espera y CPU consumido")
+def tenants():
+    return scheduler.snapshot()
+
+
+@app.delete("/inputs/{input_id}", summary="Descartar una entrada del spool (sólo su tenant)")
+def delete_input(input_id: str, x_api_key: Optional[str] = Header(default=None)):
+    if not spool.discard(input_id, owner=_tenant(x_api_key)):
+        raise HTTPException(status_code=404, detail="input_id inexistente")
+    return {"input_id": input_id, "deleted": True}
+
+
+@app.post("/execute/stream", summary="Ejecutar con salida en vivo (SSE)")
+def execute_stream(req: ExecReq, x_api_key: Optional[str] = Header(default=None)):
+    """
+    Igual que /execute, pero responde `text/event-stream`: eventos `stdout`/`stderr`
+    con cada chunk producido y un evento final `exit` con exit_code y time_ms.
+    """
+    inputs = {} if req.command else _job_inputs(req)
+    if isinstance(inputs, ExecResult):
+        return JSONResponse(inputs.dict(), status_code=404)
+
+    if req.command:
+        events = _stream_command(req.command, req.timeout)
+    elif req.project is not None:
+        events = _stream_code(req.language, req.code or "", req.timeout, req.memory_mb, project=req.project.dict(), **inputs)
+    elif req.script_path:
+        loaded = _load_script(req.script_path, req.language)
+        if isinstance(loaded, ExecResult):
+            events = iter([{"event": "exit", "exit_code": loaded.exit_code, "mode": loaded.mode, "stderr": loaded.stderr}])
+        else:
+            events = _stream_code(loaded[0], loaded[1], req.timeout, req.memory_mb, **inputs)
+    elif req.code is not None:
+        events = _stream_code(req.language, req.code, req.timeout, req.memory_mb, **inputs)
+    else:
+        return JSONResponse(
+            _normalize_out({
+                "exit_code": 400,
+                "mode": "API",
+                "stderr": _NO_EXEC_MODE,
+            }).dict(),
+            status_code=400,
+        )
+
+    # El turno se obtiene antes de responder (un rechazo aún puede ser 429); el slot se libera al cerrar el stream
+    tenant = _tenant(x_api_key)
+    job = _open_job(tenant, req.job_id)
+    try:
+        ticket = scheduler.acquire(tenant, **_admission(req.priority, req.deadline_ms, _exec_service(req)))
+    except SchedulerRejected as e:
+        supervisor.close_job(job)
+        return _rejected(e)
+    except BaseException:
+        supervisor.close_job(job)
+        raise
+    return StreamingResponse(
+        _sse_body(job, scheduler.stream(ticket, events)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Job-Id": job.id},
+    )
+
+
+@app.get("/jobs", summary="Jobs en curso del tenant (id, edad, procesos vivos)")
+def list_jobs(x_api_key: Optional[str] = Header(default=None)):
+    return {"jobs": supervisor.jobs(owner=_tenant(x_api_key))}
+
+
+@app.delete("/jobs/{job_id}", summary="Cancelar un job en curso (mata su árbol de procesos)")
+def cancel_job(job_id: str, x_api_key: Optional[str] = Header(default=None)):
+    """
+    SIGKILL inmediato al árbol de procesos del job (compilación, run o casos del juez); el request que lo
+    lanzó responde exit 130 y libera su slot y workdir. Un job aún en cola se corta al obtener su turno.
+    """
+    if not supervisor.cancel(job_id, owner=_tenant(x_api_key)):
+        raise HTTPException(status_code=404, detail="job inexistente o ya terminado")
+    return {"job_id": job_id, "cancelled": True}
+
+
 # ---------------------------------------------------------
 # UI de $75M (Simulador de Terminal/IDE Corregido y Estable)
 # ---------------------------------------------------------
@@ -409,18 +1127,42 @@ modeSel.addEventListener('change', () => {
 
 modeSel.dispatchEvent(new Event('change'));
 
-// --- Llamada a la API (Asíncrona) ---
-async function callExecute(payload) {
-  const res = await fetch('/execute', {
+// --- Llamada a la API (Streaming SSE sobre fetch) ---
+// onChunk(evento, data) se invoca por cada chunk de stdout/stderr; devuelve el evento final 'exit'.
+async function callExecuteStream(payload, onChunk) {
+  const res = await fetch('/execute/stream', {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify(payload)
   });
-  if (!res.ok && res.status !== 500) { 
+  if (!res.ok) {
     const t = await res.text();
     throw new Error(`HTTP Error ${res.status}: ${t}`);
   }
-  return res.json();
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = '';
+  let final = null;
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buf.indexOf('\\n\\n')) >= 0) {
+      const frame = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      let name = 'message', data = '';
+      for (const line of frame.split('\\n')) {
+        if (line.startsWith('event: ')) name = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      const obj = data ? JSON.parse(data) : {};
+      if (name === 'exit') final = obj;
+      else onChunk(name, obj.data ?? '');
+    }
+  }
+  if (!final) throw new Error('Stream cortado antes del evento final.');
+  return final;
 }
 
 // --- Lógica de Ejecución ---
@@ -449,27 +1191,29 @@ async function handleRun() {
 
   exitCode.textContent = '—';
   modeOut.textContent  = 'WAIT';
-  stdout.textContent   = 'Running job...';
+  stdout.textContent   = '';
   stderr.textContent   = '';
   exitCode.classList.remove('text-green-500', 'text-red-500');
   exitCode.classList.add('text-yellow-500');
 
   try {
-    const data = await callExecute(payload);
+    const data = await callExecuteStream(payload, (name, chunk) => {
+      const target = name === 'stderr' ? stderr : stdout;
+      target.textContent += chunk;
+      target.scrollTop = target.scrollHeight;
+    });
     
     exitCode.textContent = data.exit_code ?? '—';
-    modeOut.textContent  = data.mode ?? '—';
-    stdout.textContent   = data.stdout ?? '';
-    stderr.textContent   = data.stderr ?? '';
+    modeOut.textContent  = data.time_ms != null ? `${data.mode ?? '—'} ${data.time_ms}ms` : (data.mode ?? '—');
+    if (data.stderr) {
+        stderr.textContent += data.stderr;
+    }
     
     exitCode.classList.remove('text-yellow-500');
     if (data.exit_code === 0) {
         exitCode.classList.add('text-green-500');
     } else {
         exitCode.classList.add('text-red-500');
-        if (data.stderr) {
-            stderr.textContent = data.stderr;
-        }
     }
     
   } catch (e) {
@@ -0,0 +1,311 @@
+# api/uds.py — listener en socket Unix con framing binario (clientes en el mismo host, sin HTTP/JSON/pydantic)
+"""
+Protocolo (todo entero big-endian):
+
+    frame  = u32 largo_payload | u32 request_id | u8 tipo | payload
+
+    SUBMIT (0x01)  cliente -> servidor
+        payload = u32 largo_meta | meta (JSON utf-8) | u32 largo_code | code (utf-8) | stdin (bytes crudos, resto)
+        meta: language (obligatorio), timeout, memory_mb, priority, deadline_ms, api_key, job_id y las
+              opciones de /execute (stdin_id, files, datasets, fixture, compile_tier, profile, ...).
+    PING   (0x02)  cliente -> servidor, payload vacío => PONG con el mismo request_id
+
+    RESULT (0x81)  servidor -> cliente
+        payload = u32 largo_meta | meta (JSON: ok, exit_code, time_ms, mode, ...) | u32 largo_stdout | stdout | stderr
+    PONG   (0x82)
+    ERROR  (0x83)  frame inválido (payload = mensaje utf-8); si no se puede seguir leyendo, se cierra la conexión
+
+- Pipelining y multiplexado: el cliente puede mandar SUBMITs sin esperar; cada uno corre en el pool y
+  su RESULT sale apenas termina (en cualquier orden), con el request_id del SUBMIT.
+- stdin/stdout/stderr viajan como bytes con prefijo de largo: sin escapes JSON ni base64.
+- Backpressure: con GOZOLITE_UDS_MAX_INFLIGHT jobs en curso en una conexión se deja de leer de ella.
+- Cancelación: cada SUBMIT es un job (job_id del meta o uno generado, que vuelve en el RESULT) y se
+  cancela con DELETE /jobs/{job_id}; si el cliente cierra la conexión, los jobs en curso se cancelan.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+UDS_PATH         = os.getenv("GOZOLITE_UDS_PATH", "")                         # vacío => listener apagado
+UDS_MODE         = int(os.getenv("GOZOLITE_UDS_MODE", "660"), 8)              # permisos del socket
+UDS_WORKERS      = _env_int("GOZOLITE_UDS_WORKERS", 32)                       # hilos para jobs (la cola justa limita de verdad)
+UDS_MAX_INFLIGHT = _env_int("GOZOLITE_UDS_MAX_INFLIGHT", 64)                  # por conexión
+UDS_MAX_FRAME    = _env_int("GOZOLITE_UDS_MAX_FRAME", 64 * 1024 * 1024)       # bytes de payload por frame
+
+SUBMIT, PING = 0x01, 0x02
+RESULT, PONG, ERROR = 0x81, 0x82, 0x83
+
+_HEAD = struct.Struct("!IIB")
+_U32 = struct.Struct("!I")
+
+# handler(meta, code, stdin) -> resultado estilo MainApp.submit (stdout/stderr str)
+Handler = Callable[[Dict[str, Any], str, bytes], Dict[str, Any]]
+# cancel(meta): el cliente se fue con ese SUBMIT en curso
+Canceller = Callable[[Dict[str, Any]], None]
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+# --------- Codificación (compartida por servidor y cliente) ---------
+def frame(request_id: int, ftype: int, payload: bytes = b"") -> bytes:
+    return _HEAD.pack(len(payload), request_id, ftype) + payload
+
+
+def encode_submit(request_id: int, meta: Dict[str, Any], code: str, stdin: bytes = b"") -> bytes:
+    m = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    c = code.encode("utf-8")
+    return frame(request_id, SUBMIT, b"".join((_U32.pack(len(m)), m, _U32.pack(len(c)), c, stdin)))
+
+
+def decode_submit(payload: bytes) -> Tuple[Dict[str, Any], str, bytes]:
+    try:
+        (mlen,) = _U32.unpack_from(payload, 0)
+        meta = json.loads(payload[4:4 + mlen])
+        (clen,) = _U32.unpack_from(payload, 4 + mlen)
+        start = 8 + mlen
+        if start + clen > len(payload):
+            raise ProtocolError("largo de code fuera del frame")
+        code = payload[start:start + clen].decode("utf-8")
+    except (struct.error, ValueError) as e:
+        raise ProtocolError(f"SUBMIT mal formado: {e}")
+    if not isinstance(meta, dict):
+        raise ProtocolError("meta debe ser un objeto JSON")
+    return meta, code, payload[start + clen:]
+
+
+def encode_result(request_id: int, res: Dict[str, Any]) -> bytes:
+    out = res.get("stdout") or ""
+    err = res.get("stderr") or ""
+    out_b = out if isinstance(out, bytes) else str(out).encode("utf-8", "surrogateescape")
+    err_b = err if isinstance(err, bytes) else str(err).encode("utf-8", "surrogateescape")
+    meta = {k: v for k, v in res.items() if k not in ("stdout", "stderr")}
+    m = json.dumps(meta, separators=(",", ":"), default=str).encode("utf-8")
+    return frame(request_id, RESULT, b"".join((_U32.pack(len(m)), m, _U32.pack(len(out_b)), out_b, err_b)))
+
+
+def decode_result(payload: bytes) -> Dict[str, Any]:
+    (mlen,) = _U32.unpack_from(payload, 0)
+    res = json.loads(payload[4:4 + mlen])
+    (olen,) = _U32.unpack_from(payload, 4 + mlen)
+    start = 8 + mlen
+    res["stdout"] = payload[start:start + olen]
+    res["stderr"] = payload[start + olen:]
+    return res
+
+
+# --------- Servidor ---------
+class UdsServer:
+    """
+    Listener asyncio propio (en su hilo, independiente del loop de uvicorn). Cada SUBMIT se
+    decodifica y se pasa a `handler` en un pool de hilos: el handler es el mismo camino que /execute
+    (cola justa del tenant, MainApp.submit y SecureMiddleware). Si la conexión se corta con SUBMITs
+    en curso, se llama a `cancel` con el meta de cada uno (que siempre lleva job_id).
+    """
+
+    def __init__(self, path: str, handler: Handler, workers: Optional[int] = None,
+                 max_inflight: Optional[int] = None, max_frame: Optional[int] = None, mode: Optional[int] = None,
+                 cancel: Optional[Canceller] = None):
+        self.path = path
+        self.handler = handler
+        self.cancel = cancel
+        self.max_inflight = max(1, max_inflight or UDS_MAX_INFLIGHT)
+        self.max_frame = max_frame or UDS_MAX_FRAME
+        self.mode = UDS_MODE if mode is None else mode
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers or UDS_WORKERS), thread_name_prefix="gozolite-uds")
+        self.stats: Dict[str, int] = {"connections": 0, "open": 0, "jobs": 0, "protocol_errors": 0, "cancelled": 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    # --------- Ciclo de vida ---------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._serve, name="gozolite-uds", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=10)
+        if self._error is not None:
+            raise self._error
+
+    def _serve(self) -> None:
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            if os.path.exists(self.path):
+                os.unlink(self.path)  # socket viejo de una corrida anterior
+            server = loop.run_until_complete(asyncio.start_unix_server(self._client, path=self.path))
+            os.chmod(self.path, self.mode)
+        except BaseException as e:
+            self._error = e
+            self._ready.set()
+            loop.close()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            server.close()  # las conexiones abiertas se cortan con el loop
+            loop.close()
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+        self._thread = None
+        self.pool.shutdown(wait=False)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"path": self.path, **self.stats}
+
+    # --------- Conexión ---------
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        self.stats["open"] += 1
+        gate = asyncio.Semaphore(self.max_inflight)
+        jobs: set = set()
+        live: Dict[int, Dict[str, Any]] = {}  # id(meta) -> meta de los SUBMITs en curso (el request_id lo elige el cliente)
+        try:
+            while True:
+                try:
+                    length, rid, ftype = _HEAD.unpack(await reader.readexactly(_HEAD.size))
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if length > self.max_frame:
+                    self.stats["protocol_errors"] += 1
+                    writer.write(frame(rid, ERROR, f"frame demasiado grande (> {self.max_frame} bytes)".encode()))
+                    break  # no se puede resincronizar sin leerlo
+                try:
+                    payload = await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if ftype == PING:
+                    writer.write(frame(rid, PONG))
+                    continue
+                if ftype != SUBMIT:
+                    self.stats["protocol_errors"] += 1
+                    writer.write(frame(rid, ERROR, f"tipo de frame desconocido: {ftype:#x}".encode()))
+                    continue
+                await gate.acquire()  # backpressure: con el cupo lleno no se lee más de esta conexión
+                task = asyncio.get_running_loop().create_task(self._job(rid, payload, writer, gate, live))
+                jobs.add(task)
+                task.add_done_callback(jobs.discard)
+        finally:
+            if live and self.cancel is not None:  # el cliente se fue: nadie espera esos resultados
+                for meta in list(live.values()):
+                    self.cancel(meta)
+                    self.stats["cancelled"] += 1
+            if jobs:
+                await asyncio.gather(*jobs, return_exceptions=True)
+            self.stats["open"] -= 1
+            writer.close()
+
+    async def _job(self, rid: int, payload: bytes, writer: asyncio.StreamWriter, gate: asyncio.Semaphore,
+                   live: Dict[int, Dict[str, Any]]) -> None:
+        meta: Optional[Dict[str, Any]] = None
+        try:
+            try:
+                meta, code, stdin = decode_submit(payload)
+                self.stats["jobs"] += 1
+                meta.setdefault("job_id", uuid.uuid4().hex)
+                live[id(meta)] = meta
+                res = await asyncio.get_running_loop().run_in_executor(self.pool, self.handler, meta, code, stdin)
+            except ProtocolError as e:
+                self.stats["protocol_errors"] += 1
+                res = {"ok": False, "exit_code": 400, "stderr": str(e), "mode": "uds"}
+            except Exception as e:
+                res = {"ok": False, "exit_code": 500, "stderr": f"UDS handler: {type(e).__name__}: {e}", "mode": "uds"}
+        finally:
+            if meta is not None:
+                live.pop(id(meta), None)
+            gate.release()
+        if writer.is_closing():
+            return  # el cliente se fue: el resultado se descarta
+        writer.write(encode_result(rid, res))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+# --------- Cliente de referencia ---------
+class UdsClient:
+    """
+    Cliente bloqueante mínimo del protocolo (para daemons en el mismo host y pruebas):
+    `submit` manda el frame y devuelve el request_id; `result(rid)` espera ese RESULT
+    (los que lleguen antes quedan guardados). Un hilo por cliente.
+    """
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self._next = 0
+        self._done: Dict[int, Dict[str, Any]] = {}
+        self._buf = bytearray()
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def __enter__(self) -> "UdsClient":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def submit(self, language: str, code: str, stdin: bytes = b"", **meta: Any) -> int:
+        self._next += 1
+        self.sock.sendall(encode_submit(self._next, dict(meta, language=language), code, stdin))
+        return self._next
+
+    def ping(self) -> int:
+        self._next += 1
+        self.sock.sendall(frame(self._next, PING))
+        return self._next
+
+    def _recv_frame(self) -> Tuple[int, int, bytes]:
+        while True:
+            if len(self._buf) >= _HEAD.size:
+                length, rid, ftype = _HEAD.unpack_from(self._buf, 0)
+                if len(self._buf) >= _HEAD.size + length:
+                    payload = bytes(self._buf[_HEAD.size:_HEAD.size + length])
+                    del self._buf[:_HEAD.size + length]
+                    return rid, ftype, payload
+            chunk = self.sock.recv(1 << 16)
+            if not chunk:
+                raise ConnectionError("el servidor cerró la conexión")
+            self._buf += chunk
+
+    def result(self, request_id: int) -> Dict[str, Any]:
+        while request_id not in self._done:
+            rid, ftype, payload = self._recv_frame()
+            if ftype == RESULT:
+                self._done[rid] = decode_result(payload)
+            elif ftype == PONG:
+                self._done[rid] = {"pong": True}
+            elif ftype == ERROR:
+                raise ProtocolError(payload.decode("utf-8", "replace"))
+        return self._done.pop(request_id)
+
+    def run(self, language: str, code: str, stdin: bytes = b"", **meta: Any) -> Dict[str, Any]:
+        return self.result(self.submit(language, code, stdin, **meta))
@@ -0,0 +1,163 @@
+# core2/orchestrators/artifact_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from .supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+ARTIFACT_DIR      = os.getenv("GOZOLITE_ARTIFACT_DIR", "/tmp/gozolite-artifacts")
+ARTIFACT_CACHE_MB = _env_int("GOZOLITE_ARTIFACT_CACHE_MB", 1024)
+EVICT_MIN_AGE_S   = 60  # nunca se borra un artefacto usado hace menos de esto (puede estar corriendo)
+
+
+@dataclass
+class BuildOutcome:
+    ok: bool
+    dir: Path
+    src: Path
+    cached: bool
+    exit_code: int = 0
+    stdout: str = ""
+    stderr: str = ""
+    time_ms: int = 0
+    tier: str = ""  # nivel de compilación (quick/opt), lo fija GozoLite
+
+
+def artifact_key(language: str, code: str, variant: str = "") -> str:
+    h = hashlib.sha256()
+    for part in (language, variant, code):
+        b = part.encode("utf-8")
+        h.update(len(b).to_bytes(8, "little"))
+        h.update(b)
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Cache de compilación por contenido: <root>/<lang>-<sha256>/ con la fuente y sus artefactos.
+    - Se compila en un directorio temporal y se publica con rename atómico (sin carreras).
+    - Los fallos de compilación no se cachean.
+    - Evicción LRU por mtime cuando se supera GOZOLITE_ARTIFACT_CACHE_MB.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_mb: Optional[int] = None):
+        self.root = Path(root or ARTIFACT_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = (max_mb if max_mb is not None else ARTIFACT_CACHE_MB) * 1024 * 1024
+        self.stats: Dict[str, int] = {"hits": 0, "builds": 0, "failures": 0}
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None  # se recalcula solo al podar
+
+    def lookup(self, language: str, code: str, variant: str = "") -> Optional[Path]:
+        d = self.root / f"{language}-{artifact_key(language, code, variant)}"
+        if d.is_dir():
+            os.utime(d)
+            return d
+        return None
+
+    def get_or_build(
+        self,
+        language: str,
+        code: str,
+        source_name: str,
+        build_cmd: Callable[[Path, Path], str],
+        timeout: float,
+        variant: str = "",
+        env: Optional[Dict[str, str]] = None,
+        fresh: bool = False,
+    ) -> BuildOutcome:
+        """
+        Devuelve el directorio con los artefactos de `code`; compila con build_cmd(src, outdir)
+        solo si no estaba en cache (fresh=True compila igual: los canaries prueban el compilador).
+        """
+        key = f"{language}-{artifact_key(language, code, variant)}"
+        final = self.root / key
+        if final.is_dir() and not fresh:
+            os.utime(final)
+            with self._lock:
+                self.stats["hits"] += 1
+            return BuildOutcome(True, final, final / source_name, cached=True)
+
+        tmp = Path(tempfile.mkdtemp(prefix=f".build-{language}-", dir=str(self.root)))
+        src = tmp / source_name
+        src.write_text(code, encoding="utf-8")
+        cmd = build_cmd(src, tmp)
+        started = time.monotonic()
+        proc = supervisor.run(["bash", "-lc", cmd], cwd=str(tmp), timeout=timeout, env=env)
+        if proc.timed_out:
+            shutil.rmtree(tmp, ignore_errors=True)
+            with self._lock:
+                self.stats["failures"] += 1
+            return BuildOutcome(False, final, final / source_name, cached=False, exit_code=124,
+                                stderr="Timeout de compilación", time_ms=int((time.monotonic() - started) * 1000))
+        elapsed = int((time.monotonic() - started) * 1000)
+        if proc.returncode != 0:
+            shutil.rmtree(tmp, ignore_errors=True)
+            with self._lock:
+                self.stats["failures"] += 1
+            return BuildOutcome(False, final, final / source_name, cached=False, exit_code=proc.returncode,
+                                stdout=proc.stdout, stderr=proc.stderr, time_ms=elapsed)
+        try:
+            os.rename(tmp, final)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # otro job publicó el mismo artefacto primero
+        with self._lock:
+            self.stats["builds"] += 1
+        self._account(final)
+        return BuildOutcome(True, final, final / source_name, cached=False, stdout=proc.stdout, stderr=proc.stderr, time_ms=elapsed)
+
+    @staticmethod
+    def _dir_bytes(d: Path) -> int:
+        return sum(f.stat().st_size for f in d.rglob("*") if f.is_file())
+
+    def _account(self, added: Path) -> None:
+        try:
+            size = self._dir_bytes(added)
+        except OSError:
+            size = 0
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = -1  # marcador: primera medición completa
+            else:
+                self._approx_bytes += size
+            over = self._approx_bytes < 0 or self._approx_bytes > self.max_bytes
+        if over:
+            self._trim()
+
+    def _trim(self) -> None:
+        entries = []
+        total = 0
+        for d in self.root.iterdir():
+            if d.name.startswith("."):
+                continue
+            try:
+                size = self._dir_bytes(d)
+                entries.append((d.stat().st_mtime, size, d))
+                total += size
+            except OSError:
+                pass
+        if total > self.max_bytes:
+            cutoff = time.time() - EVICT_MIN_AGE_S
+            for mtime, size, d in sorted(entries):
+                if mtime > cutoff:
+                    break
+                shutil.rmtree(d, ignore_errors=True)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        with self._lock:
+            self._approx_bytes = total
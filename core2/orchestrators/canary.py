@@ -0,0 +1,189 @@
+# core2/orchestrators/canary.py — canaries por lenguaje en background (estado cacheado para /health y /ready)
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+CANARY_INTERVAL_S = _env_int("GOZOLITE_CANARY_INTERVAL_S", 120)  # cada cuánto se repite la ronda
+CANARY_SLOW_MS    = _env_int("GOZOLITE_CANARY_SLOW_MS", 5000)    # más lento que esto => degradado
+CANARY_FAIL_AFTER = _env_int("GOZOLITE_CANARY_FAIL_AFTER", 2)    # fallos seguidos para pasar a failing
+CANARY_TIMEOUT_S  = 10
+LATENCY_ALPHA     = 0.3
+
+log = logging.getLogger("gozolite.canary")
+
+# Programa mínimo por lenguaje: todos imprimen "canary" (sed recibe "x" por stdin desde el runner)
+CANARIES: Dict[str, str] = {
+    "python":     'print("canary")',
+    "node":       'console.log("canary")',
+    "typescript": 'console.log("canary")',
+    "bash":       'echo canary',
+    "c":          '#include <stdio.h>\nint main(void){ puts("canary"); return 0; }',
+    "cpp":        '#include <iostream>\nint main(){ std::cout << "canary\\n"; return 0; }',
+    "java":       'public class Main { public static void main(String[] a){ System.out.println("canary"); } }',
+    "go":         'package main\nimport "fmt"\nfunc main(){ fmt.Println("canary") }',
+    "rust":       'fn main(){ println!("canary"); }',
+    "sql":        "select 'canary';",
+    "ruby":       'puts "canary"',
+    "php":        '<?php echo "canary\\n";',
+    "r":          'cat("canary\\n")',
+    "lua":        'print("canary")',
+    "perl":       'print "canary\\n";',
+    "tcl":        'puts canary',
+    "awk":        'BEGIN { print "canary" }',
+    "sed":        's/.*/canary/',
+    "make":       '.PHONY: all\nall:\n\t@echo canary',
+    "bc":         'print "canary\\n"',
+    "kotlin":     'fun main(){ println("canary") }',
+    "scala":      'object Main extends App { println("canary") }',
+    "haskell":    'main = putStrLn "canary"',
+    "ocaml":      'print_endline "canary";;',
+    "dart":       'void main(){ print("canary"); }',
+    "fortran":    'program canary\nprint "(a)", "canary"\nend program canary',
+    "pascal":     "program Canary; begin writeln('canary'); end.",
+    "ada":        'with Ada.Text_IO; use Ada.Text_IO; procedure Canary is begin Put_Line("canary"); end Canary;',
+    "cobol":      '       IDENTIFICATION DIVISION.\n       PROGRAM-ID. CANARY.\n       PROCEDURE DIVISION.\n'
+                  '           DISPLAY "canary".\n           STOP RUN.',
+    "zig":        'pub fn main() void { @import("std").debug.print("canary\\n", .{}); }',
+}
+
+# Estados: ok | slow | failing | unavailable (toolchain no instalado) | unknown (todavía sin correr)
+DEGRADED = ("slow", "failing", "unavailable")
+
+
+class CanaryMonitor:
+    """
+    Corre en background un programa mínimo por lenguaje (compilando de verdad, sin la cache de
+    artefactos) y guarda estado y latencia. /health, /ready y el dispatcher leen el estado cacheado:
+    ningún probe ejecuta código.
+    """
+
+    def __init__(self, orch: Any, interval_s: Optional[int] = None, slow_ms: Optional[int] = None,
+                 languages: Optional[List[str]] = None):
+        self.orch = orch
+        self.interval_s = CANARY_INTERVAL_S if interval_s is None else interval_s
+        self.slow_ms = CANARY_SLOW_MS if slow_ms is None else slow_ms
+        registry = getattr(orch, "registry", {}) or {}
+        self.languages = [l for l in (languages or sorted(registry)) if l in CANARIES]
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {
+            l: {"status": "unknown", "latency_ms": None, "latency_ms_avg": None, "checked_at": None,
+                "checks": 0, "failures": 0, "consecutive_failures": 0, "last_error": ""}
+            for l in self.languages
+        }
+        self.rounds = 0
+        self.last_round_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --------- Ciclo ---------
+    def start(self) -> None:
+        if self._thread is None and self.languages and self.interval_s > 0:
+            self._thread = threading.Thread(target=self._loop, name="gozolite-canary", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.run_round()
+            self._stop.wait(self.interval_s)
+
+    def run_round(self) -> None:
+        for lang in self.languages:  # de a uno: los canaries no compiten entre sí ni acaparan slots
+            if self._stop.is_set():
+                return
+            try:
+                self.check(lang)
+            except Exception as e:  # un canary roto no mata el monitor
+                self._record(lang, "failing", None, f"excepción: {e}")
+        with self._lock:
+            self.rounds += 1
+            self.last_round_at = time.time()
+
+    def check(self, language: str) -> Dict[str, Any]:
+        spec = getattr(self.orch, "registry", {}).get(language)
+        which = getattr(self.orch, "_which", None)
+        if spec is not None and which is not None:
+            missing = [t for t in spec.tools if not which(t)]
+            if missing:
+                return self._record(language, "unavailable", None, f"{'/'.join(missing)} no instalado")
+        started = time.monotonic()
+        res = self.orch.execute({"language": language, "code": CANARIES[language], "timeout": CANARY_TIMEOUT_S,
+                                 "memory_mb": 256, "fresh_build": True})
+        latency = int((time.monotonic() - started) * 1000)
+        if int(res.get("exit_code", 1)) != 0 or "canary" not in str(res.get("stdout", "")):
+            err = str(res.get("stderr", "")).strip() or f"exit={res.get('exit_code')} sin 'canary' en stdout"
+            return self._record(language, "failing", latency, err[-300:])
+        slow = max(self.slow_ms, int(getattr(self.orch, "min_timeout", {}).get(language, 0)) * 500)
+        return self._record(language, "slow" if latency > slow else "ok", latency, "")
+
+    def _record(self, language: str, status: str, latency: Optional[int], error: str) -> Dict[str, Any]:
+        with self._lock:
+            st = self._state[language]
+            st["checks"] += 1
+            st["checked_at"] = time.time()
+            if latency is not None:
+                st["latency_ms"] = latency
+                prev = st["latency_ms_avg"]
+                st["latency_ms_avg"] = latency if prev is None else int((1 - LATENCY_ALPHA) * prev + LATENCY_ALPHA * latency)
+            if status == "failing":
+                st["failures"] += 1
+                st["consecutive_failures"] += 1
+                st["last_error"] = error
+                # Un fallo aislado no degrada un lenguaje que venía sano (hasta CANARY_FAIL_AFTER seguidos)
+                if st["status"] in ("ok", "slow") and st["consecutive_failures"] < CANARY_FAIL_AFTER:
+                    return dict(st)
+            else:
+                st["consecutive_failures"] = 0
+                if status == "unavailable":
+                    st["last_error"] = error
+            if st["status"] != status:
+                level = logging.WARNING if status in ("failing", "slow") else logging.INFO
+                log.log(level, "canary %s: %s -> %s %s", language, st["status"], status, error)
+            st["status"] = status
+            return dict(st)
+
+    # --------- Lectura (instantánea) ---------
+    def status(self, language: str) -> str:
+        with self._lock:
+            st = self._state.get(language)
+            return st["status"] if st else "unknown"
+
+    def degraded(self) -> List[str]:
+        with self._lock:
+            return sorted(l for l, st in self._state.items() if st["status"] in DEGRADED)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for st in self._state.values():
+                counts[st["status"]] = counts.get(st["status"], 0) + 1
+            return {"alive": self.alive, "rounds": self.rounds, "last_round_at": self.last_round_at,
+                    "interval_s": self.interval_s, "counts": counts}
+
+    def snapshot(self) -> Dict[str, Any]:
+        out = self.summary()
+        with self._lock:
+            out["languages"] = {l: dict(st) for l, st in sorted(self._state.items())}
+        return out
+
+    def readiness(self, required: List[str]) -> Tuple[bool, List[str]]:
+        """Listo si todos los lenguajes requeridos pasaron su último canary (ok o slow)."""
+        with self._lock:
+            pending = [l for l in required if self._state.get(l, {}).get("status") not in ("ok", "slow")]
+        return (not pending), pending
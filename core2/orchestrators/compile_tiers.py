@@ -0,0 +1,85 @@
+# core2/orchestrators/compile_tiers.py — niveles de compilación: quick (-O0) por defecto, opt bajo demanda
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set
+
+from .artifact_cache import ArtifactCache, artifact_key
+from .supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+TIERS = ("quick", "opt")
+COMPILE_TIER   = os.getenv("GOZOLITE_COMPILE_TIER", "auto").strip().lower()  # auto | quick | opt
+TIER_UP_RUN_MS = _env_int("GOZOLITE_TIER_UP_RUN_MS", 250)  # una corrida así de larga => el run domina al build
+TIER_UP_RUNS   = _env_int("GOZOLITE_TIER_UP_RUNS", 3)      # corridas del mismo binario quick => se optimiza
+TIER_STATS_MAX = 4096                                      # fuentes con historial (LRU)
+
+
+class CompileTiers:
+    """
+    Elige el nivel de compilación por job. `quick` compila sin optimizar (lo normal: el programa
+    imprime algo y termina); `opt` es el build optimizado de siempre. Cada nivel se cachea por
+    separado en ArtifactCache (variant = nivel).
+    En `auto` se usa quick salvo que el binario optimizado ya exista; cuando un binario quick
+    corre mucho (>= TIER_UP_RUN_MS) o se repite (TIER_UP_RUNS), se compila el opt en background
+    y las corridas siguientes lo usan.
+    """
+
+    def __init__(self, cache: ArtifactCache):
+        self.cache = cache
+        self.stats: Dict[str, int] = {"quick": 0, "opt": 0, "promotions": 0}
+        self._runs: "OrderedDict[str, tuple[int, int]]" = OrderedDict()  # key -> (corridas, run_ms total)
+        self._building: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def choose(self, language: str, code: str, requested: Optional[str], tiered: bool) -> str:
+        if not tiered:
+            tier = "opt"  # el lenguaje no tiene build rápido
+        else:
+            req = (requested or COMPILE_TIER or "auto").strip().lower()
+            if req in TIERS:
+                tier = req
+            else:
+                tier = "opt" if self.cache.lookup(language, code, "opt") is not None else "quick"
+        with self._lock:
+            self.stats[tier] += 1
+        return tier
+
+    def ran(self, language: str, code: str, run_ms: int, build_opt: Callable[[], Any]) -> bool:
+        """Registra una corrida de un binario quick; si ya conviene, lanza build_opt() en background."""
+        key = artifact_key(language, code)
+        with self._lock:
+            runs, total = self._runs.pop(key, (0, 0))
+            runs, total = runs + 1, total + run_ms
+            self._runs[key] = (runs, total)
+            while len(self._runs) > TIER_STATS_MAX:
+                self._runs.popitem(last=False)
+            if key in self._building or (run_ms < TIER_UP_RUN_MS and runs < TIER_UP_RUNS):
+                return False
+            self._building.add(key)
+            self.stats["promotions"] += 1
+
+        def _promote() -> None:
+            try:
+                # el build no es parte del job que lo disparó (ni se cancela con él)
+                with supervisor.observe(None), supervisor.running(None), supervisor.metered(None):
+                    build_opt()
+            finally:
+                with self._lock:
+                    self._building.discard(key)
+                    self._runs.pop(key, None)
+
+        # El CPU del build optimizado se carga al tenant que lo disparó
+        threading.Thread(target=supervisor.bind(_promote), name="gozolite-tier-up", daemon=True).start()
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "building": len(self._building)}
@@ -0,0 +1,362 @@
+# core2/orchestrators/dataset_store.py — datasets por contenido (sha256), guardados una vez y montados sólo lectura en cada job
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+DATASET_DIR       = os.getenv("GOZOLITE_DATASET_DIR", "/tmp/gozolite-datasets")
+DATASET_CACHE_MB  = _env_int("GOZOLITE_DATASET_CACHE_MB", 4096)                    # tope total del store
+MAX_DATASET_BYTES = _env_int("GOZOLITE_MAX_DATASET_BYTES", 1024 * 1024 * 1024)     # 1 GiB por dataset
+EVICT_MIN_AGE_S   = 60  # nunca se borra un dataset usado hace menos de esto
+FLUSH_BYTES       = 1024 * 1024  # put_async junta chunks y hashea/escribe fuera del event loop por tandas
+
+_SHA_RE  = re.compile(r"^[0-9a-f]{64}$")
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.\-]{0,127}$")
+
+
+class DatasetTooLarge(ValueError):
+    pass
+
+
+class DatasetStore:
+    """
+    Store de datasets direccionado por contenido: <root>/blobs/<sha256> (modo 0444) y alias
+    <root>/names/<nombre> -> blob (symlink). El mismo contenido se guarda una sola vez.
+    - GozoLite los monta de solo lectura en el workdir del job, con o sin sandbox (sin copia); sólo si el
+      kernel no permite user namespaces le da una copia/reflink. Nunca un hardlink, que el job podría
+      volver escribible.
+    - Cada blob guarda (inodo, tamaño, ctime) al confirmarse o verificarse; si cambió, se rehashea y
+      un blob que ya no coincide con su sha256 se pone en cuarentena (se borra) en vez de servirse.
+    - Evicción LRU (último uso en memoria, mtime tras un reinicio) cuando se supera
+      GOZOLITE_DATASET_CACHE_MB; un blob usado hace menos de EVICT_MIN_AGE_S no se borra.
+    - Dueños en <root>/owners.json: cada blob, los tenants que lo subieron; cada alias, quien lo creó.
+      Un tenant sólo lista/borra lo suyo; un blob compartido se borra cuando no le queda ningún dueño.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_mb: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root or DATASET_DIR)
+        self.blobs = self.root / "blobs"
+        self.names = self.root / "names"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.names.mkdir(parents=True, exist_ok=True)
+        self.max_total = (max_mb if max_mb is not None else DATASET_CACHE_MB) * 1024 * 1024
+        self.max_bytes = max_bytes if max_bytes is not None else MAX_DATASET_BYTES
+        self.stats: Dict[str, int] = {"uploads": 0, "dedup": 0, "evicted": 0, "quarantined": 0}
+        self._lock = threading.Lock()
+        self._stamps: Dict[str, Tuple[int, int, int]] = {}
+        self._used: Dict[str, float] = {}  # último uso en memoria: un utime() cambiaría el ctime del sello
+        self._owners_file = self.root / "owners.json"
+        self._blob_owners: Dict[str, List[str]] = {}
+        self._name_owners: Dict[str, str] = {}
+        try:
+            saved = json.loads(self._owners_file.read_text())
+            self._blob_owners = {k: list(v) for k, v in saved.get("blobs", {}).items()}
+            self._name_owners = dict(saved.get("names", {}))
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    # --------- Alta ---------
+    def _open(self) -> Tuple[BinaryIO, Path]:
+        fd, tmp = tempfile.mkstemp(prefix=".part-", dir=str(self.blobs))
+        return os.fdopen(fd, "wb"), Path(tmp)
+
+    def _commit(self, tmp: Path, sha: str, size: int, name: Optional[str], owner: Optional[str]) -> Dict[str, Any]:
+        final = self.blobs / sha
+        with self._lock:
+            if final.is_file() and self._verified(sha):
+                tmp.unlink(missing_ok=True)  # mismo contenido ya subido: se reusa
+                self.stats["dedup"] += 1
+                existed = True
+            else:
+                os.chmod(tmp, 0o444)
+                os.replace(tmp, final)
+                self._stamps[sha] = _stamp(final)
+                self.stats["uploads"] += 1
+                existed = False
+            self._used[sha] = time.time()
+            if owner is not None and owner not in self._blob_owners.setdefault(sha, []):
+                self._blob_owners[sha].append(owner)
+                self._save_owners()
+        if name:
+            self.alias(name, sha, owner=owner)
+        self.trim()
+        return {"sha256": sha, "bytes": size, "name": name, "existed": existed}
+
+    def _check_name(self, name: Optional[str], owner: Optional[str] = None) -> None:
+        if name is not None and not _NAME_RE.match(name):
+            raise ValueError(f"Nombre de dataset inválido: {name!r}")
+        if name is not None and owner is not None:
+            with self._lock:
+                taken = self._name_owners.get(name)
+                if taken not in (None, owner) and (self.names / name).exists():
+                    raise PermissionError(f"El dataset {name!r} pertenece a otro tenant")
+
+    def put(self, chunks: Iterable[bytes], name: Optional[str] = None, owner: Optional[str] = None) -> Dict[str, Any]:
+        """Guarda los chunks (hasheando al vuelo) y devuelve {sha256, bytes, name, existed}. `owner`: tenant."""
+        self._check_name(name, owner)
+        fh, tmp = self._open()
+        h, size = hashlib.sha256(), 0
+        try:
+            with fh:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise DatasetTooLarge(f"Dataset demasiado grande (> {self.max_bytes} bytes)")
+                    h.update(chunk)
+                    fh.write(chunk)
+            return self._commit(tmp, h.hexdigest(), size, name, owner)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    async def put_async(self, chunks: AsyncIterator[bytes], name: Optional[str] = None,
+                        owner: Optional[str] = None) -> Dict[str, Any]:
+        """Variante para `request.stream()` de Starlette: hash y disco en el threadpool, no en el loop."""
+        self._check_name(name, owner)
+        fh, tmp = await asyncio.to_thread(self._open)
+        h, size = hashlib.sha256(), 0
+
+        def flush(data: bytes) -> None:
+            h.update(data)
+            fh.write(data)
+
+        try:
+            with fh:
+                pending = bytearray()
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise DatasetTooLarge(f"Dataset demasiado grande (> {self.max_bytes} bytes)")
+                    pending += chunk
+                    if len(pending) >= FLUSH_BYTES:
+                        await asyncio.to_thread(flush, bytes(pending))
+                        pending.clear()
+                if pending:
+                    await asyncio.to_thread(flush, bytes(pending))
+            return await asyncio.to_thread(self._commit, tmp, h.hexdigest(), size, name, owner)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    def alias(self, name: str, sha: str, owner: Optional[str] = None) -> None:
+        """
+        Apunta `name` al blob `sha` (reemplazo atómico si ya existía). Con `owner`, un alias vivo de
+        otro tenant no se pisa: PermissionError.
+        """
+        self._check_name(name)
+        if not (self.blobs / sha).is_file():
+            raise KeyError(sha)
+        with self._lock:
+            taken = self._name_owners.get(name)
+            if owner is not None and taken not in (None, owner) and (self.names / name).exists():
+                raise PermissionError(f"El dataset {name!r} pertenece a otro tenant")
+            tmp = self.names / f".{name}.{os.getpid()}.{threading.get_ident()}"
+            tmp.unlink(missing_ok=True)
+            os.symlink(f"../blobs/{sha}", tmp)
+            os.replace(tmp, self.names / name)
+            if owner is not None:
+                self._name_owners[name] = owner
+            else:
+                self._name_owners.pop(name, None)
+            self._save_owners()
+
+    # --------- Consulta ---------
+    def path(self, ref: str) -> Optional[Path]:
+        """Ruta del blob para un sha256 o un nombre; None si no existe (o fue desalojado)."""
+        if _SHA_RE.match(ref or ""):
+            p = self.blobs / ref
+        elif _NAME_RE.match(ref or ""):
+            try:
+                p = self.blobs / Path(os.readlink(self.names / ref)).name
+            except OSError:
+                return None
+        else:
+            return None
+        with self._lock:
+            if not p.is_file() or not self._verified(p.name):
+                return None
+            self._used[p.name] = time.time()  # uso reciente => posterga la evicción
+        return p
+
+    def _verified(self, sha: str) -> bool:
+        """
+        True si el blob sigue siendo el contenido de su sha256. Se rehashea sólo si el sello cambió (o
+        no se conoce, p. ej. tras un reinicio); si no coincide, el blob se borra. Llamar con el lock.
+        """
+        p = self.blobs / sha
+        try:
+            stamp = _stamp(p)
+        except OSError:
+            return False
+        if self._stamps.get(sha) == stamp:
+            return True
+        h = hashlib.sha256()
+        try:
+            with open(p, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                    h.update(chunk)
+        except OSError:
+            return False
+        if h.hexdigest() == sha:
+            self._stamps[sha] = stamp
+            return True
+        p.unlink(missing_ok=True)
+        self._forget(sha)
+        self.stats["quarantined"] += 1
+        return False
+
+    def resolve(self, refs: Dict[str, str]) -> Dict[str, Path]:
+        """Mapea {nombre_en_workdir: sha256|nombre} a {nombre_en_workdir: ruta}; KeyError con la referencia faltante."""
+        out: Dict[str, Path] = {}
+        for name, ref in refs.items():
+            p = self.path(ref)
+            if p is None:
+                raise KeyError(ref)
+            out[name] = p
+        return out
+
+    def list(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Blobs con sus alias; con `owner`, sólo los que ese tenant subió y los alias que creó."""
+        with self._lock:
+            blob_owners = {k: list(v) for k, v in self._blob_owners.items()}
+            name_owners = dict(self._name_owners)
+        aliases: Dict[str, List[str]] = {}
+        for link in self.names.iterdir():
+            if link.name.startswith(".") or (owner is not None and name_owners.get(link.name) != owner):
+                continue
+            try:
+                aliases.setdefault(Path(os.readlink(link)).name, []).append(link.name)
+            except OSError:
+                pass
+        out = []
+        for p in sorted(self.blobs.iterdir()):
+            if not _SHA_RE.match(p.name) or (owner is not None and owner not in blob_owners.get(p.name, [])):
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            last_used = max(st.st_mtime, self._used.get(p.name, 0.0))
+            out.append({"sha256": p.name, "bytes": st.st_size, "names": sorted(aliases.get(p.name, [])),
+                        "last_used": int(last_used), "in_use": last_used > time.time() - EVICT_MIN_AGE_S})
+        return out
+
+    # --------- Baja / evicción ---------
+    def delete(self, ref: str, owner: Optional[str] = None) -> bool:
+        """
+        Un nombre borra sólo el alias; un sha256 borra el blob (los jobs en curso conservan su montaje/copia).
+        Con `owner` sólo se toca lo de ese tenant (si no, False, como si no existiera): un sha256 le quita
+        el blob a él (y sus alias a ese blob) y el archivo se borra cuando no le quedan dueños.
+        """
+        if _SHA_RE.match(ref or ""):
+            p = self.blobs / ref
+            if not p.is_file():
+                return False
+            with self._lock:
+                if owner is not None:
+                    owners = self._blob_owners.get(ref, [])
+                    if owner not in owners:
+                        return False
+                    owners.remove(owner)
+                    for name in [n for n, o in self._name_owners.items() if o == owner]:
+                        link = self.names / name
+                        if link.is_symlink() and Path(os.readlink(link)).name == ref:
+                            link.unlink(missing_ok=True)
+                            del self._name_owners[name]
+                    if owners:
+                        self._save_owners()
+                        return True
+                p.unlink(missing_ok=True)
+                self._forget(ref)
+            self._drop_dangling()
+            return True
+        if _NAME_RE.match(ref or "") and (self.names / ref).is_symlink():
+            with self._lock:
+                if owner is not None and self._name_owners.get(ref) != owner:
+                    return False
+                (self.names / ref).unlink(missing_ok=True)
+                self._name_owners.pop(ref, None)
+                self._save_owners()
+            return True
+        return False
+
+    def _forget(self, sha: str) -> None:
+        """Olvida el sello, el uso y los dueños de un blob que ya no está. Llamar con el lock."""
+        self._stamps.pop(sha, None)
+        self._used.pop(sha, None)
+        if self._blob_owners.pop(sha, None) is not None:
+            self._save_owners()
+
+    def _save_owners(self) -> None:
+        """Persiste los dueños (reemplazo atómico). Llamar con el lock."""
+        tmp = self.root / f".owners.{os.getpid()}.{threading.get_ident()}"
+        tmp.write_text(json.dumps({"blobs": self._blob_owners, "names": self._name_owners}))
+        os.replace(tmp, self._owners_file)
+
+    def _drop_dangling(self) -> None:
+        with self._lock:
+            for link in self.names.iterdir():
+                if link.is_symlink() and not link.exists():
+                    link.unlink(missing_ok=True)
+                    self._name_owners.pop(link.name, None)
+            self._save_owners()
+
+    def trim(self) -> int:
+        entries, total = [], 0
+        for p in self.blobs.iterdir():
+            if p.name.startswith("."):
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((max(st.st_mtime, self._used.get(p.name, 0.0)), st.st_size, p))
+            total += st.st_size
+        removed = 0
+        if total > self.max_total:
+            cutoff = time.time() - EVICT_MIN_AGE_S
+            for last_used, size, p in sorted(entries):
+                if total <= self.max_total:
+                    break
+                if last_used > cutoff:
+                    continue
+                p.unlink(missing_ok=True)
+                with self._lock:
+                    self._forget(p.name)
+                total -= size
+                removed += 1
+            if removed:
+                self._drop_dangling()
+                with self._lock:
+                    self.stats["evicted"] += removed
+        return removed
+
+    def usage(self) -> Dict[str, Any]:
+        total = count = 0
+        for p in self.blobs.iterdir():
+            if _SHA_RE.match(p.name):
+                try:
+                    total += p.stat().st_size
+                    count += 1
+                except OSError:
+                    pass
+        return {"datasets": count, "bytes": total, "max_bytes": self.max_total, **self.stats}
+
+
+def _stamp(p: Path) -> Tuple[int, int, int]:
+    st = os.stat(p)
+    return st.st_ino, st.st_size, st.st_ctime_ns
@@ -1,68 +1,141 @@
 from __future__ import annotations
-import os, shlex, shutil, subprocess, tempfile, time
+import codecs, os, queue, selectors, shlex, shutil, signal, subprocess, tempfile, threading, time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Tuple, Callable, Optional
+from typing import Dict, Any, Tuple, Callable, Optional, Iterator, BinaryIO, List
+
+from .input_spool import copy_into
+from .project_builder import ProjectBuilder, BuildError
+from .artifact_cache import ArtifactCache, BuildOutcome
+from .compile_tiers import CompileTiers, TIER_UP_RUNS
+from .judge import CaseRunner, ACCEPTED
+from .pipeline import PipelineRunner, PipelineError, parse_blocks
+from .supervisor import supervisor, MAX_OUTPUT_BYTES, OUTPUT_LIMIT_EXIT, CANCELLED_EXIT
+from .sql_engine import SqlEngine, SqlUnsupported, FixtureNotFound
+from .sessions import SessionManager
+from .profiler import profiler_for, set_phase
+from .syntax_check import SyntaxChecker, SYNTAX_EXIT
+from .sandbox import NsSandbox
+from .jvm_cds import JvmCds, jar_main
+
+# Tamaño de lectura por chunk en modo streaming (la memoria queda acotada a esto)
+STREAM_CHUNK_BYTES = int(os.getenv("GOZOLITE_STREAM_CHUNK_BYTES", "65536"))
+# Cache global de zig (la std se compila una sola vez, no por job)
+ZIG_CACHE_DIR = os.getenv("GOZOLITE_ZIG_CACHE", "/tmp/gozolite-zig-cache")
+# sql: "inprocess" (módulo sqlite3, fixtures) o "cli" (sqlite3 :memory: por job)
+SQL_ENGINE = os.getenv("GOZOLITE_SQL_ENGINE", "inprocess").strip().lower()
+
+# (fuente, directorio de artefactos) -> comando shell
+StepBuilder = Callable[[Path, Path], str]
 
 @dataclass
 class LangSpec:
     suffix: str
     tools: Tuple[str, ...]
     cmd_builder: Callable[[Path, str, Path], str]
+    build: Optional[StepBuilder] = None   # solo lenguajes compilados (nivel opt)
+    run: Optional[StepBuilder] = None
+    quick: Optional[StepBuilder] = None   # build sin optimizar (nivel quick), si el compilador lo permite
 
 class GozoLite:
     MODE = "gozo-lite"
 
     def __init__(self, memory=None):
         self.memory = memory
+        self.jvm = JvmCds()  # antes del registry: el run de java/kotlin/scala lo consulta
         self.registry = self._build_registry()
         # Ajustes mínimos por compiladores/lanzadores más pesados
         self.min_timeout = {"kotlin": 60, "zig": 60, "scala": 20, "haskell": 20, "typescript": 10}
+        self.projects = ProjectBuilder(self.registry, self._which)
+        self.artifacts = ArtifactCache()
+        self.tiers = CompileTiers(self.artifacts)
+        self.pipeline = PipelineRunner(self)
+        self.sql = SqlEngine()
+        self.sessions = SessionManager()
+        self.syntax = SyntaxChecker()
+        self.sandbox = NsSandbox()
 
     def execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        prof = profiler_for(payload)
+        if prof is None:
+            return self._if_cancelled(payload, self._execute(payload))
+        # profile=true: cada proceso del job (build incluido) queda bajo el sampler
+        with supervisor.observe(prof):
+            res = self._if_cancelled(payload, self._execute(payload))
+        res["profile"] = prof.finish()
+        return res
+
+    def _execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         language = (payload.get("language") or "").strip().lower()
         code = payload.get("code") or ""
         stdin = payload.get("stdin")  # NUEVO: soporta entrada estándar
         req_to = int(payload.get("timeout") or 10)
         timeout = max(req_to, self.min_timeout.get(language, 10))
 
+        if language == "auto":
+            return self._run_pipeline(code, req_to, stdin)
+
         if not language or language not in self.registry:
             return self._fail(2, f"Lenguaje no soportado: {language or '(vacío)'}")
 
+        if language == "sql":
+            res = self._run_sql(code, payload, req_to)
+            if res is not None:
+                return res
+
         spec = self.registry[language]
         missing = [t for t in spec.tools if not self._which(t)]
         if missing:
             return self._fail(127, f"{'/'.join(missing)} no instalado", language=language)
+        rejected = self._precheck(language, payload, code)
+        if rejected is not None:
+            return rejected
 
         workdir = Path(tempfile.mkdtemp(prefix="ce-", dir="/tmp"))
+        stdin_fh: Optional[BinaryIO] = None
+        started = time.monotonic()
         try:
-            src = self._write_source(language, spec.suffix, code, workdir)
-            cmd = spec.cmd_builder(src, code, workdir)
-            started = time.monotonic()
-            proc = subprocess.run(
-                ["bash", "-lc", cmd],
+            cmd, built = self._command(language, spec, payload, code, workdir, started + timeout)
+            set_phase("run")
+            stdin_fh, inputs = self._stage_inputs(payload)
+            run_started = time.monotonic()
+            argv, env = self._run_argv(cmd, workdir, built, inputs)
+            # Grupo de procesos propio: timeout/límite de salida matan el árbol completo
+            proc = supervisor.run(
+                argv,
                 cwd=str(workdir),
-                text=True,
-                input=stdin if isinstance(stdin, str) else None,  # NUEVO
-                capture_output=True,
-                timeout=timeout
+                env=env,
+                stdin=stdin_fh,  # stdin grande: fd del archivo spooleado
+                input=stdin if (stdin_fh is None and isinstance(stdin, str)) else None,
+                timeout=self._remaining(started, timeout),
             )
+            self._tier_up(language, spec, code, built, run_started)
             elapsed = int((time.monotonic() - started) * 1000)
+            if proc.timed_out:
+                return self._fail(124, "Timeout", time_ms=elapsed, language=language)
+            if proc.truncated:
+                res = self._fail(OUTPUT_LIMIT_EXIT, proc.stderr + f"\nLímite de salida excedido ({MAX_OUTPUT_BYTES} bytes)",
+                                 time_ms=elapsed, language=language)
+                res["stdout"] = proc.stdout
+                return res
             return {
                 "ok": proc.returncode == 0,
                 "exit_code": proc.returncode,
-                "stdout": proc.stdout,
-                "stderr": proc.stderr,
+                "stdout": (built.stdout if built else "") + proc.stdout,
+                "stderr": (built.stderr if built else "") + proc.stderr,
                 "time_ms": elapsed,
                 "mode": self.MODE,
                 "language": language
             }
-        except subprocess.TimeoutExpired:
-            elapsed = int((time.monotonic() - started) * 1000)
-            return self._fail(124, "Timeout", time_ms=elapsed, language=language)
+        except BuildError as e:
+            res = self._fail(e.exit_code, e.stderr, time_ms=int((time.monotonic() - started) * 1000), language=language)
+            res["stdout"] = e.stdout
+            return res
         except Exception as e:
             return self._fail(1, f"Excepción: {e}", language=language)
         finally:
+            if stdin_fh is not None:
+                stdin_fh.close()
             try:
                 for p in workdir.iterdir():
                     try:
@@ -76,6 +149,288 @@ class GozoLite:
             except Exception:
                 pass
 
+    def stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Igual que execute(), pero emite eventos a medida que el proceso escribe:
+        {"event": "stdout"|"stderr", "data": "..."} y un evento final
+        {"event": "exit", ...} con exit_code y time_ms. No acumula la salida.
+        """
+        prof = profiler_for(payload)
+        # El generador se reanuda en el contexto del consumidor: el observador se fija en cada paso
+        gen = self._stream(payload)
+        try:
+            while True:
+                if prof is None:
+                    evt = next(gen, None)
+                else:
+                    with supervisor.observe(prof):
+                        evt = next(gen, None)
+                if evt is None:
+                    return
+                if evt.get("event") == "exit":
+                    evt = self._if_cancelled(payload, evt)
+                    if prof is not None:
+                        evt["profile"] = prof.finish()
+                yield evt
+        finally:
+            gen.close()
+            if prof is not None:
+                prof.finish()
+
+    def _stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        language = (payload.get("language") or "").strip().lower()
+        code = payload.get("code") or ""
+        stdin = payload.get("stdin")
+        req_to = int(payload.get("timeout") or 10)
+        timeout = max(req_to, self.min_timeout.get(language, 10))
+
+        if language == "auto":
+            yield from self._stream_pipeline(code, req_to, stdin)
+            return
+
+        if not language or language not in self.registry:
+            yield self._exit_event(self._fail(2, f"Lenguaje no soportado: {language or '(vacío)'}"))
+            return
+
+        if language == "sql":
+            res = self._run_sql(code, payload, req_to)
+            if res is not None:  # consulta in-process: en milisegundos, se emite completa
+                for name in ("stdout", "stderr"):
+                    if res.get(name):
+                        yield {"event": name, "data": res[name]}
+                yield self._exit_event(res)
+                return
+
+        spec = self.registry[language]
+        missing = [t for t in spec.tools if not self._which(t)]
+        if missing:
+            yield self._exit_event(self._fail(127, f"{'/'.join(missing)} no instalado", language=language))
+            return
+        rejected = self._precheck(language, payload, code)
+        if rejected is not None:
+            yield self._exit_event(rejected)
+            return
+
+        workdir = Path(tempfile.mkdtemp(prefix="ce-", dir="/tmp"))
+        proc: Optional[subprocess.Popen] = None
+        stdin_fh: Optional[BinaryIO] = None
+        started = time.monotonic()
+        try:
+            cmd, built = self._command(language, spec, payload, code, workdir, started + timeout)
+            if built is not None:
+                for name in ("stdout", "stderr"):
+                    if getattr(built, name):
+                        yield {"event": name, "data": getattr(built, name)}
+            set_phase("run")
+            stdin_fh, inputs = self._stage_inputs(payload)
+            run_started = time.monotonic()
+            feed = stdin if (stdin_fh is None and isinstance(stdin, str)) else None
+            argv, env = self._run_argv(cmd, workdir, built, inputs)
+            proc = supervisor.popen(
+                argv,
+                cwd=str(workdir),
+                env=env,
+                stdin=stdin_fh or (subprocess.PIPE if feed is not None else subprocess.DEVNULL),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            stopped = yield from pump_output(proc, self._remaining(started, timeout), feed, max_output=MAX_OUTPUT_BYTES)
+            self._tier_up(language, spec, code, built, run_started)
+            elapsed = int((time.monotonic() - started) * 1000)
+            if stopped == "timeout":
+                yield self._exit_event(self._fail(124, "Timeout", time_ms=elapsed, language=language))
+                return
+            if stopped == "output_limit":
+                yield self._exit_event(self._fail(OUTPUT_LIMIT_EXIT, f"Límite de salida excedido ({MAX_OUTPUT_BYTES} bytes)",
+                                                  time_ms=elapsed, language=language))
+                return
+            yield self._exit_event({
+                "ok": proc.returncode == 0,
+                "exit_code": proc.returncode,
+                "time_ms": elapsed,
+                "mode": self.MODE,
+                "language": language,
+            })
+        except BuildError as e:
+            if e.stdout:
+                yield {"event": "stdout", "data": e.stdout}
+            yield self._exit_event(self._fail(e.exit_code, e.stderr, time_ms=int((time.monotonic() - started) * 1000), language=language))
+        except Exception as e:
+            yield self._exit_event(self._fail(1, f"Excepción: {e}", language=language))
+        finally:
+            # Si el consumidor abandona el generador, no dejamos el árbol vivo
+            if proc is not None:
+                if supervisor.poll(proc) is None:
+                    supervisor.kill_tree(proc)
+                else:
+                    supervisor.finish(proc)
+            if stdin_fh is not None:
+                stdin_fh.close()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _run_pipeline(self, code: str, timeout: int, stdin: Optional[str],
+                      on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      abort: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        language="auto": bloques ```lenguaje``` en paralelo según sus dependencias, con pipes entre etapas.
+        stdout/stderr agregan los bloques finales (los que no alimentan a otro), con encabezado por bloque.
+        `on_event`/`abort`: ver PipelineRunner.run (los usa el streaming).
+        """
+        started = time.monotonic()
+        try:
+            blocks = parse_blocks(code)
+        except PipelineError as e:
+            return self._fail(2, str(e), language="auto")
+        timeout = max([timeout] + [self.min_timeout.get(b.language, 0) for b in blocks])
+        results = self.pipeline.run(blocks, timeout, stdin, on_event=on_event, abort=abort)
+
+        feeds = {b.stdin_from for b in blocks if b.stdin_from}
+        multi = len(blocks) > 1
+        out, err = [], []
+        for b, r in zip(blocks, results):
+            head = f"[{b.id}:{b.language}]\n" if multi else ""
+            if r.get("stdout") and b.id not in feeds:
+                out.append(head + r["stdout"])
+            if r.get("stderr"):
+                err.append(head + r["stderr"])
+        failed = next((r for r in results if not r.get("ok")), None)
+        return {
+            "ok": failed is None,
+            "exit_code": 0 if failed is None else int(failed.get("exit_code") or 1),
+            "stdout": "".join(out),
+            "stderr": "".join(err),
+            "time_ms": int((time.monotonic() - started) * 1000),
+            "mode": self.MODE,
+            "language": "auto",
+            "blocks": results,
+        }
+
+    def _stream_pipeline(self, code: str, timeout: int, stdin: Optional[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming de language="auto": los bloques corren en los hilos del pipeline y sus eventos (salida con
+        `block`, `stage` al terminar cada uno) se emiten a medida que ocurren. Si el consumidor abandona el
+        stream, se aborta el pipeline y se mata lo que quede vivo.
+        """
+        events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        abort = threading.Event()
+        box: Dict[str, Dict[str, Any]] = {}
+
+        def _run() -> None:
+            try:
+                box["res"] = self._run_pipeline(code, timeout, stdin, on_event=events.put, abort=abort)
+            except Exception as e:
+                box["res"] = self._fail(1, f"Excepción: {e}", language="auto")
+            finally:
+                events.put(None)
+
+        worker = threading.Thread(target=supervisor.bind(_run), daemon=True)
+        worker.start()
+        try:
+            while True:
+                evt = events.get()
+                if evt is None:
+                    break
+                yield evt
+        finally:
+            abort.set()
+            worker.join()
+        res = box["res"]
+        if res.pop("blocks", None) is not None:
+            res.pop("stderr", None)  # ya salió en vivo, bloque por bloque
+        yield self._exit_event(res)
+
+    def judge(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Modo juez: compila una sola vez y ejecuta el programa contra N casos en paralelo.
+        payload["cases"] = [{"stdin"|"stdin_path", "expected"}, ...]; opciones: compare
+        (exact|whitespace|float), float_tol, stop_on_fail, parallelism. timeout/memory_mb son por caso.
+        """
+        res = self._judge(payload)
+        if supervisor.cancelled() is None:
+            return res
+        out = self._if_cancelled(payload, res)
+        out.update({"compile": res.get("compile"), "passed": 0, "total": res.get("total", 0),
+                    "cases": [{"index": i, "verdict": "cancelled"} for i in range(int(res.get("total") or 0))]})
+        return out
+
+    def _judge(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        language = (payload.get("language") or "").strip().lower()
+        code = payload.get("code") or ""
+        cases = list(payload.get("cases") or [])
+        case_timeout = float(payload.get("timeout") or 10)
+        memory_mb = int(payload.get("memory_mb") or 256)
+
+        if not language or language not in self.registry:
+            return self._fail(2, f"Lenguaje no soportado: {language or '(vacío)'}")
+        spec = self.registry[language]
+        missing = [t for t in spec.tools if not self._which(t)]
+        if missing:
+            return self._fail(127, f"{'/'.join(missing)} no instalado", language=language)
+        rejected = self._precheck(language, payload, code)
+        if rejected is not None:
+            rejected.update({"compile": None, "passed": 0, "total": len(cases),
+                             "cases": [{"index": i, "verdict": "compile_error"} for i in range(len(cases))]})
+            return rejected
+
+        started = time.monotonic()
+        scratch: Optional[Path] = None
+        try:
+            if spec.build is not None:
+                # varios casos sobre el mismo binario: en auto se compila optimizado
+                tier = self.tiers.choose(language, self._source_text(language, code),
+                                         payload.get("compile_tier") or ("opt" if len(cases) >= TIER_UP_RUNS else None),
+                                         spec.quick is not None)
+                built = self._build_cached(language, spec, code, max(case_timeout, self.min_timeout.get(language, 10)), tier=tier)
+                compile_info = {"cached": built.cached, "time_ms": built.time_ms, "exit_code": built.exit_code,
+                                "stdout": built.stdout, "stderr": built.stderr, "tier": tier}
+                if not built.ok:
+                    res = self._fail(built.exit_code, built.stderr, time_ms=int((time.monotonic() - started) * 1000),
+                                     language=language)
+                    res.update({"stdout": built.stdout, "compile": compile_info, "passed": 0, "total": len(cases),
+                                "cases": [{"index": i, "verdict": "compile_error"} for i in range(len(cases))]})
+                    return res
+                run_cmd = spec.run(built.src, built.dir)
+            else:
+                # Interpretados: la fuente vive en un dir propio; cada caso corre en su propio cwd
+                scratch = Path(tempfile.mkdtemp(prefix="ce-judge-", dir="/tmp"))
+                src = self._write_source(language, spec.suffix, code, scratch)
+                run_cmd = spec.cmd_builder(src, code, scratch)
+                compile_info = None
+
+            runner = CaseRunner(
+                run_cmd,
+                timeout=case_timeout,
+                memory_mb=memory_mb,
+                compare=str(payload.get("compare") or "exact"),
+                float_tol=float(payload.get("float_tol") or 1e-6),
+                stop_on_fail=bool(payload.get("stop_on_fail")),
+                parallelism=payload.get("parallelism"),
+                sandbox=self.sandbox,
+                visible=[str(built.dir), *self.jvm.visible()] if spec.build is not None else [str(scratch)],
+            )
+            results = runner.run_all(cases)
+        except Exception as e:
+            return self._fail(1, f"Excepción: {e}", language=language)
+        finally:
+            if scratch is not None:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+        passed = sum(1 for r in results if r.get("verdict") == ACCEPTED)
+        ok = passed == len(results)
+        return {
+            "ok": ok,
+            "exit_code": 0 if ok else 1,
+            "stdout": "",
+            "stderr": "",
+            "time_ms": int((time.monotonic() - started) * 1000),
+            "mode": self.MODE,
+            "language": language,
+            "compile": compile_info,
+            "passed": passed,
+            "total": len(results),
+            "cases": results,
+        }
+
     def status(self, job_id: str) -> Dict[str, Any]:
         return {"job_id": job_id, "state": "unsupported", "detail": "GozoLite es síncrono"}
 
@@ -94,19 +449,118 @@ class GozoLite:
             "language": language or "-"
         }
 
+    def _precheck(self, language: str, payload: Dict[str, Any], code: str) -> Optional[Dict[str, Any]]:
+        """Error de sintaxis detectado sin lanzar el toolchain (mismo formato y exit code), o None para seguir."""
+        if payload.get("project"):
+            return None
+        started = time.monotonic()
+        error = self.syntax.check(language, code)
+        if error is None:
+            return None
+        return self._fail(SYNTAX_EXIT, error, time_ms=int((time.monotonic() - started) * 1000), language=language)
+
+    def _if_cancelled(self, payload: Dict[str, Any], res: Dict[str, Any]) -> Dict[str, Any]:
+        """Job cancelado: CANCELLED_EXIT en lugar de lo que dejó el árbol muerto a medias (resultado o evento exit)."""
+        reason = supervisor.cancelled()
+        if reason is None:
+            return res
+        out = self._fail(CANCELLED_EXIT, f"Job cancelado ({reason})", time_ms=int(res.get("time_ms") or 0),
+                         language=res.get("language") or (payload.get("language") or "").strip().lower() or None)
+        return self._exit_event(out) if res.get("event") == "exit" else out
+
+    @staticmethod
+    def _exit_event(result: Dict[str, Any]) -> Dict[str, Any]:
+        # El evento final no repite stdout/stderr ya emitidos (salvo mensajes del propio executor)
+        evt = {"event": "exit"}
+        evt.update({k: v for k, v in result.items() if k != "stdout"})
+        if not evt.get("stderr"):
+            evt.pop("stderr", None)
+        return evt
+
+    def _command(self, language: str, spec: LangSpec, payload: Dict[str, Any], code: str, workdir: Path,
+                 deadline: float) -> Tuple[str, Optional[BuildOutcome]]:
+        """
+        Prepara el job y devuelve (comando a ejecutar en el workdir, resultado del build si hubo uno nuevo).
+        - proyecto: se arma el árbol y se compila incrementalmente
+        - lenguaje compilado: se compila una vez por contenido y nivel (ArtifactCache) y se ejecuta el artefacto
+        - interpretado: se escribe la fuente en el workdir
+        """
+        set_phase("compile")
+        project = payload.get("project")
+        if project:
+            return self.projects.build(language, project, workdir, deadline), None
+        if spec.build is not None:
+            tier = self.tiers.choose(language, self._source_text(language, code), payload.get("compile_tier"),
+                                     spec.quick is not None)
+            built = self._build_cached(language, spec, code, max(0.1, deadline - time.monotonic()),
+                                       fresh=bool(payload.get("fresh_build")), tier=tier)
+            if not built.ok:
+                raise BuildError(built.exit_code, built.stderr, built.stdout)
+            return spec.run(built.src, built.dir), built  # cacheado: sin stdout/stderr de build
+        src = self._write_source(language, spec.suffix, code, workdir)
+        return spec.cmd_builder(src, code, workdir), None
+
+    def _run_argv(self, cmd: str, workdir: Path, built: Optional[BuildOutcome],
+                  inputs: Optional[Dict[str, str]] = None) -> Tuple[List[str], Optional[Dict[str, str]]]:
+        """
+        argv/env del run: en el sandbox (`bash -c` con el entorno de login cacheado) o `bash -lc` sin él.
+        `inputs` ({nombre: ruta}) se montan sólo lectura en workdir/nombre, también sin sandbox (binder con
+        user + mount namespaces propios): ninguna copia por job. Sólo si el kernel no permite user
+        namespaces sin privilegios, cada job recibe una copia (reflink si el filesystem lo permite).
+        """
+        ro = [str(built.dir), *self.jvm.visible()] if built is not None else []
+        binds = [(src, str(workdir / name)) for name, src in (inputs or {}).items()]
+        argv = self.sandbox.wrap(["bash", "-c", cmd], str(workdir), ro=ro, binds=binds)
+        if argv is None:
+            argv = self.sandbox.bind(["bash", "-lc", cmd], binds)
+            if argv is not None:
+                return argv, None
+            for name, src in (inputs or {}).items():
+                copy_into(Path(src), workdir / name)
+            return ["bash", "-lc", cmd], None
+        return argv, self.sandbox.env()
+
+    @staticmethod
+    def _remaining(started: float, timeout: float) -> float:
+        # El build del modo proyecto consume parte del presupuesto del job
+        return max(0.1, timeout - (time.monotonic() - started))
+
+    @staticmethod
+    def _stage_inputs(payload: Dict[str, Any]) -> Tuple[Optional[BinaryIO], Dict[str, str]]:
+        """
+        Prepara las entradas ya spooleadas en disco, sin exponer al job los archivos compartidos:
+        - payload["files"] = {nombre: ruta} y payload["datasets"] = {nombre: ruta del blob} se validan y
+          se devuelven como {nombre: ruta}; `_run_argv` los monta o copia en workdir/nombre
+        - payload["stdin_path"] = ruta → abierto de solo lectura para usar como fd (sin enlace en el workdir)
+        """
+        staged = {**(payload.get("files") or {})}
+        for name, path in (payload.get("datasets") or {}).items():
+            if name in staged:
+                raise ValueError(f"Nombre repetido en files y datasets: {name!r}")
+            staged[name] = path
+        for name, path in staged.items():
+            if not name or Path(name).name != name or name.startswith("."):
+                raise ValueError(f"Nombre de archivo de entrada inválido: {name!r}")
+            staged[name] = str(path)
+        stdin_path = payload.get("stdin_path")
+        return (open(stdin_path, "rb") if stdin_path else None), staged
+
+    @staticmethod
+    def _source_name(language: str, suffix: str) -> Optional[str]:
+        # Algunos toolchains exigen un nombre fijo de archivo
+        return {"java": "Main.java", "scala": "Main.scala", "make": "Makefile"}.get(language)
+
+    @staticmethod
+    def _source_text(language: str, code: str) -> str:
+        if language == "scala" and "object Main" not in code and "class Main" not in code:
+            return f"object Main extends App {{\n{code}\n}}\n"
+        return code
+
     def _write_source(self, language: str, suffix: str, code: str, workdir: Path) -> Path:
-        if language == "java":
-            path = workdir / "Main.java"
-            path.write_text(code, encoding="utf-8")
-            return path
-        if language == "scala":
-            if "object Main" not in code and "class Main" not in code:
-                code = f"object Main extends App {{\n{code}\n}}\n"
-            path = workdir / "Main.scala"
-            path.write_text(code, encoding="utf-8")
-            return path
-        if language == "make":
-            path = workdir / "Makefile"
+        code = self._source_text(language, code)
+        name = self._source_name(language, suffix)
+        if name:
+            path = workdir / name
             path.write_text(code, encoding="utf-8")
             return path
         fd, tmp = tempfile.mkstemp(prefix="code_", suffix=suffix, dir=str(workdir))
@@ -117,61 +571,203 @@ class GozoLite:
             path.chmod(0o755)
         return path
 
+    def _run_sql(self, code: str, payload: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        SQL en el motor in-process (con `fixture` opcional). None => usar el runner CLI
+        (motor desactivado, entradas en archivos o dot-commands que sólo entiende la CLI).
+        """
+        fixture = payload.get("fixture")
+        if SQL_ENGINE != "inprocess" or payload.get("project") or payload.get("files") or payload.get("datasets") \
+                or payload.get("stdin_path"):
+            return self._fail(2, "fixture SQL requiere el motor in-process sin archivos de entrada",
+                              language="sql") if fixture else None
+        try:
+            res = self.sql.run(code, fixture=fixture, timeout=timeout, memory_mb=int(payload.get("memory_mb") or 256))
+        except SqlUnsupported as e:
+            if fixture:
+                return self._fail(2, f"{e.args[0]}: no soportado por el motor SQL in-process", language="sql")
+            return None
+        except FixtureNotFound as e:
+            return self._fail(2, f"Fixture SQL inexistente: {e.args[0]}", language="sql")
+        res.update(mode=f"{self.MODE}/sql", language="sql")
+        return res
+
+    def _build_cached(self, language: str, spec: LangSpec, code: str, timeout: float,
+                      fresh: bool = False, tier: str = "opt") -> BuildOutcome:
+        """Compila (o reutiliza de la cache por contenido y nivel) y devuelve dónde quedaron los artefactos."""
+        quick = tier == "quick" and spec.quick is not None
+        built = self.artifacts.get_or_build(
+            language,
+            self._source_text(language, code),
+            self._source_name(language, spec.suffix) or f"code{spec.suffix}",
+            spec.quick if quick else spec.build,
+            timeout=timeout,
+            variant="quick" if quick else "opt",
+            fresh=fresh,
+        )
+        built.tier = "quick" if quick else "opt"
+        return built
+
+    def prebuild(self, language: str, code: str) -> Optional[bool]:
+        """Compila `code` (nivel opt) en la cache sin ejecutarlo; None si el lenguaje no compila o no está instalado."""
+        spec = self.registry.get(language)
+        if spec is None or spec.build is None or any(not self._which(t) for t in spec.tools):
+            return None
+        timeout = float(max(30, self.min_timeout.get(language, 10)))
+        return self._build_cached(language, spec, code, timeout, tier="opt").ok
+
+    def _tier_up(self, language: str, spec: LangSpec, code: str, built: Optional[BuildOutcome], run_started: float) -> None:
+        """Tras correr un binario quick: si el run domina o se repite, se compila el opt en background."""
+        if built is None or built.tier != "quick":
+            return
+        run_ms = int((time.monotonic() - run_started) * 1000)
+        self.tiers.ran(language, code, run_ms, lambda: self._build_cached(
+            language, spec, code, float(max(30, self.min_timeout.get(language, 10))), tier="opt"))
+
     def _build_registry(self) -> Dict[str, LangSpec]:
         R: Dict[str, LangSpec] = {}
 
         def _cmd(fmt: str, **kw) -> str:
             return fmt.format(**{k: shlex.quote(str(v)) for k, v in kw.items()})
 
+        def _spec(suffix: str, tools: Tuple[str, ...], run: StepBuilder, build: Optional[StepBuilder] = None,
+                  quick: Optional[StepBuilder] = None) -> LangSpec:
+            # cmd_builder = build && run sobre el workdir (camino sin cache); build/run sueltos para la cache
+            def _full(s: Path, _c: str, w: Path) -> str:
+                return f"{build(s, w)} && {run(s, w)}" if build else run(s, w)
+            return LangSpec(suffix, tools, _full, build=build, run=run, quick=quick)
+
+        def _native(suffix: str, tools: Tuple[str, ...], out: str, build_fmt: str, quick_fmt: Optional[str] = None) -> LangSpec:
+            # Compilado a un binario nativo `out` dentro del directorio de artefactos (quick_fmt: sin optimizar)
+            return _spec(suffix, tools,
+                         run=lambda _s, w: _cmd("{out}", out=w/out),
+                         build=lambda s, w: _cmd(build_fmt, src=s, out=w/out),
+                         quick=(lambda s, w: _cmd(quick_fmt, src=s, out=w/out)) if quick_fmt else None)
+
         # Core
-        R["python"] = LangSpec(".py", ("python3",), lambda s, _c, _w: _cmd("python3 {src}", src=s))
-        R["node"]   = LangSpec(".js", ("node",),    lambda s, _c, _w: _cmd("node {src}", src=s))
-        R["bash"]   = LangSpec(".sh", ("bash",),    lambda s, _c, _w: _cmd("bash {src}", src=s))
-        R["c"]      = LangSpec(".c",  ("gcc",),     lambda s, _c, w: _cmd("gcc -O2 -s -o {out} {src} && {out}", src=s, out=w/"c.out"))
-        R["cpp"]    = LangSpec(".cpp",("g++",),     lambda s, _c, w: _cmd("g++ -O2 -s -o {out} {src} && {out}", src=s, out=w/"cpp.out"))
-        R["java"]   = LangSpec(".java",("javac","java"),
-                               lambda _s, _c, w: _cmd("mkdir -p {out} && javac {main} -d {out} && java -cp {out} Main",
-                                                      out=w/"out", main=w/"Main.java"))
-        R["go"]     = LangSpec(".go", ("go",),      lambda s, _c, w: _cmd("go build -ldflags='-s -w' -o {out} {src} && {out}", src=s, out=w/"go.out"))
-        R["rust"]   = LangSpec(".rs", ("rustc",),   lambda s, _c, w: _cmd("rustc -C opt-level=2 -o {out} {src} && {out}", src=s, out=w/"rust.out"))
-        R["sql"]    = LangSpec(".sql",("sqlite3",), lambda s, _c, _w: _cmd("sqlite3 :memory: '.read {src}'", src=s))
+        R["python"] = _spec(".py", ("python3",), lambda s, _w: _cmd("python3 {src}", src=s))
+        R["node"]   = _spec(".js", ("node",),    lambda s, _w: _cmd("node {src}", src=s))
+        R["bash"]   = _spec(".sh", ("bash",),    lambda s, _w: _cmd("bash {src}", src=s))
+        R["c"]      = _native(".c",  ("gcc",), "c.out",   "gcc -O2 -s -o {out} {src}", "gcc -O0 -o {out} {src}")
+        R["cpp"]    = _native(".cpp",("g++",), "cpp.out", "g++ -O2 -s -o {out} {src}", "g++ -O0 -o {out} {src}")
+        R["java"]   = _spec(".java",("javac","java"),
+                            run=lambda _s, w: self.jvm.command("java", [w/"out"], "Main")
+                                              or _cmd("java -cp {out} Main", out=w/"out"),
+                            build=lambda s, w: _cmd("mkdir -p {out} && javac {main} -d {out}", out=w/"out", main=s))
+        R["go"]     = _native(".go", ("go",),    "go.out",   "go build -ldflags='-s -w' -o {out} {src}")
+        R["rust"]   = _native(".rs", ("rustc",), "rust.out", "rustc -C opt-level=2 -o {out} {src}",
+                              "rustc -C opt-level=0 -C debuginfo=0 -C debug-assertions=off -C overflow-checks=off -o {out} {src}")
+        R["sql"]    = _spec(".sql",("sqlite3",), lambda s, _w: _cmd("sqlite3 :memory: '.read {src}'", src=s))
 
         # Scripting
-        R["ruby"] = LangSpec(".rb", ("ruby",),  lambda s, _c, _w: _cmd("ruby {src}", src=s))
-        R["php"]  = LangSpec(".php",("php",),   lambda s, _c, _w: _cmd("php {src}", src=s))
-        R["r"]    = LangSpec(".R",  ("Rscript",),lambda s, _c, _w: _cmd("Rscript {src}", src=s))
-        R["lua"]  = LangSpec(".lua",("lua",),   lambda s, _c, _w: _cmd("lua {src}", src=s))
-        R["perl"] = LangSpec(".pl", ("perl",),  lambda s, _c, _w: _cmd("perl {src}", src=s))
-        R["tcl"]  = LangSpec(".tcl",("tclsh",), lambda s, _c, _w: _cmd("tclsh {src}", src=s))
+        R["ruby"] = _spec(".rb", ("ruby",),   lambda s, _w: _cmd("ruby {src}", src=s))
+        R["php"]  = _spec(".php",("php",),    lambda s, _w: _cmd("php {src}", src=s))
+        R["r"]    = _spec(".R",  ("Rscript",),lambda s, _w: _cmd("Rscript {src}", src=s))
+        R["lua"]  = _spec(".lua",("lua",),    lambda s, _w: _cmd("lua {src}", src=s))
+        R["perl"] = _spec(".pl", ("perl",),   lambda s, _w: _cmd("perl {src}", src=s))
+        R["tcl"]  = _spec(".tcl",("tclsh",),  lambda s, _w: _cmd("tclsh {src}", src=s))
 
         # CLI extras
-        R["awk"]  = LangSpec(".awk",("awk",),   lambda s, _c, _w: _cmd("awk -f {src} /dev/null", src=s))
-        R["sed"]  = LangSpec(".sed",("sed",),   lambda s, _c, _w: _cmd("echo x | sed -f {src}", src=s))
-        R["make"] = LangSpec(".mk", ("make",),  lambda _s, _c, w: _cmd("make -C {w} -f {mk}", w=w, mk=w/"Makefile"))
-        R["bc"]   = LangSpec(".bc", ("bc",),    lambda s, _c, _w: _cmd("cat {src} | bc -l", src=s))
+        R["awk"]  = _spec(".awk",("awk",),    lambda s, _w: _cmd("awk -f {src} /dev/null", src=s))
+        R["sed"]  = _spec(".sed",("sed",),    lambda s, _w: _cmd("echo x | sed -f {src}", src=s))
+        R["make"] = _spec(".mk", ("make",),   lambda s, _w: _cmd("make -C {w} -f {mk}", w=s.parent, mk=s))
+        R["bc"]   = _spec(".bc", ("bc",),     lambda s, _w: _cmd("cat {src} | bc -l", src=s))
 
         # JVM/funcionales
-        R["kotlin"]  = LangSpec(".kt", ("kotlinc","java"),
-                                lambda s, _c, w: _cmd("kotlinc {src} -include-runtime -d {jar} && java -jar {jar}",
-                                                      src=s, jar=w/"kotlin.jar"))
-        R["scala"]   = LangSpec(".scala", ("scalac","scala"),
-                                lambda s, _c, w: _cmd("mkdir -p {out} && scalac -d {out} {src} && scala -nc -cp {out} Main",
-                                                      src=s, out=w/"scala_out"))
-        R["haskell"] = LangSpec(".hs", ("runghc",), lambda s, _c, _w: _cmd("runghc {src}", src=s))
-        R["ocaml"]   = LangSpec(".ml", ("ocaml",),  lambda s, _c, _w: _cmd("ocaml {src}", src=s))
-        R["dart"]    = LangSpec(".dart",("dart",),  lambda s, _c, _w: _cmd("dart {src}", src=s))
+        R["kotlin"]  = _spec(".kt", ("kotlinc","java"),
+                             run=lambda _s, w: self.jvm.command("kotlin", [w/"kotlin.jar"], jar_main(w/"kotlin.jar"))
+                                               or _cmd("java -jar {jar}", jar=w/"kotlin.jar"),
+                             build=lambda s, w: _cmd("kotlinc {src} -include-runtime -d {jar}", src=s, jar=w/"kotlin.jar"))
+        R["scala"]   = _spec(".scala", ("scalac","scala"),
+                             run=lambda _s, w: self.jvm.command("scala", [w/"scala_out"], "Main")
+                                               or _cmd("scala -nc -cp {out} Main", out=w/"scala_out"),
+                             build=lambda s, w: _cmd("mkdir -p {out} && scalac -d {out} {src}", src=s, out=w/"scala_out"))
+        R["haskell"] = _spec(".hs", ("runghc",), lambda s, _w: _cmd("runghc {src}", src=s))
+        R["ocaml"]   = _spec(".ml", ("ocaml",),  lambda s, _w: _cmd("ocaml {src}", src=s))
+        R["dart"]    = _spec(".dart",("dart",),  lambda s, _w: _cmd("dart {src}", src=s))
 
         # Legacy/modern
-        R["fortran"] = LangSpec(".f90",("gfortran",), lambda s, _c, w: _cmd("gfortran -O2 -o {out} {src} && {out}", src=s, out=w/"fortran.out"))
-        R["pascal"]  = LangSpec(".pas",("fpc",),      lambda s, _c, w: _cmd("fpc -O2 -o{out} {src} && {out}", src=s, out=w/"pascal.out"))
-        R["ada"]     = LangSpec(".adb",("gnatmake",), lambda s, _c, w: _cmd("gnatmake -q -o {out} {src} && {out}", src=s, out=w/"ada.out"))
-        R["cobol"]   = LangSpec(".cob",("cobc",),     lambda s, _c, w: _cmd("cobc -x -O2 -o {out} {src} && {out}", src=s, out=w/"cobol.out"))
-        R["zig"]     = LangSpec(".zig",("zig",),      lambda s, _c, w: _cmd("ZIG_GLOBAL_CACHE_DIR={cache} ZIG_LOCAL_CACHE_DIR={cache} zig run {src}",
-                                                                            src=s, cache=w/"zig-cache"))
+        R["fortran"] = _native(".f90",("gfortran",), "fortran.out", "gfortran -O2 -o {out} {src}", "gfortran -O0 -o {out} {src}")
+        R["pascal"]  = _native(".pas",("fpc",),      "pascal.out",  "fpc -O2 -o{out} {src}",       "fpc -O- -o{out} {src}")
+        R["ada"]     = _native(".adb",("gnatmake",), "ada.out",     "gnatmake -q -O2 -o {out} {src}", "gnatmake -q -O0 -o {out} {src}")
+        R["cobol"]   = _native(".cob",("cobc",),     "cobol.out",   "cobc -x -O2 -o {out} {src}",  "cobc -x -o {out} {src}")
+        R["zig"]     = _spec(".zig",("zig",),
+                             run=lambda _s, w: _cmd("{out}", out=w/"zig.out"),
+                             build=lambda s, w: _cmd("ZIG_GLOBAL_CACHE_DIR={cache} ZIG_LOCAL_CACHE_DIR={cache} zig build-exe -O ReleaseFast -femit-bin={out} {src}",
+                                                     src=s, out=w/"zig.out", cache=ZIG_CACHE_DIR),
+                             quick=lambda s, w: _cmd("ZIG_GLOBAL_CACHE_DIR={cache} ZIG_LOCAL_CACHE_DIR={cache} zig build-exe -femit-bin={out} {src}",
+                                                     src=s, out=w/"zig.out", cache=ZIG_CACHE_DIR))
 
         # TypeScript (reemplazo de Nim) — requiere `npm i -g typescript ts-node`
-        R["typescript"] = LangSpec(".ts", ("ts-node",),
-                                   # --transpile-only acelera (no type-check estricto)
-                                   lambda s, _c, _w: _cmd("ts-node --transpile-only {src}", src=s))
+        R["typescript"] = _spec(".ts", ("ts-node",),
+                                # --transpile-only acelera (no type-check estricto)
+                                lambda s, _w: _cmd("ts-node --transpile-only {src}", src=s))
 
-        return R
\ No newline at end of file
+        return R
+
+def pump_output(proc: subprocess.Popen, timeout: float, stdin: Optional[str] = None,
+                max_output: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lee stdout/stderr de `proc` en chunks y los emite como eventos.
+    Devuelve (vía StopIteration) None, o "timeout"/"output_limit" si hubo que matar el árbol del proceso.
+    """
+    if stdin is not None and proc.stdin is not None:
+        def _feed(pipe, data: bytes) -> None:
+            try:
+                pipe.write(data)
+            except (BrokenPipeError, OSError):
+                pass
+            finally:
+                try:
+                    pipe.close()
+                except OSError:
+                    pass
+        threading.Thread(target=_feed, args=(proc.stdin, stdin.encode("utf-8")), daemon=True).start()
+
+    deadline = time.monotonic() + timeout
+    sel = selectors.DefaultSelector()
+    decoders = {}
+    for name, pipe in (("stdout", proc.stdout), ("stderr", proc.stderr)):
+        if pipe is not None:
+            sel.register(pipe, selectors.EVENT_READ, name)
+            decoders[name] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    total = 0
+    leader_done = False
+    try:
+        while sel.get_map():
+            if not leader_done and supervisor.poll(proc) is not None:
+                leader_done = True  # quedan procesos en background con el pipe abierto: se matan
+                supervisor.signal_group(proc, signal.SIGKILL)
+                deadline = min(deadline, time.monotonic() + 1.0)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if leader_done:
+                    break
+                supervisor.kill_tree(proc)
+                return "timeout"
+            for key, _ in sel.select(timeout=min(remaining, 0.25)):
+                chunk = os.read(key.fileobj.fileno(), STREAM_CHUNK_BYTES)
+                total += len(chunk)
+                if max_output is not None and total > max_output:
+                    supervisor.kill_tree(proc)
+                    return "output_limit"
+                if not chunk:
+                    sel.unregister(key.fileobj)
+                    tail = decoders[key.data].decode(b"", final=True)
+                    if tail:
+                        yield {"event": key.data, "data": tail}
+                    continue
+                text = decoders[key.data].decode(chunk)
+                if text:
+                    yield {"event": key.data, "data": text}
+        try:
+            supervisor.wait(proc, timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            supervisor.kill_tree(proc)
+            return "timeout"
+        return None
+    finally:
+        sel.close()
+        for pipe in (proc.stdout, proc.stderr):
+            if pipe is not None:
+                pipe.close()
@@ -0,0 +1,193 @@
+# core2/orchestrators/input_spool.py
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, Optional, Tuple
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+SPOOL_DIR       = os.getenv("GOZOLITE_SPOOL_DIR", "/tmp/gozolite-spool")
+MAX_INPUT_BYTES = _env_int("GOZOLITE_MAX_INPUT_BYTES", 64 * 1024 * 1024)   # 64 MiB por entrada
+SPOOL_TTL_S     = _env_int("GOZOLITE_SPOOL_TTL_S", 900)                    # entradas sin usar se purgan
+FLUSH_BYTES     = 1024 * 1024  # write_async junta chunks y escribe fuera del event loop por tandas
+
+_ID_RE  = re.compile(r"^[0-9a-f]{32}$")
+_FICLONE = 0x40049409  # ioctl de reflink (btrfs/xfs): copia sin duplicar bloques
+
+
+class InputTooLarge(ValueError):
+    pass
+
+
+class InputSpool:
+    """
+    Spool en disco para stdin/archivos de entrada grandes.
+    - Los bytes se escriben por chunks (nunca se arma el body completo en memoria).
+    - GozoLite abre el stdin de solo lectura y monta los archivos sólo lectura en el workdir (copia sólo si
+      el kernel no permite montarlos): nunca un hardlink que el job pueda volver escribible.
+    - Cada entrada guarda (inodo, tamaño, ctime) al confirmarse; si un job la modificó igual (chmod +
+      escritura sin sandbox), `path()` la descarta en vez de entregarla a otro job.
+    - Entradas con más de SPOOL_TTL_S sin uso se eliminan en cada alta.
+    - Cada entrada recuerda el tenant que la subió: sólo él puede descartarla por la API.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None, ttl_s: Optional[int] = None):
+        self.root = Path(root or SPOOL_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else MAX_INPUT_BYTES
+        self.ttl_s = ttl_s if ttl_s is not None else SPOOL_TTL_S
+        self._lock = threading.Lock()
+        self._stamps: Dict[str, Tuple[int, int, int]] = {}
+        self._used: Dict[str, float] = {}  # último uso en memoria: un utime() cambiaría el ctime del sello
+        self._owners: Dict[str, str] = {}
+
+    # --------- Alta ---------
+    def _open(self) -> Tuple[str, BinaryIO, Path]:
+        self.purge_expired()
+        fd, tmp = tempfile.mkstemp(prefix=".part-", dir=str(self.root))
+        return uuid.uuid4().hex, os.fdopen(fd, "wb"), Path(tmp)
+
+    def _commit(self, input_id: str, tmp: Path, owner: Optional[str]) -> None:
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, self.root / input_id)
+        with self._lock:
+            self._stamps[input_id] = _stamp(self.root / input_id)
+            self._used[input_id] = time.time()
+            if owner is not None:
+                self._owners[input_id] = owner
+
+    def write(self, chunks: Iterable[bytes], owner: Optional[str] = None) -> Tuple[str, int]:
+        """Guarda los chunks y devuelve (input_id, bytes). `owner`: tenant dueño de la entrada."""
+        input_id, fh, tmp = self._open()
+        size = 0
+        try:
+            with fh:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise InputTooLarge(f"Entrada demasiado grande (> {self.max_bytes} bytes)")
+                    fh.write(chunk)
+            self._commit(input_id, tmp, owner)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return input_id, size
+
+    async def write_async(self, chunks: AsyncIterator[bytes], owner: Optional[str] = None) -> Tuple[str, int]:
+        """Variante para `request.stream()` de Starlette: el disco se toca en el threadpool, no en el loop."""
+        input_id, fh, tmp = await asyncio.to_thread(self._open)
+        size = 0
+        try:
+            with fh:
+                pending = bytearray()
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise InputTooLarge(f"Entrada demasiado grande (> {self.max_bytes} bytes)")
+                    pending += chunk
+                    if len(pending) >= FLUSH_BYTES:
+                        await asyncio.to_thread(fh.write, bytes(pending))
+                        pending.clear()
+                if pending:
+                    await asyncio.to_thread(fh.write, bytes(pending))
+            await asyncio.to_thread(self._commit, input_id, tmp, owner)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return input_id, size
+
+    # --------- Consulta / baja ---------
+    def path(self, input_id: str) -> Optional[Path]:
+        if not _ID_RE.match(input_id or ""):
+            return None
+        p = self.root / input_id
+        with self._lock:
+            try:
+                stamp = _stamp(p)
+            except OSError:
+                return None
+            if self._stamps.setdefault(input_id, stamp) != stamp:
+                # modificada después del alta (el ctime no se puede falsear): no se reparte a otro job
+                p.unlink(missing_ok=True)
+                self._forget(input_id)
+                return None
+            self._used[input_id] = time.time()  # uso reciente => posterga la purga
+        return p
+
+    def resolve(self, ids: Dict[str, str]) -> Dict[str, Path]:
+        """Mapea {nombre: input_id} a {nombre: ruta}; KeyError con el id si alguno no existe."""
+        out: Dict[str, Path] = {}
+        for name, input_id in ids.items():
+            p = self.path(input_id)
+            if p is None:
+                raise KeyError(input_id)
+            out[name] = p
+        return out
+
+    def discard(self, input_id: str, owner: Optional[str] = None) -> bool:
+        """Borra la entrada; con `owner`, sólo si es de ese tenant (si no, como si no existiera)."""
+        if owner is not None:
+            with self._lock:
+                if self._owners.get(input_id) != owner:
+                    return False
+        p = self.path(input_id)
+        if p is None:
+            return False
+        p.unlink(missing_ok=True)
+        with self._lock:
+            self._forget(input_id)
+        return True
+
+    def _forget(self, input_id: str) -> None:
+        self._stamps.pop(input_id, None)
+        self._used.pop(input_id, None)
+        self._owners.pop(input_id, None)
+
+    def purge_expired(self) -> int:
+        if self.ttl_s <= 0:
+            return 0
+        cutoff = time.time() - self.ttl_s
+        removed = 0
+        with self._lock:
+            for p in self.root.iterdir():
+                try:
+                    if max(p.stat().st_mtime, self._used.get(p.name, 0.0)) < cutoff:
+                        p.unlink(missing_ok=True)
+                        self._forget(p.name)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+def _stamp(p: Path) -> Tuple[int, int, int]:
+    st = os.stat(p)
+    return st.st_ino, st.st_size, st.st_ctime_ns
+
+
+def copy_into(src: Path, dest: Path) -> Path:
+    """
+    Copia privada (solo lectura) de `src` en `dest` cuando no se puede montar (sin sandbox y sin user
+    namespaces): reflink si el filesystem lo soporta (sin duplicar bloques), copia normal si no. Nunca un hardlink: el job es dueño del
+    inodo y podría hacer chmod u+w y reescribir la entrada compartida.
+    """
+    with open(src, "rb") as fin, open(dest, "xb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+        except OSError:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+    os.chmod(dest, 0o444)
+    return dest
@@ -0,0 +1,332 @@
+# core2/orchestrators/judge.py
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .supervisor import _self_hwm_kb, supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+JUDGE_MAX_OUTPUT  = _env_int("GOZOLITE_JUDGE_MAX_OUTPUT", 4 * 1024 * 1024)  # salida máx. por caso
+JUDGE_ECHO_BYTES  = _env_int("GOZOLITE_JUDGE_ECHO_BYTES", 1024)             # salida devuelta en casos fallidos
+JUDGE_PARALLELISM = _env_int("GOZOLITE_JUDGE_PARALLELISM", os.cpu_count() or 1)
+JUDGE_DIR         = os.getenv("GOZOLITE_JUDGE_DIR", "/tmp/gozolite-judge")       # launcher de casos compilado
+
+COMPARE_MODES = ("exact", "whitespace", "float")
+
+# Lo que imprimen los runtimes cuando malloc falla contra RLIMIT_DATA
+_OOM_MARKERS = ("MemoryError", "bad_alloc", "OutOfMemoryError", "out of memory", "memory allocation of")
+
+# Veredictos por caso
+ACCEPTED, WRONG, TLE, MLE, RTE, SKIPPED = (
+    "accepted", "wrong_answer", "time_limit", "memory_limit", "runtime_error", "skipped",
+)
+
+
+def compare_output(out: str, expected: str, mode: str = "exact", float_tol: float = 1e-6) -> bool:
+    """
+    - exact: mismas líneas, ignorando espacios al final de cada línea y saltos de línea finales
+      ("3\\n" == "3"), como la mayoría de los jueces
+    - whitespace: mismos tokens ignorando espacios/saltos de línea
+    - float: como whitespace, pero los tokens numéricos se comparan con tolerancia abs/rel
+    """
+    if mode == "exact":
+        return [ln.rstrip() for ln in out.rstrip().splitlines()] == [ln.rstrip() for ln in expected.rstrip().splitlines()]
+    got, want = out.split(), expected.split()
+    if mode == "whitespace":
+        return got == want
+    if len(got) != len(want):
+        return False
+    for a, b in zip(got, want):
+        if a == b:
+            continue
+        try:
+            fa, fb = float(a), float(b)
+        except ValueError:
+            return False
+        if not math.isclose(fa, fb, rel_tol=float_tol, abs_tol=float_tol):
+            return False
+    return True
+
+
+@lru_cache(maxsize=1)
+def login_env() -> Dict[str, str]:
+    """
+    Entorno de un login shell (PATH de sdkman, cargo, etc.), capturado una sola vez.
+    Los casos corren con `bash -c` + este entorno en lugar de pagar `bash -lc` por caso.
+    """
+    try:
+        out = subprocess.run(["bash", "-lc", "env -0"], capture_output=True, timeout=30).stdout
+        env = dict(item.split("=", 1) for item in out.decode("utf-8", "replace").split("\0") if "=" in item)
+        if env.get("PATH"):
+            return env
+    except Exception:
+        pass
+    return dict(os.environ)
+
+
+def _limits(memory_mb: int, cpu_s: int) -> List[str]:
+    """
+    Prefijo de argv que fija los límites y hace exec del comando: `prlimit` (util-linux) o `ulimit` de sh.
+    Reemplaza a preexec_fn, que corre Python entre fork y exec y puede trabarse en un servidor con hilos.
+    RLIMIT_DATA (heap) en vez de RLIMIT_AS: JVM/Go/V8 reservan mucho espacio virtual sin usarlo.
+    """
+    mem = memory_mb * 1024 * 1024
+    prlimit = shutil.which("prlimit")
+    if prlimit:
+        return [prlimit, f"--data={mem}", f"--cpu={cpu_s}:{cpu_s + 1}", "--"]
+    return ["sh", "-c", f'ulimit -d {mem // 1024} && ulimit -H -t {cpu_s + 1} && ulimit -S -t {cpu_s} && exec "$@"', "sh"]
+
+
+# Launcher de casos: fija los límites en un hijo, lo espera e informa su ru_maxrss por REPORT_FD.
+# Ese hijo nace de un proceso mínimo, así que su pico no arrastra el RSS de la API (como el ru_maxrss
+# de un hijo directo de Python, heredado a través del exec). Sale con el mismo estado/señal del hijo.
+_CASE_LAUNCHER = r"""
+#include <errno.h>
+#include <signal.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+/* gozolite-case DATA_BYTES CPU_S REPORT_FD -- argv... */
+int main(int argc, char **argv) {
+    if (argc < 6 || strcmp(argv[4], "--") != 0) return 125;
+    rlim_t data = strtoull(argv[1], NULL, 10), cpu = strtoull(argv[2], NULL, 10);
+    int report = atoi(argv[3]), status;
+    struct rusage ru;
+    pid_t pid = fork();
+    if (pid < 0) { perror("gozolite-case: fork"); return 125; }
+    if (pid == 0) {
+        struct rlimit d = {data, data}, c = {cpu, cpu + 1};
+        close(report);
+        if (setrlimit(RLIMIT_DATA, &d) || setrlimit(RLIMIT_CPU, &c)) { perror("gozolite-case: setrlimit"); _exit(125); }
+        execvp(argv[5], argv + 5);
+        fprintf(stderr, "gozolite-case: %s: %s\n", argv[5], strerror(errno));
+        _exit(127);
+    }
+    while (wait4(pid, &status, 0, &ru) < 0)
+        if (errno != EINTR) return 125;
+    dprintf(report, "%ld\n", ru.ru_maxrss);
+    close(report);
+    if (WIFSIGNALED(status)) {
+        struct rlimit none = {0, 0};
+        setrlimit(RLIMIT_CORE, &none);
+        signal(WTERMSIG(status), SIG_DFL);
+        raise(WTERMSIG(status));
+    }
+    return WIFEXITED(status) ? WEXITSTATUS(status) : 125;
+}
+"""
+
+
+@lru_cache(maxsize=1)
+def case_launcher() -> Optional[str]:
+    """Ruta del launcher de casos (se compila una vez con cc); None sin compilador: se usa `_limits`."""
+    cc = shutil.which("cc") or shutil.which("gcc")
+    if cc is None:
+        return None
+    root = Path(JUDGE_DIR)
+    exe = root / f"case-{hashlib.sha256(_CASE_LAUNCHER.encode()).hexdigest()[:12]}"
+    if exe.is_file():
+        return str(exe)
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        src = root / f".case-{os.getpid()}.c"
+        src.write_text(_CASE_LAUNCHER)
+        tmp = root / f".case-{os.getpid()}"
+        with supervisor.observe(None), supervisor.running(None):  # no es un proceso de ningún job
+            res = supervisor.run([cc, "-O2", "-o", str(tmp), str(src)], timeout=60)
+        src.unlink(missing_ok=True)
+        if res.returncode != 0:
+            return None
+        os.replace(tmp, exe)
+        return str(exe)
+    except OSError:
+        return None
+
+
+def _read_capped(pipe, sink: List[bytes], cap: int) -> None:
+    size = 0
+    while True:
+        chunk = pipe.read(65536)
+        if not chunk:
+            break
+        if size < cap:
+            sink.append(chunk[: cap - size])
+        size += len(chunk)
+    pipe.close()
+
+
+class CaseRunner:
+    """Ejecuta casos de un programa ya compilado, en paralelo y con límites por caso."""
+
+    def __init__(self, run_cmd: str, timeout: float, memory_mb: int, compare: str = "exact",
+                 float_tol: float = 1e-6, stop_on_fail: bool = False, parallelism: Optional[int] = None,
+                 sandbox: Optional[Any] = None, visible: Sequence[str] = ()):
+        self.run_cmd = run_cmd
+        self.sandbox = sandbox      # NsSandbox: cada caso corre en su propio namespace
+        self.visible = list(visible)  # rutas del programa (artefacto o fuente) que el caso necesita ver
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.compare = compare if compare in COMPARE_MODES else "exact"
+        self.float_tol = float_tol
+        self.stop_on_fail = stop_on_fail
+        self.parallelism = max(1, min(parallelism or JUDGE_PARALLELISM, JUDGE_PARALLELISM))
+        self._stop = threading.Event()
+        self._live: Dict[int, subprocess.Popen] = {}
+        self._lock = threading.Lock()
+
+    def run_all(self, cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not cases:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.parallelism, len(cases))) as pool:
+            return list(pool.map(supervisor.bind(self._run_case), range(len(cases)), cases))
+
+    def _abort_all(self) -> None:
+        self._stop.set()
+        with self._lock:
+            for proc in self._live.values():
+                supervisor.signal_group(proc, signal.SIGKILL)
+
+    def _run_case(self, index: int, case: Dict[str, Any]) -> Dict[str, Any]:
+        if self._stop.is_set():
+            return {"index": index, "verdict": SKIPPED}
+        workdir = Path(tempfile.mkdtemp(prefix="ce-case-", dir="/tmp"))
+        stdin_fh = None
+        report_r = report_w = peak_kb = None
+        try:
+            stdin_path = case.get("stdin_path")
+            if stdin_path:
+                stdin_fh = open(stdin_path, "rb")
+            stdin_data = case.get("stdin")
+            argv = ["bash", "-c", self.run_cmd]
+            env = login_env()
+            if self.sandbox is not None:
+                boxed = self.sandbox.wrap(argv, str(workdir), ro=self.visible)
+                if boxed is not None:
+                    argv, env = boxed, self.sandbox.env()
+            cpu_s = int(math.ceil(self.timeout))
+            launcher = case_launcher()
+            if launcher is not None:
+                report_r, report_w = os.pipe()
+                argv = [launcher, str(self.memory_mb * 1024 * 1024), str(cpu_s), str(report_w), "--", *argv]
+            else:
+                argv = [*_limits(self.memory_mb, cpu_s), *argv]
+            inherited_kb = _self_hwm_kb()
+            started = time.monotonic()
+            try:
+                proc = supervisor.popen(  # grupo propio: el timeout mata todo el árbol
+                    argv,
+                    cwd=str(workdir),
+                    env=env,
+                    stdin=stdin_fh or (subprocess.PIPE if stdin_data is not None else subprocess.DEVNULL),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    pass_fds=(report_w,) if report_w is not None else (),
+                )
+            finally:
+                if report_w is not None:
+                    os.close(report_w)
+            with self._lock:
+                self._live[index] = proc
+
+            timed_out = threading.Event()
+            def _expire() -> None:
+                timed_out.set()
+                supervisor.signal_group(proc, signal.SIGKILL)
+            timer = threading.Timer(self.timeout, _expire)
+            timer.start()
+            out: List[bytes] = []
+            err: List[bytes] = []
+            readers = [
+                threading.Thread(target=_read_capped, args=(proc.stdout, out, JUDGE_MAX_OUTPUT), daemon=True),
+                threading.Thread(target=_read_capped, args=(proc.stderr, err, JUDGE_MAX_OUTPUT), daemon=True),
+            ]
+            for t in readers:
+                t.start()
+            if stdin_data is not None and proc.stdin is not None:
+                try:
+                    proc.stdin.write(stdin_data.encode("utf-8"))
+                except (BrokenPipeError, OSError):
+                    pass
+                finally:
+                    try:
+                        proc.stdin.close()
+                    except OSError:
+                        pass
+
+            # wait4 en lugar de wait(): da el rusage del caso (CPU y pico de memoria) sin mezclar con otros
+            _, status, ru = os.wait4(proc.pid, 0)
+            supervisor.record(proc, ru, status)
+            if report_r is not None:
+                reported = os.read(report_r, 64).strip()  # vacío si el launcher murió (timeout)
+                peak_kb = int(reported) if reported.isdigit() else None
+            timer.cancel()
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            elapsed = int((time.monotonic() - started) * 1000)
+            supervisor.finish(proc)  # procesos en background del caso: no sobreviven al veredicto
+            for t in readers:
+                t.join()
+        except Exception as e:
+            return {"index": index, "verdict": RTE, "exit_code": 1, "stderr": f"Excepción: {e}"}
+        finally:
+            with self._lock:
+                self._live.pop(index, None)
+            if stdin_fh is not None:
+                stdin_fh.close()
+            if report_r is not None:
+                os.close(report_r)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        stdout = b"".join(out).decode("utf-8", errors="replace")
+        stderr = b"".join(err).decode("utf-8", errors="replace")
+        if peak_kb is not None:
+            memory_kb = peak_kb  # pico del caso medido por el launcher, sin el RSS de la API
+        else:
+            # Sin launcher: un pico por debajo del heredado de la API no es medible, se informa 0
+            memory_kb = int(ru.ru_maxrss) if ru.ru_maxrss > inherited_kb else 0
+        res: Dict[str, Any] = {
+            "index": index,
+            "exit_code": 124 if timed_out.is_set() else proc.returncode,
+            "time_ms": elapsed,
+            "cpu_ms": int((ru.ru_utime + ru.ru_stime) * 1000),
+            "memory_kb": memory_kb,
+        }
+        expected = case.get("expected")
+        if self._stop.is_set() and proc.returncode < 0 and not timed_out.is_set():
+            res["verdict"] = SKIPPED  # abortado por stop_on_fail
+            return res
+        if timed_out.is_set() or proc.returncode in (-signal.SIGXCPU, 128 + signal.SIGXCPU):
+            res["verdict"] = TLE
+        elif proc.returncode != 0:
+            near_limit = memory_kb * 1024 >= 0.9 * self.memory_mb * 1024 * 1024
+            res["verdict"] = MLE if near_limit or any(m in stderr for m in _OOM_MARKERS) else RTE
+        elif expected is not None and not compare_output(stdout, expected, self.compare, self.float_tol):
+            res["verdict"] = WRONG
+        else:
+            res["verdict"] = ACCEPTED
+
+        if res["verdict"] != ACCEPTED:
+            res["stdout"] = stdout[:JUDGE_ECHO_BYTES]
+            res["stderr"] = stderr[:JUDGE_ECHO_BYTES]
+            if self.stop_on_fail:
+                self._abort_all()
+        return res
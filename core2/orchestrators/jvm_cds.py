@@ -0,0 +1,345 @@
+# core2/orchestrators/jvm_cds.py — archivos CDS por runtime JVM (java/kotlin/scala) y lanzador afinado para el run
+from __future__ import annotations
+
+import hashlib
+import os
+import shlex
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from .judge import login_env
+from .supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+JVM_CDS           = os.getenv("GOZOLITE_JVM_CDS", "1") != "0"
+JVM_CDS_DIR       = os.getenv("GOZOLITE_JVM_CDS_DIR", "/tmp/gozolite-cds")
+JVM_CDS_TIMEOUT_S = _env_int("GOZOLITE_JVM_CDS_TIMEOUT_S", 300)  # compilar + entrenar + volcar, por lenguaje
+# Programas cortos: GC serial (sin hilos de GC ni regiones que inicializar) y sin hsperfdata en /tmp.
+# `-XX:TieredStopAtLevel=1` arranca aún más rápido, pero sólo C1: se paga en programas que calculan mucho.
+JVM_FLAGS         = os.getenv("GOZOLITE_JVM_FLAGS", "-XX:+UseSerialGC -XX:-UsePerfData")
+# Los warnings de la JVM (p. ej. un archivo CDS que no aplica) van a stdout: sólo errores, y a stderr
+_QUIET = ["-Xshare:auto", "-Xlog:disable", "-Xlog:all=error:stderr"]
+_FORMAT = 1  # sube si cambian los programas de entrenamiento (invalida los archivos viejos)
+
+# Programas de entrenamiento: cargan lo que usa una solución típica (lectura de stdin, colecciones,
+# lambdas/streams, formateo) para que esas clases queden en el archivo. Se ejecutan con _TRAIN_INPUT.
+_TRAIN_INPUT = "3\n5 1 4\nhola mundo\n"
+_TRAIN: Dict[str, Dict[str, str]] = {
+    "java": {"file": "Main.java", "main": "Main", "code": r"""
+import java.io.*;
+import java.math.BigInteger;
+import java.util.*;
+import java.util.stream.*;
+
+public class Main {
+    public static void main(String[] args) throws IOException {
+        BufferedReader br = new BufferedReader(new InputStreamReader(System.in));
+        PrintWriter out = new PrintWriter(new BufferedWriter(new OutputStreamWriter(System.out)));
+        int n = Integer.parseInt(br.readLine().trim());
+        StringTokenizer st = new StringTokenizer(br.readLine());
+        List<Integer> xs = new ArrayList<>();
+        for (int i = 0; i < n; i++) xs.add(Integer.parseInt(st.nextToken()));
+        String[] words = br.readLine().split("\\s+");
+        Collections.sort(xs);
+        int[] arr = xs.stream().mapToInt(Integer::intValue).toArray();
+        Arrays.sort(arr);
+        Map<String, Integer> freq = new HashMap<>();
+        for (String w : words) freq.merge(w, 1, Integer::sum);
+        TreeMap<Integer, String> tm = new TreeMap<>();
+        PriorityQueue<Long> pq = new PriorityQueue<>(Comparator.reverseOrder());
+        Deque<Integer> dq = new ArrayDeque<>();
+        Set<Integer> seen = new HashSet<>(xs);
+        for (int x : arr) { tm.put(x, String.valueOf(x)); pq.add((long) x * x); dq.addLast(x); }
+        Scanner sc = new Scanner("7 8.5 nueve").useLocale(Locale.ROOT);
+        int a = sc.nextInt(); double b = sc.nextDouble(); String c = sc.next();
+        StringBuilder sb = new StringBuilder();
+        sb.append(xs.stream().map(x -> x * 2).filter(x -> x > 0).map(String::valueOf).collect(Collectors.joining(" ")));
+        out.println(sb);
+        out.printf("%d %.3f %s %s%n", a, b, c, String.join(",", words));
+        out.println(String.format("%5d|%-5s|", pq.peek(), tm.firstEntry().getValue()) + seen.size() + dq.peekLast() + freq);
+        out.println(BigInteger.valueOf(Math.max(a, n)).pow(20).mod(BigInteger.valueOf(1_000_000_007L)));
+        out.println(IntStream.rangeClosed(1, n).boxed().collect(Collectors.toList()));
+        out.flush();
+    }
+}
+"""},
+    "kotlin": {"file": "Main.kt", "main": "MainKt", "code": r"""
+import java.io.*
+import java.util.*
+
+fun main() {
+    val br = BufferedReader(InputStreamReader(System.`in`))
+    val n = br.readLine()!!.trim().toInt()
+    val xs = br.readLine()!!.split(" ").filter { it.isNotEmpty() }.map { it.toInt() }.take(n)
+    val words = br.readLine()!!.split(Regex("\\s+"))
+    val freq = HashMap<String, Int>()
+    for (w in words) freq[w] = (freq[w] ?: 0) + 1
+    val sorted = xs.sorted().toMutableList()
+    val arr = IntArray(n) { sorted[it] }
+    arr.sort()
+    val pq = PriorityQueue<Long>(Collections.reverseOrder())
+    arr.forEach { pq.add(it.toLong() * it) }
+    val dq = java.util.ArrayDeque<Int>()
+    dq.addLast(arr.last())
+    val m = mutableMapOf<Int, String>().apply { xs.forEach { put(it, it.toString()) } }
+    val s = buildString {
+        append(sorted.map { it * 2 }.filter { it > 0 }.joinToString(" "))
+        append(' ')
+        append(m.entries.sortedBy { it.key }.first().value)
+    }
+    println(s)
+    println(String.format("%d %.3f %s", pq.peek(), xs.average(), words.joinToString(",")))
+    println("${setOf(*xs.toTypedArray()).size} ${dq.peekFirst()} $freq ${(1..n).toList()} ${xs.groupBy { it % 2 }}")
+    val sb = StringBuilder()
+    repeat(n) { sb.append(it).append('\n') }
+    print(sb)
+}
+"""},
+    "scala": {"file": "Main.scala", "main": "Main", "code": r"""
+import scala.collection.mutable
+import scala.io.StdIn
+
+object Main {
+  def main(args: Array[String]): Unit = {
+    val n = StdIn.readLine().trim.toInt
+    val xs = StdIn.readLine().split(" ").filter(_.nonEmpty).map(_.toInt).take(n).toVector
+    val words = Option(StdIn.readLine()).getOrElse("").split("\\s+").toList
+    val freq = mutable.HashMap[String, Int]()
+    words.foreach(w => freq(w) = freq.getOrElse(w, 0) + 1)
+    val buf = mutable.ArrayBuffer[Int]()
+    buf ++= xs.sorted
+    val pq = mutable.PriorityQueue[Long]()
+    buf.foreach(x => pq.enqueue(x.toLong * x))
+    val m = xs.map(x => x -> x.toString).toMap
+    val sb = new StringBuilder
+    (1 to n).foreach(i => sb.append(i).append(' '))
+    println(buf.map(_ * 2).filter(_ > 0).mkString(" "))
+    println(f"${pq.head}%d ${xs.sum.toDouble / n}%.3f ${words.mkString(",")}")
+    println(s"${m.keys.toList.sorted} ${freq.toSeq.sortBy(_._1)} ${xs.groupBy(_ % 2).size} ${List.fill(2)(BigInt(n).pow(20) % 1000000007)}")
+    println(sb.toString.trim)
+  }
+}
+"""},
+}
+
+
+def jar_main(jar: Path) -> Optional[str]:
+    """Main-Class del manifest de un jar (el que escribe `kotlinc -d x.jar`), o None."""
+    try:
+        with zipfile.ZipFile(jar) as z:
+            manifest = z.read("META-INF/MANIFEST.MF").decode("utf-8", "replace")
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+    for line in manifest.splitlines():
+        if line.lower().startswith("main-class:"):
+            return line.split(":", 1)[1].strip() or None
+    return None
+
+
+class JvmCds:
+    """
+    Arranque de programas JVM cortos sin re-parsear ni re-verificar el runtime en cada run:
+    - por lenguaje, un archivo AppCDS (class data sharing) del JDK + su runtime (kotlin-stdlib,
+      scala-library), volcado de la lista de clases que carga un programa de entrenamiento típico;
+    - el run lanza `java` directo (sin `java -jar` ni el script `scala`) con ese runtime al frente
+      del classpath, el archivo CDS y JVM_FLAGS.
+    El archivo se genera en background la primera vez que se usa el lenguaje (o en `prewarm()`,
+    al arrancar la API) y se identifica por JVM, runtime y flags: si cambian, se regenera.
+    `command()` devuelve None si el lenguaje no tiene un runtime ubicable (se usa el lanzador de siempre).
+    """
+
+    LANGUAGES = ("java", "kotlin", "scala")
+
+    def __init__(self, enabled: bool = JVM_CDS, root: str = JVM_CDS_DIR, flags: str = JVM_FLAGS):
+        self.enabled = enabled
+        self.root = Path(root)
+        self.flags = shlex.split(flags)
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._runtimes: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._building: Dict[str, str] = {}  # lenguaje -> fingerprint en generación
+        self._failed: Dict[str, str] = {}    # lenguaje -> fingerprint que falló (no se reintenta)
+        self._lock = threading.Lock()
+
+    # --------- Runtime ---------
+    def _runtime(self, language: str) -> Optional[Dict[str, Any]]:
+        """java del PATH de los jobs y jars del runtime del lenguaje (resuelto una vez por proceso)."""
+        if language not in self._runtimes:
+            try:
+                self._runtimes[language] = self._locate(language)
+            except OSError:
+                self._runtimes[language] = None
+        return self._runtimes[language]
+
+    @staticmethod
+    def _locate(language: str) -> Optional[Dict[str, Any]]:
+        path = login_env().get("PATH")
+        java = shutil.which("java", path=path)
+        if java is None:
+            return None
+        java = os.path.realpath(java)
+        jars: List[str] = []
+        compiler = {"java": "javac", "kotlin": "kotlinc", "scala": "scalac"}[language]
+        compiler_exe = shutil.which(compiler, path=path)
+        if compiler_exe is None:
+            return None
+        lib = Path(os.path.realpath(compiler_exe)).parent.parent / "lib"
+        if language == "kotlin":
+            jars = [str(p) for p in [lib / "kotlin-stdlib.jar"] if p.is_file()]
+        elif language == "scala":
+            # scala 2: scala-library.jar; scala 3: scala3-library_3-*.jar + scala-library-2.13.*.jar
+            jars = sorted(str(p) for p in lib.glob("scala*-library*.jar"))
+        if language != "java" and not jars:
+            return None  # runtime no ubicable (p. ej. scala-cli): se sigue con el lanzador del toolchain
+        home = Path(java).parent.parent
+        return {"java": java, "compiler": compiler_exe, "jars": jars,
+                "stamp": [str(p) for p in [Path(java), home / "lib" / "modules", *map(Path, jars)]]}
+
+    def _fingerprint(self, language: str, rt: Dict[str, Any]) -> str:
+        h = hashlib.sha1(f"{_FORMAT}\0{language}\0{' '.join(self.flags)}".encode())
+        for p in rt["stamp"]:
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            h.update(f"\0{p}:{st.st_size}:{st.st_mtime_ns}".encode())
+        return h.hexdigest()[:16]
+
+    def _archive(self, language: str, rt: Dict[str, Any]) -> Optional[Path]:
+        """Archivo CDS vigente del lenguaje; si no existe, se dispara su generación y se devuelve None."""
+        fp = self._fingerprint(language, rt)
+        path = self.root / f"{language}-{fp}.jsa"
+        if path.is_file():
+            if self.stats.get(language, {}).get("archive") != str(path):
+                self._ready(language, path)  # generado por un proceso anterior de la API
+            return path
+        with self._lock:
+            if self._building.get(language) == fp or self._failed.get(language) == fp:
+                return None
+            self._building[language] = fp
+        threading.Thread(target=self._generate, args=(language, rt, fp), name=f"gozolite-cds-{language}",
+                         daemon=True).start()
+        return None
+
+    # --------- Run ---------
+    def command(self, language: str, classpath: Sequence[Path], main: Optional[str], cds: bool = True) -> Optional[str]:
+        """Comando `java` del run (runtime + classpath, CDS si ya está listo, JVM_FLAGS), o None."""
+        if not self.enabled or main is None or language not in self.LANGUAGES:
+            return None
+        rt = self._runtime(language)
+        if rt is None:
+            return None
+        archive = self._archive(language, rt) if cds else None
+        argv = [rt["java"], *self.flags, *_QUIET]
+        if archive is not None:
+            argv.append(f"-XX:SharedArchiveFile={archive}")
+            self._count(language, "runs_cds")
+        else:
+            self._count(language, "runs_plain")
+        argv += ["-cp", os.pathsep.join([*rt["jars"], *map(str, classpath)]), main]
+        return " ".join(shlex.quote(a) for a in argv)
+
+    def visible(self) -> List[str]:
+        """Archivos CDS listos: el run en el sandbox tiene que poder mapearlos (viven fuera del workdir)."""
+        with self._lock:
+            return [c["archive"] for c in self.stats.values() if c.get("archive")]
+
+    def prewarm(self, languages: Sequence[str] = LANGUAGES) -> None:
+        """Genera en background los archivos de los lenguajes instalados (al arrancar la API)."""
+        if not self.enabled:
+            return
+        def _run() -> None:
+            for language in languages:
+                rt = self._runtime(language)
+                if rt is not None:
+                    path = self._archive(language, rt)
+                    if path is not None:
+                        self._ready(language, path)
+        threading.Thread(target=_run, name="gozolite-cds-prewarm", daemon=True).start()
+
+    # --------- Generación ---------
+    def _generate(self, language: str, rt: Dict[str, Any], fp: str) -> None:
+        started = time.monotonic()
+        self.root.mkdir(parents=True, exist_ok=True)
+        work = Path(tempfile.mkdtemp(prefix=f".cds-{language}-", dir=str(self.root)))
+        try:
+            with supervisor.observe(None), supervisor.running(None):  # no es trabajo de ningún job
+                classes = self._dump(language, rt, work)
+            final = self.root / f"{language}-{fp}.jsa"
+            os.replace(work / "app.jsa", final)
+            for old in self.root.glob(f"{language}-*.jsa"):
+                if old != final:
+                    old.unlink(missing_ok=True)  # JVM/runtime anterior
+            self._ready(language, final, classes=classes, build_ms=int((time.monotonic() - started) * 1000))
+        except Exception as e:
+            with self._lock:
+                self._failed[language] = fp
+                self.stats.setdefault(language, {})["error"] = str(e)[-500:]
+        finally:
+            with self._lock:
+                self._building.pop(language, None)
+            shutil.rmtree(work, ignore_errors=True)
+
+    def _dump(self, language: str, rt: Dict[str, Any], work: Path) -> int:
+        """Compila y corre el programa de entrenamiento, vuelca el archivo y lo prueba con -Xshare:on."""
+        train = _TRAIN[language]
+        (work / train["file"]).write_text(train["code"], encoding="utf-8")
+        classes_dir, classlist, empty = work / "classes", work / "classes.lst", work / "empty"
+        classes_dir.mkdir()
+        empty.mkdir()
+        env = login_env()
+        runtime_cp = os.pathsep.join(rt["jars"])
+        app_cp = os.pathsep.join([*rt["jars"], str(classes_dir)])
+        java = [rt["java"], *self.flags]
+
+        def _step(argv: List[str], what: str, stdin: Optional[str] = None):
+            res = supervisor.run(argv, cwd=str(work), env=env, input=stdin, timeout=JVM_CDS_TIMEOUT_S)
+            if res.timed_out or res.returncode != 0:
+                raise RuntimeError(f"{what}: exit {res.returncode}: {(res.stderr or res.stdout).strip()[-300:]}")
+            return res
+
+        _step([rt["compiler"], "-d", str(classes_dir), train["file"]], "compilación del entrenamiento")
+        trained = _step([*java, "-Xshare:off", f"-XX:DumpLoadedClassList={classlist}", "-cp", app_cp, train["main"]],
+                        "entrenamiento", _TRAIN_INPUT)
+        # Sólo el runtime en el classpath del volcado: las clases del entrenamiento quedan afuera y el
+        # classpath del run (runtime + artefacto) empieza igual que el del archivo
+        dump = [*java, "-Xshare:dump", f"-XX:SharedClassListFile={classlist}", "-XX:SharedArchiveFile=app.jsa"]
+        _step(dump + ["-cp", runtime_cp or str(empty)], "volcado CDS")  # un directorio no vacío no se admite
+        check = _step([*java, *_QUIET[1:], "-Xshare:on", "-XX:SharedArchiveFile=app.jsa", "-cp", app_cp, train["main"]],
+                      "prueba del archivo", _TRAIN_INPUT)
+        if check.stdout != trained.stdout:
+            raise RuntimeError("la salida con el archivo CDS difiere de la del entrenamiento")
+        with open(classlist, encoding="utf-8", errors="replace") as f:
+            return sum(1 for line in f if line.strip() and not line.startswith(("#", "@")))
+
+    # --------- Estado ---------
+    def _ready(self, language: str, path: Path, **info: Any) -> None:
+        with self._lock:
+            cell = self.stats.setdefault(language, {})
+            cell.pop("error", None)
+            cell.update(info, archive=str(path))
+            try:
+                cell["archive_kb"] = path.stat().st_size // 1024
+            except OSError:
+                pass
+
+    def _count(self, language: str, key: str) -> None:
+        with self._lock:
+            cell = self.stats.setdefault(language, {})
+            cell[key] = cell.get(key, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            langs = {k: dict(v) for k, v in self.stats.items()}
+            building = sorted(self._building)
+        return {"enabled": self.enabled, "dir": str(self.root), "flags": " ".join(self.flags),
+                "building": building, "languages": langs}
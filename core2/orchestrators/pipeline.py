@@ -0,0 +1,417 @@
+# core2/orchestrators/pipeline.py
+from __future__ import annotations
+
+import codecs
+import os
+import re
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .project_files import BuildError
+from .supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+PIPELINE_MAX_BLOCKS = _env_int("GOZOLITE_PIPELINE_MAX_BLOCKS", 20)
+PIPELINE_MAX_OUTPUT = _env_int("GOZOLITE_PIPELINE_MAX_OUTPUT", 1024 * 1024)  # salida capturada por bloque
+RELAY_CHUNK_BYTES   = 65536
+
+# Alias de la etiqueta del fence -> lenguaje del registry
+LANG_ALIASES: Dict[str, str] = {
+    "py": "python", "python3": "python", "js": "node", "javascript": "node", "nodejs": "node",
+    "sh": "bash", "shell": "bash", "zsh": "bash", "c++": "cpp", "cc": "cpp", "cxx": "cpp",
+    "rs": "rust", "golang": "go", "ts": "typescript", "rb": "ruby", "pl": "perl",
+    "kt": "kotlin", "hs": "haskell", "f90": "fortran", "sqlite": "sql", "makefile": "make",
+}
+
+_FENCE_OPEN = re.compile(r"^```\s*([^\s`]*)(.*)$")
+_FENCE_CLOSE = re.compile(r"^```\s*$")
+
+# Heurística para bloques sin etiqueta (primer match gana)
+_DETECT: List[tuple] = [
+    (re.compile(r"^#!.*\bpython"), "python"),
+    (re.compile(r"^#!.*\bnode"), "node"),
+    (re.compile(r"^#!.*\b(ba)?sh\b"), "bash"),
+    (re.compile(r"#include\s*<(iostream|vector|string|bits/stdc\+\+\.h)>|\bstd::"), "cpp"),
+    (re.compile(r"#include\s*[<\"]"), "c"),
+    (re.compile(r"^\s*package\s+main\b", re.M), "go"),
+    (re.compile(r"\bfn\s+main\s*\(\s*\)"), "rust"),
+    (re.compile(r"\bpublic\s+static\s+void\s+main\b"), "java"),
+    (re.compile(r"\bconsole\.log\s*\(|\brequire\s*\(|=>"), "node"),
+    (re.compile(r"^\s*(SELECT|CREATE\s+TABLE|INSERT\s+INTO|WITH)\b", re.I | re.M), "sql"),
+    (re.compile(r"^\s*(def |import |from \S+ import |print\()", re.M), "python"),
+    (re.compile(r"^\s*(echo|printf|export|for \w+ in|if \[)", re.M), "bash"),
+    (re.compile(r"^\s*(puts|require ')", re.M), "ruby"),
+]
+
+
+class PipelineError(ValueError):
+    pass
+
+
+@dataclass
+class Block:
+    index: int
+    id: str
+    language: str
+    code: str
+    stdin_from: Optional[str] = None          # id del bloque cuyo stdout se conecta a este stdin
+    after: List[str] = field(default_factory=list)  # ids que deben terminar OK antes de arrancar
+
+
+def detect_language(code: str) -> Optional[str]:
+    for pat, lang in _DETECT:
+        if pat.search(code):
+            return lang
+    return None
+
+
+def normalize_language(tag: str) -> str:
+    tag = (tag or "").strip().lower()
+    return LANG_ALIASES.get(tag, tag)
+
+
+def parse_blocks(text: str, max_blocks: Optional[int] = None) -> List[Block]:
+    """
+    Extrae los bloques ```lenguaje [id=nombre] [stdin=id] [after=id1,id2]``` del markdown.
+    Sin fences, todo el texto es un único bloque. Bloques sin etiqueta: detect_language().
+    """
+    limit = max_blocks if max_blocks is not None else PIPELINE_MAX_BLOCKS
+    raw: List[tuple] = []
+    lines = text.splitlines()
+    i = 0
+    while i < len(lines):
+        m = _FENCE_OPEN.match(lines[i])
+        if not m:
+            i += 1
+            continue
+        body: List[str] = []
+        i += 1
+        while i < len(lines) and not _FENCE_CLOSE.match(lines[i]):
+            body.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            raise PipelineError(f"Bloque {len(raw)} sin cerrar (falta ```)")
+        i += 1
+        raw.append((m.group(1), m.group(2), "\n".join(body) + "\n"))
+        if len(raw) > limit:
+            raise PipelineError(f"Exceso de bloques (>{limit}).")
+    if not raw:
+        raw.append(("", "", text))
+
+    blocks: List[Block] = []
+    for idx, (tag, info, code) in enumerate(raw):
+        attrs = dict(kv.split("=", 1) for kv in info.split() if "=" in kv)
+        lang = normalize_language(tag) or detect_language(code)
+        if not lang:
+            raise PipelineError(f"Bloque {idx}: no se pudo detectar el lenguaje; usar ```<lenguaje>")
+        blocks.append(Block(
+            index=idx,
+            id=attrs.get("id") or f"b{idx}",
+            language=lang,
+            code=code,
+            stdin_from=attrs.get("stdin") or None,
+            after=[x for x in (attrs.get("after") or "").split(",") if x],
+        ))
+    _link(blocks)
+    return blocks
+
+
+def _link(blocks: List[Block]) -> None:
+    """Resuelve referencias (por id o por índice) y rechaza ciclos/deadlocks."""
+    by_id: Dict[str, Block] = {}
+    for b in blocks:
+        if b.id in by_id:
+            raise PipelineError(f"id de bloque duplicado: {b.id}")
+        by_id[b.id] = b
+
+    def _ref(b: Block, name: str) -> str:
+        if name in by_id:
+            ref = by_id[name]
+        elif name.isdigit() and int(name) < len(blocks):
+            ref = blocks[int(name)]
+        else:
+            raise PipelineError(f"Bloque {b.id}: referencia a bloque inexistente '{name}'")
+        if ref is b:
+            raise PipelineError(f"Bloque {b.id}: no puede depender de sí mismo")
+        return ref.id
+
+    for b in blocks:
+        b.after = [_ref(b, x) for x in b.after]
+        if b.stdin_from:
+            b.stdin_from = _ref(b, b.stdin_from)
+
+    # Cierre transitivo de `after` (+ pipes, que arrancan juntos): detecta ciclos
+    state: Dict[str, int] = {}
+    closure: Dict[str, set] = {}
+
+    def _visit(bid: str) -> set:
+        if state.get(bid) == 1:
+            raise PipelineError(f"Ciclo de dependencias en el bloque {bid}")
+        if state.get(bid) == 2:
+            return closure[bid]
+        state[bid] = 1
+        b = by_id[bid]
+        deps = set(b.after)
+        for d in b.after:
+            deps |= _visit(d)
+        if b.stdin_from:
+            deps |= _visit(b.stdin_from)
+        state[bid] = 2
+        closure[bid] = deps
+        return deps
+
+    for b in blocks:
+        _visit(b.id)
+        # Si el consumidor espera (after) a que termine su propio productor, el pipe se llena y nadie avanza
+        if b.stdin_from and any(b.stdin_from in closure[d] or d == b.stdin_from for d in b.after):
+            raise PipelineError(f"Bloque {b.id}: no puede esperar (after) al bloque que le alimenta stdin")
+
+
+class PipelineRunner:
+    """
+    Ejecuta los bloques de un pipeline:
+    - cada bloque corre en su hilo apenas terminan OK sus dependencias `after`
+    - `stdin=<id>` conecta el stdout del productor al stdin del consumidor (os.pipe, en vivo)
+    - cada bloque sigue el camino de un /execute: chequeo de sintaxis, cache de artefactos (builds
+      también en paralelo) y el sandbox del orquestador
+    - `on_event` (opcional) recibe en vivo la salida de los bloques y un evento `stage` al terminar cada uno
+    """
+
+    def __init__(self, orchestrator: Any):
+        self.orch = orchestrator
+
+    def run(self, blocks: List[Block], timeout: float, stdin: Optional[str] = None,
+            on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+            abort: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+        """
+        Corre los bloques y devuelve un resultado por bloque. Con `on_event`: {"event": "stdout"|"stderr",
+        "block", "data"} a medida que se producen (stdout sólo de los bloques finales; el de los demás
+        alimenta a otro bloque) y {"event": "stage", ...resultado sin la salida ya emitida} al terminar
+        cada bloque. `abort` corta la espera y mata lo que quede vivo (consumidor del stream que se fue).
+        """
+        deadline = time.monotonic() + timeout
+        started = time.monotonic()
+        done = {b.id: threading.Event() for b in blocks}
+        results: Dict[str, Dict[str, Any]] = {}
+        feeds = {b.stdin_from for b in blocks if b.stdin_from}
+        # pipes creados antes de arrancar: el productor puede empezar antes que el consumidor
+        read_end: Dict[str, int] = {}
+        sinks: Dict[str, List[int]] = {b.id: [] for b in blocks}
+        for b in blocks:
+            if b.stdin_from:
+                r, w = os.pipe()
+                read_end[b.id] = r
+                sinks[b.stdin_from].append(w)
+        # stdin global: al primer bloque que no lee de otro bloque
+        feed_id = next((b.id for b in blocks if not b.stdin_from), None) if stdin else None
+
+        lock = threading.Lock()
+        live: List[subprocess.Popen] = []
+
+        def _stage(b: Block) -> None:
+            res: Dict[str, Any] = {"index": b.index, "id": b.id, "language": b.language}
+            stdin_ref = [read_end.get(b.id)]
+            emit = {name: _emitter(on_event, name, b.id) for name in ("stdout", "stderr")
+                    if on_event is not None and not (name == "stdout" and b.id in feeds)}
+            try:
+                res.update(self._run_block(b, done, results, deadline, started, stdin_ref, sinks[b.id],
+                                           stdin if b.id == feed_id else None, lock, live, emit, abort))
+            except Exception as e:
+                res.update({"status": "error", "ok": False, "exit_code": 1, "stdout": "", "stderr": f"Excepción: {e}"})
+            finally:
+                if stdin_ref[0] is not None:
+                    os.close(stdin_ref[0])  # bloque que no llegó a correr: el productor recibe EPIPE
+                for fd in sinks[b.id]:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+                with lock:
+                    results[b.id] = res
+                done[b.id].set()
+                if on_event is not None:
+                    on_event(_stage_event(res, emit))
+
+        threads = [threading.Thread(target=supervisor.bind(_stage), args=(b,), daemon=True) for b in blocks]
+        for t in threads:
+            t.start()
+        for t in threads:
+            while t.is_alive() and not (abort is not None and abort.is_set()):
+                left = deadline + 5 - time.monotonic()
+                if left <= 0:
+                    break
+                t.join(min(left, 0.1) if abort is not None else left)
+        # Red de seguridad: nada queda vivo tras el deadline
+        with lock:
+            for proc in live:
+                if supervisor.poll(proc) is None:
+                    supervisor.signal_group(proc, signal.SIGKILL)
+            out = [results.get(b.id) or {"index": b.index, "id": b.id, "language": b.language, "status": "timeout",
+                                         "ok": False, "exit_code": 124, "stdout": "", "stderr": "Timeout"} for b in blocks]
+            missing = [r for b, r in zip(blocks, out) if b.id not in results]
+        if on_event is not None:
+            for r in missing:
+                on_event(_stage_event(r, {}))
+        return out
+
+    def _run_block(self, b: Block, done: Dict[str, threading.Event], results: Dict[str, Dict[str, Any]],
+                   deadline: float, t0: float, stdin_ref: List[Optional[int]], sink_fds: List[int], feed: Optional[str],
+                   lock: threading.Lock, live: List[subprocess.Popen], emit: Dict[str, Callable[..., None]],
+                   abort: Optional[threading.Event]) -> Dict[str, Any]:
+        ms = lambda: int((time.monotonic() - t0) * 1000)
+        for dep in b.after:
+            if not done[dep].wait(max(0.0, deadline - time.monotonic())):
+                return {"status": "timeout", "ok": False, "exit_code": 124, "stdout": "", "stderr": "Timeout esperando dependencias"}
+            if not results[dep].get("ok"):
+                return {"status": "skipped", "ok": False, "exit_code": 1, "stdout": "",
+                        "stderr": f"Omitido: falló la dependencia {dep}"}
+        if abort is not None and abort.is_set():
+            return dict(_ABORTED)
+
+        orch = self.orch
+        if b.language not in orch.registry:
+            return {"status": "error", "ok": False, "exit_code": 2, "stdout": "", "stderr": f"Lenguaje no soportado: {b.language}"}
+        spec = orch.registry[b.language]
+        missing = [t for t in spec.tools if not orch._which(t)]
+        if missing:
+            return {"status": "error", "ok": False, "exit_code": 127, "stdout": "", "stderr": f"{'/'.join(missing)} no instalado"}
+        rejected = orch._precheck(b.language, {}, b.code)
+        if rejected is not None:
+            return {"status": "compile_error", "ok": False, "exit_code": rejected["exit_code"], "stdout": "",
+                    "stderr": rejected["stderr"], "end_ms": ms()}
+
+        start_ms = ms()
+        workdir = Path(tempfile.mkdtemp(prefix="ce-stage-", dir="/tmp"))
+        timing: Dict[str, Any] = {"start_ms": start_ms, "build_ms": 0}
+        try:
+            try:
+                cmd, built = orch._command(b.language, spec, {}, b.code, workdir, deadline)
+            except BuildError as e:
+                return {"status": "compile_error", "ok": False, "exit_code": e.exit_code,
+                        "stdout": e.stdout, "stderr": e.stderr, "end_ms": ms(), **timing}
+            if built is not None:
+                timing.update(build_ms=built.time_ms, cached=built.cached)
+
+            # Mismo camino de run que /execute: sandbox (o bash -lc sin él)
+            argv, env = orch._run_argv(cmd, workdir, built)
+            stdin_fd = stdin_ref[0]
+            run_started = time.monotonic()
+            proc = supervisor.popen(
+                argv,
+                cwd=str(workdir),
+                env=env,
+                stdin=stdin_fd if stdin_fd is not None else (subprocess.PIPE if feed is not None else subprocess.DEVNULL),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            if stdin_fd is not None:
+                stdin_ref[0] = None
+                os.close(stdin_fd)  # el hijo tiene su copia; si muere, el productor recibe EPIPE
+            with lock:
+                live.append(proc)
+                if abort is not None and abort.is_set():
+                    supervisor.signal_group(proc, signal.SIGKILL)  # llegó tarde al barrido de run()
+
+            out: List[bytes] = []
+            err: List[bytes] = []
+            relay = threading.Thread(target=_tee, args=(proc.stdout, out, list(sink_fds), emit.get("stdout")), daemon=True)
+            errt = threading.Thread(target=_tee, args=(proc.stderr, err, [], emit.get("stderr")), daemon=True)
+            relay.start()
+            errt.start()
+            if feed is not None and proc.stdin is not None:
+                try:
+                    proc.stdin.write(feed.encode("utf-8"))
+                except OSError:
+                    pass
+                finally:
+                    try:
+                        proc.stdin.close()
+                    except OSError:
+                        pass
+
+            timed_out = False
+            try:
+                supervisor.wait(proc, timeout=max(0.1, deadline - time.monotonic()))
+                supervisor.finish(proc)  # cierra el grupo: el relay recibe EOF aunque queden hijos en background
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                supervisor.kill_tree(proc)
+            relay.join()
+            errt.join()
+            orch._tier_up(b.language, spec, b.code, built, run_started)
+            timing.update(run_ms=int((time.monotonic() - run_started) * 1000), end_ms=ms())
+            stdout = b"".join(out).decode("utf-8", errors="replace")
+            stderr = b"".join(err).decode("utf-8", errors="replace")
+            if timed_out:
+                if "stderr" in emit:
+                    emit["stderr"](b"\nTimeout" if stderr else b"Timeout")
+                return {"status": "timeout", "ok": False, "exit_code": 124, "stdout": stdout,
+                        "stderr": (stderr + "\nTimeout").lstrip("\n"), **timing}
+            return {"status": "ok" if proc.returncode == 0 else "failed", "ok": proc.returncode == 0,
+                    "exit_code": proc.returncode, "stdout": stdout, "stderr": stderr, **timing}
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+_ABORTED = {"status": "cancelled", "ok": False, "exit_code": 130, "stdout": "", "stderr": "Pipeline abandonado"}
+
+
+def _emitter(on_event: Callable[[Dict[str, Any]], None], name: str, block_id: str) -> Callable[..., None]:
+    """Decodifica por chunks (UTF-8 incremental: un carácter partido entre chunks no se rompe) y emite."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def emit(chunk: bytes, final: bool = False) -> None:
+        text = decoder.decode(chunk, final=final)
+        if text:
+            on_event({"event": name, "block": block_id, "data": text})
+    return emit
+
+
+def _stage_event(res: Dict[str, Any], emit: Dict[str, Callable[..., None]]) -> Dict[str, Any]:
+    """Evento `stage`: el resultado del bloque sin la salida que ya se emitió en vivo."""
+    evt = {"event": "stage", **res}
+    for name in ("stdout", "stderr"):
+        if name in emit or not evt.get(name):
+            evt.pop(name, None)
+    return evt
+
+
+def _tee(pipe, sink: List[bytes], fds: List[int], emit: Optional[Callable[..., None]] = None) -> None:
+    """
+    Lee `pipe` por chunks: guarda hasta PIPELINE_MAX_OUTPUT (y emite eso mismo si hay `emit`) y reenvía
+    todo a los fds consumidores.
+    """
+    size = 0
+    fd = pipe.fileno()
+    while True:
+        chunk = os.read(fd, RELAY_CHUNK_BYTES)
+        if not chunk:
+            break
+        if size < PIPELINE_MAX_OUTPUT:
+            kept = chunk[: PIPELINE_MAX_OUTPUT - size]
+            sink.append(kept)
+            if emit is not None:
+                emit(kept)
+        size += len(chunk)
+        for w in list(fds):
+            try:
+                view = memoryview(chunk)
+                while view:
+                    view = view[os.write(w, view):]
+            except OSError:
+                fds.remove(w)  # el consumidor terminó (EPIPE): se sigue capturando igual
+    if emit is not None:
+        emit(b"", final=True)
+    pipe.close()
@@ -0,0 +1,250 @@
+# core2/orchestrators/profiler.py — timeline de CPU/memoria/IO por job (opt-in: profile=true)
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+PROFILE_INTERVAL_MS  = _env_int("GOZOLITE_PROFILE_INTERVAL_MS", 50)        # período de muestreo por defecto
+PROFILE_MIN_INTERVAL_MS = 10
+PROFILE_MAX_INTERVAL_MS = 1000
+CPU_WINDOW_MS = 250
+PROFILE_MAX_SAMPLES  = _env_int("GOZOLITE_PROFILE_MAX_SAMPLES", 1000)      # más => se diezma (y se duplica el período)
+PROFILE_MAX_OVERHEAD = _env_float("GOZOLITE_PROFILE_MAX_OVERHEAD_PCT", 2.0)  # CPU del sampler / wall; si se pasa, se espacia
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK")
+_PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+COLUMNS = ["t_ms", "phase", "cpu_ms", "rss_kb", "threads", "procs", "read_bytes", "write_bytes"]
+
+
+def _read_stat(pid: int) -> Optional[Tuple[float, int, int]]:
+    """(cpu_s propio + hijos ya esperados, threads, rss_kb) de /proc/<pid>/stat."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    # campos desde el 3 (state): utime=14, stime=15, cutime=16, cstime=17, num_threads=20, rss=24
+    ticks = int(fields[11]) + int(fields[12]) + int(fields[13]) + int(fields[14])
+    return ticks / _CLK_TCK, int(fields[17]), int(fields[21]) * _PAGE_KB
+
+
+def _read_io(pid: int) -> Tuple[int, int]:
+    """rchar/wchar: bytes leídos/escritos por syscalls (archivos, pipes, sockets)."""
+    r = w = 0
+    try:
+        with open(f"/proc/{pid}/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"rchar:"):
+                    r = int(line.split()[1])
+                elif line.startswith(b"wchar:"):
+                    w = int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return r, w
+
+
+def _tree(pid: int) -> List[int]:
+    """El proceso y sus descendientes vivos (vía /proc/<pid>/task/*/children)."""
+    out, stack = [], [pid]
+    while stack:
+        p = stack.pop()
+        out.append(p)
+        try:
+            for tid in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{tid}/children", "rb") as f:
+                    stack.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            pass
+    return out
+
+
+class JobProfiler:
+    """
+    Muestrea el árbol de procesos de un job cada `interval_ms` (hilo propio) y arma una serie temporal
+    por fase (`compile` / `run`): CPU acumulado (propio + hijos esperados, sin doble conteo), RSS, threads,
+    procesos e I/O. Al cosecharse cada proceso se completa con su rusage exacto (wait4), así que un
+    proceso más corto que el período igual queda medido.
+    El sampler mide su propio CPU: si supera PROFILE_MAX_OVERHEAD % del wall, duplica el período.
+    """
+
+    def __init__(self, interval_ms: Optional[int] = None, max_samples: Optional[int] = None):
+        ms = PROFILE_INTERVAL_MS if interval_ms is None else int(interval_ms)
+        self.interval_ms = max(PROFILE_MIN_INTERVAL_MS, min(PROFILE_MAX_INTERVAL_MS, ms))
+        self.max_samples = max(16, max_samples or PROFILE_MAX_SAMPLES)
+        self.phase = "run"
+        self._t0 = time.monotonic()
+        self._lock = threading.Lock()
+        self._procs: List[Tuple[subprocess.Popen, str, float]] = []  # (proceso, fase, t_inicio)
+        self._reaped: Dict[int, Tuple[str, float, int, float]] = {}  # pid -> (fase, cpu_s, maxrss_kb, t_fin)
+        self._samples: List[List[Any]] = []
+        self._sampler_cpu_s = 0.0
+        self._adjustments = 0
+        self._ticks = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._report: Optional[Dict[str, Any]] = None
+
+    def _now_ms(self) -> int:
+        return int((time.monotonic() - self._t0) * 1000)
+
+    # --------- Ganchos del supervisor ---------
+    def set_phase(self, phase: str) -> None:
+        self.phase = phase
+
+    def started(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._procs.append((proc, self.phase, time.monotonic()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="gozolite-profiler", daemon=True)
+                self._thread.start()
+
+    def reaped(self, proc: subprocess.Popen, ru: Any) -> None:
+        with self._lock:
+            phase = next((ph for p, ph, _ in self._procs if p is proc), self.phase)
+            self._reaped[proc.pid] = (phase, ru.ru_utime + ru.ru_stime, int(ru.ru_maxrss), time.monotonic())
+
+    # --------- Muestreo ---------
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_ms / 1000.0):
+            t = time.thread_time()
+            self.sample()
+            self._sampler_cpu_s += time.thread_time() - t
+            self._ticks += 1
+            wall = time.monotonic() - self._t0
+            # con pocas muestras la proporción es ruido (arranque del hilo, caches fríos)
+            if self._ticks >= 8 and 100.0 * self._sampler_cpu_s / wall > PROFILE_MAX_OVERHEAD and \
+                    self.interval_ms < PROFILE_MAX_INTERVAL_MS:
+                self.interval_ms = min(PROFILE_MAX_INTERVAL_MS, self.interval_ms * 2)
+                self._adjustments += 1
+
+    def sample(self) -> None:
+        with self._lock:
+            live = [(p, ph) for p, ph, _ in self._procs if p.returncode is None and p.pid not in self._reaped]
+        by_phase: Dict[str, List[int]] = {}
+        for proc, phase in live:
+            acc = by_phase.setdefault(phase, [0, 0, 0, 0, 0, 0])  # cpu_ms, rss, threads, procs, rchar, wchar
+            cpu = 0.0
+            for pid in _tree(proc.pid):
+                st = _read_stat(pid)
+                if st is None:
+                    continue
+                r, w = _read_io(pid)
+                cpu += st[0]
+                acc[1] += st[2]
+                acc[2] += st[1]
+                acc[3] += 1
+                acc[4] += r
+                acc[5] += w
+            acc[0] += int(cpu * 1000)
+        now = self._now_ms()
+        with self._lock:
+            for phase, acc in by_phase.items():
+                if acc[3]:
+                    self._samples.append([now, phase] + acc)
+            if len(self._samples) > self.max_samples:  # tope de tamaño: se diezma y se espacia el muestreo
+                self._samples = self._samples[::2]
+                self.interval_ms = min(PROFILE_MAX_INTERVAL_MS, self.interval_ms * 2)
+                self._adjustments += 1
+
+    # --------- Resultado ---------
+    def finish(self) -> Dict[str, Any]:
+        """Detiene el muestreo y devuelve serie, resumen por fase, picos y costo del propio sampler."""
+        if self._report is not None:
+            return self._report
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        wall_ms = self._now_ms()
+        with self._lock:
+            samples = list(self._samples)
+            procs = list(self._procs)
+            reaped = dict(self._reaped)
+
+        phases: Dict[str, Dict[str, Any]] = {}
+        for proc, phase, t_start in procs:
+            ph = phases.setdefault(phase, {"start_ms": None, "end_ms": None, "cpu_ms": 0, "peak_rss_kb": 0,
+                                           "peak_threads": 0, "read_bytes": 0, "write_bytes": 0, "processes": 0})
+            start_ms = int((t_start - self._t0) * 1000)
+            ph["start_ms"] = start_ms if ph["start_ms"] is None else min(ph["start_ms"], start_ms)
+            ph["processes"] += 1
+            done = reaped.get(proc.pid)
+            if done is not None:
+                ph["cpu_ms"] += int(done[1] * 1000)  # exacto (wait4): incluye todo el árbol esperado
+                ph["peak_rss_kb"] = max(ph["peak_rss_kb"], done[2])
+                end_ms = int((done[3] - self._t0) * 1000)
+                ph["end_ms"] = end_ms if ph["end_ms"] is None else max(ph["end_ms"], end_ms)
+        for t_ms, phase, cpu_ms, rss, threads, _n, rchar, wchar in samples:
+            ph = phases.get(phase)
+            if ph is None:
+                continue
+            ph["peak_rss_kb"] = max(ph["peak_rss_kb"], rss)
+            ph["peak_threads"] = max(ph["peak_threads"], threads)
+            ph["read_bytes"] = max(ph["read_bytes"], rchar)
+            ph["write_bytes"] = max(ph["write_bytes"], wchar)
+            ph["sampled_cpu_ms"] = max(ph.get("sampled_cpu_ms", 0), cpu_ms)
+        for ph in phases.values():
+            ph["cpu_ms"] = max(ph["cpu_ms"], ph.pop("sampled_cpu_ms", 0))  # procesos no cosechados: lo muestreado
+            end = wall_ms if ph["end_ms"] is None else ph["end_ms"]
+            ph["wall_ms"] = max(0, end - (ph["start_ms"] or 0))
+
+        # %CPU pico sobre ventanas de >= CPU_WINDOW_MS: con ticks de 10 ms, un período corto exagera
+        peak_cpu_pct = 0.0
+        window: Dict[str, List[Tuple[int, int]]] = {}
+        for t_ms, phase, cpu_ms, *_ in samples:
+            w = window.setdefault(phase, [])
+            w.append((t_ms, cpu_ms))
+            while len(w) > 2 and t_ms - w[1][0] >= CPU_WINDOW_MS:
+                w.pop(0)
+            if t_ms - w[0][0] >= CPU_WINDOW_MS:
+                peak_cpu_pct = max(peak_cpu_pct, 100.0 * (cpu_ms - w[0][1]) / (t_ms - w[0][0]))
+
+        sampler_ms = round(self._sampler_cpu_s * 1000, 3)
+        self._report = {
+            "interval_ms": self.interval_ms,
+            "columns": COLUMNS,
+            "samples": samples,
+            "phases": phases,
+            "peaks": {
+                "rss_kb": max([ph["peak_rss_kb"] for ph in phases.values()] or [0]),
+                "threads": max([ph["peak_threads"] for ph in phases.values()] or [0]),
+                "cpu_pct": round(peak_cpu_pct, 1),
+            },
+            "overhead": {
+                "sampler_cpu_ms": sampler_ms,
+                "pct_of_wall": round(100.0 * sampler_ms / wall_ms, 3) if wall_ms else 0.0,
+                "samples": len(samples),
+                "interval_adjustments": self._adjustments,
+            },
+        }
+        return self._report
+
+
+def profiler_for(payload: Dict[str, Any]) -> Optional[JobProfiler]:
+    if not payload.get("profile"):
+        return None
+    return JobProfiler(payload.get("profile_interval_ms"))
+
+
+def set_phase(phase: str) -> None:
+    """Marca la fase (compile/run) de los procesos que se lancen a continuación en este contexto."""
+    observer = supervisor.observer()
+    if isinstance(observer, JobProfiler):
+        observer.set_phase(phase)
@@ -0,0 +1,352 @@
+# core2/orchestrators/project_builder.py
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shlex
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .project_files import BuildError, _safe_rel, load_files
+from .supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+BUILD_CACHE_DIR     = os.getenv("GOZOLITE_BUILD_CACHE", "/tmp/gozolite-build-cache")
+BUILD_CACHE_MB      = _env_int("GOZOLITE_BUILD_CACHE_MB", 512)
+
+_C_SOURCES   = {"c": (".c",), "cpp": (".cpp", ".cc", ".cxx")}
+_C_HEADERS   = (".h", ".hh", ".hpp", ".hxx", ".inc")
+_JAVA_MAIN   = re.compile(r"public\s+static\s+void\s+main\s*\(")
+_JAVA_PKG    = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.M)
+_JAVA_TYPE   = re.compile(r"\b(?:class|interface|enum|record)\s+([A-Za-z_$][\w$]*)")
+_JAVA_WORD   = re.compile(r"[A-Za-z_$][\w$]*")
+_CACHE_SUBDIRS = ("obj", "java", "rust", "go")
+TRIM_MIN_AGE_S = 60  # la evicción no toca entradas usadas hace menos de esto (builds en curso)
+_DEFAULT_ENTRY = {
+    "python": ("main.py", "__main__.py"),
+    "node": ("index.js", "main.js"),
+    "rust": ("main.rs", "src/main.rs"),
+    "typescript": ("index.ts", "main.ts"),
+    "ruby": ("main.rb",), "php": ("index.php", "main.php"), "r": ("main.R",),
+    "lua": ("main.lua",), "perl": ("main.pl",), "bash": ("main.sh",),
+}
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _sha(*chunks: bytes) -> str:
+    h = hashlib.sha256()
+    for c in chunks:
+        h.update(len(c).to_bytes(8, "little"))
+        h.update(c)
+    return h.hexdigest()
+
+
+class ProjectBuilder:
+    """
+    Modo proyecto: varios archivos en el workdir + build con la herramienta del lenguaje.
+    - c/cpp: un .o por fuente cacheado por hash de contenido (+ headers + flags); solo se
+      recompilan las fuentes que cambiaron y luego se linkea.
+    - java: .class cacheados por hash de la clausura de dependencias de cada .java (él y todo .java
+      que declare un tipo que nombra, transitivamente); javac solo recibe los archivos afectados.
+    - go: `go build` con GOCACHE persistente (la cache de Go ya es por contenido/paquete).
+    - rust: rustc sin cargo, con `-C incremental` persistente.
+    - Makefile en la raíz: `make` (con ccache si está instalado).
+    - Interpretados: se ejecuta el entry con el runner del registry.
+    build() devuelve el comando de ejecución; si el build falla lanza BuildError.
+    """
+
+    def __init__(self, registry: Dict[str, Any], which: Callable[[str], Optional[str]], cache_dir: Optional[str] = None):
+        self.registry = registry
+        self.which = which
+        self.cache = Path(cache_dir or BUILD_CACHE_DIR)
+        (self.cache / "obj").mkdir(parents=True, exist_ok=True)
+        self.stats = {"compiled": 0, "reused": 0}
+        self._lock = threading.Lock()  # stats se actualiza desde el pool de compilación y desde varios jobs
+
+    # --------- Entrada pública ---------
+    def build(self, language: str, project: Dict[str, Any], workdir: Path, deadline: float) -> str:
+        files = project.get("_files") or load_files(project)
+        for rel, data in files.items():
+            dest = workdir / rel
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.write_bytes(data)
+        entry = project.get("entry")
+
+        if "Makefile" in files or "makefile" in files or language == "make":
+            return self._make(workdir)
+        if language in _C_SOURCES:
+            return self._build_c(language, files, workdir, deadline)
+        if language == "java":
+            return self._build_java(files, workdir, entry, deadline)
+        if language == "go":
+            return self._build_go(files, workdir, entry, deadline)
+        if language == "rust":
+            return self._build_rust(files, workdir, entry, deadline)
+        return self._interpreted(language, files, workdir, entry)
+
+    # --------- Builders ---------
+    def _make(self, workdir: Path) -> str:
+        env = ""
+        if self.which("ccache"):
+            env = "CCACHE_DIR={d} CC='ccache gcc' CXX='ccache g++' ".format(d=shlex.quote(str(self.cache / "ccache")))
+        return env + "make -C {w}".format(w=shlex.quote(str(workdir)))
+
+    def _build_c(self, language: str, files: Dict[str, bytes], workdir: Path, deadline: float) -> str:
+        cc = "gcc" if language == "c" else "g++"
+        flags = ["-O2", "-I", str(workdir)]
+        sources = sorted(r for r in files if r.endswith(_C_SOURCES[language]))
+        if not sources:
+            raise BuildError(2, f"El proyecto no tiene fuentes {'/'.join(_C_SOURCES[language])}")
+        headers = _sha(*(r.encode() + b"\0" + files[r] for r in sorted(files) if r.endswith(_C_HEADERS)))
+        salt = " ".join([cc, "-O2"]).encode()
+
+        def _obj(rel: str) -> Tuple[Path, Optional[str], bool]:
+            key = _sha(salt, headers.encode(), files[rel])
+            obj = self.cache / "obj" / f"{key}.o"
+            if obj.exists():
+                os.utime(obj)
+                with self._lock:
+                    self.stats["reused"] += 1
+                return obj, None, False
+            fd, tmp = tempfile.mkstemp(suffix=".o", dir=str(self.cache / "obj"))
+            os.close(fd)
+            err = self._run([cc, *flags, "-c", str(workdir / rel), "-o", tmp], workdir, deadline)
+            if err is not None:
+                os.unlink(tmp)
+                return obj, err, False
+            os.replace(tmp, obj)
+            with self._lock:
+                self.stats["compiled"] += 1
+            return obj, None, True
+
+        with ThreadPoolExecutor(max_workers=max(1, os.cpu_count() or 1)) as pool:
+            results = list(pool.map(supervisor.bind(_obj), sources))
+        errors = [e for _, e, _ in results if e]
+        if errors:
+            raise BuildError(1, "".join(errors))
+        if any(compiled for _, _, compiled in results):
+            self._trim_cache()
+
+        out = workdir / ".build" / f"{language}.out"
+        out.parent.mkdir(exist_ok=True)
+        err = self._run([cc, "-s", "-o", str(out), *(str(o) for o, _, _ in results)], workdir, deadline)
+        if err is not None:
+            raise BuildError(1, err)
+        return shlex.quote(str(out))
+
+    def _build_java(self, files: Dict[str, bytes], workdir: Path, entry: Optional[str], deadline: float) -> str:
+        out = workdir / ".build" / "classes"
+        out.mkdir(parents=True)
+        sources = sorted(r for r in files if r.endswith(".java"))
+        if not sources:
+            raise BuildError(2, "El proyecto no tiene fuentes .java")
+
+        declared, keys = self._java_closure(files, sources)
+        pending: List[Tuple[str, Path]] = []
+        for rel in sources:
+            cached = self.cache / "java" / keys[rel]
+            if cached.is_dir():
+                os.utime(cached)
+                shutil.copytree(cached, out, dirs_exist_ok=True, copy_function=_link_or_copy)
+                with self._lock:
+                    self.stats["reused"] += 1
+            else:
+                pending.append((rel, cached))
+
+        if pending:
+            # javac escribe en un directorio aparte: así lo nuevo se distingue de lo reusado de la cache
+            fresh = workdir / ".build" / "javac"
+            fresh.mkdir()
+            err = self._run(["javac", "-d", str(fresh), "-cp", str(out), *(str(workdir / r) for r, _ in pending)], workdir, deadline)
+            if err is not None:
+                raise BuildError(1, err)
+            for rel, cached in pending:
+                self._store_classes(files[rel], rel, declared[rel], fresh, cached)
+            shutil.copytree(fresh, out, dirs_exist_ok=True, copy_function=_link_or_copy)
+            shutil.rmtree(fresh, ignore_errors=True)
+            with self._lock:
+                self.stats["compiled"] += len(pending)
+            self._trim_cache()
+
+        main_class = entry or self._java_main(files, sources)
+        if not main_class:
+            raise BuildError(2, "No encontré una clase con main(); indicar 'entry' (ej: com.acme.App)")
+        return "java -cp {cp} {main}".format(cp=shlex.quote(str(out)), main=shlex.quote(main_class))
+
+    @staticmethod
+    def _java_fqcn(data: bytes, rel: str) -> Tuple[str, str]:
+        m = _JAVA_PKG.search(data.decode("utf-8", errors="replace"))
+        pkg = m.group(1) if m else ""
+        stem = PurePosixPath(rel).stem
+        return pkg, (f"{pkg}.{stem}" if pkg else stem)
+
+    def _java_main(self, files: Dict[str, bytes], sources: List[str]) -> Optional[str]:
+        mains = [self._java_fqcn(files[r], r)[1] for r in sources if _JAVA_MAIN.search(files[r].decode("utf-8", errors="replace"))]
+        for name in mains:
+            if name.split(".")[-1] == "Main":
+                return name
+        return mains[0] if mains else None
+
+    @staticmethod
+    def _java_closure(files: Dict[str, bytes], sources: List[str]) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+        """
+        Tipos declarados por cada .java y la clave de cache de cada uno: el hash de él más todos los .java
+        de los que depende, transitivamente. Depender = nombrar un tipo que declara otro archivo (simple,
+        calificado o en un import): sobreaproxima, pero un cambio de firma, de constante o una clase de
+        más en un archivo invalida a todos los que lo usan aunque su propio texto no cambie.
+        """
+        texts = {rel: files[rel].decode("utf-8", errors="replace") for rel in sources}
+        declared = {rel: sorted(set(_JAVA_TYPE.findall(texts[rel]))) for rel in sources}
+        declarers: Dict[str, List[str]] = {}
+        for rel in sources:
+            for name in declared[rel]:
+                declarers.setdefault(name, []).append(rel)
+        deps = {rel: {d for w in set(_JAVA_WORD.findall(texts[rel])) for d in declarers.get(w, ()) if d != rel}
+                for rel in sources}
+        keys: Dict[str, str] = {}
+        for rel in sources:
+            closure, stack = {rel}, [rel]
+            while stack:
+                for d in deps[stack.pop()]:
+                    if d not in closure:
+                        closure.add(d)
+                        stack.append(d)
+            keys[rel] = _sha(*(r.encode() + b"\0" + files[r] for r in sorted(closure)))
+        return declared, keys
+
+    def _store_classes(self, data: bytes, rel: str, types: List[str], fresh: Path, cached: Path) -> None:
+        # Clases de un .java: <Tipo>.class y <Tipo>$*.class de cada tipo que declara (también los top-level
+        # que no se llaman como el archivo), dentro del directorio de su package
+        pkg, _ = self._java_fqcn(data, rel)
+        pkg_dir = Path(*pkg.split(".")) if pkg else Path()
+        names = set(types)
+        produced = [p for p in (fresh / pkg_dir).glob("*.class") if p.stem.split("$")[0] in names]
+        if not produced:
+            return
+        tmp = Path(tempfile.mkdtemp(dir=str(self.cache)))
+        for p in produced:
+            (tmp / pkg_dir).mkdir(parents=True, exist_ok=True)
+            shutil.copy2(p, tmp / pkg_dir / p.name)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.rename(tmp, cached)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)  # otro job ya lo guardó
+
+    def _build_go(self, files: Dict[str, bytes], workdir: Path, entry: Optional[str], deadline: float) -> str:
+        if "go.mod" not in files:
+            (workdir / "go.mod").write_text("module gozolite/project\n\ngo 1.16\n", encoding="utf-8")
+        out = workdir / ".build" / "go.out"
+        out.parent.mkdir(exist_ok=True)
+        env = dict(os.environ, GOCACHE=str(self.cache / "go"), GOFLAGS="-mod=mod", GOPROXY="off", GO111MODULE="on")
+        err = self._run(["go", "build", "-ldflags=-s -w", "-o", str(out), entry or "."], workdir, deadline, env=env)
+        if err is not None:
+            raise BuildError(1, err)
+        self._trim_cache()
+        return shlex.quote(str(out))
+
+    def _build_rust(self, files: Dict[str, bytes], workdir: Path, entry: Optional[str], deadline: float) -> str:
+        root = entry or self._default_entry("rust", files)
+        if not root:
+            raise BuildError(2, "No encontré main.rs ni src/main.rs; indicar 'entry'")
+        out = workdir / ".build" / "rust.out"
+        out.parent.mkdir(exist_ok=True)
+        # La cache incremental de rustc compara fingerprints por contenido: solo recompila lo que cambió
+        incr = self.cache / "rust" / _sha(*(r.encode() for r in sorted(files)))
+        err = self._run(["rustc", "--edition=2021", "-C", "opt-level=2", "-C", f"incremental={incr}",
+                         "-o", str(out), str(workdir / root)], workdir, deadline)
+        if err is not None:
+            raise BuildError(1, err)
+        if incr.is_dir():
+            os.utime(incr)
+        self._trim_cache()
+        return shlex.quote(str(out))
+
+    def _interpreted(self, language: str, files: Dict[str, bytes], workdir: Path, entry: Optional[str]) -> str:
+        spec = self.registry.get(language)
+        if spec is None:
+            raise BuildError(2, f"Lenguaje no soportado: {language}")
+        rel = entry or self._default_entry(language, files)
+        if not rel:
+            candidates = sorted(r for r in files if r.endswith(spec.suffix))
+            rel = candidates[0] if len(candidates) == 1 else None
+        if not rel or _safe_rel(rel) is None or rel not in files:
+            raise BuildError(2, "No pude determinar el archivo de entrada; indicar 'entry'")
+        return spec.cmd_builder(workdir / rel, files[rel].decode("utf-8", errors="replace"), workdir)
+
+    @staticmethod
+    def _default_entry(language: str, files: Dict[str, bytes]) -> Optional[str]:
+        for cand in _DEFAULT_ENTRY.get(language, ()):
+            if cand in files:
+                return cand
+        return None
+
+    # --------- Utilidades ---------
+    @staticmethod
+    def _run(argv: List[str], cwd: Path, deadline: float, env: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """Corre un paso de build sin shell; devuelve stderr si falla, None si ok."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return "Timeout durante el build\n"
+        try:
+            proc = supervisor.run(argv, cwd=str(cwd), timeout=remaining, env=env)
+        except FileNotFoundError:
+            return f"{argv[0]} no instalado\n"
+        if proc.timed_out:
+            return "Timeout durante el build\n"
+        if proc.returncode != 0:
+            return proc.stdout + proc.stderr
+        return None
+
+    def _trim_cache(self) -> None:
+        """
+        Evicción LRU (por mtime) cuando la cache supera GOZOLITE_BUILD_CACHE_MB: objetos C/C++, clases
+        Java, directorios incrementales de rustc y entradas del GOCACHE (go las toca al usarlas). Nunca
+        borra algo usado hace menos de TRIM_MIN_AGE_S: puede ser de un build en curso.
+        """
+        limit = BUILD_CACHE_MB * 1024 * 1024
+        entries = []
+        total = 0
+        for sub in _CACHE_SUBDIRS:
+            base = self.cache / sub
+            if not base.is_dir():
+                continue
+            # GOCACHE: <xx>/<hash>-a|-d; cada archivo es una entrada (los de la raíz son de go)
+            units = (f for d in base.iterdir() if d.is_dir() for f in d.iterdir()) if sub == "go" else base.iterdir()
+            for p in units:
+                try:
+                    size = p.stat().st_size if p.is_file() else sum(f.stat().st_size for f in p.rglob("*") if f.is_file())
+                    entries.append((p.stat().st_mtime, size, p))
+                    total += size
+                except OSError:
+                    pass
+        if total <= limit:
+            return
+        cutoff = time.time() - TRIM_MIN_AGE_S
+        for mtime, size, p in sorted(entries):
+            if mtime > cutoff:
+                break
+            if p.is_dir():
+                shutil.rmtree(p, ignore_errors=True)
+            else:
+                p.unlink(missing_ok=True)
+            total -= size
+            if total <= limit:
+                break
@@ -0,0 +1,99 @@
+# core2/orchestrators/project_files.py — proyectos multi-archivo: decodificación y validación de rutas
+"""
+Compartido por la validación (SecureMiddleware) y el build (ProjectBuilder): el middleware decodifica
+y valida el proyecto sin arrastrar los builders, y le pasa los archivos ya decodificados al orquestador.
+"""
+from __future__ import annotations
+
+import base64
+import io
+import os
+import tarfile
+import zipfile
+from pathlib import PurePosixPath
+from typing import Any, Dict, Optional
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+PROJECT_MAX_FILES   = _env_int("GOZOLITE_PROJECT_MAX_FILES", 200)
+PROJECT_MAX_BYTES   = _env_int("GOZOLITE_PROJECT_MAX_BYTES", 5 * 1024 * 1024)
+
+
+class BuildError(Exception):
+    """Proyecto inválido o compilación fallida; lleva un resultado listo para devolver."""
+
+    def __init__(self, exit_code: int, stderr: str, stdout: str = ""):
+        super().__init__(stderr)
+        self.exit_code = exit_code
+        self.stderr = stderr
+        self.stdout = stdout
+
+
+def load_files(project: Dict[str, Any]) -> Dict[str, bytes]:
+    """
+    Normaliza un proyecto a {ruta_relativa: bytes}.
+    Acepta {"files": {ruta: texto}} y/o {"archive": base64 de .tar/.tar.gz/.zip}.
+    Rechaza rutas absolutas, '..', links y proyectos por encima de los límites.
+    """
+    out: Dict[str, bytes] = {}
+    total = 0
+
+    def _add(name: str, data: bytes) -> None:
+        nonlocal total
+        rel = _safe_rel(name)
+        if rel is None:
+            raise BuildError(2, f"Ruta inválida en el proyecto: {name!r}")
+        total += len(data)
+        if total > PROJECT_MAX_BYTES:
+            raise BuildError(2, f"Proyecto demasiado grande (> {PROJECT_MAX_BYTES} bytes)")
+        out[rel] = data
+        if len(out) > PROJECT_MAX_FILES:
+            raise BuildError(2, f"Demasiados archivos en el proyecto (> {PROJECT_MAX_FILES})")
+
+    archive = project.get("archive")
+    if archive:
+        try:
+            raw = base64.b64decode(archive, validate=True)
+        except Exception:
+            raise BuildError(2, "archive no es base64 válido")
+        if raw[:2] == b"PK":
+            with zipfile.ZipFile(io.BytesIO(raw)) as zf:
+                for info in zf.infolist():
+                    if info.is_dir():
+                        continue
+                    if info.file_size > PROJECT_MAX_BYTES:
+                        raise BuildError(2, f"Proyecto demasiado grande (> {PROJECT_MAX_BYTES} bytes)")
+                    _add(info.filename, zf.read(info))
+        else:
+            try:
+                with tarfile.open(fileobj=io.BytesIO(raw), mode="r:*") as tf:
+                    for member in tf:
+                        if member.isdir():
+                            continue
+                        if not member.isfile():
+                            raise BuildError(2, f"Entrada no soportada en el archivo (link/dispositivo): {member.name!r}")
+                        if member.size > PROJECT_MAX_BYTES:
+                            raise BuildError(2, f"Proyecto demasiado grande (> {PROJECT_MAX_BYTES} bytes)")
+                        fh = tf.extractfile(member)
+                        _add(member.name, fh.read() if fh else b"")
+            except tarfile.TarError as e:
+                raise BuildError(2, f"archive ilegible: {e}")
+
+    for name, text in (project.get("files") or {}).items():
+        _add(name, text.encode("utf-8") if isinstance(text, str) else bytes(text))
+
+    if not out:
+        raise BuildError(2, "Proyecto vacío: enviar 'files' o 'archive'")
+    return out
+
+
+def _safe_rel(name: str) -> Optional[str]:
+    p = PurePosixPath(name.replace("\\", "/"))
+    parts = [x for x in p.parts if x != "."]
+    if p.is_absolute() or not parts or ".." in parts:
+        return None
+    return "/".join(parts)
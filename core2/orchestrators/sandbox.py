@@ -0,0 +1,324 @@
+# core2/orchestrators/sandbox.py — sandbox de namespaces (user/mount/pid/net/ipc) para el run de cada job
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .judge import login_env
+from .supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+SANDBOX        = os.getenv("GOZOLITE_SANDBOX", "off").strip().lower()  # off | ns | auto (ns si el kernel lo permite)
+SANDBOX_TMP_MB = _env_int("GOZOLITE_SANDBOX_TMP_MB", 64)  # tmpfs privado del job (/tmp, incluye el workdir)
+SANDBOX_UID    = 1000  # uid/gid del job dentro del namespace (sin capabilities tras el exec)
+
+# Syscalls y flags (linux/sched.h, linux/mount.h, linux/prctl.h); compartido por plantilla y launcher
+_PRELUDE = r"""
+import ctypes, os, signal, sys
+_libc = ctypes.CDLL(None, use_errno=True)
+NEWNS, NEWIPC, NEWUSER, NEWPID, NEWNET = 0x20000, 0x8000000, 0x10000000, 0x20000000, 0x40000000
+RDONLY, NOSUID, NODEV, NOEXEC, REMOUNT, BIND, REC, PRIVATE = 1, 2, 4, 8, 32, 4096, 16384, 1 << 18
+def _check(rc, what):
+    if rc != 0:
+        e = ctypes.get_errno()
+        raise OSError(e, f"{what}: {os.strerror(e)}")
+def unshare(flags):
+    _check(_libc.unshare(flags), "unshare")
+def setns(path, nstype):
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        _check(_libc.setns(fd, nstype), f"setns {path}")
+    finally:
+        os.close(fd)
+def mount(src, target, fstype, flags, data=None):
+    enc = lambda s: None if s is None else s.encode()
+    _check(_libc.mount(enc(src), enc(target), enc(fstype), ctypes.c_ulong(flags), enc(data)), f"mount {target}")
+def prctl(option, arg):
+    _check(_libc.prctl(option, ctypes.c_ulong(arg), 0, 0, 0), "prctl")
+def locked(path):
+    # flags que un namespace menos privilegiado no puede quitar: se repiten en cada remount
+    f = os.statvfs(path).f_flag
+    return ((NOSUID if f & os.ST_NOSUID else 0) | (NODEV if f & os.ST_NODEV else 0) | (NOEXEC if f & os.ST_NOEXEC else 0)
+            | (1024 if f & os.ST_NOATIME else 0) | (2048 if f & os.ST_NODIRATIME else 0) | ((1 << 21) if f & os.ST_RELATIME else 0))
+"""
+
+# Plantilla (una por API): crea user + mount (+ net) namespaces una sola vez, deja toda la raíz de solo
+# lectura y queda dormida. Cada job se une a sus namespaces en vez de recrearlos.
+_TEMPLATE = _PRELUDE + r"""
+inner, net = int(sys.argv[1]), sys.argv[2] == "1"
+uid, gid = os.geteuid(), os.getegid()
+try:
+    unshare(NEWUSER | NEWNS | (NEWNET if net else 0))
+    for name, data in (("setgroups", "deny"), ("uid_map", f"{inner} {uid} 1"), ("gid_map", f"{inner} {gid} 1")):
+        with open(f"/proc/self/{name}", "w") as f:
+            f.write(data)
+    mount(None, "/", None, REC | PRIVATE)  # nada del host se propaga a los jobs
+    points = []
+    with open("/proc/self/mountinfo") as f:
+        for line in f:
+            p = line.split()[4].encode().decode("unicode_escape")
+            if p not in points:
+                points.append(p)
+    for p in points:
+        try:
+            mount(None, p, None, REMOUNT | BIND | RDONLY | locked(p))
+        except OSError:
+            if p == "/":
+                raise
+    prctl(1, signal.SIGKILL)  # PR_SET_PDEATHSIG: no sobrevive a la API
+except Exception as e:
+    print(f"error: {e}", flush=True)
+    sys.exit(1)
+print("ready", flush=True)
+sys.stdin.read()  # hasta que la API cierre el pipe
+"""
+
+# Launcher por job: argv = pid_plantilla tmp_mb workdir [ro | -b origen destino ...] -- comando...
+# Se une a los namespaces de la plantilla, crea mount/pid/ipc (+ net) propios y forkea el PID 1 del job:
+# /tmp privado (tmpfs), workdir montado rw, `ro` visibles sólo lectura en su ruta, `-b` montado sólo
+# lectura en `destino` (entradas dentro del workdir), /proc propio y no_new_privs.
+# PID 1 cosecha huérfanos; cuando el comando termina sale, y el kernel mata lo que quede en el namespace.
+_LAUNCHER = _PRELUDE + r"""
+tpl, tmp_mb = sys.argv[1], int(sys.argv[2])
+sep = sys.argv.index("--")
+workdir, extra, argv = sys.argv[3], sys.argv[4:sep], sys.argv[sep + 1:]
+mounts, i = [(workdir, workdir)], 0
+while i < len(extra):
+    if extra[i] == "-b":
+        mounts.append((extra[i + 1], extra[i + 2]))
+        i += 3
+    else:
+        mounts.append((extra[i], extra[i]))
+        i += 1
+try:
+    setns(f"/proc/{tpl}/ns/user", NEWUSER)
+    setns(f"/proc/{tpl}/ns/mnt", NEWNS)
+    shared_net = os.readlink(f"/proc/{tpl}/ns/net") != os.readlink("/proc/self/ns/net")
+    if shared_net:
+        setns(f"/proc/{tpl}/ns/net", NEWNET)
+    unshare(NEWNS | NEWPID | NEWIPC | (0 if shared_net else NEWNET))
+except OSError as e:
+    print(f"gozolite-sandbox: {e}", file=sys.stderr, flush=True)
+    os._exit(126)
+pid = os.fork()
+if pid:
+    for s in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(s, signal.SIG_IGN)  # la señal llega al job por el grupo; el launcher espera a PID 1
+    _, status = os.waitpid(pid, 0)
+    os._exit(os.waitstatus_to_exitcode(status) if os.WIFEXITED(status) else 128 + os.WTERMSIG(status))
+try:
+    prctl(1, signal.SIGKILL)  # PR_SET_PDEATHSIG: si matan al launcher muere el namespace entero
+    keep = [(dst, os.open(src, os.O_PATH | os.O_CLOEXEC)) for src, dst in mounts]
+    mount("tmpfs", "/tmp", "tmpfs", NOSUID | NODEV, f"size={tmp_mb}m,mode=1777")
+    for i, (p, fd) in enumerate(keep):
+        src = f"/proc/self/fd/{fd}"
+        if os.path.isdir(src):
+            os.makedirs(p, exist_ok=True)
+        elif not os.path.exists(p):
+            os.makedirs(os.path.dirname(p), exist_ok=True)
+            open(p, "a").close()
+        mount(src, p, None, BIND)
+        # el workdir es lo único escribible fuera de /tmp; el resto se remonta explícitamente sólo lectura
+        mount(None, p, None, REMOUNT | BIND | (0 if i == 0 else RDONLY) | locked(p))
+        os.close(fd)
+    try:
+        mount("proc", "/proc", "proc", NOSUID | NODEV | NOEXEC)
+    except OSError:
+        pass  # /proc del host enmascarado (p. ej. dentro de docker): queda el de la plantilla, sólo lectura
+    os.chdir(workdir)
+    prctl(38, 1)  # PR_SET_NO_NEW_PRIVS
+except OSError as e:
+    print(f"gozolite-sandbox: {e}", file=sys.stderr, flush=True)
+    os._exit(126)
+job = os.fork()
+if job == 0:
+    try:
+        os.execvp(argv[0], argv)
+    except OSError as e:
+        print(f"gozolite-sandbox: {argv[0]}: {e.strerror}", file=sys.stderr, flush=True)
+        os._exit(127)
+while True:
+    try:
+        pid, status = os.wait()
+    except ChildProcessError:
+        os._exit(1)
+    if pid == job:
+        os._exit(os.waitstatus_to_exitcode(status) if os.WIFEXITED(status) else 128 + os.WTERMSIG(status))
+"""
+
+
+# Binder para jobs sin sandbox que reciben entradas: argv = uid_interno origen destino ... -- comando...
+# user + mount namespaces propios y nada más (misma red, pids y raíz): cada origen queda montado sólo
+# lectura en su destino y el comando reemplaza al binder (mismo pid y grupo). El uid interno no es 0, así
+# que el exec se queda sin capabilities y el job no puede desmontar ni remontar rw la entrada compartida.
+_BINDER = _PRELUDE + r"""
+inner = int(sys.argv[1])
+sep = sys.argv.index("--")
+pairs, argv = sys.argv[2:sep], sys.argv[sep + 1:]
+uid, gid = os.geteuid(), os.getegid()
+try:
+    unshare(NEWUSER | NEWNS)
+    for name, data in (("setgroups", "deny"), ("uid_map", f"{inner} {uid} 1"), ("gid_map", f"{inner} {gid} 1")):
+        with open(f"/proc/self/{name}", "w") as f:
+            f.write(data)
+    mount(None, "/", None, REC | PRIVATE)
+    for src, dst in zip(pairs[0::2], pairs[1::2]):
+        if not os.path.exists(dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            open(dst, "a").close()
+        mount(src, dst, None, BIND)
+        mount(None, dst, None, REMOUNT | BIND | RDONLY | locked(dst))
+    prctl(38, 1)  # PR_SET_NO_NEW_PRIVS
+except OSError as e:
+    print(f"gozolite-bind: {e}", file=sys.stderr, flush=True)
+    os._exit(126)
+try:
+    os.execvp(argv[0], argv)
+except OSError as e:
+    print(f"gozolite-bind: {argv[0]}: {e.strerror}", file=sys.stderr, flush=True)
+    os._exit(127)
+"""
+
+
+class NsSandbox:
+    """
+    Sandbox liviano con namespaces sin privilegios, para el run de cada job (en lugar de `bash -lc` como
+    el usuario de la API):
+    - user namespace (uid SANDBOX_UID, sin capabilities), raíz de solo lectura, sin red;
+    - por job: mount/pid/ipc propios, /tmp en tmpfs privado con el workdir montado, y un PID 1 que
+      cosecha huérfanos y se lleva todo el namespace al terminar.
+    La creación de los namespaces caros (user, mount con la raíz remontada, net) se amortiza en una
+    plantilla que vive lo que la API: cada job se une con setns() y sólo crea los baratos.
+    El comando corre con `bash -c` y el entorno de login cacheado (login_env), no con un login shell.
+    `wrap()` devuelve None si el sandbox está apagado o el kernel no lo permite (se sigue sin sandbox).
+    Sin sandbox, `bind()` monta igual las entradas sólo lectura (sin copiarlas) cuando el kernel permite
+    user namespaces sin privilegios.
+    """
+
+    def __init__(self, mode: str = SANDBOX, tmp_mb: int = SANDBOX_TMP_MB, shared_net: bool = True):
+        self.mode = mode if mode in ("off", "ns", "auto") else "off"
+        self.tmp_mb = tmp_mb
+        self.shared_net = shared_net  # net namespace de la plantilla (sin interfaces) vs uno por job
+        self.error: Optional[str] = None
+        self.stats: Dict[str, int] = {"launched": 0, "template_starts": 0, "bound": 0}
+        self._template: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._bind_ok: Optional[bool] = None  # binder sondeado una vez (user namespaces sin privilegios)
+        self.bind_error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off" and (self.error is None or self.mode == "ns")
+
+    def _ensure_template(self) -> Optional[int]:
+        with self._lock:
+            proc = self._template
+            if proc is not None and proc.poll() is None:
+                return proc.pid
+            if self.error is not None and self.mode == "auto":
+                return None  # el kernel no lo permite: no se reintenta en cada job
+            with supervisor.observe(None), supervisor.running(None):  # no es un proceso de ningún job
+                proc = supervisor.popen([sys.executable, "-I", "-S", "-c", _TEMPLATE, str(SANDBOX_UID),
+                                         "1" if self.shared_net else "0"],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            proc.gozolite_account = None  # type: ignore[attr-defined]
+            line = proc.stdout.readline().decode("utf-8", "replace").strip()
+            if line != "ready":
+                supervisor.kill_tree(proc, grace_s=0.1)
+                self.error = line.removeprefix("error: ") or "la plantilla de namespaces no arrancó"
+                self._template = None
+                return None
+            self.error = None
+            self._template = proc
+            self.stats["template_starts"] += 1
+            return proc.pid
+
+    def wrap(self, argv: Sequence[str], workdir: str, ro: Sequence[str] = (),
+             binds: Sequence[Tuple[str, str]] = ()) -> Optional[List[str]]:
+        """
+        argv del launcher que corre `argv` en el sandbox con cwd=workdir, o None. `ro` quedan visibles
+        en su ruta y cada (origen, destino) de `binds` montado en destino; ambos sólo lectura.
+        """
+        if self.mode == "off":
+            return None
+        tpl = self._ensure_template()
+        if tpl is None:
+            if self.mode == "ns":
+                raise RuntimeError(f"sandbox no disponible: {self.error}")
+            return None
+        with self._lock:
+            self.stats["launched"] += 1
+        return [sys.executable, "-I", "-S", "-c", _LAUNCHER, str(tpl), str(self.tmp_mb),
+                os.path.abspath(workdir), *[os.path.abspath(p) for p in ro],
+                *[x for src, dst in binds for x in ("-b", os.path.abspath(src), os.path.abspath(dst))], "--", *argv]
+
+    def bind(self, argv: Sequence[str], binds: Sequence[Tuple[str, str]]) -> Optional[List[str]]:
+        """
+        Para un job sin sandbox: argv del binder que monta cada (origen, destino) de `binds` sólo lectura y
+        luego ejecuta `argv` tal cual (sin el resto del aislamiento). None si no hay binds o el kernel no
+        permite user namespaces sin privilegios: entonces el llamador copia (copy_into).
+        """
+        if not binds or not self._probe_bind():
+            return None
+        with self._lock:
+            self.stats["bound"] += 1
+        return self._binder(argv, binds)
+
+    @staticmethod
+    def _binder(argv: Sequence[str], binds: Sequence[Tuple[str, str]]) -> List[str]:
+        inner = os.geteuid() or SANDBOX_UID  # nunca 0 adentro: el exec pierde las capabilities
+        return [sys.executable, "-I", "-S", "-c", _BINDER, str(inner),
+                *[os.path.abspath(x) for pair in binds for x in pair], "--", *argv]
+
+    def _probe_bind(self) -> bool:
+        with self._lock:
+            if self._bind_ok is None:
+                tmp = tempfile.mkdtemp(prefix="gozolite-bind-probe-")
+                try:
+                    src = os.path.join(tmp, "src")
+                    with open(src, "w") as f:
+                        f.write("ok")
+                    os.chmod(src, 0o444)
+                    dst = os.path.join(tmp, "dst")
+                    # el destino tiene que verse y no poder volverse escribible
+                    check = f"cat {dst}; echo; chmod u+w {dst} 2>/dev/null || echo ro"
+                    with supervisor.observe(None), supervisor.running(None), supervisor.metered(None):
+                        out = supervisor.run(self._binder(["sh", "-c", check], [(src, dst)]), timeout=10)
+                    self._bind_ok = out.returncode == 0 and out.stdout.split() == ["ok", "ro"]
+                    self.bind_error = None if self._bind_ok else (out.stderr.strip() or out.stdout.strip())[:200]
+                except (OSError, subprocess.SubprocessError) as e:
+                    self._bind_ok, self.bind_error = False, str(e)
+                finally:
+                    shutil.rmtree(tmp, ignore_errors=True)
+            return self._bind_ok
+
+    @staticmethod
+    def env() -> Dict[str, str]:
+        """Entorno del job en el sandbox: el de login (cacheado) con los temporales en el tmpfs privado."""
+        return dict(login_env(), TMPDIR="/tmp", XDG_CACHE_HOME="/tmp/.cache")
+
+    def snapshot(self) -> Dict[str, Any]:
+        tpl = self._template
+        return {"mode": self.mode, "active": self.enabled and tpl is not None and tpl.poll() is None,
+                "template_pid": tpl.pid if tpl is not None else None, "shared_net": self.shared_net,
+                "tmp_mb": self.tmp_mb, "error": self.error, "bind_error": self.bind_error, **self.stats}
+
+    def close(self) -> None:
+        with self._lock:
+            proc, self._template = self._template, None
+        if proc is not None:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            supervisor.kill_tree(proc, grace_s=0.1)
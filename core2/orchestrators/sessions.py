@@ -0,0 +1,465 @@
+# core2/orchestrators/sessions.py — sesiones con intérprete persistente (kernels tipo notebook)
+from __future__ import annotations
+
+import os
+import re
+import selectors
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .judge import _limits, login_env
+from .supervisor import supervisor, CANCELLED_EXIT, MAX_OUTPUT_BYTES, OUTPUT_LIMIT_EXIT
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+MAX_SESSIONS    = _env_int("GOZOLITE_MAX_SESSIONS", 16)      # kernels vivos a la vez (global)
+SESSION_IDLE_S  = _env_int("GOZOLITE_SESSION_IDLE_S", 600)   # sin celdas por más de esto => se cierra
+SESSION_CPU_S   = _env_int("GOZOLITE_SESSION_CPU_S", 300)    # CPU total por kernel (RLIMIT_CPU)
+INTERRUPT_GRACE_S = 1.0  # tras el timeout de una celda: espera al kernel interrumpido antes de matarlo
+
+# Protocolo: una línea por celda, "<token> <código en hex>\n". El kernel ejecuta la celda en un espacio
+# de nombres persistente y termina su salida con "\n<token> <status>\n" en stdout y "\n<token>\n" en stderr.
+# El stdin real del kernel es el canal de control: las celdas ven /dev/null.
+_PY_KERNEL = r'''
+import ast, sys, traceback
+def _gz_main():
+    ns = {"__name__": "__main__", "__builtins__": __builtins__}
+    ctl = sys.stdin.buffer
+    sys.stdin = open("/dev/null")
+    while True:
+        line = ctl.readline()
+        if not line:
+            return
+        tok, _, hexsrc = line.decode().strip().partition(" ")
+        src = bytes.fromhex(hexsrc).decode("utf-8", "replace")
+        status = 0
+        try:
+            tree = ast.parse(src, "<cell>")
+            last = tree.body.pop() if tree.body and isinstance(tree.body[-1], ast.Expr) else None
+            exec(compile(tree, "<cell>", "exec"), ns)
+            if last is not None:  # como en un notebook: se muestra el valor de la última expresión
+                exec(compile(ast.Interactive([last]), "<cell>", "single"), ns)
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException as e:
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            status = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdout.write("\n%s %d\n" % (tok, status))
+        sys.stdout.flush()
+        sys.stderr.write("\n%s\n" % tok)
+        sys.stderr.flush()
+_gz_main()
+'''
+
+_RUBY_KERNEL = r'''
+$stdout.sync = true
+$stderr.sync = true
+def __gz_binding; binding; end
+GZ_BINDING = __gz_binding
+GZ_CTL = $stdin.binmode
+$stdin = File.open(File::NULL)
+while (gz_line = GZ_CTL.gets)
+  gz_tok, gz_hex = gz_line.strip.split(" ", 2)
+  gz_src = [gz_hex.to_s].pack("H*").force_encoding("UTF-8")
+  gz_status = 0
+  begin
+    eval(gz_src, GZ_BINDING, "<cell>", 1)
+  rescue SystemExit => e
+    gz_status = e.status
+  rescue Exception => e
+    $stderr.puts "#{e.class}: #{e.message}"
+    gz_status = 1
+  end
+  $stdout.write("\n#{gz_tok} #{gz_status}\n")
+  $stderr.write("\n#{gz_tok}\n")
+end
+'''
+
+_PERL_KERNEL = r'''
+sub __gz_cell { package main; no strict; eval $_[0]; return $@ }
+$| = 1; { my $o = select STDERR; $| = 1; select $o; }
+open(my $__gz_ctl, "<&", \*STDIN) or die; open(STDIN, "<", "/dev/null");
+while (defined(my $__gz_line = <$__gz_ctl>)) {
+  chomp $__gz_line;
+  my ($__gz_tok, $__gz_hex) = split / /, $__gz_line, 2;
+  my $__gz_err = __gz_cell(pack("H*", $__gz_hex // ""));
+  my $__gz_status = 0;
+  if ($__gz_err) { print STDERR $__gz_err; $__gz_status = 1; }
+  print STDOUT "\n$__gz_tok $__gz_status\n"; print STDERR "\n$__gz_tok\n";
+}
+'''
+
+_LUA_KERNEL = r'''
+io.stdout:setvbuf("no"); io.stderr:setvbuf("no")
+local ctl = io.stdin
+io.input("/dev/null")
+while true do
+  local line = ctl:read("*l")
+  if not line then break end
+  local tok, hex = line:match("^(%S+) ?(%x*)")
+  local src = hex:gsub("%x%x", function(c) return string.char(tonumber(c, 16)) end)
+  local status = 0
+  local fn, err = load(src, "=cell", "t", _G)
+  if not fn then
+    io.stderr:write(tostring(err), "\n"); status = 1
+  else
+    local ok, e = pcall(fn)
+    if not ok then io.stderr:write(tostring(e), "\n"); status = 1 end
+  end
+  io.stdout:write("\n", tok, " ", status, "\n"); io.stderr:write("\n", tok, "\n")
+end
+'''
+
+_R_KERNEL = r'''
+local({
+  ctl <- file("stdin", open = "r")
+  repeat {
+    line <- readLines(ctl, n = 1, warn = FALSE)
+    if (length(line) == 0) break
+    parts <- strsplit(line, " ", fixed = TRUE)[[1]]
+    hex <- if (length(parts) > 1) parts[2] else ""
+    src <- if (nchar(hex) > 0) rawToChar(as.raw(strtoi(substring(hex, seq(1, nchar(hex), 2), seq(2, nchar(hex), 2)), 16L))) else ""
+    status <- 0L
+    tryCatch({
+      for (e in parse(text = src, keep.source = FALSE)) {
+        r <- withVisible(eval(e, envir = globalenv()))
+        if (r$visible) print(r$value)
+      }
+    }, error = function(err) {
+      message("Error: ", conditionMessage(err))
+      status <<- 1L
+    })
+    cat("\n", parts[1], " ", status, "\n", sep = "")
+    flush(stdout())
+    message("\n", parts[1])
+  }
+})
+'''
+
+_PHP_KERNEL = r'''
+$__gz_ctl = fopen("php://stdin", "r");
+while (($__gz_line = fgets($__gz_ctl)) !== false) {
+    $__gz_parts = explode(" ", trim($__gz_line), 2);
+    $__gz_src = preg_replace('/^\s*<\?php/', '', (string)hex2bin($__gz_parts[1] ?? ""));
+    $__gz_status = 0;
+    try {
+        eval($__gz_src);
+    } catch (Throwable $__gz_e) {
+        fwrite(STDERR, get_class($__gz_e) . ": " . $__gz_e->getMessage() . "\n");
+        $__gz_status = 1;
+    }
+    fwrite(STDOUT, "\n{$__gz_parts[0]} {$__gz_status}\n");
+    fwrite(STDERR, "\n{$__gz_parts[0]}\n");
+}
+'''
+
+# lenguaje -> (intérprete, argv del kernel)
+KERNELS: Dict[str, Tuple[str, List[str]]] = {
+    "python": ("python3", ["python3", "-u", "-c", _PY_KERNEL]),
+    "ruby":   ("ruby",    ["ruby", "-e", _RUBY_KERNEL]),
+    "perl":   ("perl",    ["perl", "-e", _PERL_KERNEL]),
+    "lua":    ("lua",     ["lua", "-e", _LUA_KERNEL]),
+    "r":      ("Rscript", ["Rscript", "--vanilla", "-e", _R_KERNEL]),
+    "php":    ("php",     ["php", "-r", _PHP_KERNEL]),
+}
+
+
+class SessionError(Exception):
+    def __init__(self, status: int, msg: str):
+        super().__init__(msg)
+        self.status = status  # código HTTP: 404 inexistente, 409 ocupada, 429 cupo lleno, 400 lenguaje, 503 sin intérprete
+
+
+@dataclass
+class Session:
+    id: str
+    language: str
+    proc: subprocess.Popen
+    workdir: Path
+    memory_mb: int
+    owner: Optional[str] = None  # tenant que la abrió: sólo él la ve
+    created: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    cells: int = 0
+    cpu_s: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    closed: bool = False
+
+    def info(self) -> Dict[str, Any]:
+        return {"session_id": self.id, "language": self.language, "memory_mb": self.memory_mb,
+                "cells": self.cells, "created": int(self.created), "idle_s": int(time.time() - self.last_used),
+                "cpu_ms": int(self.cpu_s * 1000), "busy": self.lock.locked()}
+
+
+def _proc_times(pid: int) -> Tuple[float, float]:
+    """CPU (user, sys) consumido hasta ahora por un proceso vivo, desde /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        tck = os.sysconf("SC_CLK_TCK")
+        return int(fields[11]) / tck, int(fields[12]) / tck
+    except (OSError, ValueError, IndexError):
+        return 0.0, 0.0
+
+
+class SessionManager:
+    """
+    Kernels de intérprete de larga vida (python, ruby, perl, lua, R, php), uno por sesión:
+    - cada sesión tiene su workdir y un proceso supervisado con RLIMIT_DATA (memory_mb) y RLIMIT_CPU total
+    - las celdas se ejecutan de a una, con timeout propio: al vencer se interrumpe el kernel (SIGINT) y,
+      si no responde, se mata y la sesión se cierra
+    - tope global de sesiones vivas y cierre por inactividad (SESSION_IDLE_S)
+    - el CPU de cada celda se carga a la cuenta activa (contabilidad por tenant), no al que abrió la sesión
+    """
+
+    MODE = "gozo-lite/session"
+
+    def __init__(self, max_sessions: Optional[int] = None, idle_s: Optional[int] = None):
+        self.max_sessions = MAX_SESSIONS if max_sessions is None else max_sessions
+        self.idle_s = SESSION_IDLE_S if idle_s is None else idle_s
+        self._sessions: Dict[str, Session] = {}
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self.stats: Dict[str, int] = {"opened": 0, "cells": 0, "expired": 0, "killed": 0}
+
+    # --------- Ciclo de vida ---------
+    def open(self, language: str, memory_mb: int = 256, owner: Optional[str] = None) -> Dict[str, Any]:
+        if language not in KERNELS:
+            raise SessionError(400, f"Sesiones no soportadas para {language or '(vacío)'} (disponibles: {', '.join(sorted(KERNELS))})")
+        tool, argv = KERNELS[language]
+        env = dict(login_env())
+        exe = shutil.which(tool, path=env.get("PATH"))
+        if exe is None:
+            raise SessionError(503, f"{tool} no instalado")
+        self.reap_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionError(429, f"Cupo de sesiones lleno ({self.max_sessions}); cerrá alguna o esperá a que expire")
+            sid = uuid.uuid4().hex
+            # el lugar queda reservado mientras arranca el kernel
+            self._sessions[sid] = None  # type: ignore[assignment]
+        workdir = Path(tempfile.mkdtemp(prefix="ce-session-", dir="/tmp"))
+        try:
+            proc = supervisor.popen(
+                _limits(memory_mb, SESSION_CPU_S) + [exe] + argv[1:],
+                cwd=str(workdir),
+                env=env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except Exception:
+            shutil.rmtree(workdir, ignore_errors=True)
+            with self._lock:
+                self._sessions.pop(sid, None)
+            raise
+        proc.gozolite_account = None  # type: ignore[attr-defined]  # el CPU se carga por celda (ver execute)
+        s = Session(sid, language, proc, workdir, memory_mb, owner=owner)
+        with self._lock:
+            self._sessions[sid] = s
+            self.stats["opened"] += 1
+        self._ensure_reaper()
+        return s.info()
+
+    def close(self, session_id: str, owner: Optional[str] = None) -> bool:
+        with self._lock:
+            s = self._sessions.get(session_id)
+            if s is None or s.owner != owner:
+                return False
+            del self._sessions[session_id]
+        self._terminate(s)
+        return True
+
+    def _terminate(self, s: Session) -> None:
+        s.closed = True
+        try:
+            if s.proc.stdin is not None:
+                s.proc.stdin.close()
+        except OSError:
+            pass
+        supervisor.kill_tree(s.proc, grace_s=0.2)
+        for pipe in (s.proc.stdout, s.proc.stderr):
+            if pipe is not None:
+                pipe.close()
+        shutil.rmtree(s.workdir, ignore_errors=True)
+
+    def _drop(self, s: Session) -> None:
+        with self._lock:
+            if self._sessions.get(s.id) is s:
+                del self._sessions[s.id]
+        self._terminate(s)
+
+    def get(self, session_id: str, owner: Optional[str] = None) -> Session:
+        with self._lock:
+            s = self._sessions.get(session_id)
+        if s is None or s.owner != owner:  # la sesión de otro tenant no existe para este
+            raise SessionError(404, f"Sesión inexistente o expirada: {session_id}")
+        return s
+
+    def list(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            live = [s for s in self._sessions.values() if s is not None and s.owner == owner]
+        return [s.info() for s in live]
+
+    def snapshot(self, owner: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            total = len(self._sessions)
+        return {"max_sessions": self.max_sessions, "live": total, "idle_s": self.idle_s,
+                "languages": sorted(KERNELS), "sessions": self.list(owner), **self.stats}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            live = [s for s in self._sessions.values() if s is not None]
+            self._sessions.clear()
+        for s in live:
+            self._terminate(s)
+
+    # --------- Inactividad ---------
+    def reap_idle(self) -> int:
+        cutoff = time.time() - self.idle_s
+        with self._lock:
+            stale = [s for s in self._sessions.values()
+                     if s is not None and s.last_used < cutoff and not s.lock.locked()]
+            for s in stale:
+                del self._sessions[s.id]
+            self.stats["expired"] += len(stale)
+        for s in stale:
+            self._terminate(s)
+        return len(stale)
+
+    def _ensure_reaper(self) -> None:
+        if self.idle_s <= 0 or (self._reaper is not None and self._reaper.is_alive()):
+            return
+        def _loop() -> None:
+            while True:
+                time.sleep(max(1, min(60, self.idle_s // 4)))
+                self.reap_idle()
+        self._reaper = threading.Thread(target=_loop, name="gozolite-session-reaper", daemon=True)
+        self._reaper.start()
+
+    # --------- Celdas ---------
+    def execute(self, session_id: str, code: str, timeout: float, owner: Optional[str] = None) -> Dict[str, Any]:
+        s = self.get(session_id, owner)
+        if not s.lock.acquire(blocking=False):
+            raise SessionError(409, "La sesión está ejecutando otra celda")
+        try:
+            if s.closed:
+                raise SessionError(404, f"Sesión inexistente o expirada: {session_id}")
+            s.last_used = time.time()
+            s.cells += 1
+            with self._lock:
+                self.stats["cells"] += 1
+            user_before, sys_before = _proc_times(s.proc.pid)
+            res = self._run_cell(s, code, timeout)
+            if not s.closed:
+                user, sys_ = _proc_times(s.proc.pid)
+                user, sys_ = max(0.0, user - user_before), max(0.0, sys_ - sys_before)
+                s.cpu_s += user + sys_
+                supervisor.charge_times(user, sys_)
+            s.last_used = time.time()
+            res.update(session_id=s.id, cell=s.cells, mode=self.MODE, language=s.language)
+            return res
+        finally:
+            s.lock.release()
+
+    def _run_cell(self, s: Session, code: str, timeout: float) -> Dict[str, Any]:
+        tok = f"__gz_{uuid.uuid4().hex}"
+        started = time.monotonic()
+        out, err = bytearray(), bytearray()
+        done_out = re.compile(rb"\n" + tok.encode() + rb" (-?\d+)\n$")
+        done_err = (b"\n" + tok.encode() + b"\n")
+
+        def _result(exit_code: int, extra: str = "") -> Dict[str, Any]:
+            m = done_out.search(bytes(out))
+            stdout = bytes(out[:m.start()]) if m else bytes(out)
+            stderr = bytes(err[:-len(done_err)]) if err.endswith(done_err) else bytes(err)
+            text_err = stderr.decode("utf-8", "replace") + extra
+            return {"ok": exit_code == 0, "exit_code": exit_code, "stdout": stdout.decode("utf-8", "replace"),
+                    "stderr": text_err, "time_ms": int((time.monotonic() - started) * 1000)}
+
+        cancelled = supervisor.cancelled()  # DELETE /jobs o desconexión: la celda se corta como un timeout
+
+        def _cut(survived: bool) -> Dict[str, Any]:
+            tail = "celda interrumpida; la sesión sigue viva" if survived else "kernel terminado; la sesión se cerró"
+            if cancelled:
+                return _result(CANCELLED_EXIT, f"Job cancelado ({cancelled}; {tail})\n")
+            return _result(124, f"Timeout ({tail})\n")
+
+        if cancelled:  # cancelado mientras esperaba turno en la cola
+            return _result(CANCELLED_EXIT, f"Job cancelado ({cancelled})\n")
+        try:
+            s.proc.stdin.write(f"{tok} {code.encode('utf-8').hex()}\n".encode("ascii"))
+            s.proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self._drop(s)
+            return _result(1, "El kernel de la sesión terminó; abrir una sesión nueva.\n")
+
+        deadline = started + timeout
+        interrupted = False
+        sel = selectors.DefaultSelector()
+        sel.register(s.proc.stdout, selectors.EVENT_READ, out)
+        sel.register(s.proc.stderr, selectors.EVENT_READ, err)
+        try:
+            while True:
+                if done_out.search(bytes(out[-200:])) and err.endswith(done_err):
+                    status = int(done_out.search(bytes(out)).group(1))
+                    if interrupted:
+                        return _cut(True)
+                    return _result(status)
+                if not interrupted and not cancelled:
+                    cancelled = supervisor.cancelled()
+                    if cancelled:
+                        deadline = time.monotonic()  # se interrumpe ya
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if interrupted:
+                        self._drop(s)
+                        with self._lock:
+                            self.stats["killed"] += 1
+                        return _cut(False)
+                    interrupted = True  # primero SIGINT: los kernels que lo atrapan sobreviven
+                    try:
+                        os.kill(s.proc.pid, signal.SIGINT)
+                    except ProcessLookupError:
+                        pass
+                    deadline = time.monotonic() + INTERRUPT_GRACE_S
+                    continue
+                events = sel.select(timeout=min(remaining, 0.25))
+                for key, _ in events:
+                    chunk = os.read(key.fileobj.fileno(), 65536)
+                    if not chunk:
+                        sel.unregister(key.fileobj)
+                        continue
+                    key.data.extend(chunk)
+                if len(out) + len(err) > MAX_OUTPUT_BYTES:
+                    self._drop(s)
+                    with self._lock:
+                        self.stats["killed"] += 1
+                    return _result(OUTPUT_LIMIT_EXIT, f"\nLímite de salida excedido ({MAX_OUTPUT_BYTES} bytes); la sesión se cerró\n")
+                if not sel.get_map():  # el kernel cerró sus pipes: murió (exit, señal, RLIMIT)
+                    try:
+                        rc = supervisor.wait(s.proc, timeout=1)
+                    except subprocess.TimeoutExpired:
+                        rc = 1
+                    self._drop(s)
+                    if interrupted:  # el kernel no atrapa SIGINT (perl, lua, php): la celda vence igual
+                        with self._lock:
+                            self.stats["killed"] += 1
+                        return _cut(False)
+                    return _result(rc or 1, "El kernel de la sesión terminó; abrir una sesión nueva.\n")
+        finally:
+            sel.close()
@@ -0,0 +1,319 @@
+# core2/orchestrators/sql_engine.py — motor SQL in-process (módulo sqlite3) con fixtures precargados
+from __future__ import annotations
+
+import csv
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .supervisor import MAX_OUTPUT_BYTES, OUTPUT_LIMIT_EXIT
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+SQL_WORKERS   = _env_int("GOZOLITE_SQL_WORKERS", max(2, os.cpu_count() or 1))  # consultas simultáneas
+SQL_MAX_ROWS  = _env_int("GOZOLITE_SQL_MAX_ROWS", 1000)                          # filas estructuradas por result set
+FIXTURES_DIR  = os.getenv("GOZOLITE_SQL_FIXTURES_DIR",
+                          str(Path(__file__).resolve().parents[2] / "fixtures" / "sql"))
+SQL_HEAP_MB   = _env_int("GOZOLITE_SQL_HEAP_MB", 1024)                            # tope de heap de sqlite (todo el proceso)
+PROGRESS_STEPS = 10000  # instrucciones de la VM entre chequeos del deadline
+_SERIALIZE = hasattr(sqlite3.Connection, "serialize")  # Python >= 3.11; en 3.10 las imágenes se copian con backup()
+_SETLIMIT  = hasattr(sqlite3.Connection, "setlimit")   # ídem
+
+FIXTURE_NAME = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+FIXTURE_SUFFIXES = (".db", ".sqlite", ".sqlite3", ".sql")
+MODES = ("list", "csv", "tabs")
+
+# Pragmas que tocan el proceso entero (no la conexión del job): prohibidos
+_DENIED_PRAGMAS = {"temp_store_directory", "data_store_directory", "hard_heap_limit", "soft_heap_limit", "mmap_size"}
+
+
+class SqlUnsupported(Exception):
+    """El script usa algo que sólo entiende la CLI sqlite3 (dot-commands no soportados): usar el runner CLI."""
+
+
+class FixtureNotFound(KeyError):
+    pass
+
+
+def _authorizer(action: int, arg1: Optional[str], arg2: Optional[str], _db: Optional[str], _trigger: Optional[str]) -> int:
+    # Sin ATTACH (ni VACUUM INTO, que pasa por ATTACH): el job no abre ni escribe archivos del host
+    if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH):
+        return sqlite3.SQLITE_DENY
+    if action == sqlite3.SQLITE_PRAGMA and (arg1 or "").lower() in _DENIED_PRAGMAS:
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+def format_value(v: Any) -> str:
+    """Formato de la CLI sqlite3 en modo list (NULL vacío, reales con %!.15g)."""
+    if v is None:
+        return ""
+    if isinstance(v, float):
+        if v != v:
+            return ""
+        if v in (float("inf"), float("-inf")):
+            return "Inf" if v > 0 else "-Inf"
+        if v == 0:
+            return "0.0"
+        s = "%.15g" % v
+        mant, _, exp = s.partition("e")
+        if "." not in mant:
+            mant += ".0"
+        return f"{mant}e{exp}" if exp else mant
+    if isinstance(v, bytes):
+        return v.decode("utf-8", "replace")
+    return str(v)
+
+
+class _Image:
+    """
+    Fixture precargado: bytes serializados (deserialize por job) o, sin Connection.serialize (Python 3.10),
+    la base en memoria misma, que se copia al job con backup() de a una copia por vez.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        self.bytes = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+        self._data: Optional[bytes] = conn.serialize() if _SERIALIZE else None
+        self._conn = None if _SERIALIZE else conn
+        self._lock = threading.Lock()
+
+    def load_into(self, dst: sqlite3.Connection) -> None:
+        if self._data is not None:
+            dst.deserialize(self._data)
+            return
+        with self._lock:  # la conexión fuente no se comparte entre hilos a la vez
+            self._conn.backup(dst)
+
+
+def _json_value(v: Any) -> Any:
+    if isinstance(v, bytes):
+        return v.decode("utf-8", "replace")
+    if isinstance(v, float) and (v != v or v in (float("inf"), float("-inf"))):
+        return format_value(v)
+    return v
+
+
+def split_script(script: str) -> List[Tuple[int, str]]:
+    """
+    Separa el script en (línea, sentencia) como la CLI: cada sentencia termina en el primer `;` que la
+    completa (respeta strings, comentarios y triggers); una línea que empieza con `.` es un dot-command.
+    """
+    out: List[Tuple[int, str]] = []
+    pos, n = 0, len(script)
+    while pos < n:
+        while pos < n and script[pos].isspace():
+            pos += 1
+        if pos >= n:
+            break
+        line = script.count("\n", 0, pos) + 1
+        at_line_start = script[script.rfind("\n", 0, pos) + 1:pos].strip() == ""
+        if script[pos] == "." and at_line_start:
+            end = script.find("\n", pos)
+            end = n if end < 0 else end
+            out.append((line, script[pos:end].strip()))
+            pos = end
+            continue
+        end = script.find(";", pos)
+        while end >= 0 and not sqlite3.complete_statement(script[pos:end + 1]):
+            end = script.find(";", end + 1)
+        end = n - 1 if end < 0 else end  # sentencia incompleta al final: que sqlite reporte el error
+        out.append((line, script[pos:end + 1]))
+        pos = end + 1
+    return out
+
+
+class SqlEngine:
+    """
+    Ejecuta scripts SQL con el módulo sqlite3 en un pool de hilos (sqlite libera el GIL):
+    - cada job tiene su propia base en memoria; con `fixture` arranca como copia de una base precargada
+      (imagen serializada una vez: deserialize por job, sin reconstruir tablas; backup() en Python 3.10)
+    - salida de texto como la CLI (modo list, `|`) y result sets estructurados (columns/rows)
+    - deadline por progress handler, sin ATTACH; memoria: max_page_count y SQLITE_LIMIT_LENGTH (ningún
+      string/blob más grande que memory_mb) por job, y hard_heap_limit de sqlite para todo el proceso
+    """
+
+    def __init__(self, fixtures_dir: Optional[str] = None, workers: Optional[int] = None):
+        self.fixtures_dir = Path(fixtures_dir or FIXTURES_DIR)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers or SQL_WORKERS), thread_name_prefix="gozolite-sql")
+        self._lock = threading.Lock()
+        self._images: Dict[str, Tuple[float, _Image]] = {}  # nombre -> (mtime, imagen)
+        self.stats: Dict[str, int] = {"jobs": 0, "fixture_loads": 0, "fixture_hits": 0}
+        if SQL_HEAP_MB > 0:
+            # Global de la librería: cubre lo que el tope por job no ve (sorts, temporales, expresiones)
+            conn = sqlite3.connect(":memory:")
+            conn.execute(f"PRAGMA hard_heap_limit = {SQL_HEAP_MB * 1024 * 1024}")
+            conn.close()
+
+    # --------- Fixtures ---------
+    def _fixture_path(self, name: str) -> Path:
+        if not FIXTURE_NAME.match(name or ""):
+            raise FixtureNotFound(name)
+        for suffix in FIXTURE_SUFFIXES:
+            p = self.fixtures_dir / f"{name}{suffix}"
+            if p.is_file():
+                return p
+        raise FixtureNotFound(name)
+
+    def _image(self, name: str) -> _Image:
+        """Imagen del fixture; se reconstruye sólo si cambió el archivo."""
+        path = self._fixture_path(name)
+        mtime = path.stat().st_mtime
+        with self._lock:
+            cached = self._images.get(name)
+            if cached and cached[0] == mtime:
+                self.stats["fixture_hits"] += 1
+                return cached[1]
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        try:
+            if path.suffix == ".sql":
+                conn.executescript(path.read_text(encoding="utf-8"))
+            else:
+                src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+                try:
+                    src.backup(conn)
+                finally:
+                    src.close()
+            image = _Image(conn)
+        except BaseException:
+            conn.close()
+            raise
+        if _SERIALIZE:
+            conn.close()  # la imagen ya son bytes; en 3.10 la conexión es la imagen
+        with self._lock:
+            self._images[name] = (mtime, image)
+            self.stats["fixture_loads"] += 1
+        return image
+
+    def fixtures(self) -> List[Dict[str, Any]]:
+        out = []
+        if not self.fixtures_dir.is_dir():
+            return out
+        for p in sorted(self.fixtures_dir.iterdir()):
+            if p.suffix not in FIXTURE_SUFFIXES or not FIXTURE_NAME.match(p.stem):
+                continue
+            try:
+                image = self._image(p.stem)
+                conn = sqlite3.connect(":memory:")
+                image.load_into(conn)
+                tables = {t: conn.execute(f'SELECT count(*) FROM "{t}"').fetchone()[0]
+                          for (t,) in conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")}
+                conn.close()
+                out.append({"name": p.stem, "source": p.name, "tables": tables, "bytes": image.bytes})
+            except (sqlite3.Error, OSError) as e:
+                out.append({"name": p.stem, "source": p.name, "error": str(e)})
+        return out
+
+    # --------- Ejecución ---------
+    def run(self, script: str, fixture: Optional[str] = None, timeout: float = 10, memory_mb: int = 256) -> Dict[str, Any]:
+        """Corre el script en el pool. SqlUnsupported si necesita la CLI; FixtureNotFound si el fixture no existe."""
+        statements = split_script(script)
+        for _, stmt in statements:
+            if stmt.startswith(".") and not self._dot_supported(stmt):
+                raise SqlUnsupported(stmt.split()[0])
+        image = self._image(fixture) if fixture else None  # errores de fixture antes de ocupar un worker
+        return self._pool.submit(self._run, statements, image, timeout, memory_mb).result()
+
+    @staticmethod
+    def _dot_supported(cmd: str) -> bool:
+        parts = cmd.split()
+        if parts[0] == ".headers":
+            return len(parts) == 2 and parts[1] in ("on", "off")
+        if parts[0] == ".mode":
+            return len(parts) == 2 and parts[1] in MODES
+        return parts[0] == ".separator" and len(parts) == 2
+
+    def _run(self, statements: List[Tuple[int, str]], image: Optional[_Image], timeout: float,
+             memory_mb: int) -> Dict[str, Any]:
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._lock:
+            self.stats["jobs"] += 1
+        conn = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+        out = io.StringIO()
+        errors: List[str] = []
+        result_sets: List[Dict[str, Any]] = []
+        headers, mode, sep = False, "list", "|"
+        timed_out = truncated = False
+        try:
+            if image is not None:
+                image.load_into(conn)
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            conn.execute(f"PRAGMA max_page_count = {max(16, memory_mb * 1024 * 1024 // page_size)}")
+            if _SETLIMIT:
+                conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, max(1024 * 1024, memory_mb * 1024 * 1024))
+            conn.set_authorizer(_authorizer)
+            conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, PROGRESS_STEPS)
+            for line, stmt in statements:
+                if stmt.startswith("."):
+                    parts = stmt.split()
+                    if parts[0] == ".headers":
+                        headers = parts[1] == "on"
+                    elif parts[0] == ".mode":
+                        mode = parts[1]
+                        sep = {"list": "|", "csv": ",", "tabs": "\t"}[mode]
+                    else:
+                        sep = parts[1].strip("'\"")
+                    continue
+                try:
+                    cur = conn.execute(stmt)
+                    if cur.description is None:
+                        continue
+                    columns = [d[0] for d in cur.description]
+                    rs: Dict[str, Any] = {"line": line, "columns": columns, "rows": [], "truncated": False}
+                    result_sets.append(rs)
+                    if headers:
+                        self._emit(out, columns, mode, sep)
+                    for row in cur:
+                        if len(rs["rows"]) < SQL_MAX_ROWS:
+                            rs["rows"].append([_json_value(v) for v in row])
+                        else:
+                            rs["truncated"] = True
+                        self._emit(out, [format_value(v) for v in row], mode, sep)
+                        if out.tell() > MAX_OUTPUT_BYTES:
+                            truncated = True
+                            break
+                except sqlite3.Error as e:
+                    if time.monotonic() > deadline:
+                        timed_out = True
+                        break
+                    errors.append(f"Error near line {line}: {str(e) or 'out of memory'}")  # hard_heap_limit: sin mensaje
+                if truncated:
+                    break
+        finally:
+            conn.close()
+        elapsed = int((time.monotonic() - started) * 1000)
+        if timed_out:
+            exit_code, errors = 124, errors + ["Timeout"]
+        elif truncated:
+            exit_code, errors = OUTPUT_LIMIT_EXIT, errors + [f"Límite de salida excedido ({MAX_OUTPUT_BYTES} bytes)"]
+        else:
+            exit_code = 1 if errors else 0
+        return {
+            "ok": exit_code == 0,
+            "exit_code": exit_code,
+            "stdout": out.getvalue(),
+            "stderr": "\n".join(errors) + ("\n" if errors else ""),
+            "time_ms": elapsed,
+            "result_sets": result_sets,
+        }
+
+    @staticmethod
+    def _emit(out: io.StringIO, values: List[str], mode: str, sep: str) -> None:
+        if mode == "csv":
+            csv.writer(out, lineterminator="\n").writerow(values)
+        else:
+            out.write(sep.join(values) + "\n")
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,552 @@
+# core2/orchestrators/supervisor.py
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+KILL_GRACE_S     = _env_float("GOZOLITE_KILL_GRACE_S", 0.5)          # SIGTERM -> espera -> SIGKILL
+SWEEP_INTERVAL_S = _env_int("GOZOLITE_SWEEP_S", 30)                  # 0 = sin sweeper
+MAX_OUTPUT_BYTES = _env_int("GOZOLITE_MAX_OUTPUT_BYTES", 8 * 1024 * 1024)  # stdout+stderr por job
+OUTPUT_LIMIT_EXIT = 128 + signal.SIGXFSZ  # mismo código que un proceso que excede RLIMIT_FSIZE
+CANCELLED_EXIT    = 128 + signal.SIGINT   # job cancelado (DELETE /jobs/{id} o cliente desconectado)
+
+JOB_ENV = "GOZOLITE_JOB"  # marca heredada por todo el árbol del job (sobrevive a setsid/daemonize)
+
+log = logging.getLogger("gozolite.supervisor")
+
+# Cuenta a la que se carga el CPU de los procesos lanzados en este contexto (ver charge_to)
+_account: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("gozolite_account", default=None)
+# Observador de los procesos lanzados en este contexto (p. ej. el profiler del job, ver observe)
+_observer: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar("gozolite_observer", default=None)
+# Job (cancelable) al que pertenecen los procesos lanzados en este contexto (ver open_job/running)
+_job: contextvars.ContextVar[Optional["Job"]] = contextvars.ContextVar("gozolite_job", default=None)
+# Contabilidad de recursos de los procesos lanzados en este contexto (ver metered)
+_meter: contextvars.ContextVar[Optional["Usage"]] = contextvars.ContextVar("gozolite_meter", default=None)
+
+
+class JobCancelled(Exception):
+    """El job fue cancelado: no se lanzan más procesos para él."""
+
+
+@dataclass
+class Job:
+    id: str
+    owner: Optional[str] = None
+    cancelled: Optional[str] = None  # motivo ("cancelled", "disconnect", ...) una vez cancelado
+    created: float = 0.0
+    procs: Dict[str, subprocess.Popen] = field(default_factory=dict)
+
+
+@dataclass
+class Usage:
+    """
+    Recursos de los procesos de un job, sumados desde el rusage de wait4 de cada uno (incluye a los hijos
+    que esperó), no desde el RUSAGE_CHILDREN de toda la API; una celda de sesión suma el CPU que gastó el
+    kernel (charge_times). max_rss_kb es el mayor pico de un proceso;
+    uno que no supera el pico de RSS que heredó de la API no es medible y cuenta 0. oom_kills: procesos
+    muertos por SIGKILL que no mandó el supervisor (timeout, cancelación, límite de salida): el OOM killer.
+    """
+    utime_s: float = 0.0
+    stime_s: float = 0.0
+    max_rss_kb: int = 0
+    minor_faults: int = 0
+    major_faults: int = 0
+    inblock: int = 0
+    oublock: int = 0
+    processes: int = 0
+    oom_kills: int = 0
+
+    def add(self, ru: Any, inherited_kb: int, oom: bool) -> None:
+        self.utime_s += ru.ru_utime
+        self.stime_s += ru.ru_stime
+        if ru.ru_maxrss > inherited_kb:
+            self.max_rss_kb = max(self.max_rss_kb, int(ru.ru_maxrss))
+        self.minor_faults += ru.ru_minflt
+        self.major_faults += ru.ru_majflt
+        self.inblock += ru.ru_inblock
+        self.oublock += ru.ru_oublock
+        self.processes += 1
+        self.oom_kills += oom
+
+    def snapshot(self) -> Dict[str, Any]:
+        out = dict(self.__dict__)
+        out["utime_s"] = round(self.utime_s, 6)
+        out["stime_s"] = round(self.stime_s, 6)
+        return out
+
+
+@dataclass
+class Completed:
+    returncode: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    truncated: bool = False
+
+
+class Supervisor:
+    """
+    Lanza cada job en su propia sesión/grupo de procesos y garantiza que no sobreviva nada:
+    - al terminar (normal, timeout, límite de salida o cancelación) se mata el grupo entero
+    - los procesos lanzados dentro de running(job) quedan asociados al job: cancel(job_id) los mata
+    - kill_tree: SIGTERM al grupo, gracia KILL_GRACE_S, luego SIGKILL
+    - el sweeper periódico mata procesos marcados con GOZOLITE_JOB cuyo job ya no está vivo
+      (los que escaparon del grupo con setsid/doble fork)
+    """
+
+    def __init__(self, grace_s: Optional[float] = None, sweep_interval_s: Optional[int] = None):
+        self.grace_s = KILL_GRACE_S if grace_s is None else grace_s
+        self.sweep_interval_s = SWEEP_INTERVAL_S if sweep_interval_s is None else sweep_interval_s
+        self._prefix = f"{os.getpid()}-"  # solo barremos jobs de este proceso (varios workers uvicorn)
+        self._live: Dict[str, Optional[subprocess.Popen]] = {}  # None: reservado, arrancando
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats: Dict[str, Any] = {"launched": 0, "tree_kills": 0, "swept": 0, "last_sweep": None,
+                                      "cancelled": 0}
+        self._usage: Dict[str, float] = {}  # cuenta -> segundos de CPU (user+sys) de procesos ya cosechados
+
+    # --------- Lanzamiento ---------
+    def popen(self, argv: Sequence[str], env: Optional[Dict[str, str]] = None, **kw: Any) -> subprocess.Popen:
+        if os.getpid() != int(self._prefix[:-1]):
+            self._prefix = f"{os.getpid()}-"  # tras fork (p. ej. workers de uvicorn)
+        job = _job.get()
+        if job is not None and job.cancelled:
+            raise JobCancelled(job.id)
+        tag = self._prefix + uuid.uuid4().hex[:12]
+        job_env = dict(os.environ if env is None else env)
+        job_env[JOB_ENV] = tag
+        kw.setdefault("start_new_session", True)
+        # El tag se registra antes del fork: un sweep concurrente no mata al hijo recién nacido
+        with self._lock:
+            self._live[tag] = None
+        try:
+            proc = subprocess.Popen(list(argv), env=job_env, **kw)
+        except BaseException:
+            with self._lock:
+                self._live.pop(tag, None)
+            raise
+        proc.gozolite_tag = tag  # type: ignore[attr-defined]
+        proc.gozolite_account = _account.get()  # type: ignore[attr-defined]
+        proc.gozolite_observer = _observer.get()  # type: ignore[attr-defined]
+        proc.gozolite_job = job  # type: ignore[attr-defined]
+        proc.gozolite_meter = _meter.get()  # type: ignore[attr-defined]
+        proc.gozolite_inherited_kb = _self_hwm_kb() if proc.gozolite_meter is not None else 0  # type: ignore[attr-defined]
+        proc.gozolite_signaled = False  # type: ignore[attr-defined]
+        with self._lock:
+            self._live[tag] = proc
+            self.stats["launched"] += 1
+            if job is not None:
+                job.procs[tag] = proc
+            cancelled = job is not None and job.cancelled
+        if cancelled:  # se canceló mientras arrancaba
+            self.signal_group(proc, signal.SIGKILL)
+        self._ensure_sweeper()
+        if proc.gozolite_observer is not None:  # type: ignore[attr-defined]
+            proc.gozolite_observer.started(proc)  # type: ignore[attr-defined]
+        return proc
+
+    def finish(self, proc: subprocess.Popen) -> None:
+        """Cierre normal del job: mata lo que haya quedado en el grupo (procesos en background)."""
+        self.signal_group(proc, signal.SIGKILL)
+        self.wait(proc)
+        tag = getattr(proc, "gozolite_tag", "")
+        with self._lock:
+            self._live.pop(tag, None)
+            job = getattr(proc, "gozolite_job", None)
+            if job is not None:
+                job.procs.pop(tag, None)
+
+    def kill_tree(self, proc: subprocess.Popen, grace_s: Optional[float] = None) -> None:
+        grace = self.grace_s if grace_s is None else grace_s
+        with self._lock:
+            self.stats["tree_kills"] += 1
+        self.signal_group(proc, signal.SIGTERM)
+        try:
+            self.wait(proc, timeout=grace)
+        except subprocess.TimeoutExpired:
+            pass
+        self.signal_group(proc, signal.SIGKILL)
+        self.finish(proc)
+
+    def wait(self, proc: subprocess.Popen, timeout: Optional[float] = None) -> int:
+        """
+        Como proc.wait(), pero cosecha con wait4 para cargar el CPU del proceso (y de los hijos
+        que esperó) a su cuenta. TimeoutExpired si no terminó a tiempo.
+        """
+        if proc.returncode is not None:
+            return proc.returncode
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.0005
+        while True:
+            try:
+                pid, status, ru = os.wait4(proc.pid, 0 if deadline is None else os.WNOHANG)
+            except ChildProcessError:
+                return proc.wait()  # ya cosechado por otro camino (Popen.poll)
+            if pid:
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                self.record(proc, ru, status)
+                return proc.returncode
+            if time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def poll(self, proc: subprocess.Popen) -> Optional[int]:
+        """Como proc.poll(), pero cosechando con wait4 (ver wait)."""
+        try:
+            return self.wait(proc, timeout=0)
+        except subprocess.TimeoutExpired:
+            return None
+
+    def record(self, proc: subprocess.Popen, ru: Any, status: Optional[int] = None) -> None:
+        """
+        Carga el rusage de un proceso ya cosechado (wait4) a la cuenta con la que se lanzó y, si se lanzó
+        dentro de metered(), a la contabilidad del job (`status` de wait4: distingue un SIGKILL ajeno).
+        """
+        self._charge(getattr(proc, "gozolite_account", None), ru.ru_utime + ru.ru_stime)
+        meter = getattr(proc, "gozolite_meter", None)
+        if meter is not None:
+            code = None if status is None else os.waitstatus_to_exitcode(status)
+            oom = code in (-signal.SIGKILL, 128 + signal.SIGKILL) and not getattr(proc, "gozolite_signaled", False)
+            with self._lock:
+                meter.add(ru, getattr(proc, "gozolite_inherited_kb", 0), oom)
+        observer = getattr(proc, "gozolite_observer", None)
+        if observer is not None:
+            observer.reaped(proc, ru)
+
+    def charge(self, cpu_s: float) -> None:
+        """Carga CPU medido fuera de este proceso (p. ej. cpu_ms de un agente remoto) a la cuenta actual."""
+        self._charge(_account.get(), cpu_s)
+
+    def charge_times(self, utime_s: float, stime_s: float) -> None:
+        """
+        Como charge(), para CPU de un proceso que sigue vivo (el kernel de una sesión: nunca se cosecha
+        por celda): además lo suma a la contabilidad del job (metered), si la hay.
+        """
+        self._charge(_account.get(), utime_s + stime_s)
+        meter = _meter.get()
+        if meter is not None:
+            with self._lock:
+                meter.utime_s += utime_s
+                meter.stime_s += stime_s
+
+    def _charge(self, account: Optional[str], cpu_s: float) -> None:
+        if account is None or cpu_s <= 0:
+            return
+        with self._lock:
+            self._usage[account] = self._usage.get(account, 0.0) + cpu_s
+
+    @contextmanager
+    def charge_to(self, account: str) -> Iterator[None]:
+        """Todo proceso lanzado dentro del bloque (en este hilo/contexto) carga su CPU a `account`."""
+        token = _account.set(account)
+        try:
+            yield
+        finally:
+            _account.reset(token)
+
+    @contextmanager
+    def observe(self, observer: Optional[Any]) -> Iterator[None]:
+        """Todo proceso lanzado dentro del bloque avisa a `observer.started(proc)` y, al cosecharse, `.reaped(proc, ru)`."""
+        token = _observer.set(observer)
+        try:
+            yield
+        finally:
+            _observer.reset(token)
+
+    @staticmethod
+    def observer() -> Optional[Any]:
+        return _observer.get()
+
+    @contextmanager
+    def metered(self, usage: Optional["Usage"]) -> Iterator[Optional["Usage"]]:
+        """Todo proceso lanzado dentro del bloque suma su rusage (al cosecharse) a `usage` (None: a ninguno)."""
+        token = _meter.set(usage)
+        try:
+            yield usage
+        finally:
+            _meter.reset(token)
+
+    def bind(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Envuelve `fn` para que, corrida en otro hilo (pools), cargue a la cuenta (observador, job y
+        contabilidad) del llamador.
+        """
+        account, observer, job, meter = _account.get(), _observer.get(), _job.get(), _meter.get()
+        if account is None and observer is None and job is None and meter is None:
+            return fn
+        def _bound(*args: Any, **kwargs: Any) -> Any:
+            a, o, j, m = _account.set(account), _observer.set(observer), _job.set(job), _meter.set(meter)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _meter.reset(m)
+                _job.reset(j)
+                _observer.reset(o)
+                _account.reset(a)
+        return _bound
+
+    # --------- Jobs cancelables ---------
+    def open_job(self, job_id: str, owner: Optional[str] = None) -> Job:
+        """Registra un job por id (KeyError si ya hay uno vivo con ese id); sus procesos se lanzan dentro de running()."""
+        with self._lock:
+            if job_id in self._jobs:
+                raise KeyError(job_id)
+            job = self._jobs[job_id] = Job(job_id, owner, created=time.time())
+            return job
+
+    def close_job(self, job: Job) -> None:
+        with self._lock:
+            if self._jobs.get(job.id) is job:
+                del self._jobs[job.id]
+
+    @contextmanager
+    def running(self, job: Optional[Job]) -> Iterator[None]:
+        """Todo proceso lanzado dentro del bloque pertenece a `job` (cancel() lo mata)."""
+        token = _job.set(job)
+        try:
+            yield
+        finally:
+            _job.reset(token)
+
+    @contextmanager
+    def job(self, job_id: str, owner: Optional[str] = None) -> Iterator[Job]:
+        job = self.open_job(job_id, owner)
+        try:
+            with self.running(job):
+                yield job
+        finally:
+            self.close_job(job)
+
+    def cancel(self, job_id: str, owner: Optional[str] = None, reason: str = "cancelled") -> bool:
+        """
+        Cancela un job vivo del `owner`: SIGKILL inmediato a los grupos de sus procesos (el hilo del job
+        los cosecha y limpia su workdir) y no se lanzan más. False si no existe o es de otro owner.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.owner != owner:
+                return False
+            first = job.cancelled is None
+            if first:
+                job.cancelled = reason
+                self.stats["cancelled"] += 1
+            procs = list(job.procs.values())
+        for proc in procs:
+            self.signal_group(proc, signal.SIGKILL)
+        return True
+
+    @staticmethod
+    def cancelled() -> Optional[str]:
+        """Motivo de cancelación del job del contexto actual (None si no hay job o sigue vivo)."""
+        job = _job.get()
+        return job.cancelled if job is not None else None
+
+    def jobs(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"job_id": j.id, "age_s": round(time.time() - j.created, 3), "processes": len(j.procs),
+                     "cancelled": j.cancelled} for j in self._jobs.values() if j.owner == owner]
+
+    def usage(self, account: str, pop: bool = True) -> float:
+        """Segundos de CPU acumulados por `account` (y se olvida la cuenta si pop)."""
+        with self._lock:
+            return self._usage.pop(account, 0.0) if pop else self._usage.get(account, 0.0)
+
+    @staticmethod
+    def signal_group(proc: subprocess.Popen, sig: int) -> None:
+        if proc.returncode is None:
+            proc.gozolite_signaled = True  # type: ignore[attr-defined]  # su SIGKILL no es un OOM
+        try:
+            os.killpg(proc.pid, sig)  # pgid == pid del líder (start_new_session)
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            if proc.returncode is None:
+                proc.send_signal(sig)
+
+    def shutdown(self) -> None:
+        """Apagado de la API/agente: ningún job queda vivo."""
+        self._stop.set()
+        with self._lock:
+            procs = [p for p in self._live.values() if p is not None]
+        for proc in procs:
+            self.kill_tree(proc, grace_s=0.2)
+        self.sweep()
+
+    # --------- Ejecución con captura acotada ---------
+    def run(self, argv: Sequence[str], timeout: float, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+            input: Optional[str] = None, stdin: Optional[BinaryIO] = None,
+            max_output: Optional[int] = None) -> Completed:
+        """
+        Como subprocess.run(capture_output=True, text=True), pero con el árbol supervisado:
+        timeout o stdout+stderr > max_output => kill_tree y Completed(timed_out|truncated).
+        """
+        cap = MAX_OUTPUT_BYTES if max_output is None else max_output
+        proc = self.popen(
+            argv, env=env, cwd=cwd,
+            stdin=stdin if stdin is not None else (subprocess.PIPE if input is not None else subprocess.DEVNULL),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        if input is not None:
+            threading.Thread(target=_feed, args=(proc.stdin, input.encode("utf-8")), daemon=True).start()
+        bufs: Dict[str, List[bytes]] = {"stdout": [], "stderr": []}
+        total = 0
+        timed_out = truncated = False
+        deadline = time.monotonic() + timeout
+        sel = selectors.DefaultSelector()
+        sel.register(proc.stdout, selectors.EVENT_READ, "stdout")
+        sel.register(proc.stderr, selectors.EVENT_READ, "stderr")
+        leader_done = False
+        try:
+            while sel.get_map():
+                if not leader_done and self.poll(proc) is not None:
+                    # El líder terminó: lo que quede en el grupo (p. ej. `cmd &`) se mata y se drena
+                    leader_done = True
+                    self.signal_group(proc, signal.SIGKILL)
+                    deadline = min(deadline, time.monotonic() + 1.0)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = not leader_done  # un huérfano fuera del grupo no vuelve timeout al job
+                    break
+                for key, _ in sel.select(timeout=min(remaining, 0.25)):
+                    chunk = os.read(key.fileobj.fileno(), 65536)
+                    if not chunk:
+                        sel.unregister(key.fileobj)
+                        continue
+                    keep = max(0, cap - total)
+                    bufs[key.data].append(chunk[:keep])
+                    total += len(chunk)
+                    if total > cap:
+                        truncated = True
+                        break
+                if truncated:
+                    break
+            if not (timed_out or truncated):
+                try:
+                    self.wait(proc, timeout=max(0.0, deadline - time.monotonic()))
+                except subprocess.TimeoutExpired:
+                    timed_out = True
+            if timed_out or truncated:
+                self.kill_tree(proc)
+            else:
+                self.finish(proc)
+        finally:
+            sel.close()
+            proc.stdout.close()
+            proc.stderr.close()
+            if proc.returncode is None:
+                self.kill_tree(proc)
+        return Completed(
+            returncode=proc.returncode,
+            stdout=b"".join(bufs["stdout"]).decode("utf-8", errors="replace"),
+            stderr=b"".join(bufs["stderr"]).decode("utf-8", errors="replace"),
+            timed_out=timed_out,
+            truncated=truncated,
+        )
+
+    # --------- Sweeper ---------
+    def _ensure_sweeper(self) -> None:
+        if self.sweep_interval_s <= 0 or self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name="gozolite-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._stop.wait(self.sweep_interval_s):
+            try:
+                self.sweep()
+            except Exception as e:  # el sweeper nunca debe morir
+                log.warning("sweep falló: %s", e)
+
+    def sweep(self) -> List[Dict[str, Any]]:
+        """Mata procesos con GOZOLITE_JOB de este proceso cuyo job ya terminó. Devuelve lo barrido."""
+        needle = f"{JOB_ENV}={self._prefix}".encode()
+        me = os.getpid()
+        swept: List[Dict[str, Any]] = []
+        for entry in Path("/proc").iterdir():
+            if not entry.name.isdigit() or int(entry.name) == me:
+                continue
+            try:
+                environ = (entry / "environ").read_bytes()
+            except OSError:
+                continue  # ya terminó o no es nuestro
+            start = environ.find(needle)
+            if start < 0:
+                continue
+            end = environ.find(b"\0", start)
+            tag = environ[start + len(JOB_ENV) + 1: end if end >= 0 else None].decode("ascii", "replace")
+            with self._lock:  # contra el registro actual, no una foto previa al recorrido de /proc
+                if tag in self._live:
+                    continue
+            pid = int(entry.name)
+            try:
+                cmd = (entry / "cmdline").read_bytes().replace(b"\0", b" ").decode("utf-8", "replace").strip()
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                continue
+            swept.append({"pid": pid, "job": tag, "cmd": cmd[:200]})
+        with self._lock:
+            self.stats["swept"] += len(swept)
+            self.stats["last_sweep"] = time.time()
+        if swept:
+            log.warning("sweeper: %d procesos huérfanos eliminados: %s", len(swept), swept)
+        return swept
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"live": len(self._live), "jobs": len(self._jobs), **self.stats}
+
+
+def _self_hwm_kb() -> int:
+    # Pico de RSS de la API: Popen lanza con vfork y el exec arrastra el hiwater del padre al ru_maxrss del hijo
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def _feed(pipe, data: bytes) -> None:
+    try:
+        pipe.write(data)
+    except OSError:
+        pass
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+
+# Instancia compartida por el proceso (GozoLite, ArtifactCache, ProjectBuilder, judge, pipeline, API)
+supervisor = Supervisor()
@@ -0,0 +1,247 @@
+# core2/orchestrators/syntax_check.py — pre-chequeo de sintaxis sin lanzar el toolchain del job
+from __future__ import annotations
+
+import json
+import os
+import select
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import warnings
+from typing import Any, Dict, Optional
+
+from .judge import login_env
+from .supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+SYNTAX_CHECK      = os.getenv("GOZOLITE_SYNTAX_CHECK", "1") != "0"
+SYNTAX_TIMEOUT_MS = _env_int("GOZOLITE_SYNTAX_CHECK_TIMEOUT_MS", 2000)     # por consulta al checker de node
+SYNTAX_MAX_BYTES  = _env_int("GOZOLITE_SYNTAX_CHECK_MAX_BYTES", 256 * 1024)  # fuentes más grandes no se chequean
+SYNTAX_EXIT = 1  # lo que devuelven python3, node y ts-node ante un error de sintaxis
+_WARNINGS_LOCK = threading.Lock()  # catch_warnings toca estado global del proceso
+
+# Checker persistente: una línea JSON {lang, file, code} por consulta => {ok: true|false|null, error}.
+# JS se compila como lo hace node con un módulo CommonJS (compileFunction con el wrapper) y, si falla,
+# como ES module: sólo se rechaza lo que no parsea de ninguna forma. TS: diagnósticos sintácticos de
+# transpileModule, lo mismo que reporta `ts-node --transpile-only`. Nada de lo chequeado se ejecuta.
+_NODE_CHECKER = r"""
+const vm = require('vm'), path = require('path');
+let ts;
+function loadTs() {
+  if (ts !== undefined) return ts;
+  for (const m of ['typescript', path.join(path.dirname(process.execPath), '..', 'lib', 'node_modules', 'typescript')]) {
+    try { return ts = require(m); } catch (_) {}
+  }
+  return ts = null;
+}
+function checkJs(q) {
+  try {
+    vm.compileFunction(q.code, ['exports', 'require', 'module', '__filename', '__dirname'], { filename: q.file });
+    return { ok: true };
+  } catch (e) {
+    if (!(e instanceof SyntaxError)) return { ok: null };
+    if (vm.SourceTextModule) {
+      try { new vm.SourceTextModule(q.code, { identifier: q.file }); return { ok: true }; } catch (_) {}
+    }
+    const lines = String(e.stack).split('\n'), end = lines.findIndex(l => l.startsWith('SyntaxError'));
+    return { ok: false, error: (end >= 0 ? lines.slice(0, end + 1) : [String(e)]).join('\n') };
+  }
+}
+function checkTs(q) {
+  const t = loadTs();
+  if (!t) return { ok: null };
+  const out = t.transpileModule(q.code, { fileName: q.file, reportDiagnostics: true });
+  const errs = (out.diagnostics || []).filter(d => d.category === t.DiagnosticCategory.Error);
+  if (!errs.length) return { ok: true };
+  return { ok: false, error: errs.map(d => {
+    const p = d.file ? d.file.getLineAndCharacterOfPosition(d.start) : null;
+    return (p ? `${q.file}(${p.line + 1},${p.character + 1}): ` : '') +
+           `error TS${d.code}: ${t.flattenDiagnosticMessageText(d.messageText, '\n')}`;
+  }).join('\n') };
+}
+require('readline').createInterface({ input: process.stdin }).on('line', line => {
+  let r;
+  try { const q = JSON.parse(line); r = q.lang === 'ts' ? checkTs(q) : checkJs(q); } catch (_) { r = { ok: null }; }
+  process.stdout.write(JSON.stringify(r) + '\n');
+});
+"""
+
+
+class _NodeChecker:
+    """Proceso node tibio (uno por API), consultas serializadas; si no responde a tiempo se mata y se relanza."""
+
+    def __init__(self, timeout_ms: int):
+        self.timeout_s = timeout_ms / 1000
+        self.proc: Optional[subprocess.Popen] = None
+        self.starts = 0
+        self._buf = b""
+        self._lock = threading.Lock()
+
+    def _spawn(self) -> Optional[subprocess.Popen]:
+        env = dict(login_env())
+        exe = shutil.which("node", path=env.get("PATH"))
+        if exe is None:
+            return None
+        with supervisor.observe(None), supervisor.running(None):  # no es un proceso del job que lo disparó
+            proc = supervisor.popen([exe, "--experimental-vm-modules", "--no-warnings", "-e", _NODE_CHECKER],
+                                    env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL)
+        proc.gozolite_account = None  # type: ignore[attr-defined]  # no se carga a ningún tenant
+        self.starts += 1
+        self._buf = b""
+        return proc
+
+    def check(self, lang: str, filename: str, code: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self.proc = self._spawn()
+                if self.proc is None:
+                    return None
+            try:
+                self.proc.stdin.write((json.dumps({"lang": lang, "file": filename, "code": code}) + "\n").encode("utf-8"))
+                self.proc.stdin.flush()
+                line = self._readline(time.monotonic() + self.timeout_s)
+            except OSError:
+                line = None
+            if line is None:
+                self._kill()
+                return None
+            try:
+                return json.loads(line)
+            except ValueError:
+                return None
+
+    def _readline(self, deadline: float) -> Optional[bytes]:
+        fd = self.proc.stdout.fileno()
+        while b"\n" not in self._buf:
+            left = deadline - time.monotonic()
+            if left <= 0 or not select.select([fd], [], [], left)[0]:
+                return None
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None
+            self._buf += chunk
+        line, self._buf = self._buf.split(b"\n", 1)
+        return line
+
+    def _kill(self) -> None:
+        if self.proc is not None:
+            supervisor.kill_tree(self.proc, grace_s=0.1)
+            self.proc = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self.proc is not None and self.proc.stdin is not None:
+                try:
+                    self.proc.stdin.close()
+                except OSError:
+                    pass
+            self._kill()
+
+
+class SyntaxChecker:
+    """
+    Rechaza el código que no parsea antes de pagar workdir, login shell y arranque del toolchain.
+    - python: compile() in-process (sólo si el python3 de los jobs es la misma versión que la API;
+      hasta saberlo, los jobs python pasan sin chequear).
+    - node / typescript: checker node tibio (ver _NODE_CHECKER).
+    `check()` devuelve el mensaje de error con el formato del toolchain, o None para seguir al run
+    (sin errores, lenguaje no cubierto o checker no disponible: ante la duda nunca se rechaza).
+    """
+
+    LANGUAGES = ("python", "node", "typescript")
+
+    def __init__(self, enabled: bool = SYNTAX_CHECK, max_bytes: int = SYNTAX_MAX_BYTES, timeout_ms: int = SYNTAX_TIMEOUT_MS):
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.node = _NodeChecker(timeout_ms)
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._python_ok: Optional[bool] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _count(self, language: str, key: str, us: int = 0) -> None:
+        with self._lock:
+            cell = self.stats.setdefault(language, {"accepted": 0, "rejected": 0, "skipped": 0, "check_us": 0})
+            cell[key] += 1
+            cell["check_us"] += us
+
+    def check(self, language: str, code: str) -> Optional[str]:
+        if not self.enabled or language not in self.LANGUAGES:
+            return None
+        if len(code) > self.max_bytes:
+            self._count(language, "skipped")
+            return None
+        started = time.perf_counter()
+        try:
+            error = self._check(language, code)
+        except Exception:
+            error = False
+        us = int((time.perf_counter() - started) * 1e6)
+        if error is False:
+            self._count(language, "skipped", us)
+            return None
+        self._count(language, "rejected" if error else "accepted", us)
+        return error
+
+    def _check(self, language: str, code: str):
+        """None => parsea; str => error de sintaxis; False => no se pudo chequear."""
+        if language == "python":
+            return self._python(code) if self._same_python() else False
+        res = self.node.check("ts" if language == "typescript" else "js",
+                              "code.ts" if language == "typescript" else "code.js", code)
+        if res is None or res.get("ok") is None:
+            return False
+        return None if res["ok"] else str(res.get("error") or "SyntaxError")
+
+    @staticmethod
+    def _python(code: str) -> Optional[str]:
+        try:
+            with _WARNINGS_LOCK, warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # SyntaxWarning/DeprecationWarning no son rechazos
+                compile(code, "code.py", "exec", dont_inherit=True)
+        except SyntaxError as e:  # incluye IndentationError/TabError
+            return "".join(traceback.format_exception_only(type(e), e))
+        return None
+
+    def _same_python(self) -> bool:
+        """compile() de la API sólo vale si los jobs corren la misma versión; se pregunta una vez, en background."""
+        if self._python_ok is None:
+            with self._lock:
+                if self._probing:
+                    return False  # mientras tanto no se chequea (ni se demora el job)
+                self._probing = True
+            threading.Thread(target=self._probe_python, name="gozolite-syntax-probe", daemon=True).start()
+            return False
+        return self._python_ok
+
+    def _probe_python(self) -> None:
+        env = dict(login_env())
+        exe = shutil.which("python3", path=env.get("PATH"))
+        ok = False
+        if exe is not None:
+            try:
+                with supervisor.observe(None), supervisor.running(None):
+                    out = supervisor.run([exe, "-c", "import sys; print('%d.%d' % sys.version_info[:2])"],
+                                         env=env, timeout=30)
+                ok = out.stdout.strip() == "%d.%d" % sys.version_info[:2]
+            except Exception:
+                ok = False
+        self._python_ok = ok
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            langs = {k: dict(v) for k, v in self.stats.items()}
+        return {"enabled": self.enabled, "python_in_process": self._python_ok, "rejected": sum(v["rejected"] for v in langs.values()),
+                "node_checker_starts": self.node.starts, "languages": langs}
+
+    def close(self) -> None:
+        self.node.close()
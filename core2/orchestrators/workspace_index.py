@@ -0,0 +1,178 @@
+# core2/orchestrators/workspace_index.py — índice de scripts del workspace (contenido + lenguaje) con prebuild
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+WORKSPACE_POLL_S      = _env_int("GOZOLITE_WORKSPACE_POLL_S", 5)        # 0 => sin poller (sólo validación por stat)
+WORKSPACE_MAX_FILES   = _env_int("GOZOLITE_WORKSPACE_MAX_FILES", 5000)  # tope del recorrido
+WORKSPACE_MAX_BYTES   = _env_int("GOZOLITE_WORKSPACE_MAX_BYTES", 1024 * 1024)  # scripts más grandes no se cachean
+PREBUILD_WORKERS      = 2
+_SKIP_DIRS = {"__pycache__", "node_modules", "venv", "target", "build", "dist"}
+
+log = logging.getLogger("gozolite.workspace")
+
+
+@dataclass
+class Script:
+    language: Optional[str]   # inferido por extensión (None si no está en el mapa)
+    code: str
+    stamp: Tuple[int, int, int]  # (st_mtime_ns, st_size, st_ino)
+
+
+class WorkspaceIndex:
+    """
+    Cache de los scripts del workspace para `script_path`:
+    - `load(path)` valida con un `stat` (mtime_ns, tamaño, inodo) y devuelve el contenido cacheado;
+      sólo relee el archivo si cambió. Nunca devuelve contenido viejo.
+    - Un poller (cada GOZOLITE_WORKSPACE_POLL_S) recorre el workspace, indexa lo nuevo o modificado
+      y, para lenguajes compilados, llama a `prebuild(language, code)` en background: la próxima
+      ejecución del script encuentra el binario en ArtifactCache y va directo al run.
+    Polling por mtime (sin inotify: no hay binding en la stdlib); directorios ocultos y de build se saltean.
+    """
+
+    def __init__(self, root: Path, ext_map: Dict[str, str],
+                 prebuild: Optional[Callable[[str, str], Any]] = None,
+                 poll_s: Optional[int] = None, max_files: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root).resolve()
+        self.ext_map = dict(ext_map)
+        self.prebuild = prebuild
+        self.poll_s = WORKSPACE_POLL_S if poll_s is None else poll_s
+        self.max_files = max_files or WORKSPACE_MAX_FILES
+        self.max_bytes = max_bytes or WORKSPACE_MAX_BYTES
+        self.stats: Dict[str, int] = {"hits": 0, "reads": 0, "scans": 0, "changed": 0, "prebuilt": 0, "prebuild_failed": 0}
+        self._entries: Dict[Path, Script] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    # --------- Consulta ---------
+    def language(self, path: Path) -> Optional[str]:
+        return self.ext_map.get(path.suffix.lower())
+
+    def load(self, path: Path) -> Script:
+        """Contenido y lenguaje del script; OSError/UnicodeDecodeError si no se puede leer."""
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._lock:
+            hit = self._entries.get(path)
+            if hit is not None and hit.stamp == stamp:
+                self.stats["hits"] += 1
+                return hit
+        script = Script(self.language(path), Path(path).read_text(encoding="utf-8"), stamp)
+        with self._lock:
+            self.stats["reads"] += 1
+            if st.st_size <= self.max_bytes and len(self._entries) < self.max_files:
+                self._entries[path] = script
+        if hit is None or hit.code != script.code:
+            self._schedule_prebuild(path, script)  # el poller ya no lo verá como cambio
+        return script
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"root": str(self.root), "scripts": len(self._entries), "poll_s": self.poll_s, **self.stats}
+
+    # --------- Poller ---------
+    def start(self) -> None:
+        if self._thread is not None or self.poll_s <= 0:
+            return
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=PREBUILD_WORKERS, thread_name_prefix="gozolite-prebuild")
+        self._thread = threading.Thread(target=self._loop, name="gozolite-workspace", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:  # un error de recorrido no mata el poller
+                log.warning("workspace scan falló: %s", e)
+            self._stop.wait(self.poll_s)
+
+    def _walk(self):
+        stack, seen = [self.root], 0
+        while stack and seen < self.max_files:
+            d = stack.pop()
+            try:
+                with os.scandir(d) as it:
+                    for e in it:
+                        if e.name.startswith(".") or e.name in _SKIP_DIRS:
+                            continue
+                        if e.is_dir(follow_symlinks=False):
+                            stack.append(e.path)
+                        elif e.is_file(follow_symlinks=False) and os.path.splitext(e.name)[1].lower() in self.ext_map:
+                            seen += 1
+                            yield Path(e.path), e.stat(follow_symlinks=False)
+                            if seen >= self.max_files:
+                                return
+            except OSError:
+                continue
+
+    def scan(self) -> int:
+        """Una pasada: indexa lo nuevo/modificado, olvida lo borrado y agenda prebuilds. Devuelve cuántos cambiaron."""
+        changed, present = 0, set()
+        for path, st in self._walk():
+            present.add(path)
+            if st.st_size > self.max_bytes:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+            with self._lock:
+                old = self._entries.get(path)
+            if old is not None and old.stamp == stamp:
+                continue
+            try:
+                script = Script(self.language(path), path.read_text(encoding="utf-8"), stamp)
+            except (OSError, UnicodeDecodeError):
+                continue
+            with self._lock:
+                self._entries[path] = script
+            changed += 1
+            if old is None or old.code != script.code:
+                self._schedule_prebuild(path, script)
+        with self._lock:
+            for gone in [p for p in self._entries if p not in present]:
+                del self._entries[gone]
+            self.stats["scans"] += 1
+            self.stats["changed"] += changed
+        return changed
+
+    def _schedule_prebuild(self, path: Path, script: Script) -> None:
+        if self.prebuild is None or self._pool is None or script.language is None:
+            return
+
+        def _run() -> None:
+            try:
+                built = self.prebuild(script.language, script.code)
+            except Exception as e:
+                log.warning("prebuild de %s falló: %s", path, e)
+                built = False
+            if built is None:
+                return  # interpretado: nada que compilar
+            with self._lock:
+                self.stats["prebuilt" if built else "prebuild_failed"] += 1
+
+        try:
+            self._pool.submit(_run)
+        except RuntimeError:
+            pass  # pool cerrado (apagado)
@@ -0,0 +1,26 @@
+-- demo.sql — fixture de ejemplo para ejercicios SQL (fixture="demo")
+CREATE TABLE departments (
+  id    INTEGER PRIMARY KEY,
+  name  TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE employees (
+  id            INTEGER PRIMARY KEY,
+  name          TEXT NOT NULL,
+  department_id INTEGER REFERENCES departments(id),
+  salary        REAL NOT NULL,
+  hired_on      TEXT NOT NULL
+);
+
+INSERT INTO departments (id, name) VALUES
+  (1, 'Engineering'), (2, 'Sales'), (3, 'Support'), (4, 'Research');
+
+INSERT INTO employees (id, name, department_id, salary, hired_on) VALUES
+  (1, 'Ana',     1, 5200.0, '2019-03-01'),
+  (2, 'Bruno',   1, 4800.0, '2020-07-15'),
+  (3, 'Carla',   2, 3900.0, '2018-11-20'),
+  (4, 'Diego',   2, 4100.0, '2021-01-10'),
+  (5, 'Elena',   3, 3100.0, '2022-05-02'),
+  (6, 'Fabián',  3, 3300.0, '2017-09-30'),
+  (7, 'Gala',    1, 6100.0, '2016-02-14'),
+  (8, 'Hugo',    NULL, 2800.0, '2023-04-01');
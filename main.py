@@ -1,7 +1,8 @@
 # main.py
 from __future__ import annotations
 import os
-from typing import Dict, Any, Optional, Iterable
+import time
+from typing import Dict, Any, Optional, Iterable, Iterator
 
 # ---------------- Memory (shim si falta) ----------------
 try:
@@ -17,6 +18,7 @@ except Exception:
 
 # ---------------- Orquestador base ----------------
 from core2.orchestrators.gozo_lite import GozoLite
+from security.traffic_recorder import TrafficRecorder
 
 # ---------------- Utils ENV ----------------
 def _env_int(name: str, default: int) -> int:
@@ -71,7 +73,15 @@ class _ClampGuard:
 class MainApp:
     def __init__(self):
         self.memory = Memory(max_events=int(os.getenv("MEMORY_MAX_EVENTS", "20")))
-        base = GozoLite(self.memory)
+        agents = [u.strip() for u in os.getenv("GOZOLITE_AGENTS", "").split(",") if u.strip()]
+        if agents:
+            # Modo dispatcher: los jobs corren en runner agents remotos (workers/agent.py)
+            from workers.dispatcher import Dispatcher
+            base = Dispatcher(agents, self.memory)
+            self.memory.add("system", f"[Main] Dispatcher con {len(agents)} agentes")
+        else:
+            base = GozoLite(self.memory)
+        self.base = base  # orquestador sin capas (canaries, estado de agentes)
 
         if SECURE_AVAILABLE:
             # Seguridad avanzada: validator + policy + audit + rusage
@@ -86,7 +96,24 @@ class MainApp:
             self.mode_name = "gozo-lite+clamp"
             self.memory.add("system", "[Main] Orchestrator=GozoLite + ClampGuard (fallback)")
 
-    def submit(self, language: str, code: str, timeout: int = 10, memory_mb: int = 256) -> Dict[str, Any]:
+        # Grabación muestreada de tráfico para replay (GOZOLITE_CAPTURE_PATH; None => apagada)
+        self.recorder = TrafficRecorder.from_env()
+
+    def submit(self, language: str, code: str, timeout: int = 10, memory_mb: int = 256,
+               stdin: Optional[str] = None, **options: Any) -> Dict[str, Any]:
+        if self.recorder is None or not self.recorder.sampled():
+            return self._submit(language, code, timeout, memory_mb, stdin, **options)
+        arrival, started = time.time(), time.monotonic()
+        out = self._submit(language, code, timeout, memory_mb, stdin, **options)
+        self.recorder.record(arrival, dict(options, language=language, code=code, timeout=timeout,
+                                           memory_mb=memory_mb, stdin=stdin),
+                             out, (time.monotonic() - started) * 1000)
+        return out
+
+    def _submit(self, language: str, code: str, timeout: int = 10, memory_mb: int = 256,
+                stdin: Optional[str] = None, **options: Any) -> Dict[str, Any]:
+        # options: stdin_path, files (entradas spooleadas), datasets (store por contenido), project (modo multi-archivo),
+        #          profile/profile_interval_ms (timeline de recursos)
         # Camino con seguridad avanzada
         if self.orchestrator is not None:
             res = self.orchestrator.submit(
@@ -94,13 +121,15 @@ class MainApp:
                 code=code,
                 timeout=timeout,
                 memory_mb=memory_mb,
+                stdin=stdin,
+                **options,
             )
             # Normalización
             ok = bool(res.get("ok", res.get("exit_code", 1) == 0))
             exit_code = int(res.get("exit_code", 1))
             mode = str(res.get("mode", self.mode_name))
             self.memory.add("system", f"[Main.submit] mode={mode} ok={ok} exit={exit_code} lang={language}")
-            return {
+            out = {
                 "ok": ok,
                 "exit_code": exit_code,
                 "stdout": str(res.get("stdout", "")),
@@ -108,6 +137,13 @@ class MainApp:
                 "time_ms": int(res.get("time_ms", 0)),
                 "mode": mode,
             }
+            if res.get("blocks") is not None:
+                out["blocks"] = res["blocks"]  # modo pipeline (language="auto")
+            if res.get("result_sets") is not None:
+                out["result_sets"] = res["result_sets"]  # motor SQL in-process
+            if res.get("profile") is not None:
+                out["profile"] = res["profile"]  # profile=true
+            return out
 
         # Fallback sencillo con clamps
         raw_payload = {
@@ -115,6 +151,8 @@ class MainApp:
             "code": code,
             "timeout": timeout,
             "memory_mb": memory_mb,
+            "stdin": stdin,
+            **options,
         }
         guarded = self._guard.enforce(raw_payload)
         if isinstance(guarded, dict) and guarded.get("mode") == "guard-block":
@@ -134,7 +172,7 @@ class MainApp:
         exit_code = int(res.get("exit_code", 1))
         mode = str(res.get("mode", self.mode_name))
         self.memory.add("system", f"[Main.submit] mode={mode} ok={ok} exit={exit_code} lang={payload.get('language')}")
-        return {
+        out = {
             "ok": ok,
             "exit_code": exit_code,
             "stdout": str(res.get("stdout", "")),
@@ -142,6 +180,134 @@ class MainApp:
             "time_ms": int(res.get("time_ms", 0)),
             "mode": mode,
         }
+        if res.get("blocks") is not None:
+            out["blocks"] = res["blocks"]
+        if res.get("result_sets") is not None:
+            out["result_sets"] = res["result_sets"]
+        if res.get("profile") is not None:
+            out["profile"] = res["profile"]
+        return out
+
+    def stream(self, language: str, code: str, timeout: int = 10, memory_mb: int = 256,
+               stdin: Optional[str] = None, **options: Any) -> Iterator[Dict[str, Any]]:
+        """Como submit(), pero entrega eventos stdout/stderr incrementales y un evento final 'exit'."""
+        if self.orchestrator is not None:
+            events = self.orchestrator.stream(
+                language=(language or "python"),
+                code=code,
+                timeout=timeout,
+                memory_mb=memory_mb,
+                stdin=stdin,
+                **options,
+            )
+        else:
+            raw_payload = {"language": language, "code": code, "timeout": timeout, "memory_mb": memory_mb,
+                           "stdin": stdin, **options}
+            guarded = self._guard.enforce(raw_payload)
+            if isinstance(guarded, dict) and guarded.get("mode") == "guard-block":
+                self.memory.add("system", f"[Guard.block] lang={language} reason={guarded.get('stderr','')}")
+                yield {
+                    "event": "exit",
+                    "ok": False,
+                    "exit_code": int(guarded.get("exit_code", 2)),
+                    "stderr": str(guarded.get("stderr", "Bloqueado por política de seguridad")),
+                    "time_ms": 0,
+                    "mode": "guard-block",
+                }
+                return
+            events = self._base.stream(guarded)
+
+        try:
+            for evt in events:
+                if evt.get("event") == "exit":
+                    exit_code = int(evt.get("exit_code", 1))
+                    mode = str(evt.get("mode", self.mode_name))
+                    self.memory.add("system", f"[Main.stream] mode={mode} exit={exit_code} lang={language}")
+                    evt = {
+                        "event": "exit",
+                        "ok": bool(evt.get("ok", exit_code == 0)),
+                        "exit_code": exit_code,
+                        "stderr": str(evt.get("stderr", "")),
+                        "time_ms": int(evt.get("time_ms", 0)),
+                        "mode": mode,
+                        **({"profile": evt["profile"]} if evt.get("profile") is not None else {}),
+                    }
+                yield evt
+        finally:
+            events.close()
+
+    def judge(self, language: str, code: str, cases: list, timeout: int = 10, memory_mb: int = 256,
+              **options: Any) -> Dict[str, Any]:
+        """Compila una vez y corre `cases` ({stdin|stdin_path, expected}); devuelve veredicto por caso."""
+        if self.orchestrator is not None:
+            res = self.orchestrator.judge(language=(language or "python"), code=code, cases=cases,
+                                          timeout=timeout, memory_mb=memory_mb, **options)
+        else:
+            raw_payload = {"language": language, "code": code, "timeout": timeout, "memory_mb": memory_mb,
+                           "cases": cases, **options}
+            guarded = self._guard.enforce(raw_payload)
+            if isinstance(guarded, dict) and guarded.get("mode") == "guard-block":
+                self.memory.add("system", f"[Guard.block] lang={language} reason={guarded.get('stderr','')}")
+                return dict(guarded, cases=[], passed=0, total=len(cases))
+            res = self._base.judge(guarded)
+
+        exit_code = int(res.get("exit_code", 1))
+        mode = str(res.get("mode", self.mode_name))
+        self.memory.add("system", f"[Main.judge] mode={mode} exit={exit_code} lang={language} "
+                                  f"passed={res.get('passed', 0)}/{res.get('total', len(cases))}")
+        return {
+            "ok": bool(res.get("ok", exit_code == 0)),
+            "exit_code": exit_code,
+            "stdout": str(res.get("stdout", "")),
+            "stderr": str(res.get("stderr", "")),
+            "time_ms": int(res.get("time_ms", 0)),
+            "mode": mode,
+            "compile": res.get("compile"),
+            "passed": int(res.get("passed", 0)),
+            "total": int(res.get("total", len(cases))),
+            "cases": list(res.get("cases") or []),
+        }
+
+    # ---------------- Sesiones (kernels persistentes) ----------------
+    def session_open(self, language: str, memory_mb: int = 256, owner: Optional[str] = None) -> Dict[str, Any]:
+        """Abre un kernel (python, ruby, perl, lua, r, php); SessionError si no se puede."""
+        if self.orchestrator is not None:
+            info = self.orchestrator.session_open(language=language, memory_mb=memory_mb, owner=owner)
+        else:
+            info = self._base.sessions.open((language or "").strip().lower(),
+                                            min(memory_mb, self._guard.max_memory_mb), owner=owner)
+        self.memory.add("system", f"[Main.session_open] lang={language} id={info.get('session_id')}")
+        return info
+
+    def session_execute(self, session_id: str, code: str, timeout: int = 10,
+                        owner: Optional[str] = None) -> Dict[str, Any]:
+        if self.orchestrator is not None:
+            res = self.orchestrator.session_execute(session_id=session_id, code=code, timeout=timeout, owner=owner)
+        else:
+            res = self._base.sessions.execute(session_id, code, min(timeout, self._guard.max_timeout), owner=owner)
+        exit_code = int(res.get("exit_code", 1))
+        mode = str(res.get("mode", self.mode_name))
+        self.memory.add("system", f"[Main.session_execute] mode={mode} exit={exit_code} id={session_id}")
+        return {
+            "ok": bool(res.get("ok", exit_code == 0)),
+            "exit_code": exit_code,
+            "stdout": str(res.get("stdout", "")),
+            "stderr": str(res.get("stderr", "")),
+            "time_ms": int(res.get("time_ms", 0)),
+            "mode": mode,
+            "session_id": session_id,
+            "cell": res.get("cell"),
+        }
+
+    def session_close(self, session_id: str, owner: Optional[str] = None) -> bool:
+        if self.orchestrator is not None:
+            return self.orchestrator.session_close(session_id=session_id, owner=owner)
+        return self._base.sessions.close(session_id, owner=owner)
+
+    def sessions(self, owner: Optional[str] = None) -> Dict[str, Any]:
+        if self.orchestrator is not None:
+            return self.orchestrator.sessions(owner=owner)
+        return self._base.sessions.snapshot(owner)
 
     def status(self, job_id: str):
         try:
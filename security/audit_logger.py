@@ -1,7 +1,7 @@
 from __future__ import annotations
 import json, os, uuid, time
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 AUDIT_PATH = os.getenv("SEC_AUDIT_PATH", "/tmp/gozolite_audit.jsonl")
 
@@ -22,24 +22,34 @@ class AuditTrail:
         self.request = request
         self.started_monotonic = time.monotonic()
 
-    def start(self, policy: Dict[str, Any]) -> None:
-        write_audit({
+    def start(self, policy: Dict[str, Any], datasets: Optional[List[Dict[str, Any]]] = None,
+              session_id: Optional[str] = None) -> None:
+        entry = {
             "ts": _ts(), "evt": "START",
             "job_id": self.job_id,
             "request": {"language": self.request.get("language"), "code_len": len((self.request.get("code") or "").encode("utf-8"))},
             "policy": policy,
-        })
+        }
+        if datasets:
+            entry["datasets"] = datasets  # qué datasets (nombre en el workdir, sha256, bytes) leyó el job
+        if session_id:
+            entry["session_id"] = session_id  # celda de una sesión persistente
+        write_audit(entry)
 
-    def end(self, result: Dict[str, Any], resources: Optional[Dict[str, Any]] = None) -> None:
+    def end(self, result: Dict[str, Any], resources: Optional[Dict[str, Any]] = None,
+            cancelled: Optional[str] = None) -> None:
+        """END del job; si fue cancelado (DELETE /jobs, cliente desconectado) se registra como CANCEL con el motivo."""
         elapsed_ms = int((time.monotonic() - self.started_monotonic) * 1000)
+        entry: Dict[str, Any] = {"reason": cancelled} if cancelled else {}
         write_audit({
-            "ts": _ts(), "evt": "END",
+            "ts": _ts(), "evt": "CANCEL" if cancelled else "END",
             "job_id": self.job_id,
+            **entry,
             "elapsed_ms": elapsed_ms,
             "result": {
                 "exit_code": result.get("exit_code"),
-                "stdout_len": len((result.get("stdout") or "")),
-                "stderr_len": len((result.get("stderr") or "")),
+                "stdout_len": result.get("stdout_len", len((result.get("stdout") or ""))),
+                "stderr_len": result.get("stderr_len", len((result.get("stderr") or ""))),
                 "mode": result.get("mode"),
                 "language": result.get("language"),
             },
@@ -6,6 +6,7 @@ from typing import Tuple, Optional, Dict, Pattern, Iterable
 MAX_CODE_BYTES = int(os.getenv("SEC_MAX_CODE_BYTES", "65536"))     # 64 KiB
 MAX_LINES      = int(os.getenv("SEC_MAX_LINES", "1200"))
 MAX_BLOCKS     = int(os.getenv("SEC_MAX_BLOCKS", "20"))            # si usás fences
+MAX_STDIN_BYTES = int(os.getenv("SEC_MAX_STDIN_BYTES", "1048576"))  # 1 MiB inline; más grande => /inputs
 ALLOW_NET      = os.getenv("SEC_ALLOW_NET", "false").lower() in ("1","true","yes")
 
 # Si querés whitelistear lenguajes: "python,node,c,cpp,go,rust,java,sql,..."
@@ -36,7 +37,7 @@ LANG_DENY_MAP: Dict[str, Iterable[Pattern]] = {
     "sh": _SHELL_DENY,
 }
 
-def validate_request(language: str, code: str, blocks: int = 1) -> Tuple[bool, Optional[str]]:
+def validate_request(language: str, code: str, blocks: int = 1, stdin: Optional[str] = None) -> Tuple[bool, Optional[str]]:
     lang = (language or "").strip().lower()
     if LANG_WHITELIST and lang and (lang not in LANG_WHITELIST and lang != "auto"):
         return False, f"Lenguaje '{lang}' no permitido por política (SEC_LANG_WHITELIST)."
@@ -51,6 +52,9 @@ def validate_request(language: str, code: str, blocks: int = 1) -> Tuple[bool, O
     if code.count("\n") + 1 > MAX_LINES:
         return False, f"Demasiadas líneas de código (> {MAX_LINES})."
 
+    if stdin is not None and len(stdin) > MAX_STDIN_BYTES:  # en caracteres: evita codificar una copia
+        return False, f"stdin inline demasiado grande (> {MAX_STDIN_BYTES} bytes); usar /inputs."
+
     # Deny patterns
     for pat in _GLOBAL_DENY:
         if pat.search(code):
@@ -1,28 +1,96 @@
 from __future__ import annotations
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+import os
 
-from .input_validator import validate_request
+from .input_validator import validate_request, MAX_BLOCKS
+from core2.orchestrators.project_files import BuildError, load_files
+from core2.orchestrators.pipeline import PipelineError, parse_blocks
+from core2.orchestrators.sessions import SessionError
+from core2.orchestrators.supervisor import Usage, supervisor
 from .policy_enforcer import build_policy, policy_dict
 from .audit_logger import AuditTrail
-from .resource_monitor import snapshot_rusage, diff_usage
+
+MAX_JUDGE_CASES = int(os.getenv("SEC_MAX_JUDGE_CASES", "200"))  # casos por llamada a /judge
 
 class SecureMiddleware:
     """
     Envoltorio de seguridad para un orquestador estilo GozoLite.
     - Valida input (deny patterns, tamaño, líneas, bloques)
     - Ajusta timeout/memoria (clamp) según política
-    - Audita START/END/REJECT a JSONL
+    - Audita START/END/REJECT (y CANCEL para jobs cancelados) a JSONL
     - Toma rusage (aprox) antes/después
     """
 
     def __init__(self, orchestrator: Any):
         self.orch = orchestrator
 
-    def submit(self, *, language: str, code: str, timeout: int, memory_mb: int, stdin: Optional[str] = None) -> Dict[str, Any]:
+    @staticmethod
+    def _validate(language: str, code: str, stdin: Optional[str], options: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+        """
+        validate_request sobre el código (o sobre cada bloque del pipeline / archivo de texto del proyecto).
+        En modo proyecto deja los archivos ya decodificados en options["project"]["_files"].
+        """
+        if (language or "").strip().lower() == "auto":
+            # Pipeline: cada bloque se valida con las reglas de su propio lenguaje
+            try:
+                blocks = parse_blocks(code, max_blocks=MAX_BLOCKS)
+            except PipelineError as e:
+                return False, str(e)
+            for b in blocks:
+                ok, reason = validate_request(b.language, b.code, blocks=len(blocks), stdin=stdin)
+                if not ok:
+                    return False, f"bloque {b.id}: {reason}"
+            return True, None
+        project = options.get("project")
+        if not project:
+            return validate_request(language, code, blocks=1, stdin=stdin)
+        try:
+            files = load_files(project)
+        except BuildError as e:
+            return False, e.stderr
+        for rel, data in files.items():
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                continue  # binarios (assets): no aplican deny patterns de código
+            ok, reason = validate_request(language, text, blocks=1, stdin=stdin)
+            if not ok:
+                return False, f"{rel}: {reason}"
+        options["project"] = {"_files": files, "entry": project.get("entry")}
+        return True, None
+
+    @staticmethod
+    def _datasets(options: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Accesos a datasets del job para la auditoría (el blob se llama como su sha256)."""
+        out = []
+        for name, path in sorted((options.get("datasets") or {}).items()):
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None
+            out.append({"name": name, "sha256": os.path.basename(str(path)), "bytes": size})
+        return out
+
+    @staticmethod
+    def _payload(language: str, code: str, pol: Any, stdin: Optional[str], options: Dict[str, Any]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "language": (language or "").strip().lower(),
+            "code": code,
+            "timeout": pol.timeout,
+            "memory_mb": pol.memory_mb,
+        }
+        if stdin is not None:
+            payload["stdin"] = stdin
+        # Opciones extra del orquestador (stdin_path, files, project, ...): solo si vienen
+        payload.update({k: v for k, v in options.items() if v})
+        return payload
+
+    def submit(self, *, language: str, code: str, timeout: int, memory_mb: int, stdin: Optional[str] = None,
+               **options: Any) -> Dict[str, Any]:
         req = {"language": language, "code": code}
         audit = AuditTrail(req)
 
-        ok, reason = validate_request(language, code, blocks=1)
+        ok, reason = self._validate(language, code, stdin, options)
         if not ok:
             audit.reject(reason)
             return {
@@ -33,36 +101,185 @@ class SecureMiddleware:
             }
 
         pol = build_policy(timeout, memory_mb)
-        audit.start(policy_dict(pol))
+        audit.start(policy_dict(pol), datasets=self._datasets(options))
 
-        # rusage antes
-        before = snapshot_rusage()
+        # recursos de los procesos de este job (no el RUSAGE_CHILDREN de toda la API)
+        usage = Usage()
 
-        payload = {
-            "language": (language or "").strip().lower(),
-            "code": code,
-            "timeout": pol.timeout,
-            "memory_mb": pol.memory_mb,
-        }
-        if stdin is not None:
-            payload["stdin"] = stdin
+        payload = self._payload(language, code, pol, stdin, options)
 
         try:
-            # GozoLite expone execute(payload) o run/submit con kwargs
-            if hasattr(self.orch, "execute"):
-                res = self.orch.execute(payload=payload)
-            elif hasattr(self.orch, "run"):
-                res = self.orch.run(**payload)
-            elif hasattr(self.orch, "submit"):
-                res = self.orch.submit(**payload)
+            with supervisor.metered(usage):
+                # GozoLite expone execute(payload) o run/submit con kwargs
+                if hasattr(self.orch, "execute"):
+                    res = self.orch.execute(payload=payload)
+                elif hasattr(self.orch, "run"):
+                    res = self.orch.run(**payload)
+                elif hasattr(self.orch, "submit"):
+                    res = self.orch.submit(**payload)
+                else:
+                    res = {"exit_code": 2, "stdout": "", "stderr": "Orquestador no expone execute/run/submit", "mode": "secure"}
+
+        except Exception as e:
+            res = {"exit_code": 1, "stdout": "", "stderr": f"orchestrator error: {e}", "mode": "secure"}
+
+        audit.end(res, resources=usage.snapshot(), cancelled=supervisor.cancelled())
+        return res
+
+    def stream(self, *, language: str, code: str, timeout: int, memory_mb: int, stdin: Optional[str] = None,
+               **options: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Variante streaming de submit(): misma validación/política/auditoría,
+        pero reenvía los eventos del orquestador sin acumular stdout/stderr.
+        """
+        req = {"language": language, "code": code}
+        audit = AuditTrail(req)
+
+        ok, reason = self._validate(language, code, stdin, options)
+        if not ok:
+            audit.reject(reason)
+            yield {
+                "event": "exit",
+                "exit_code": 2,
+                "mode": getattr(self.orch, "MODE", "secure"),
+                "stderr": f"Bloqueado por política: {reason}",
+            }
+            return
+
+        pol = build_policy(timeout, memory_mb)
+        audit.start(policy_dict(pol), datasets=self._datasets(options))
+        usage = Usage()
+
+        payload = self._payload(language, code, pol, stdin, options)
+
+        sizes = {"stdout": 0, "stderr": 0}
+        final: Dict[str, Any] = {"event": "exit", "exit_code": 1, "mode": "secure", "stderr": "stream sin evento final"}
+        events = self.orch.stream(payload=payload) if hasattr(self.orch, "stream") else None
+        try:
+            if events is None:
+                final = {"event": "exit", "exit_code": 2, "mode": "secure", "stderr": "Orquestador no expone stream"}
             else:
-                res = {"exit_code": 2, "stdout": "", "stderr": "Orquestador no expone execute/run/submit", "mode": "secure"}
+                while True:
+                    # el generador lanza y cosecha procesos dentro de next(): se mide ahí, no entre yields
+                    with supervisor.metered(usage):
+                        evt = next(events, None)
+                    if evt is None:
+                        break
+                    if evt.get("event") == "exit":
+                        final = evt
+                        break
+                    sizes[evt["event"]] = sizes.get(evt["event"], 0) + len(evt.get("data", ""))
+                    yield evt
+        except Exception as e:
+            final = {"event": "exit", "exit_code": 1, "mode": "secure", "stderr": f"orchestrator error: {e}"}
+        finally:
+            if events is not None:
+                with supervisor.metered(usage):
+                    events.close()  # cliente desconectado => el orquestador mata el proceso
+            summary = dict(final)
+            summary["stdout_len"] = sizes["stdout"]
+            summary["stderr_len"] = sizes["stderr"] + len(final.get("stderr") or "")
+            audit.end(summary, resources=usage.snapshot(), cancelled=supervisor.cancelled())
+        yield final
+
+    def judge(self, *, language: str, code: str, cases: List[Dict[str, Any]], timeout: int, memory_mb: int,
+              **options: Any) -> Dict[str, Any]:
+        """
+        Modo juez: el código se valida una vez, cada stdin inline por separado;
+        timeout/memory_mb se aplican por caso. Un único START/END en auditoría.
+        """
+        req = {"language": language, "code": code}
+        audit = AuditTrail(req)
+
+        ok, reason = validate_request(language, code, blocks=1)
+        if ok and len(cases) > MAX_JUDGE_CASES:
+            ok, reason = False, f"Demasiados casos ({len(cases)} > {MAX_JUDGE_CASES})."
+        for i, case in enumerate(cases):
+            if not ok:
+                break
+            ok, reason = validate_request(language, "", blocks=1, stdin=case.get("stdin"))
+            if not ok:
+                reason = f"caso {i}: {reason}"
+        if not ok:
+            audit.reject(reason)
+            return {
+                "exit_code": 2,
+                "mode": getattr(self.orch, "MODE", "secure"),
+                "stdout": "",
+                "stderr": f"Bloqueado por política: {reason}",
+            }
+
+        pol = build_policy(timeout, memory_mb)
+        audit.start(policy_dict(pol))
+        usage = Usage()
 
+        payload = self._payload(language, code, pol, None, options)
+        payload["cases"] = cases
+        try:
+            with supervisor.metered(usage):
+                if hasattr(self.orch, "judge"):
+                    res = self.orch.judge(payload=payload)
+                else:
+                    res = {"exit_code": 2, "stdout": "", "stderr": "Orquestador no expone judge", "mode": "secure"}
         except Exception as e:
             res = {"exit_code": 1, "stdout": "", "stderr": f"orchestrator error: {e}", "mode": "secure"}
 
-        # rusage después
-        after = snapshot_rusage()
-        usage = diff_usage(before, after)
-        audit.end(res, resources=usage)
-        return res
\ No newline at end of file
+        resources = usage.snapshot()
+        # el juez mide la memoria por caso: sus memory_limit son los OOM del job aunque no haya SIGKILL
+        resources["memory_limit_cases"] = sum(c.get("verdict") == "memory_limit" for c in res.get("cases") or [])
+        audit.end(res, resources=resources, cancelled=supervisor.cancelled())
+        return res
+
+    # --------- Sesiones (kernels persistentes) ---------
+    def _session_manager(self) -> Any:
+        mgr = getattr(self.orch, "sessions", None)
+        if mgr is None:
+            raise SessionError(501, "Sesiones no disponibles con este orquestador")
+        return mgr
+
+    def session_open(self, *, language: str, memory_mb: int, owner: Optional[str] = None) -> Dict[str, Any]:
+        """Abre un kernel; memory_mb pasa por la misma política que un job."""
+        lang = (language or "").strip().lower()
+        ok, reason = validate_request(lang, "", blocks=1)
+        if not ok:
+            raise SessionError(403, f"Bloqueado por política: {reason}")
+        pol = build_policy(None, memory_mb)
+        return self._session_manager().open(lang, pol.memory_mb, owner=owner)
+
+    def session_execute(self, *, session_id: str, code: str, timeout: int, owner: Optional[str] = None) -> Dict[str, Any]:
+        """Una celda: misma validación, clamp de timeout y START/END de auditoría que un job (con session_id)."""
+        mgr = self._session_manager()
+        session = mgr.get(session_id, owner)
+        audit = AuditTrail({"language": session.language, "code": code})
+
+        ok, reason = validate_request(session.language, code, blocks=1)
+        if not ok:
+            audit.reject(reason)
+            return {
+                "exit_code": 2,
+                "mode": mgr.MODE,
+                "stdout": "",
+                "stderr": f"Bloqueado por política: {reason}",
+                "session_id": session_id,
+            }
+
+        pol = build_policy(timeout, session.memory_mb)
+        audit.start(policy_dict(pol), session_id=session_id)
+        usage = Usage()  # el kernel no se cosecha por celda: la sesión suma el CPU de la celda
+        try:
+            with supervisor.metered(usage):
+                res = mgr.execute(session_id, code, pol.timeout, owner=owner)
+        except SessionError:
+            raise
+        except Exception as e:
+            res = {"exit_code": 1, "stdout": "", "stderr": f"orchestrator error: {e}", "mode": mgr.MODE,
+                   "session_id": session_id}
+        # DELETE /jobs o desconexión => CANCEL, no END
+        audit.end(res, resources=usage.snapshot(), cancelled=supervisor.cancelled())
+        return res
+
+    def session_close(self, *, session_id: str, owner: Optional[str] = None) -> bool:
+        return self._session_manager().close(session_id, owner=owner)
+
+    def sessions(self, *, owner: Optional[str] = None) -> Dict[str, Any]:
+        return self._session_manager().snapshot(owner)
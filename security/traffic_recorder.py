@@ -0,0 +1,246 @@
+# security/traffic_recorder.py — grabación muestreada de tráfico (payload completo + llegada) para replay
+from __future__ import annotations
+import atexit, gzip, hashlib, json, logging, os, random, re, threading, time
+from typing import Any, Dict, List, Optional
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+CAPTURE_PATH      = os.getenv("GOZOLITE_CAPTURE_PATH", "")               # vacío => grabación apagada
+CAPTURE_SAMPLE    = _env_float("GOZOLITE_CAPTURE_SAMPLE", 0.1)            # fracción de requests grabados
+CAPTURE_MAX_MB    = _env_int("GOZOLITE_CAPTURE_MAX_MB", 512)              # tope del archivo; después deja de grabar
+CAPTURE_MAX_INPUT = _env_int("GOZOLITE_CAPTURE_MAX_INPUT_BYTES", 1024 * 1024)  # stdin/archivos más grandes no se copian
+CAPTURE_REDACT    = os.getenv("GOZOLITE_CAPTURE_REDACT", "")              # JSON con reglas de redacción
+FLUSH_RECORDS     = 64   # registros por miembro gzip
+FLUSH_S           = 2.0  # o cada tanto, lo que pase primero
+
+# Secretos típicos; se aplican siempre salvo {"defaults": false} en las reglas
+DEFAULT_PATTERNS = [
+    r"-----BEGIN [A-Z ]*PRIVATE KEY-----[\s\S]*?-----END [A-Z ]*PRIVATE KEY-----",
+    r"\bAKIA[0-9A-Z]{16}\b",
+    r"\bgh[pousr]_[A-Za-z0-9]{36,}\b",
+    r"\bxox[abpr]-[A-Za-z0-9-]{10,}\b",
+    r"(?i)\b(?:password|passwd|secret|token|api[_-]?key)\b\s*[:=]\s*['\"]?(?P<value>[^\s'\"]+)",
+]
+REPLACEMENT = "<redacted>"
+_CARRIED = ("fixture", "compile_tier", "profile", "profile_interval_ms", "project")  # options que se reproducen tal cual
+
+log = logging.getLogger("gozolite.capture")
+
+
+def digest(s: str) -> str:
+    """Hash corto (sha256, 16 hex) para comparar código/salidas sin guardarlos."""
+    return hashlib.sha256(s.encode("utf-8", "replace")).hexdigest()[:16]
+
+
+class Redactor:
+    """
+    Reglas (JSON en GOZOLITE_CAPTURE_REDACT, archivo o literal):
+        {"patterns": ["regex", ...], "replacement": "<redacted>", "defaults": true,
+         "drop_code_languages": ["sql"], "drop_stdin": false}
+    - `patterns` (más los DEFAULT_PATTERNS) se reemplazan en código, stdin y archivos; si la regex
+      tiene un grupo `value`, sólo se tapa ese grupo (p. ej. el valor de `password = ...`).
+    - `drop_code_languages`: el código de esos lenguajes no se guarda (sólo largo y hash); el replay los saltea.
+    - `drop_stdin`: no guarda entradas (stdin/archivos), sólo largo y hash.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        rules = rules or {}
+        pats = list(rules.get("patterns") or [])
+        if rules.get("defaults", True):
+            pats = DEFAULT_PATTERNS + pats
+        self.patterns = [re.compile(p) for p in pats]
+        self.replacement = str(rules.get("replacement", REPLACEMENT))
+        self.drop_code = {str(x).lower() for x in rules.get("drop_code_languages") or []}
+        self.drop_stdin = bool(rules.get("drop_stdin", False))
+
+    @classmethod
+    def from_env(cls, spec: str = CAPTURE_REDACT) -> "Redactor":
+        if not spec:
+            return cls()
+        text = spec if spec.lstrip().startswith("{") else open(spec, encoding="utf-8").read()
+        return cls(json.loads(text))
+
+    def scrub(self, text: str) -> str:
+        for p in self.patterns:
+            if "value" in p.groupindex:  # clave=valor: sólo se tapa el grupo `value`
+                text = p.sub(lambda m: m.string[m.start():m.start("value")] + self.replacement
+                             + m.string[m.end("value"):m.end()], text)
+            else:
+                text = p.sub(self.replacement, text)
+        return text
+
+
+class TrafficRecorder:
+    """
+    Graba una muestra de los submits: llegada (epoch), payload completo (lenguaje, código, stdin,
+    límites, options reproducibles) y el resultado grabado (exit_code, wall_ms, hash del stdout).
+    Formato: JSONL en miembros gzip concatenados (se cierran cada FLUSH_RECORDS/FLUSH_S), así un
+    corte sólo pierde el último lote y el archivo siempre se puede leer con gzip.open.
+    Nunca rompe la ejecución: cualquier error de grabación se loguea y se descarta.
+    """
+
+    def __init__(self, path: str, sample: float = CAPTURE_SAMPLE, redactor: Optional[Redactor] = None,
+                 max_mb: Optional[int] = None, max_input: Optional[int] = None):
+        self.path = path
+        self.sample = max(0.0, min(1.0, sample))
+        self.redactor = redactor or Redactor()
+        self.max_bytes = (max_mb if max_mb is not None else CAPTURE_MAX_MB) * 1024 * 1024
+        self.max_input = max_input if max_input is not None else CAPTURE_MAX_INPUT
+        self.stats: Dict[str, int] = {"seen": 0, "recorded": 0, "redacted": 0, "dropped": 0, "bytes": 0}
+        self._buf: List[str] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["TrafficRecorder"]:
+        if not CAPTURE_PATH or CAPTURE_SAMPLE <= 0:
+            return None
+        try:
+            rec = cls(CAPTURE_PATH, CAPTURE_SAMPLE, Redactor.from_env())
+        except Exception as e:
+            log.warning("grabación de tráfico desactivada: %s", e)
+            return None
+        atexit.register(rec.flush)
+        return rec
+
+    # --------- Captura ---------
+    def sampled(self) -> bool:
+        with self._lock:
+            self.stats["seen"] += 1
+        return random.random() < self.sample
+
+    def _input(self, text: Optional[str], redacted: List[str], what: str) -> Dict[str, Any]:
+        if text is None:
+            return {}
+        if self.redactor.drop_stdin:
+            redacted.append(what)
+            return {"len": len(text), "sha": digest(text)}
+        clean = self.redactor.scrub(text)
+        if clean != text:
+            redacted.append(what)
+        return {"text": clean}
+
+    def _read(self, path: str) -> Optional[str]:
+        try:
+            if os.path.getsize(path) > self.max_input:
+                return None
+            with open(path, "rb") as f:
+                return f.read().decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def record(self, arrival: float, request: Dict[str, Any], result: Dict[str, Any], wall_ms: float) -> None:
+        """request: kwargs de MainApp.submit; arrival: time.time() al entrar."""
+        try:
+            self._append(self._entry(arrival, request, result, wall_ms))
+        except Exception as e:
+            log.warning("no se pudo grabar el request: %s", e)
+
+    def _entry(self, arrival: float, request: Dict[str, Any], result: Dict[str, Any], wall_ms: float) -> Dict[str, Any]:
+        language = str(request.get("language") or "")
+        code = request.get("code") or ""
+        redacted: List[str] = []
+        entry: Dict[str, Any] = {"t": round(arrival, 6), "language": language,
+                                 "timeout": request.get("timeout"), "memory_mb": request.get("memory_mb")}
+        if language.lower() in self.redactor.drop_code:
+            entry["code"] = None
+            entry["code_len"], entry["code_sha"] = len(code), digest(code)
+            redacted.append("code")
+        else:
+            entry["code"] = self.redactor.scrub(code)
+            if entry["code"] != code:
+                redacted.append("code")
+
+        stdin = request.get("stdin")
+        if stdin is None and request.get("stdin_path"):
+            stdin = self._read(str(request["stdin_path"]))
+            if stdin is None:
+                entry.setdefault("missing", []).append("stdin")
+        if stdin is not None:
+            entry["stdin"] = self._input(stdin, redacted, "stdin")
+        files = request.get("files") or {}
+        if files:
+            entry["files"] = {}
+            for name, p in files.items():
+                text = self._read(str(p))
+                if text is None:
+                    entry.setdefault("missing", []).append(f"files:{name}")
+                else:
+                    entry["files"][name] = self._input(text, redacted, f"files:{name}")
+        if request.get("datasets"):
+            entry.setdefault("missing", []).extend(f"datasets:{n}" for n in request["datasets"])
+        options = {k: request[k] for k in _CARRIED if request.get(k) is not None}
+        if entry["code"] is None and options.pop("project", None) is not None:
+            redacted.append("project")  # lenguaje sin código grabado: el proyecto tampoco
+        elif isinstance(options.get("project"), dict) and options["project"].get("files"):
+            project = dict(options["project"])
+            project["files"] = {k: self.redactor.scrub(str(v)) for k, v in project["files"].items()}
+            if project["files"] != options["project"]["files"]:
+                redacted.append("project")
+            options["project"] = project
+        if options:
+            entry["options"] = options
+        if redacted:
+            entry["redacted"] = redacted
+
+        stdout = str(result.get("stdout", ""))
+        entry["result"] = {"ok": bool(result.get("ok")), "exit_code": result.get("exit_code"),
+                           "mode": result.get("mode"), "time_ms": result.get("time_ms"),
+                           "wall_ms": round(wall_ms, 2), "stdout_len": len(stdout), "stdout_sha": digest(stdout)}
+        return entry
+
+    # --------- Escritura ---------
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            if self.stats["bytes"] >= self.max_bytes:
+                self.stats["dropped"] += 1
+                return
+            self._buf.append(line)
+            self.stats["recorded"] += 1
+            self.stats["redacted"] += 1 if entry.get("redacted") else 0
+            if len(self._buf) >= FLUSH_RECORDS or time.monotonic() - self._last_flush >= FLUSH_S:
+                self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buf:
+            return
+        data = gzip.compress(("\n".join(self._buf) + "\n").encode("utf-8"))
+        self._buf.clear()
+        self._last_flush = time.monotonic()
+        with open(self.path, "ab") as f:
+            f.write(data)
+        self.stats["bytes"] += len(data)
+
+    def flush(self) -> None:
+        with self._lock:
+            try:
+                self._flush_locked()
+            except OSError as e:
+                log.warning("no se pudo escribir la captura: %s", e)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": self.path, "sample": self.sample, "buffered": len(self._buf), **self.stats}
+
+
+def read_capture(path: str):
+    """Itera los registros de una captura; un último lote truncado (corte abrupto) se ignora."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            return
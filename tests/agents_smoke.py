@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# agents_smoke.py — Levanta N runner agents en localhost y prueba el Dispatcher:
+# ruteo por carga, afinidad por código repetido, streaming, expulsión y reintento; token de agente,
+# entradas como bytes (nunca rutas del host de la API) y sin reintento una vez enviado el job.
+# Los canaries de los agentes quedan apagados (GOZOLITE_CANARY_INTERVAL_S=0) salvo que se pida lo contrario.
+
+from __future__ import annotations
+import os, sys, json, socket, subprocess, tempfile, threading, time, urllib.error, urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("GOZOLITE_AGENT_TOKEN", "smoke-token")  # antes de importar: agentes y dispatcher lo leen
+
+from workers.dispatcher import Dispatcher
+from core2.orchestrators.input_spool import InputSpool
+
+N_AGENTS = int(os.getenv("SMOKE_AGENTS", "3"))
+SLOTS    = int(os.getenv("SMOKE_AGENT_SLOTS", "2"))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_up(port: int, timeout: float = 20) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+class _DropAfterSend(BaseHTTPRequestHandler):
+    """Agente falso: sano en /health, pero corta la conexión después de recibir el job entero."""
+    posts = 0
+
+    def log_message(self, *_args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        data = json.dumps({"agent_id": f"drop-{self.server.server_port}", "slots": 2, "languages": ["bash"]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        type(self).posts += 1
+        self.close_connection = True  # sin respuesta: el job "pudo haber corrido"
+
+
+def _post(url: str, body: dict, token: str = "") -> int:
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"X-Agent-Token": token} if token else {})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run_all() -> int:
+    procs, urls = [], []
+    for i in range(N_AGENTS):
+        port = _free_port()
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "workers.agent", "--port", str(port), "--slots", str(SLOTS), "--id", f"agent-{i}"],
+            cwd=ROOT, stdout=subprocess.DEVNULL,
+            env=dict(os.environ, GOZOLITE_CANARY_INTERVAL_S=os.getenv("GOZOLITE_CANARY_INTERVAL_S", "0")),
+        ))
+        urls.append(f"http://127.0.0.1:{port}")
+    checks = []
+
+    def check(name: str, ok: bool, detail: object = "") -> None:
+        checks.append({"check": name, "ok": bool(ok), "detail": detail})
+        print(f"=== [{name}] {'OK' if ok else 'FAIL'} {detail}")
+
+    try:
+        for u in urls:
+            _wait_up(int(u.rsplit(":", 1)[1]))
+        d = Dispatcher(urls, health_interval=0.5)
+        check("health", all(a["healthy"] for a in d.status()), [a["agent_id"] for a in d.status()])
+
+        job = {"language": "python", "code": 'print("hello agent")', "timeout": 10, "memory_mb": 256}
+        first = d.execute(dict(job))
+        check("execute", first.get("exit_code") == 0 and "hello agent" in first.get("stdout", ""), first.get("agent"))
+
+        again = [d.execute(dict(job)).get("agent") for _ in range(3)]
+        check("affinity (mismo código => mismo agente)", set(again) == {first.get("agent")}, again)
+
+        burst = [{"language": "python", "code": f'import time\ntime.sleep(1)\nprint({i})', "timeout": 10}
+                 for i in range(N_AGENTS * SLOTS)]
+        with ThreadPoolExecutor(len(burst)) as pool:
+            agents = [r.get("agent") for r in pool.map(d.execute, burst)]
+        check("least-loaded (ráfaga repartida)", len(set(agents)) == N_AGENTS, agents)
+
+        events = list(d.stream({"language": "bash", "code": "echo uno; echo dos >&2", "timeout": 10}))
+        kinds = [e.get("event") for e in events]
+        check("stream", kinds[-1] == "exit" and "stdout" in kinds, kinds)
+
+        # Entradas spooleadas en la API: viajan como bytes; el agente no acepta rutas ajenas a su spool
+        spool = InputSpool(root=tempfile.mkdtemp(prefix="smoke-api-spool-"))
+        stdin_id, _ = spool.write([b"desde el spool\n"])
+        file_id, _ = spool.write([b"contenido del archivo\n"])
+        res = d.execute({"language": "bash", "code": "cat; cat in.txt", "timeout": 10,
+                         "stdin_path": str(spool.path(stdin_id)), "files": {"in.txt": str(spool.path(file_id))}})
+        check("entradas como bytes", res.get("stdout") == "desde el spool\ncontenido del archivo\n", res.get("stdout"))
+        token = os.environ["GOZOLITE_AGENT_TOKEN"]
+        status = _post(urls[0] + "/execute", {"language": "bash", "code": "cat", "stdin_path": "/etc/hostname"}, token)
+        check("ruta de host rechazada", status == 400, status)
+        status = _post(urls[0] + "/execute", {"language": "bash", "code": "echo x"})
+        check("sin token => 401", status == 401, status)
+
+        # Un agente que recibe el job y corta sin responder: no se reintenta en otro (no duplicar efectos)
+        stubs = [ThreadingHTTPServer(("127.0.0.1", 0), _DropAfterSend) for _ in range(2)]
+        for srv in stubs:
+            threading.Thread(target=srv.serve_forever, daemon=True).start()
+        dd = Dispatcher([f"http://127.0.0.1:{srv.server_port}" for srv in stubs], health_interval=60)
+        res = dd.execute({"language": "bash", "code": "echo once", "timeout": 5})
+        check("sin reintento tras enviar", _DropAfterSend.posts == 1 and res.get("exit_code") == 1,
+              {"posts": _DropAfterSend.posts, "stderr": res.get("stderr")})
+        dd.close()
+        for srv in stubs:
+            srv.shutdown()
+
+        # Se cae el agente con afinidad: el job se reintenta en otro y el caído queda expulsado
+        victim = int(str(first.get("agent")).rsplit("-", 1)[1])
+        procs[victim].kill()
+        procs[victim].wait()
+        retried = d.execute(dict(job))
+        check("retry tras caída", retried.get("exit_code") == 0 and retried.get("agent") != first.get("agent"),
+              retried.get("agent"))
+        time.sleep(1.5)
+        down = [a for a in d.status() if a["url"] == urls[victim]][0]
+        check("ejection", not down["healthy"], down)
+        d.close()
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+                p.wait()
+
+    failures = sum(1 for c in checks if not c["ok"])
+    print("\n=== Summary ===")
+    print(json.dumps({"total": len(checks), "failures": failures}, indent=2))
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all())
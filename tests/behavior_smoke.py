@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# behavior_smoke.py — Chequeos de comportamiento de GozoLite in-process (sin API ni agentes):
+# cada chequeo corre jobs reales y verifica efectos, no sólo el exit code. Cubre streaming, stdin spooleado,
+# proyectos, juez, kill del árbol, scheduler, datasets, SQL, niveles de compilación, cancelación y sandbox,
+# más regresiones de bugs ya corregidos.
+# Los que necesitan el sandbox de namespaces se saltean (se informan) si el kernel no lo permite.
+
+from __future__ import annotations
+import hashlib, json, os, resource, sys, tempfile, threading, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core2.orchestrators import judge as judge_mod
+from core2.orchestrators.gozo_lite import GozoLite
+from core2.orchestrators.input_spool import InputSpool, InputTooLarge
+from core2.orchestrators.dataset_store import DatasetStore
+from core2.orchestrators.sandbox import NsSandbox
+from core2.orchestrators.supervisor import CANCELLED_EXIT, Usage, supervisor
+from tools.audit_stats import Aggregator
+from workers.fair_scheduler import FairScheduler, SchedulerRejected, TenantPolicy
+from security import audit_logger
+from security.secure_middleware import SecureMiddleware
+
+# Intenta volver escribible la entrada y reescribirla: por nombre en el workdir y por la ruta real del fd
+TAMPER = (
+    "chmod u+w data.txt 2>/dev/null; printf pwned > data.txt 2>/dev/null; "
+    "real=$(readlink /proc/self/fd/0); chmod u+w \"$real\" 2>/dev/null; printf pwned > \"$real\" 2>/dev/null; "
+    "cat data.txt"
+)
+
+
+def _sha(p: str) -> str:
+    with open(p, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            return fh.read().rsplit(")", 1)[1].split()[0] not in ("Z", "X")
+    except OSError:
+        return False
+
+
+def _until(cond, timeout: float) -> bool:
+    end = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def run_all() -> int:
+    checks = []
+
+    def check(name: str, ok: bool, detail: object = "") -> None:
+        checks.append({"check": name, "ok": bool(ok), "detail": detail})
+        print(f"=== [{name}] {'OK' if ok else 'FAIL'} {detail}")
+
+    tmp = tempfile.mkdtemp(prefix="behavior-smoke-")
+    spool = InputSpool(root=os.path.join(tmp, "spool"))
+    store = DatasetStore(root=os.path.join(tmp, "datasets"))
+    g = GozoLite()
+    modes = ["off"]
+    probe = NsSandbox("ns")
+    try:
+        probe.wrap(["true"], tmp)
+        modes.append("ns")
+    except RuntimeError as e:
+        print(f"=== [sandbox ns] salteado: {e}")
+    finally:
+        probe.close()
+
+    try:
+        # Un job no puede modificar un dataset ni un input_id que reusan otros jobs
+        for mode in modes:
+            g.sandbox.close()
+            g.sandbox = NsSandbox(mode)
+            meta = store.put([b"dataset original\n"], name=f"tamper-{mode}")
+            input_id, _ = spool.write([b"stdin original\n"])
+            blob = str(store.path(meta["sha256"]))
+            for _ in range(2):
+                res = g.execute({"language": "bash", "code": TAMPER, "timeout": 10,
+                                 "datasets": {"data.txt": str(store.path(meta["sha256"]) or blob)},
+                                 "stdin_path": str(spool.path(input_id) or "")})
+            check(f"dataset intacto tras jobs ({mode})",
+                  store.path(meta["sha256"]) is not None and _sha(blob) == meta["sha256"],
+                  {"exit": res.get("exit_code"), "stdout": res.get("stdout", "").strip()})
+            p = spool.path(input_id)
+            check(f"input_id intacto tras jobs ({mode})",
+                  p is None or open(p, "rb").read() == b"stdin original\n", str(p))
+            if mode == "off" and g.sandbox._probe_bind():
+                # Sin sandbox el dataset se monta (mismo inodo que el blob), no se copia por job
+                res = g.execute({"language": "bash", "code": "stat -c %i data.txt", "timeout": 20,
+                                 "datasets": {"data.txt": blob}})
+                check("dataset montado sin copia (off)",
+                      res.get("stdout", "").strip() == str(os.stat(blob).st_ino)
+                      and g.sandbox.snapshot().get("bound", 0) > 0,
+                      {"stdout": res.get("stdout", "").strip(), "ino": os.stat(blob).st_ino})
+
+        # Pipeline: los bloques pasan por el sandbox del job y el streaming emite a medida que corren
+        escape = os.path.join(tempfile.gettempdir(), f"pipeline-escape-{os.getpid()}")
+        if "ns" in modes:
+            res = g.execute({"language": "auto", "code": f"```bash\necho x > {escape}; echo fin\n```\n", "timeout": 20})
+            check("pipeline: bloque dentro del sandbox", not os.path.exists(escape), res.get("blocks", [{}])[0].get("status"))
+        g.syntax._probe_python()  # en la API el sondeo de versión corre en background con el primer job python
+        res = g.execute({"language": "auto", "code": "```python\nprint(1\n```\n", "timeout": 10})
+        check("pipeline: chequeo de sintaxis previo", res["blocks"][0].get("status") == "compile_error" or not g.syntax._python_ok,
+              {"status": res["blocks"][0].get("status"), "python_ok": g.syntax._python_ok})
+        slow = "```bash id=a\necho primero; sleep 2; echo segundo\n```\n"
+        seen = [(e.get("event"), e.get("data", "").strip(), time.monotonic())
+                for e in g.stream({"language": "auto", "code": slow, "timeout": 20}) if e.get("event") in ("stdout", "stage", "exit")]
+        check("pipeline: stream en vivo", [x[:2] for x in seen[:3]] == [("stdout", "primero"), ("stdout", "segundo"), ("stage", "")]
+              and seen[-1][0] == "exit" and seen[-1][2] - seen[0][2] >= 1.5, [x[:2] for x in seen])
+
+        # Entradas y datasets por tenant: otro tenant no los borra ni pisa sus alias
+        input_id, _ = spool.write([b"de a\n"], owner="team-a")
+        check("spool: sólo el dueño descarta",
+              not spool.discard(input_id, owner="team-b") and spool.discard(input_id, owner="team-a"))
+        meta = store.put([b"compartido\n"], name="own-a", owner="team-a")
+        store.put([b"compartido\n"], owner="team-b")
+        try:
+            store.put([b"otro\n"], name="own-a", owner="team-b")
+            stolen = True
+        except PermissionError:
+            stolen = False
+        seen_b = [d["sha256"] for d in store.list(owner="team-b")]
+        check("datasets: alias ajeno y listado por tenant",
+              not stolen and not store.delete("own-a", owner="team-b") and seen_b == [meta["sha256"]], seen_b)
+        store.delete(meta["sha256"], owner="team-a")
+        kept = store.path(meta["sha256"]) is not None and store.path("own-a") is None
+        store.delete(meta["sha256"], owner="team-b")
+        check("datasets: blob compartido vive hasta que lo borra el último dueño",
+              kept and store.path(meta["sha256"]) is None and
+              DatasetStore(root=str(store.root)).list(owner="team-a") == [])
+
+        # Proyectos: el .o de una fuente sin cambios se reusa; en Java cambiar una dependencia invalida a quien la usa
+        nonce = f"/* {os.getpid()} {time.time()} */\n"  # la cache de objetos persiste entre corridas
+        proj = {"files": {"a.c": nonce + "int f(void){return 41;}\n",
+                          "m.c": nonce + "#include <stdio.h>\nint f(void);\nint main(void){printf(\"%d\\n\", f() + 1);return 0;}\n"}}
+        first = g.execute({"language": "c", "project": proj, "timeout": 60})
+        reused = g.projects.stats["reused"]
+        proj["files"]["m.c"] = proj["files"]["m.c"].replace("+ 1", "+ 2")
+        second = g.execute({"language": "c", "project": proj, "timeout": 60})
+        check("proyecto c: recompila sólo lo cambiado",
+              first.get("stdout", "").strip() == "42" and second.get("stdout", "").strip() == "43"
+              and g.projects.stats["reused"] == reused + 1, {"stats": g.projects.stats, "stderr": second.get("stderr", "")[-200:]})
+        java = {"Main.java": b"class Main { public static void main(String[] a) { System.out.println(Util.V); } }",
+                "Util.java": b"class Util { static final int V = 1; }\nclass Extra { }", "Other.java": b"class Other { }"}
+        _, before = g.projects._java_closure(java, sorted(java))
+        java["Util.java"] = java["Util.java"].replace(b"= 1", b"= 2")
+        declared, after = g.projects._java_closure(java, sorted(java))
+        check("proyecto java: clave por clausura de dependencias",
+              [r for r in sorted(java) if before[r] != after[r]] == ["Main.java", "Util.java"]
+              and declared["Util.java"] == ["Extra", "Util"], declared)
+
+        # Streaming de un job común: cada chunk sale cuando el proceso lo escribe, no al final
+        seen = [(e.get("event"), time.monotonic())
+                for e in g.stream({"language": "bash", "code": "echo uno; sleep 2; echo dos", "timeout": 20})]
+        outs = [t for ev, t in seen if ev == "stdout"]
+        check("stream: salida en vivo", len(outs) >= 2 and seen[-1][0] == "exit" and seen[-1][1] - outs[0] >= 1.5,
+              [ev for ev, _ in seen])
+
+        # Stdin spooleado: bytes binarios por chunks llegan intactos; lo que excede el límite no deja restos
+        blob = os.urandom(3 * 1024 * 1024)
+        input_id, size = spool.write(blob[i:i + 65536] for i in range(0, len(blob), 65536))
+        res = g.execute({"language": "bash", "code": "sha256sum | cut -d' ' -f1", "timeout": 20,
+                         "stdin_path": str(spool.path(input_id))})
+        check("stdin: spool binario intacto", size == len(blob) and res.get("stdout", "").strip() == hashlib.sha256(blob).hexdigest(),
+              res.get("stdout", "").strip()[:16])
+        small = InputSpool(root=os.path.join(tmp, "small"), max_bytes=16)
+        try:
+            small.write([b"x" * 10, b"x" * 10])
+            too_large = False
+        except InputTooLarge:
+            too_large = True
+        check("stdin: límite de tamaño sin parciales", too_large and not os.listdir(small.root), os.listdir(small.root))
+
+        # Niveles de compilación: quick por defecto; tras TIER_UP_RUNS corridas se compila opt y se usa
+        if g._which("gcc"):
+            code = f"/* {os.getpid()} {time.time()} */\n#include <stdio.h>\nint main(void){{puts(\"tier\");return 0;}}\n"
+            before = dict(g.tiers.stats)
+            outs = [g.execute({"language": "c", "code": code, "timeout": 30}).get("stdout", "").strip() for _ in range(3)]
+            built = _until(lambda: g.tiers.snapshot()["building"] == 0, 60)
+            outs.append(g.execute({"language": "c", "code": code, "timeout": 30}).get("stdout", "").strip())
+            delta = {k: g.tiers.stats[k] - before[k] for k in before}
+            check("niveles: quick y promoción a opt", built and outs == ["tier"] * 4 and delta == {"quick": 3, "opt": 1, "promotions": 1},
+                  delta)
+
+        # Scheduler: con un slot, los pesos 3:1 reparten el turno 3:1; un deadline imposible se rechaza al instante
+        sched = FairScheduler(slots=1, policies={"a": TenantPolicy("a", weight=3), "b": TenantPolicy("b", weight=1)})
+        hold = sched.acquire("x")
+        try:
+            sched.acquire("b", deadline_s=0.01)
+            reason = None
+        except SchedulerRejected as e:
+            reason = e.reason
+        order: list = []
+
+        def _turn(tenant: str) -> None:
+            ticket = sched.acquire(tenant, timeout=30)
+            order.append(tenant)
+            sched.release(ticket, 0.01)
+
+        waiting = [threading.Thread(target=_turn, args=(t,)) for t in "ab" * 6]
+        for th in waiting:
+            th.start()
+        _until(lambda: sum(st.queued() for st in sched._tenants.values()) == 12, 10)
+        sched.release(hold, 0.01)
+        for th in waiting:
+            th.join(30)
+        check("scheduler: reparto ponderado y deadline", reason == "deadline" and order[:8].count("a") == 6,
+              {"order": "".join(order), "reason": reason})
+
+        # Cancelación: el job muere en el acto (exit 130); una celda de sesión se interrumpe y la sesión sigue
+        out: dict = {}
+
+        def _cancellable() -> None:
+            with supervisor.job("behavior-cancel", owner="behavior"):
+                out["job"] = g.execute({"language": "bash", "code": "sleep 30", "timeout": 30})
+
+        started = time.monotonic()
+        worker = threading.Thread(target=_cancellable)
+        worker.start()
+        _until(lambda: any(j["processes"] for j in supervisor.jobs(owner="behavior")), 20)
+        supervisor.cancel("behavior-cancel", owner="behavior")
+        worker.join(30)
+        check("cancelación: job", out.get("job", {}).get("exit_code") == CANCELLED_EXIT and time.monotonic() - started < 20,
+              {"exit": out.get("job", {}).get("exit_code"), "s": round(time.monotonic() - started, 1)})
+        sid = g.sessions.open("python")["session_id"]
+        audit_logger.AUDIT_PATH = os.path.join(tmp, "audit.jsonl")  # la celda pasa por la auditoría como en la API
+
+        def _cell() -> None:
+            with supervisor.job("behavior-cell", owner="behavior"):
+                out["cell"] = SecureMiddleware(g).session_execute(session_id=sid, code="import time\ntime.sleep(20)",
+                                                                  timeout=25)
+
+        worker = threading.Thread(target=_cell)
+        worker.start()
+        time.sleep(1)
+        supervisor.cancel("behavior-cell", owner="behavior")
+        worker.join(30)
+        after = SecureMiddleware(g).session_execute(session_id=sid, code="print(sum(range(3 * 10 ** 7)) > 0)", timeout=25)
+        g.sessions.close(sid)
+        with open(audit_logger.AUDIT_PATH, encoding="utf-8") as fh:
+            closing = [e for e in map(json.loads, fh) if e.get("evt") in ("END", "CANCEL")]
+        check("cancelación: celda de sesión", out.get("cell", {}).get("exit_code") == CANCELLED_EXIT and after.get("stdout", "").strip() == "True"
+              and [e["evt"] for e in closing] == ["CANCEL", "END"],
+              {"cell": out.get("cell", {}).get("exit_code"), "after": after.get("stdout", "").strip(),
+               "audit": [(e["evt"], e.get("reason")) for e in closing]})
+        cpu = closing[-1].get("resources", {}) if closing else {}
+        check("sesión: recursos de la celda en el audit", cpu.get("utime_s", 0) + cpu.get("stime_s", 0) > 0.1, cpu)
+
+        # SQL in-process: memory_mb también acota strings/blobs, no sólo las páginas de la base
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        res = g.execute({"language": "sql", "code": "select length(randomblob(400000000));", "memory_mb": 16, "timeout": 10})
+        grown_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) // 1024
+        check("sql: memory_mb acota blobs", res.get("exit_code") == 1 and grown_mb < 64,
+              {"stderr": res.get("stderr", "").strip(), "rss_grown_mb": grown_mb})
+        res = g.execute({"language": "sql", "code": "select count(*) from employees;", "fixture": "demo", "timeout": 10})
+        check("sql: fixture", res.get("exit_code") == 0 and res.get("stdout", "").strip() == "8", res.get("stdout", "").strip())
+
+        # Juez: salto de línea final en exact, pico de memoria medido y MLE aunque la API pese más que el límite
+        ballast = bytearray(192 * 1024 * 1024)
+        ballast[::4096] = b"\1" * len(ballast[::4096])
+        res = g.judge({"language": "python", "code": "print(int(input()) * 2)", "timeout": 10, "memory_mb": 256,
+                       "cases": [{"stdin": "2\n", "expected": "4"}, {"stdin": "3\n", "expected": "6 \n\n"},
+                                 {"stdin": "4\n", "expected": "9"}]})
+        verdicts = [c.get("verdict") for c in res.get("cases", [])]
+        check("juez: exact ignora blancos finales", verdicts == ["accepted", "accepted", "wrong_answer"], verdicts)
+        if g._which("gcc"):
+            hog = ("#include <stdlib.h>\n#include <string.h>\nint main(void){for(int i=0;i<512;i++){char*p=malloc(1<<20);"
+                   "if(!p)return 3;memset(p,1,1<<20);}return 0;}\n")
+            res = g.judge({"language": "c", "code": hog, "timeout": 10, "memory_mb": 64, "cases": [{"stdin": "", "expected": ""}]})
+            case = (res.get("cases") or [{}])[0]
+            check("juez: memory_limit con la API por encima del límite",
+                  case.get("verdict") == "memory_limit" and 0 < case.get("memory_kb", 0) <= 80 * 1024,
+                  {k: case.get(k) for k in ("verdict", "memory_kb", "exit_code")})
+        # Regresión: sin launcher, el pico heredado de la API (VmHWM, vía vfork+exec) no se informa como del caso
+        launcher = judge_mod.case_launcher
+        judge_mod.case_launcher = lambda: None
+        try:
+            res = g.judge({"language": "python", "code": "print(input())", "timeout": 10, "memory_mb": 512,
+                           "cases": [{"stdin": "1\n", "expected": "1"}]})
+        finally:
+            judge_mod.case_launcher = launcher
+        case = (res.get("cases") or [{}])[0]
+        check("juez: sin launcher no hereda el pico de la API",
+              case.get("verdict") == "accepted" and case.get("memory_kb", 0) < 128 * 1024, {k: case.get(k) for k in ("verdict", "memory_kb")})
+        del ballast
+
+        # Supervisor: un sweep concurrente no mata procesos de jobs que recién arrancan
+        stop = threading.Event()
+
+        def _sweep_loop() -> None:
+            while not stop.is_set():
+                supervisor.sweep()
+
+        sweeper = threading.Thread(target=_sweep_loop)
+        sweeper.start()
+        codes = [supervisor.run(["sleep", "0.01"], timeout=10).returncode for _ in range(50)]
+        stop.set()
+        sweeper.join()
+        check("supervisor: sweep no mata jobs vivos", all(c == 0 for c in codes), f"{sum(c != 0 for c in codes)}/50 muertos")
+
+        # Kill del árbol: lo que queda en background muere con el job; lo escapado con setsid, en el sweep
+        bg = int(supervisor.run(["sh", "-c", "sleep 300 >/dev/null 2>&1 & echo $!"], timeout=10).stdout.strip())
+        escaped = int(supervisor.run(["sh", "-c", "setsid sleep 300 >/dev/null 2>&1 & echo $!"], timeout=10).stdout.strip())
+        survived = _alive(escaped)
+        supervisor.sweep()
+        check("supervisor: mata el árbol y barre escapados", not _alive(bg) and _until(lambda: not _alive(escaped), 5),
+              {"setsid_hasta_sweep": survived})
+        res = supervisor.run(["sh", "-c", "yes"], timeout=10, max_output=1 << 20)
+        check("supervisor: límite de salida", res.truncated and len(res.stdout) <= (1 << 20) + 65536, len(res.stdout))
+
+        # Contabilidad por job: pico de memoria del job (no el heredado de la API) y OOM = SIGKILL ajeno
+        hwm_mb = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmHWM:")) // 1024
+        usage = Usage()
+        with supervisor.metered(usage):
+            supervisor.run([sys.executable, "-c", f"b = bytearray({hwm_mb + 64} << 20); b[::4096] = b'1' * len(b[::4096])"],
+                           timeout=20)
+            supervisor.run(["sh", "-c", "kill -9 $$"], timeout=10)
+            supervisor.run(["sleep", "5"], timeout=0.5)
+        acct = usage.snapshot()
+        agg = Aggregator()
+        agg.feed({"evt": "END", "ts": "2026-01-01T00:00:00", "job_id": "j", "result": {"exit_code": 0, "language": "c"},
+                  "resources": acct})
+        ooms = sum(c["ooms"] for c in agg.cells.values())
+        check("supervisor: contabilidad por job y OOM",
+              acct["processes"] == 3 and (hwm_mb + 64) * 1024 <= acct["max_rss_kb"] < (hwm_mb + 128) * 1024
+              and acct["oom_kills"] == 1 and ooms == 1, {"hwm_mb": hwm_mb, **{k: acct[k] for k in ("processes", "max_rss_kb", "oom_kills")}})
+    finally:
+        g.sandbox.close()
+
+    failures = sum(1 for c in checks if not c["ok"])
+    print(f"\n=== Summary === {len(checks) - failures}/{len(checks)} OK")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# client_smoke.py — Levanta la API con uvicorn en localhost y prueba tools/gozolite_client:
+# keep-alive, batch sync/async con concurrencia acotada, streaming, reintentos ante 429 y métricas.
+# Los canaries quedan apagados (GOZOLITE_CANARY_INTERVAL_S=0) y el sandbox en `auto` salvo que se pida lo contrario.
+
+from __future__ import annotations
+import asyncio, os, sys, json, socket, subprocess, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.gozolite_client import Client, AsyncClient, ClientError
+
+N_JOBS = int(os.getenv("SMOKE_CLIENT_JOBS", "12"))
+# Sin sandbox cada job arranca con `bash -lc` (login de conda: segundos por job, decenas con varios en
+# paralelo en 1 vCPU). La API se levanta con GOZOLITE_SANDBOX=auto (bash -c con el entorno cacheado: ms por
+# job) y, por si el kernel no permite el sandbox, los jobs piden el timeout máximo del API (30 s) con
+# SEC_MAX_TIMEOUT acorde para que no lo recorte; el cliente espera timeout + QUEUE_SLACK_S por request.
+JOB_TIMEOUT_S = int(os.getenv("SMOKE_CLIENT_JOB_TIMEOUT_S", "30"))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_up(port: int, timeout: float = 30) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def run_all() -> int:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL,
+        env=dict(os.environ, PYTHONPATH=ROOT,
+                 GOZOLITE_CANARY_INTERVAL_S=os.getenv("GOZOLITE_CANARY_INTERVAL_S", "0"),
+                 GOZOLITE_SANDBOX=os.getenv("GOZOLITE_SANDBOX", "auto"), SEC_MAX_TIMEOUT=str(JOB_TIMEOUT_S)),
+    )
+    url = f"http://127.0.0.1:{port}"
+    checks = []
+
+    def check(name: str, ok: bool, detail: object = "") -> None:
+        checks.append({"check": name, "ok": bool(ok), "detail": detail})
+        print(f"=== [{name}] {'OK' if ok else 'FAIL'} {detail}")
+
+    try:
+        check("uvicorn", _wait_up(port), url)
+        jobs = [{"language": "python", "code": f"print({i} * 2)", "timeout": JOB_TIMEOUT_S} for i in range(N_JOBS)]
+
+        with Client(url, api_key="smoke-client", max_connections=4) as c:
+            check("health", c.health().get("status") is not None, c.health().get("status"))
+
+            for _ in range(3):
+                res = c.execute("python", 'print("hola cliente")', timeout=JOB_TIMEOUT_S)
+            m = c.metrics()["connections"]
+            check("execute + keep-alive", res.get("exit_code") == 0 and "hola cliente" in res.get("stdout", "")
+                  and m["opened"] == 1 and m["reused"] >= 3, {"connections": m, "exit": res.get("exit_code"),
+                                                                "stderr": res.get("stderr", "")[-200:]})
+
+            results = c.batch(jobs, concurrency=4)
+            outs = [r.get("stdout", "").strip() or r.get("stderr", "")[-120:] if isinstance(r, dict) else repr(r)
+                    for r in results]
+            check("batch sync (en orden)", outs == [str(i * 2) for i in range(N_JOBS)], outs)
+            check("pool acotado", c.metrics()["connections"]["opened"] <= 4, c.metrics()["connections"])
+
+            events = list(c.stream("bash", "echo uno; echo dos >&2", timeout=JOB_TIMEOUT_S))
+            kinds = [e.get("event") for e in events]
+            check("stream", kinds[-1] == "exit" and "stdout" in kinds and "stderr" in kinds, kinds)
+
+            # deadline imposible => 429 siempre: se reintenta con backoff y al final ClientError
+            c.retries = 2
+            t = time.monotonic()
+            try:
+                c.execute("python", "print(1)", deadline_ms=1)
+                check("retry 429", False, "sin 429")
+            except ClientError as e:
+                check("retry 429", e.status == 429 and e.retries == 2, {"status": e.status, "retries": e.retries,
+                                                                         "s": round(time.monotonic() - t, 2)})
+
+            metrics = c.metrics()
+            check("métricas", metrics["/execute"]["requests"] >= N_JOBS and metrics["/execute"]["p95_ms"] is not None
+                  and "first_event_p50_ms" in metrics["/execute/stream"], metrics)
+
+        async def _async() -> None:
+            async with AsyncClient(url, api_key="smoke-client-async", max_connections=4) as ac:
+                res = await ac.execute("python", 'print("hola async")', timeout=JOB_TIMEOUT_S)
+                check("async execute", res.get("exit_code") == 0 and "hola async" in res.get("stdout", ""),
+                      res.get("stdout") or res.get("stderr", "")[-200:])
+
+                results = await ac.batch(jobs, concurrency=3)
+                outs = [r.get("stdout", "").strip() or r.get("stderr", "")[-120:] if isinstance(r, dict) else repr(r)
+                        for r in results]
+                check("async batch (en orden)", outs == [str(i * 2) for i in range(N_JOBS)], outs)
+
+                kinds = [e.get("event") async for e in ac.stream("bash", "echo a; sleep 0.3; echo b", timeout=JOB_TIMEOUT_S)]
+                check("async stream", kinds[-1] == "exit" and kinds.count("stdout") >= 1, kinds)
+
+                m = ac.metrics()["connections"]
+                check("async keep-alive", m["opened"] <= 4 and m["reused"] > 0, m)
+
+        asyncio.run(_async())
+    finally:
+        server.terminate()
+        server.wait()
+
+    failures = sum(1 for c in checks if not c["ok"])
+    print("\n=== Summary ===")
+    print(json.dumps({"total": len(checks), "failures": failures}, indent=2))
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_all())
@@ -0,0 +1,363 @@
+# tools/audit_stats.py — analítica del audit log (JSONL de security/audit_logger.py) en streaming
+"""
+Recorre uno o varios audit logs (también rotados y .gz) línea por línea, con memoria constante,
+une START/END (o CANCEL) por job_id y reporta por lenguaje y por hora: latencia p50/p95/p99, tasas de
+timeout, OOM y límite de salida, jobs cancelados, motivos de rechazo y los jobs que más recursos consumieron.
+
+Uso:
+    python -m tools.audit_stats [LOG ...] [--rotated] [--cache ARCHIVO] [--since 2026-01-31T08]
+                                [--until ...] [--language python] [--top 10] [--json]
+
+Sin LOG se usa SEC_AUDIT_PATH. Con --cache el resumen (columnar, compacto) se guarda y se reusa:
+si los logs no cambiaron la consulta es instantánea; si el log activo sólo creció, se procesa
+únicamente lo nuevo.
+
+Los recursos de cada END son la contabilidad por job del supervisor (rusage de wait4 de los procesos
+del job): CPU, pico de memoria y `oom_kills`. Un job cuenta como OOM si el supervisor vio un SIGKILL
+que no mandó él o si el juez dio algún caso memory_limit (`memory_limit_cases`).
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter, OrderedDict
+from typing import Any, Dict, IO, List, Optional, Tuple
+
+DEFAULT_LOG  = os.getenv("SEC_AUDIT_PATH", "/tmp/gozolite_audit.jsonl")
+MAX_PENDING  = 100_000  # STARTs esperando su END (jobs en vuelo); más viejos se descartan
+TOP_PER_HOUR = 20       # candidatos a "top consumidores" que se guardan por hora
+CACHE_VERSION = 3  # 2: contador `cancelled` (eventos CANCEL); 3: OOM y top desde la contabilidad por job
+
+TIMEOUT_EXIT, OUTPUT_LIMIT_EXIT = 124, 153
+
+_LOG_BASE = math.log(1.02)  # buckets logarítmicos: ~1% de error relativo en los percentiles
+_DIGITS = re.compile(r"\d+")
+
+
+# --------- Histograma de latencias (tamaño acotado, mergeable) ---------
+class Histogram:
+    def __init__(self, buckets: Optional[Dict[int, int]] = None):
+        self.buckets: Dict[int, int] = buckets or {}
+        self.count = sum(self.buckets.values())
+
+    def add(self, ms: float) -> None:
+        b = int(math.log1p(max(0.0, ms)) / _LOG_BASE)
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for b, c in other.buckets.items():
+            self.buckets[b] = self.buckets.get(b, 0) + c
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[int]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen > rank:
+                return int(round(math.expm1((b + 0.5) * _LOG_BASE)))
+        return None
+
+    def flat(self) -> List[int]:
+        return [x for b in sorted(self.buckets) for x in (b, self.buckets[b])]
+
+    @classmethod
+    def from_flat(cls, flat: List[int]) -> "Histogram":
+        return cls({flat[i]: flat[i + 1] for i in range(0, len(flat), 2)})
+
+
+def _new_cell() -> Dict[str, Any]:
+    return {"jobs": 0, "failed": 0, "timeouts": 0, "ooms": 0, "output_limit": 0, "cancelled": 0, "cpu_s": 0.0,
+            "hist": Histogram()}
+
+
+CELL_COUNTERS = ("jobs", "failed", "timeouts", "ooms", "output_limit", "cancelled", "cpu_s")
+
+
+# --------- Agregación ---------
+class Aggregator:
+    """Estado acumulado: celdas (hora, lenguaje), rechazos, top consumidores por hora y STARTs pendientes."""
+
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()  # job_id -> (hora, lenguaje)
+        self.cells: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.rejects: Counter = Counter()  # (hora, lenguaje, motivo) -> cantidad
+        self.top: Dict[str, List[Tuple[float, str, str, int, int]]] = {}  # hora -> heap (cpu_s, job, lang, rss, ms)
+        self.stats: Counter = Counter()
+
+    def feed(self, e: Dict[str, Any]) -> None:
+        evt = e.get("evt")
+        hour = str(e.get("ts") or "")[:13] or "?"
+        if evt == "START":
+            lang = str((e.get("request") or {}).get("language") or "-")
+            self.pending[str(e.get("job_id"))] = (hour, lang)
+            if len(self.pending) > self.max_pending:
+                self.pending.popitem(last=False)
+                self.stats["pending_dropped"] += 1
+        elif evt in ("END", "CANCEL"):
+            self._end(e, hour)
+        elif evt == "REJECT":
+            lang = str((e.get("request") or {}).get("language") or "-")
+            reason = _DIGITS.sub("N", str(e.get("reason") or "?"))[:100]
+            self.rejects[(hour, lang, reason)] += 1
+        else:
+            self.stats["unknown_events"] += 1
+
+    def _end(self, e: Dict[str, Any], end_hour: str) -> None:
+        result = e.get("result") or {}
+        started = self.pending.pop(str(e.get("job_id")), None)
+        if started is None:
+            self.stats["unmatched_end"] += 1  # START en un log no leído o descartado
+            hour, lang = end_hour, str(result.get("language") or "-")
+        else:
+            hour, lang = started
+        cell = self.cells.get((hour, lang))
+        if cell is None:
+            cell = self.cells[(hour, lang)] = _new_cell()
+        exit_code = result.get("exit_code")
+        res = e.get("resources") or {}
+        cpu = float(res.get("utime_s") or 0) + float(res.get("stime_s") or 0)
+        cell["jobs"] += 1
+        cell["cpu_s"] += cpu
+        elapsed = e.get("elapsed_ms")
+        if e.get("evt") == "CANCEL":
+            cell["cancelled"] += 1  # ni fallo ni latencia: el job no terminó por sí mismo
+        else:
+            cell["failed"] += exit_code not in (0, None)
+            cell["timeouts"] += exit_code == TIMEOUT_EXIT
+            # OOM según el supervisor (SIGKILL que no mandó él) o el juez (casos memory_limit), no por exit code
+            cell["ooms"] += bool(res.get("oom_kills") or res.get("memory_limit_cases"))
+            cell["output_limit"] += exit_code == OUTPUT_LIMIT_EXIT
+            if isinstance(elapsed, (int, float)):
+                cell["hist"].add(elapsed)
+        heap = self.top.setdefault(hour, [])
+        item = (cpu, str(e.get("job_id")), lang, int(res.get("max_rss_kb") or 0), int(elapsed or 0))
+        if len(heap) < TOP_PER_HOUR:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    # --------- Cache columnar ---------
+    def to_columns(self) -> Dict[str, Any]:
+        keys = sorted(self.cells)
+        cells: Dict[str, List[Any]] = {"hour": [k[0] for k in keys], "language": [k[1] for k in keys]}
+        for name in CELL_COUNTERS:
+            cells[name] = [round(self.cells[k][name], 6) if name == "cpu_s" else self.cells[k][name] for k in keys]
+        cells["hist"] = [self.cells[k]["hist"].flat() for k in keys]
+        rkeys = sorted(self.rejects)
+        return {
+            "cells": cells,
+            "rejects": {"hour": [k[0] for k in rkeys], "language": [k[1] for k in rkeys],
+                        "reason": [k[2] for k in rkeys], "count": [self.rejects[k] for k in rkeys]},
+            "top": {h: sorted(heap, reverse=True) for h, heap in self.top.items()},
+            "pending": [[j, h, l] for j, (h, l) in self.pending.items()],
+            "stats": dict(self.stats),
+        }
+
+    @classmethod
+    def from_columns(cls, data: Dict[str, Any]) -> "Aggregator":
+        agg = cls()
+        c = data["cells"]
+        for i, key in enumerate(zip(c["hour"], c["language"])):
+            cell = {name: c[name][i] for name in CELL_COUNTERS}
+            cell["hist"] = Histogram.from_flat(c["hist"][i])
+            agg.cells[key] = cell
+        r = data["rejects"]
+        for h, l, reason, n in zip(r["hour"], r["language"], r["reason"], r["count"]):
+            agg.rejects[(h, l, reason)] = n
+        for h, items in data["top"].items():
+            agg.top[h] = [tuple(x) for x in items]  # type: ignore[misc]
+            heapq.heapify(agg.top[h])
+        for j, h, l in data["pending"]:
+            agg.pending[j] = (h, l)
+        agg.stats.update(data.get("stats") or {})
+        return agg
+
+
+# --------- Lectura de logs ---------
+def _rotation_key(path: str) -> Tuple[int, str]:
+    # audit.jsonl.3.gz es más viejo que audit.jsonl.1: se leen de mayor a menor sufijo y el activo al final
+    m = re.search(r"\.(\d+)(\.gz)?$", path)
+    return (-int(m.group(1)) if m else 0, path)
+
+
+def expand(paths: List[str], rotated: bool) -> List[str]:
+    out: List[str] = []
+    for p in paths:
+        if rotated:
+            out.extend(sorted((q for q in glob.glob(glob.escape(p) + ".*") if re.search(r"\.\d+(\.gz)?$", q)),
+                              key=_rotation_key))
+        if os.path.exists(p):
+            out.append(p)
+    return out
+
+
+def _open(path: str) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def _signature(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "inode": st.st_ino, "size": st.st_size, "mtime": st.st_mtime}
+
+
+def scan(agg: Aggregator, path: str, offset: int = 0) -> int:
+    """Agrega `path` desde `offset`; devuelve el offset del final de la última línea completa."""
+    with _open(path) as f:
+        if offset:
+            f.seek(offset)
+        pos = offset
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # línea a medio escribir: se lee en la próxima corrida
+            pos += len(raw)
+            try:
+                agg.feed(json.loads(raw))
+            except (ValueError, AttributeError):
+                agg.stats["bad_lines"] += 1
+        return pos
+
+
+def load(paths: List[str], cache: Optional[str] = None) -> Aggregator:
+    """Agrega los logs; con `cache` reusa el resumen guardado (o procesa sólo lo que creció el último log)."""
+    sigs = [_signature(p) for p in paths]
+    agg, start_file, offset = None, 0, 0
+    if cache and os.path.exists(cache):
+        try:
+            with open(cache, encoding="utf-8") as f:
+                data = json.load(f)
+            agg, start_file, offset = _resume(data, sigs)
+        except (OSError, ValueError, KeyError):
+            agg = None
+    if agg is None:
+        agg, start_file, offset = Aggregator(), 0, 0
+    for i in range(start_file, len(paths)):
+        end = scan(agg, paths[i], offset if i == start_file else 0)
+        if i == len(paths) - 1:
+            offset = end
+    if cache and paths:
+        tmp = f"{cache}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "sources": sigs, "offset": offset, **agg.to_columns()},
+                      f, separators=(",", ":"))
+        os.replace(tmp, cache)
+    return agg
+
+
+def _resume(data: Dict[str, Any], sigs: List[Dict[str, Any]]) -> Tuple[Optional[Aggregator], int, int]:
+    old = data.get("sources") or []
+    if data.get("version") != CACHE_VERSION or not old or len(old) > len(sigs):
+        return None, 0, 0
+    n = len(old)
+    if any(old[i] != sigs[i] for i in range(n - 1)):
+        return None, 0, 0
+    last_old, last_new = old[-1], sigs[n - 1]
+    if last_old["path"] != last_new["path"] or last_old["inode"] != last_new["inode"] or last_new["size"] < last_old["size"]:
+        return None, 0, 0
+    if last_new["path"].endswith(".gz") and last_new != last_old:
+        return None, 0, 0  # un .gz no se puede continuar por offset
+    return Aggregator.from_columns(data), n - 1, int(data.get("offset") or 0)
+
+
+# --------- Reporte ---------
+def report(agg: Aggregator, since: Optional[str] = None, until: Optional[str] = None,
+           language: Optional[str] = None, top: int = 10) -> Dict[str, Any]:
+    def keep(hour: str, lang: str) -> bool:
+        return ((since is None or hour >= since) and (until is None or hour <= until)
+                and (language is None or lang == language))
+
+    def rows(group: int) -> List[Dict[str, Any]]:
+        merged: Dict[str, Dict[str, Any]] = {}
+        for key, cell in agg.cells.items():
+            if not keep(*key):
+                continue
+            m = merged.setdefault(key[group], _new_cell())
+            for name in CELL_COUNTERS:
+                m[name] += cell[name]
+            m["hist"].merge(cell["hist"])
+        out = []
+        for k in sorted(merged):
+            m = merged[k]
+            n = m["jobs"] or 1
+            out.append({
+                "key": k, "jobs": m["jobs"],
+                "p50_ms": m["hist"].quantile(0.50), "p95_ms": m["hist"].quantile(0.95), "p99_ms": m["hist"].quantile(0.99),
+                "fail_pct": round(100.0 * m["failed"] / n, 2), "timeout_pct": round(100.0 * m["timeouts"] / n, 2),
+                "oom_pct": round(100.0 * m["ooms"] / n, 2), "output_limit_pct": round(100.0 * m["output_limit"] / n, 2),
+                "cancelled": m["cancelled"], "cpu_s": round(m["cpu_s"], 3),
+            })
+        return out
+
+    reasons: Counter = Counter()
+    for (hour, lang, reason), n in agg.rejects.items():
+        if keep(hour, lang):
+            reasons[reason] += n
+    consumers = heapq.nlargest(top, (x for h, heap in agg.top.items() for x in heap if keep(h, x[2])))
+    return {
+        "by_language": rows(1),
+        "by_hour": rows(0),
+        "rejections": [{"reason": r, "count": n} for r, n in reasons.most_common(top)],
+        "top_consumers": [{"job_id": j, "language": l, "cpu_s": round(c, 3), "max_rss_kb": rss, "elapsed_ms": ms}
+                          for c, j, l, rss, ms in consumers],
+        "in_flight": len(agg.pending),
+        "stats": dict(agg.stats),
+    }
+
+
+def _table(title: str, key: str, rows: List[Dict[str, Any]]) -> str:
+    cols = ["jobs", "p50_ms", "p95_ms", "p99_ms", "fail_pct", "timeout_pct", "oom_pct", "output_limit_pct",
+            "cancelled", "cpu_s"]
+    head = [key] + cols
+    body = [[str(r["key"])] + ["-" if r[c] is None else str(r[c]) for c in cols] for r in rows]
+    widths = [max(len(h), *(len(b[i]) for b in body)) if body else len(h) for i, h in enumerate(head)]
+    lines = [title, "  ".join(h.ljust(w) for h, w in zip(head, widths))]
+    lines += ["  ".join(v.ljust(w) for v, w in zip(b, widths)) for b in body]
+    return "\n".join(lines)
+
+
+def render(rep: Dict[str, Any]) -> str:
+    parts = [_table("== Por lenguaje", "language", rep["by_language"]),
+             _table("== Por hora (UTC)", "hour", rep["by_hour"])]
+    parts.append("== Rechazos\n" + ("\n".join(f"{r['count']:>7}  {r['reason']}" for r in rep["rejections"]) or "(ninguno)"))
+    parts.append("== Top consumidores (CPU)\n" + ("\n".join(
+        f"{c['cpu_s']:>9.3f}s  {c['max_rss_kb']:>9}KB  {c['elapsed_ms']:>8}ms  {c['language']:<10} {c['job_id']}"
+        for c in rep["top_consumers"]) or "(ninguno)"))
+    extra = ", ".join(f"{k}={v}" for k, v in sorted(rep["stats"].items()))
+    parts.append(f"en vuelo (START sin END): {rep['in_flight']}" + (f"; {extra}" if extra else ""))
+    return "\n\n".join(parts)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m tools.audit_stats", description="Analítica del audit log de GozoLite")
+    ap.add_argument("logs", nargs="*", default=[DEFAULT_LOG], help="audit logs JSONL (.gz admitido); por defecto SEC_AUDIT_PATH")
+    ap.add_argument("--rotated", action="store_true", help="incluir rotaciones LOG.N / LOG.N.gz (más viejas primero)")
+    ap.add_argument("--cache", help="archivo de resumen columnar para consultas repetidas/incrementales")
+    ap.add_argument("--since", help="hora UTC inicial inclusive, p. ej. 2026-01-31T08")
+    ap.add_argument("--until", help="hora UTC final inclusive")
+    ap.add_argument("--language", help="filtrar por lenguaje")
+    ap.add_argument("--top", type=int, default=10, help="filas de rechazos y consumidores")
+    ap.add_argument("--json", action="store_true", help="salida JSON")
+    args = ap.parse_args(argv)
+
+    paths = expand(args.logs, args.rotated)
+    if not paths:
+        print(f"sin audit logs: {', '.join(args.logs)}", file=sys.stderr)
+        return 1
+    rep = report(load(paths, args.cache), args.since, args.until, args.language, args.top)
+    print(json.dumps(rep, ensure_ascii=False, indent=2) if args.json else render(rep))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+# tools/gozolite_client.py — cliente de la API de GozoLite (sync y asyncio), sólo stdlib
+"""
+Cliente para /execute, /execute/stream, /judge y /inputs:
+
+    from tools.gozolite_client import Client, AsyncClient
+
+    with Client("http://127.0.0.1:8000", api_key="team-a") as c:
+        res = c.execute("python", "print(1)")
+        for evt in c.stream("bash", "echo hola"):
+            ...
+        results = c.batch([{"language": "python", "code": f"print({i})"} for i in range(100)])
+
+    async with AsyncClient("http://127.0.0.1:8000", max_connections=16) as c:
+        results = await c.batch(jobs, concurrency=8)
+
+- Conexiones keep-alive reutilizadas (pool acotado por `max_connections`: es también el tope de
+  requests en vuelo por cliente).
+- Reintento con backoff exponencial + jitter ante 429/503 (respeta `Retry-After`) y ante conexiones
+  caídas/rechazadas. Ejecutar código es idempotente para la API: reintentar no tiene efectos extra.
+- Métricas del lado del cliente (`metrics()`): latencia p50/p95/p99 por endpoint, reintentos,
+  códigos HTTP y tiempo hasta el primer evento en streaming.
+"""
+from __future__ import annotations
+
+import asyncio
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from .audit_stats import Histogram
+
+RETRY_STATUS = (429, 503)
+DEFAULT_RETRIES = 4
+BACKOFF_BASE_S = 0.2
+BACKOFF_MAX_S = 5.0
+QUEUE_SLACK_S = 30.0  # además del timeout del job: espera en la cola del tenant, build, red
+USER_AGENT = "gozolite-client/1"
+
+
+class ClientError(Exception):
+    """Respuesta no exitosa (status HTTP; 0 = error de conexión) tras agotar los reintentos."""
+
+    def __init__(self, status: int, detail: Any, retries: int = 0):
+        super().__init__(f"HTTP {status}: {detail}" if status else f"conexión: {detail}")
+        self.status = status
+        self.detail = detail
+        self.retries = retries
+
+
+# --------- Métricas ---------
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._eps: Dict[str, Dict[str, Any]] = {}
+        self.connections = {"opened": 0, "reused": 0}
+
+    def _ep(self, endpoint: str) -> Dict[str, Any]:
+        ep = self._eps.get(endpoint)
+        if ep is None:
+            ep = self._eps[endpoint] = {"requests": 0, "errors": 0, "retries": 0, "status": {},
+                                        "latency": Histogram(), "first_event": Histogram()}
+        return ep
+
+    def observe(self, endpoint: str, ms: float, status: int, retries: int) -> None:
+        with self._lock:
+            ep = self._ep(endpoint)
+            ep["requests"] += 1
+            ep["retries"] += retries
+            ep["errors"] += 1 if status == 0 or status >= 400 else 0
+            ep["status"][status] = ep["status"].get(status, 0) + 1
+            ep["latency"].add(ms)
+
+    def first_event(self, endpoint: str, ms: float) -> None:
+        with self._lock:
+            self._ep(endpoint)["first_event"].add(ms)
+
+    def connection(self, reused: bool) -> None:
+        with self._lock:
+            self.connections["reused" if reused else "opened"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {"connections": dict(self.connections)}
+            for name, ep in sorted(self._eps.items()):
+                lat, first = ep["latency"], ep["first_event"]
+                out[name] = {
+                    "requests": ep["requests"], "errors": ep["errors"], "retries": ep["retries"],
+                    "status": {str(k): v for k, v in sorted(ep["status"].items())},
+                    "p50_ms": lat.quantile(0.50), "p95_ms": lat.quantile(0.95), "p99_ms": lat.quantile(0.99),
+                }
+                if first.count:
+                    out[name]["first_event_p50_ms"] = first.quantile(0.50)
+                    out[name]["first_event_p95_ms"] = first.quantile(0.95)
+            return out
+
+
+# --------- Helpers compartidos ---------
+def _job(language: Optional[str], code: Optional[str], options: Dict[str, Any]) -> Dict[str, Any]:
+    body = {"language": language, "code": code}
+    body.update(options)
+    return {k: v for k, v in body.items() if v is not None}
+
+
+def _backoff(attempt: int, retry_after: Optional[str]) -> float:
+    """Full jitter; con Retry-After se espera eso más un jitter chico (no todos a la vez)."""
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX_S * 4, float(retry_after)) + random.uniform(0, BACKOFF_BASE_S)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+
+def _decode(raw: bytes) -> Any:
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw.decode("utf-8", "replace")
+
+
+class _SSE:
+    """Parser incremental de Server-Sent Events (event:/data: JSON, separados por línea vacía)."""
+
+    def __init__(self) -> None:
+        self.name = "message"
+        self.data: List[str] = []
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        line = line.rstrip("\r\n")
+        if not line:
+            if not self.data:
+                return None
+            evt = {"event": self.name, **json.loads("\n".join(self.data))}
+            self.name, self.data = "message", []
+            return evt
+        if line.startswith("event:"):
+            self.name = line[6:].strip()
+        elif line.startswith("data:"):
+            self.data.append(line[5:].lstrip())
+        return None
+
+
+class _Base:
+    def __init__(self, base_url: str, api_key: Optional[str], max_connections: int, retries: int):
+        u = urlsplit(base_url)
+        if u.scheme not in ("http", "https") or not u.hostname:
+            raise ValueError(f"URL inválida: {base_url!r}")
+        self.tls = u.scheme == "https"
+        self.host = u.hostname
+        self.port = u.port or (443 if self.tls else 80)
+        self.prefix = u.path.rstrip("/")
+        self.max_connections = max(1, int(max_connections))
+        self.retries = max(0, int(retries))
+        self._metrics = Metrics()
+        self.headers = {"User-Agent": USER_AGENT, "Accept": "application/json"}
+        if api_key:
+            self.headers["X-API-Key"] = api_key
+
+    def metrics(self) -> Dict[str, Any]:
+        return self._metrics.snapshot()
+
+    @staticmethod
+    def _timeout(body: Optional[Dict[str, Any]]) -> float:
+        return float((body or {}).get("timeout") or 10) + QUEUE_SLACK_S
+
+
+# --------- Cliente sync ---------
+class Client(_Base):
+    """Cliente bloqueante, seguro entre hilos; `batch` reparte los jobs en un pool de hilos."""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, max_connections: int = 8,
+                 retries: int = DEFAULT_RETRIES):
+        super().__init__(base_url, api_key, max_connections, retries)
+        self._idle: List[http.client.HTTPConnection] = []
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._lock = threading.Lock()
+
+    # Pool
+    def _acquire(self, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        self._slots.acquire()
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        reused = conn is not None
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.tls else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=timeout)
+        else:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        self._metrics.connection(reused)
+        return conn, reused
+
+    def _release(self, conn: http.client.HTTPConnection, keep: bool) -> None:
+        try:
+            if keep:
+                with self._lock:
+                    self._idle.append(conn)
+            else:
+                conn.close()
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # Request con reintentos
+    def _send(self, method: str, path: str, data: Optional[bytes], headers: Dict[str, str], timeout: float,
+              endpoint: str) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse, int, float]:
+        """Devuelve (conexión, respuesta, reintentos, inicio); la conexión queda tomada hasta leer el body."""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            conn, _reused = self._acquire(timeout)
+            try:
+                conn.request(method, self.prefix + path, body=data, headers=headers)
+                resp = conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                self._release(conn, keep=False)
+                if attempt >= self.retries:
+                    self._metrics.observe(endpoint, (time.monotonic() - started) * 1000, 0, attempt)
+                    raise ClientError(0, str(e) or type(e).__name__, attempt)
+                time.sleep(_backoff(attempt, None))
+                attempt += 1
+                continue
+            if resp.status in RETRY_STATUS and attempt < self.retries:
+                resp.read()
+                self._release(conn, keep=not resp.will_close)
+                time.sleep(_backoff(attempt, resp.getheader("Retry-After")))
+                attempt += 1
+                continue
+            return conn, resp, attempt, started
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None, raw: Optional[bytes] = None,
+                 endpoint: Optional[str] = None) -> Any:
+        endpoint = endpoint or path
+        headers = dict(self.headers)
+        if raw is not None:
+            data = raw
+            headers["Content-Type"] = "application/octet-stream"
+        elif body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        else:
+            data = None
+        conn, resp, retries, started = self._send(method, path, data, headers, self._timeout(body), endpoint)
+        try:
+            payload = resp.read()
+        except (OSError, http.client.HTTPException) as e:
+            self._release(conn, keep=False)
+            self._metrics.observe(endpoint, (time.monotonic() - started) * 1000, 0, retries)
+            raise ClientError(0, str(e), retries)
+        self._release(conn, keep=not resp.will_close)
+        self._metrics.observe(endpoint, (time.monotonic() - started) * 1000, resp.status, retries)
+        if resp.status >= 400:
+            raise ClientError(resp.status, _decode(payload), retries)
+        return _decode(payload)
+
+    # API
+    def execute(self, language: Optional[str], code: Optional[str] = None, **options: Any) -> Dict[str, Any]:
+        """POST /execute. options: stdin, stdin_id, files, datasets, timeout, memory_mb, priority, deadline_ms, ..."""
+        return self._request("POST", "/execute", _job(language, code, options))
+
+    def judge(self, language: str, code: str, cases: List[Dict[str, Any]], **options: Any) -> Dict[str, Any]:
+        return self._request("POST", "/judge", _job(language, code, dict(options, cases=cases)))
+
+    def upload_input(self, data: bytes) -> str:
+        """POST /inputs (stdin o archivo grande) => input_id para stdin_id/files."""
+        return self._request("POST", "/inputs", raw=data)["input_id"]
+
+    def cancel(self, job_id: str) -> bool:
+        """DELETE /jobs/{job_id} (el `job_id` enviado en execute/judge/stream). False si ya terminó."""
+        try:
+            return bool(self._request("DELETE", f"/jobs/{job_id}")["cancelled"])
+        except ClientError as e:
+            if e.status == 404:
+                return False
+            raise
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def stream(self, language: Optional[str], code: Optional[str] = None, **options: Any) -> Iterator[Dict[str, Any]]:
+        """POST /execute/stream: eventos stdout/stderr a medida que llegan y un `exit` final."""
+        body = _job(language, code, options)
+        endpoint = "/execute/stream"
+        headers = dict(self.headers, **{"Content-Type": "application/json", "Accept": "text/event-stream"})
+        conn, resp, retries, started = self._send("POST", endpoint, json.dumps(body).encode("utf-8"), headers,
+                                                  self._timeout(body), endpoint)
+        keep = False
+        try:
+            if resp.status >= 400:
+                payload = resp.read()
+                keep = not resp.will_close
+                self._metrics.observe(endpoint, (time.monotonic() - started) * 1000, resp.status, retries)
+                raise ClientError(resp.status, _decode(payload), retries)
+            sse, first = _SSE(), True
+            for line in resp:
+                evt = sse.feed(line.decode("utf-8", "replace"))
+                if evt is None:
+                    continue
+                if first:
+                    self._metrics.first_event(endpoint, (time.monotonic() - started) * 1000)
+                    first = False
+                yield evt
+            keep = not resp.will_close
+            self._metrics.observe(endpoint, (time.monotonic() - started) * 1000, resp.status, retries)
+        finally:
+            # Abandonar el iterador corta la conexión: el servidor mata el job
+            self._release(conn, keep=keep and resp.isclosed())
+
+    def batch(self, jobs: Iterable[Dict[str, Any]], concurrency: Optional[int] = None,
+              return_exceptions: bool = True) -> List[Union[Dict[str, Any], ClientError]]:
+        """Corre muchos /execute con a lo sumo `concurrency` (<= max_connections) en vuelo; resultados en orden."""
+        jobs = list(jobs)
+        workers = max(1, min(concurrency or self.max_connections, self.max_connections, len(jobs) or 1))
+
+        def _one(job: Dict[str, Any]) -> Union[Dict[str, Any], ClientError]:
+            try:
+                return self._request("POST", "/execute", {k: v for k, v in job.items() if v is not None})
+            except ClientError as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gozolite-client") as pool:
+            return list(pool.map(_one, jobs))
+
+
+# --------- Cliente asyncio ---------
+class _AsyncConn:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _AsyncResponse:
+    """Respuesta HTTP/1.1 mínima: Content-Length, chunked o hasta el cierre."""
+
+    def __init__(self, conn: _AsyncConn, status: int, headers: Dict[str, str]):
+        self.conn = conn
+        self.status = status
+        self.headers = headers
+        self.done = False
+        self.keep_alive = headers.get("connection", "").lower() != "close"
+        self._left = int(headers["content-length"]) if "content-length" in headers else None
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        if self._left is None and not self._chunked:
+            self.keep_alive = False  # body hasta EOF
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        r = self.conn.reader
+        if self._chunked:
+            while True:
+                size = int((await r.readline()).split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await r.readline()) not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    break
+                data = await r.readexactly(size)
+                await r.readline()
+                yield data
+        elif self._left is not None:
+            while self._left > 0:
+                data = await r.read(min(self._left, 65536))
+                if not data:
+                    raise ConnectionError("conexión cerrada a mitad del body")
+                self._left -= len(data)
+                yield data
+        else:
+            while True:
+                data = await r.read(65536)
+                if not data:
+                    break
+                yield data
+        self.done = True
+
+    async def read(self) -> bytes:
+        return b"".join([c async for c in self.chunks()])
+
+
+class AsyncClient(_Base):
+    """Variante asyncio (sin dependencias): mismo pool keep-alive, reintentos y métricas."""
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, max_connections: int = 8,
+                 retries: int = DEFAULT_RETRIES):
+        super().__init__(base_url, api_key, max_connections, retries)
+        if self.tls:
+            import ssl
+            self._ssl: Any = ssl.create_default_context()
+        else:
+            self._ssl = None
+        self._idle: List[_AsyncConn] = []
+        self._slots: Optional[asyncio.Semaphore] = None  # se crea dentro del loop
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    # Pool
+    async def _acquire(self) -> Tuple[_AsyncConn, bool]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        await self._slots.acquire()
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.reader.at_eof() and not conn.writer.is_closing():
+                self._metrics.connection(True)
+                return conn, True
+            conn.close()
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._metrics.connection(False)
+        return _AsyncConn(reader, writer), False
+
+    def _release(self, conn: _AsyncConn, keep: bool) -> None:
+        if keep:
+            self._idle.append(conn)
+        else:
+            conn.close()
+        assert self._slots is not None
+        self._slots.release()
+
+    async def _roundtrip(self, conn: _AsyncConn, method: str, path: str, data: Optional[bytes],
+                         headers: Dict[str, str]) -> _AsyncResponse:
+        lines = [f"{method} {self.prefix}{path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        lines.append(f"Content-Length: {len(data or b'')}")
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (data or b""))
+        await conn.writer.drain()
+        status_line = await conn.reader.readline()
+        if not status_line:
+            raise ConnectionError("el servidor cerró la conexión")
+        status = int(status_line.split()[1])
+        hdrs: Dict[str, str] = {}
+        while True:
+            line = await conn.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            hdrs[k.strip().lower()] = v.strip()
+        return _AsyncResponse(conn, status, hdrs)
+
+    async def _send(self, method: str, path: str, data: Optional[bytes], headers: Dict[str, str], timeout: float,
+                    endpoint: str) -> Tuple[_AsyncResponse, int, float]:
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            conn, _reused = await self._acquire()
+            try:
+                resp = await asyncio.wait_for(self._roundtrip(conn, method, path, data, headers), timeout)
+            except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                self._release(conn, keep=False)
+                if attempt >= self.retries:
+                    self._metrics.observe(endpoint, (time.monotonic() - started) * 1000, 0, attempt)
+                    raise ClientError(0, str(e) or type(e).__name__, attempt)
+                await asyncio.sleep(_backoff(attempt, None))
+                attempt += 1
+                continue
+            if resp.status in RETRY_STATUS and attempt < self.retries:
+                await resp.read()
+                self._release(conn, keep=resp.keep_alive)
+                await asyncio.sleep(_backoff(attempt, resp.headers.get("retry-after")))
+                attempt += 1
+                continue
+            return resp, attempt, started
+
+    async def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None,
+                       raw: Optional[bytes] = None) -> Any:
+        headers = dict(self.headers)
+        if raw is not None:
+            data: Optional[bytes] = raw
+            headers["Content-Type"] = "application/octet-stream"
+        elif body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        else:
+            data = None
+        timeout = self._timeout(body)
+        resp, retries, started = await self._send(method, path, data, headers, timeout, path)
+        try:
+            payload = await asyncio.wait_for(resp.read(), timeout)
+        except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            self._release(resp.conn, keep=False)
+            self._metrics.observe(path, (time.monotonic() - started) * 1000, 0, retries)
+            raise ClientError(0, str(e) or type(e).__name__, retries)
+        self._release(resp.conn, keep=resp.keep_alive)
+        self._metrics.observe(path, (time.monotonic() - started) * 1000, resp.status, retries)
+        if resp.status >= 400:
+            raise ClientError(resp.status, _decode(payload), retries)
+        return _decode(payload)
+
+    # API
+    async def execute(self, language: Optional[str], code: Optional[str] = None, **options: Any) -> Dict[str, Any]:
+        return await self._request("POST", "/execute", _job(language, code, options))
+
+    async def judge(self, language: str, code: str, cases: List[Dict[str, Any]], **options: Any) -> Dict[str, Any]:
+        return await self._request("POST", "/judge", _job(language, code, dict(options, cases=cases)))
+
+    async def upload_input(self, data: bytes) -> str:
+        return (await self._request("POST", "/inputs", raw=data))["input_id"]
+
+    async def cancel(self, job_id: str) -> bool:
+        try:
+            return bool((await self._request("DELETE", f"/jobs/{job_id}"))["cancelled"])
+        except ClientError as e:
+            if e.status == 404:
+                return False
+            raise
+
+    async def health(self) -> Dict[str, Any]:
+        return await self._request("GET", "/health")
+
+    async def stream(self, language: Optional[str], code: Optional[str] = None, **options: Any) -> AsyncIterator[Dict[str, Any]]:
+        body = _job(language, code, options)
+        endpoint = "/execute/stream"
+        headers = dict(self.headers, **{"Content-Type": "application/json", "Accept": "text/event-stream"})
+        resp, retries, started = await self._send("POST", endpoint, json.dumps(body).encode("utf-8"), headers,
+                                                  self._timeout(body), endpoint)
+        try:
+            if resp.status >= 400:
+                payload = await resp.read()
+                self._metrics.observe(endpoint, (time.monotonic() - started) * 1000, resp.status, retries)
+                raise ClientError(resp.status, _decode(payload), retries)
+            sse, first, buf = _SSE(), True, b""
+            async for chunk in resp.chunks():
+                buf += chunk
+                *lines, buf = buf.split(b"\n")
+                for line in lines:
+                    evt = sse.feed(line.decode("utf-8", "replace"))
+                    if evt is None:
+                        continue
+                    if first:
+                        self._metrics.first_event(endpoint, (time.monotonic() - started) * 1000)
+                        first = False
+                    yield evt
+            self._metrics.observe(endpoint, (time.monotonic() - started) * 1000, resp.status, retries)
+        finally:
+            self._release(resp.conn, keep=resp.done and resp.keep_alive)
+
+    async def batch(self, jobs: Iterable[Dict[str, Any]], concurrency: Optional[int] = None,
+                    return_exceptions: bool = True) -> List[Union[Dict[str, Any], ClientError]]:
+        """Como Client.batch: a lo sumo `concurrency` jobs en vuelo (además del tope del pool)."""
+        gate = asyncio.Semaphore(max(1, min(concurrency or self.max_connections, self.max_connections)))
+
+        async def _one(job: Dict[str, Any]) -> Dict[str, Any]:
+            async with gate:
+                return await self._request("POST", "/execute", {k: v for k, v in job.items() if v is not None})
+
+        results = await asyncio.gather(*[_one(j) for j in jobs], return_exceptions=return_exceptions)
+        for r in results:
+            if isinstance(r, BaseException) and not isinstance(r, ClientError):
+                raise r  # errores de programación no se devuelven como resultado
+        return list(results)
@@ -0,0 +1,137 @@
+# tools/jvm_bench.py — arranque de programas JVM cortos: lanzador del toolchain vs java afinado vs + CDS
+"""
+Compila un programa mínimo (lee un entero de stdin e imprime el doble) por cada lenguaje JVM
+instalado, con la ArtifactCache de GozoLite, y mide el wall del run por cada camino:
+
+    launcher   el comando de siempre: java -cp / java -jar / scala -nc (JvmCds apagado)
+    flags      java directo con el runtime en el classpath y GOZOLITE_JVM_FLAGS, sin archivo CDS
+    cds        ídem, con el archivo AppCDS del lenguaje (se genera antes de medir; `setup_ms`)
+
+Cada run es `bash -c` con el entorno de login cacheado, como un caso del juez.
+
+Uso:
+    python -m tools.jvm_bench [--runs 20] [--languages java,kotlin,scala] [--modes launcher,flags,cds] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core2.orchestrators.gozo_lite import GozoLite
+from core2.orchestrators.jvm_cds import JvmCds, jar_main
+from core2.orchestrators.judge import login_env
+from core2.orchestrators.supervisor import supervisor
+
+MODES = ("launcher", "flags", "cds")
+PROGRAMS = {
+    "java": "import java.util.*;\npublic class Main {\n  public static void main(String[] a) {\n"
+            "    Scanner sc = new Scanner(System.in);\n    System.out.println(sc.nextInt() * 2);\n  }\n}\n",
+    "kotlin": "fun main() {\n  val n = readLine()!!.trim().toInt()\n  println(n * 2)\n}\n",
+    "scala": "object Main extends App {\n  println(scala.io.StdIn.readLine().trim.toInt * 2)\n}\n",
+}
+CLASSPATH = {"java": "out", "kotlin": "kotlin.jar", "scala": "scala_out"}
+
+
+def _quantile(xs: List[float], q: float) -> float:
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2)
+
+
+def _wait_archive(jvm: JvmCds, language: str, timeout_s: float = 600) -> float:
+    started = time.perf_counter()
+    jvm.prewarm([language])
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        cell = jvm.snapshot()["languages"].get(language, {})
+        if cell.get("archive"):
+            return (time.perf_counter() - started) * 1000
+        if cell.get("error"):
+            raise RuntimeError(f"{language}: archivo CDS: {cell['error']}")
+        time.sleep(0.2)
+    raise RuntimeError(f"{language}: el archivo CDS no estuvo listo en {timeout_s:.0f} s")
+
+
+def _command(g: GozoLite, language: str, mode: str, built_dir: Path, src: Path) -> str:
+    if mode == "launcher":
+        g.jvm.enabled = False
+        try:
+            return g.registry[language].run(src, built_dir)
+        finally:
+            g.jvm.enabled = True
+    cp = built_dir / CLASSPATH[language]
+    main = jar_main(cp) if language == "kotlin" else "Main"
+    cmd = g.jvm.command(language, [cp], main, cds=(mode == "cds"))
+    if cmd is None:
+        raise RuntimeError(f"{language}: runtime no ubicable para lanzar java directo")
+    return cmd
+
+
+def bench(g: GozoLite, language: str, mode: str, runs: int, built_dir: Path, src: Path, workdir: str) -> Dict[str, Any]:
+    setup_ms = _wait_archive(g.jvm, language) if mode == "cds" else 0.0
+    cmd = _command(g, language, mode, built_dir, src)
+    env = login_env()
+    times: List[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        res = supervisor.run(["bash", "-c", cmd], cwd=workdir, env=env, input="21\n", timeout=120)
+        times.append((time.perf_counter() - started) * 1000)
+        if res.returncode != 0 or res.stdout.strip() != "42":
+            raise RuntimeError(f"{language}/{mode}: exit {res.returncode}: {(res.stderr or res.stdout).strip()[-300:]}")
+    times.sort()
+    return {"language": language, "mode": mode, "runs": runs, "setup_ms": round(setup_ms, 2),
+            "p50_ms": _quantile(times, 0.5), "p95_ms": _quantile(times, 0.95),
+            "mean_ms": round(sum(times) / len(times), 2), "min_ms": round(times[0], 2)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Arranque JVM: lanzador del toolchain vs java afinado vs + CDS")
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--languages", default=",".join(PROGRAMS), help=f"subconjunto de {','.join(PROGRAMS)}")
+    ap.add_argument("--modes", default=",".join(MODES), help=f"subconjunto de {','.join(MODES)}")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    langs = [x.strip() for x in args.languages.split(",") if x.strip()]
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [x for x in langs if x not in PROGRAMS] + [m for m in modes if m not in MODES]
+    if unknown:
+        ap.error(f"lenguajes/modos desconocidos: {unknown}")
+    login_env()  # se cachea una vez, como en la API
+    g = GozoLite()
+    rows: List[Dict[str, Any]] = []
+    skipped: Dict[str, str] = {}
+    with tempfile.TemporaryDirectory(prefix="ce-bench-", dir="/tmp") as workdir:
+        for language in langs:
+            spec = g.registry[language]
+            missing = [t for t in spec.tools if not g._which(t)]
+            if missing:
+                skipped[language] = f"{'/'.join(missing)} no instalado"
+                continue
+            built = g._build_cached(language, spec, PROGRAMS[language], timeout=300.0)
+            if not built.ok:
+                skipped[language] = f"compilación: exit {built.exit_code}: {built.stderr.strip()[-300:]}"
+                continue
+            lang_rows = [bench(g, language, m, max(1, args.runs), built.dir, built.src, workdir) for m in modes]
+            base = next((r["p50_ms"] for r in lang_rows if r["mode"] == "launcher"), None)
+            for r in lang_rows:
+                r["vs_launcher"] = round(r["p50_ms"] / base, 4) if base else None
+            rows += lang_rows
+    if args.json:
+        print(json.dumps({"results": rows, "skipped": skipped, "jvm_cds": g.jvm.snapshot()}, indent=2, ensure_ascii=False))
+        return 0
+    print(f"{'lenguaje':<10}{'modo':<10}{'p50 ms':>10}{'p95 ms':>10}{'media ms':>10}{'setup ms':>11}{'vs launcher':>13}")
+    for r in rows:
+        vs = f"{r['vs_launcher']:.3f}x" if r["vs_launcher"] is not None else "-"
+        print(f"{r['language']:<10}{r['mode']:<10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['mean_ms']:>10}"
+              f"{r['setup_ms']:>11}{vs:>13}")
+    for language, why in skipped.items():
+        print(f"{language}: salteado ({why})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+# tools/overhead_bench.py — micro-benchmarks del overhead Python por request (sin el proceso hijo)
+"""
+Aísla cada etapa que recorre un request de `/execute` en proceso, con un orquestador stub que no
+lanza nada (devuelve el código como stdout), y mide por llamada el tiempo y las asignaciones
+(tracemalloc: pico transitorio y bytes retenidos) para varios tamaños de código, hasta el límite de
+64 KiB de SEC_MAX_CODE_BYTES:
+
+    pydantic          ExecReq.parse_raw del body JSON (lo que hace FastAPI antes del endpoint)
+    validate_request  validate_request (tamaño, líneas, deny patterns, red)
+    build_policy      build_policy + policy_dict
+    audit             AuditTrail: START + END (dos escrituras JSONL, a un archivo temporal)
+    rusage            Usage + supervisor.metered + snapshot (contabilidad por job del audit)
+    memory_add        Memory.add del evento de MainApp.submit
+    middleware        SecureMiddleware.submit completo sobre el stub (incluye las cuatro anteriores)
+    main_submit       MainApp.submit sobre un middleware que devuelve un resultado fijo (normalización + Memory.add)
+    normalize_out     _normalize_out de la API (dict => ExecResult)
+    request           la cadena entera: parse_raw -> MainApp.submit -> _normalize_out -> JSON de la respuesta
+
+Resultados en JSON estable (claves ordenadas, enteros) para comparar corridas; con --baseline la
+corrida falla (exit 1) si alguna etapa empeora más que el umbral en tiempo o en pico de memoria.
+
+Uso:
+    python -m tools.overhead_bench [--sizes 128,1024,16384,65536] [--stages a,b] [--rounds 15]
+                                   [--round-ms 10] [--save FILE] [--baseline FILE]
+                                   [--threshold 25] [--alloc-threshold 10] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+FORMAT = 2  # sube si cambia el esquema del JSON o lo que mide una etapa (invalida baselines viejos)
+SIZES = (128, 1024, 4096, 16384, 65536)
+STAGES = ("pydantic", "validate_request", "build_policy", "audit", "rusage", "memory_add",
+          "middleware", "main_submit", "normalize_out", "request")
+MIN_DELTA_NS = 500      # diferencias menores no cuentan como regresión de tiempo (ruido del reloj)
+MIN_DELTA_BYTES = 256   # ídem para el pico de memoria
+
+
+class StubOrchestrator:
+    """Orquestador que no lanza procesos: responde como GozoLite con el código como stdout."""
+
+    MODE = "stub"
+
+    def execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {"ok": True, "exit_code": 0, "stdout": payload["code"], "stderr": "", "time_ms": 1,
+                "mode": self.MODE, "language": payload["language"]}
+
+
+class _Fixed:
+    """Middleware que devuelve siempre el mismo resultado (aísla la normalización de MainApp.submit)."""
+
+    def __init__(self, result: Dict[str, Any]):
+        self.result = result
+
+    def submit(self, **_kw: Any) -> Dict[str, Any]:
+        return self.result
+
+
+def make_code(size: int) -> str:
+    """Código python válido de exactamente `size` bytes, sin deny patterns y dentro de SEC_MAX_LINES."""
+    lines: List[str] = []
+    total, i = 0, 0
+    while total < size:
+        line = f"v{i} = {i} * 7 + 3  # relleno del benchmark de overhead por request ...."[:63] + "\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "".join(lines)[:size - 1] + "\n" if size > 1 else "\n"
+
+
+# --------- Etapas ---------
+def _stages(size: int, audit_path: str) -> Dict[str, Callable[[], Any]]:
+    with contextlib.redirect_stdout(sys.stderr):  # los avisos de arranque de la API no ensucian el JSON
+        from api.app import ExecReq, _normalize_out, main as api_main
+    from core2.orchestrators.supervisor import Usage, supervisor
+    from memory.memory import Memory
+    from security import audit_logger
+    from security.audit_logger import AuditTrail
+    from security.input_validator import validate_request
+    from security.policy_enforcer import build_policy, policy_dict
+    from security.secure_middleware import SecureMiddleware
+
+    audit_logger.AUDIT_PATH = audit_path  # las etapas escriben auditoría real, pero fuera del log de la API
+    code = make_code(size)
+    body = json.dumps({"language": "python", "code": code, "timeout": 10, "memory_mb": 256}).encode("utf-8")
+    stub = StubOrchestrator()
+    secure = SecureMiddleware(stub)
+    result = stub.execute({"language": "python", "code": code})
+    memory = Memory(max_events=20)
+    api_main.recorder = None
+    api_main.orchestrator = secure
+    fixed_app = _FixedApp(api_main, result)
+
+    def _audit() -> None:
+        trail = AuditTrail({"language": "python", "code": code})
+        trail.start(policy_dict(build_policy(10, 256)))
+        trail.end(result, resources={})
+
+    def _rusage() -> Dict[str, Any]:
+        usage = Usage()
+        with supervisor.metered(usage):
+            pass
+        return usage.snapshot()
+
+    def _request() -> str:
+        req = ExecReq.parse_raw(body)
+        res = api_main.submit(language=req.language, code=req.code, timeout=req.timeout, memory_mb=req.memory_mb)
+        return json.dumps(_normalize_out(res).dict(), ensure_ascii=False)
+
+    return {
+        "pydantic": lambda: ExecReq.parse_raw(body),
+        "validate_request": lambda: validate_request("python", code, blocks=1, stdin=None),
+        "build_policy": lambda: policy_dict(build_policy(10, 256)),
+        "audit": _audit,
+        "rusage": _rusage,
+        "memory_add": lambda: memory.add("system", "[Main.submit] mode=stub ok=True exit=0 lang=python"),
+        "middleware": lambda: secure.submit(language="python", code=code, timeout=10, memory_mb=256),
+        "main_submit": fixed_app.submit,
+        "normalize_out": lambda: _normalize_out(result),
+        "request": _request,
+    }
+
+
+class _FixedApp:
+    """MainApp.submit con el middleware reemplazado por _Fixed (sin tocar la instancia compartida)."""
+
+    def __init__(self, app: Any, result: Dict[str, Any]):
+        self.app = app
+        self.fixed = _Fixed(result)
+        self.code = result["stdout"]
+
+    def submit(self) -> Dict[str, Any]:
+        secure, self.app.orchestrator = self.app.orchestrator, self.fixed
+        try:
+            return self.app.submit(language="python", code=self.code, timeout=10, memory_mb=256)
+        finally:
+            self.app.orchestrator = secure
+
+
+# --------- Medición ---------
+def _calibrate(fn: Callable[[], Any], round_ms: float) -> int:
+    n = 1
+    while True:
+        started = time.perf_counter_ns()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter_ns() - started
+        if elapsed >= round_ms * 1e6 / 4 or n >= 1 << 20:
+            return max(1, int(n * round_ms * 1e6 / max(elapsed, 1)))
+        n *= 4
+
+
+def _round(fn: Callable[[], Any], n: int) -> float:
+    gc.collect()
+    started = time.perf_counter_ns()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter_ns() - started) / n
+
+
+def _summary(per_call: List[float], n: int) -> Dict[str, Any]:
+    per_call = sorted(per_call)
+    median = statistics.median(per_call)
+    q1, q3 = per_call[len(per_call) // 4], per_call[(3 * len(per_call)) // 4]
+    return {"ns_median": int(median), "ns_min": int(per_call[0]), "calls_per_round": n,
+            "spread_pct": round((q3 - q1) / median * 100, 1) if median else 0.0}
+
+
+def _allocs(fn: Callable[[], Any], calls: int) -> Dict[str, Any]:
+    """Pico transitorio (mediana por llamada) y bytes retenidos (promedio) con tracemalloc."""
+    fn()
+    peaks = array("q", [0] * calls)  # fuera del tracing: lo que retiene la medición no se cuenta
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start_current = tracemalloc.get_traced_memory()[0]
+        for i in range(calls):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            peaks[i] = tracemalloc.get_traced_memory()[1] - before
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - start_current
+    finally:
+        tracemalloc.stop()
+    return {"peak_bytes": int(statistics.median(peaks)), "retained_bytes": int(retained / calls)}
+
+
+def run(sizes: List[int], stages: List[str], rounds: int, round_ms: float, alloc_calls: int) -> Dict[str, Any]:
+    """
+    Las rondas se intercalan entre todas las celdas (ronda 1 de cada una, ronda 2, ...): una racha
+    de ruido de la máquina se reparte entre las celdas en vez de caer entera sobre una.
+    """
+    results: Dict[str, Dict[str, Any]] = {s: {} for s in stages}
+    with tempfile.TemporaryDirectory(prefix="gozolite-overhead-") as tmp:
+        audit_path = os.path.join(tmp, "audit.jsonl")
+        cells: List[Tuple[str, str, Callable[[], Any], int]] = []
+        for size in sizes:
+            fns = _stages(size, audit_path)
+            for stage in stages:
+                cells.append((stage, str(size), fns[stage], _calibrate(fns[stage], round_ms)))  # + calentamiento
+        times: List[List[float]] = [[] for _ in cells]
+        for _ in range(rounds):
+            for i, (_stage, _size, fn, n) in enumerate(cells):
+                times[i].append(_round(fn, n))
+            if os.path.exists(audit_path):
+                os.truncate(audit_path, 0)  # el archivo de auditoría no crece entre rondas
+        for i, (stage, size, fn, n) in enumerate(cells):
+            results[stage][size] = dict(_summary(times[i], n), **_allocs(fn, alloc_calls))
+    return {"format": FORMAT,
+            "meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                     "machine": platform.machine(), "cpus": os.cpu_count(), "rounds": rounds, "round_ms": round_ms,
+                     "alloc_calls": alloc_calls},
+            "results": results}
+
+
+# --------- Comparación ---------
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold_pct: float,
+            alloc_threshold_pct: float) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Celdas comparadas con el baseline y la lista de regresiones (vacía => la corrida pasa)."""
+    if baseline.get("format") != current["format"]:
+        return [], [f"baseline con formato {baseline.get('format')} (actual {current['format']}): no comparable"]
+    rows: List[Dict[str, Any]] = []
+    failures: List[str] = []
+    for stage, by_size in current["results"].items():
+        for size, cell in by_size.items():
+            base = (baseline.get("results") or {}).get(stage, {}).get(size)
+            if base is None:
+                continue
+            t_ratio = cell["ns_median"] / base["ns_median"] if base["ns_median"] else None
+            a_ratio = cell["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] else None
+            row = {"stage": stage, "size": int(size), "time_ratio": round(t_ratio, 3) if t_ratio else None,
+                   "peak_ratio": round(a_ratio, 3) if a_ratio else None, "regressed": []}
+            # tiempo: tienen que empeorar la mediana y el mínimo (un pico de ruido de la máquina mueve sólo uno)
+            slower = min(cell["ns_median"] / base["ns_median"], cell["ns_min"] / max(base["ns_min"], 1)) if t_ratio else 0
+            if slower > 1 + threshold_pct / 100 and cell["ns_median"] - base["ns_median"] > MIN_DELTA_NS:
+                row["regressed"].append("time")
+                failures.append(f"{stage}@{size}: {base['ns_median']} -> {cell['ns_median']} ns/llamada "
+                                f"(+{(t_ratio - 1) * 100:.0f}% > {threshold_pct:g}%)")
+            if a_ratio and a_ratio > 1 + alloc_threshold_pct / 100 \
+                    and cell["peak_bytes"] - base["peak_bytes"] > MIN_DELTA_BYTES:
+                row["regressed"].append("alloc")
+                failures.append(f"{stage}@{size}: pico {base['peak_bytes']} -> {cell['peak_bytes']} bytes "
+                                f"(+{(a_ratio - 1) * 100:.0f}% > {alloc_threshold_pct:g}%)")
+            rows.append(row)
+    return rows, failures
+
+
+def _print(current: Dict[str, Any], rows: List[Dict[str, Any]]) -> None:
+    ratios = {(r["stage"], r["size"]): r for r in rows}
+    print(f"{'etapa':<18}{'bytes':>8}{'ns/llamada':>12}{'disp %':>8}{'pico B':>10}{'retenido B':>12}{'vs base':>10}")
+    for stage, by_size in current["results"].items():
+        for size, c in by_size.items():
+            r = ratios.get((stage, int(size)))
+            vs = "-" if r is None or r["time_ratio"] is None else f"{r['time_ratio']:.2f}x" + ("!" if r["regressed"] else "")
+            print(f"{stage:<18}{size:>8}{c['ns_median']:>12}{c['spread_pct']:>8}{c['peak_bytes']:>10}"
+                  f"{c['retained_bytes']:>12}{vs:>10}")
+
+
+def _ints(v: str) -> List[int]:
+    return [int(x) for x in v.split(",") if x.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Micro-benchmarks del overhead Python por request de GozoLite")
+    ap.add_argument("--sizes", type=_ints, default=list(SIZES), help="tamaños del código en bytes (hasta 65536)")
+    ap.add_argument("--stages", default=",".join(STAGES), help=f"subconjunto de {','.join(STAGES)}")
+    ap.add_argument("--rounds", type=int, default=15, help="rondas cronometradas por celda (se reporta la mediana)")
+    ap.add_argument("--round-ms", type=float, default=10.0, help="duración objetivo de cada ronda")
+    ap.add_argument("--alloc-calls", type=int, default=50, help="llamadas medidas con tracemalloc por celda")
+    ap.add_argument("--save", default=None, help="escribe los resultados (JSON) en este archivo")
+    ap.add_argument("--baseline", default=None, help="JSON de una corrida anterior: falla si alguna etapa empeora")
+    ap.add_argument("--threshold", type=float, default=25.0, help="regresión de tiempo tolerada, en %%")
+    ap.add_argument("--alloc-threshold", type=float, default=10.0, help="regresión del pico de memoria tolerada, en %%")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        ap.error(f"etapas desconocidas: {unknown}")
+    if not args.sizes or any(s < 1 for s in args.sizes):
+        ap.error("--sizes: enteros positivos")
+    os.environ.pop("GOZOLITE_CAPTURE_PATH", None)  # MainApp sin grabación de tráfico
+
+    current = run(args.sizes, stages, max(3, args.rounds), max(1.0, args.round_ms), max(1, args.alloc_calls))
+    rows: List[Dict[str, Any]] = []
+    failures: List[str] = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            rows, failures = compare(current, json.load(f), args.threshold, args.alloc_threshold)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.json:
+        out = dict(current, comparison=rows, regressions=failures) if args.baseline else current
+        print(json.dumps(out, indent=2, sort_keys=True))
+    else:
+        _print(current, rows)
+        for msg in failures:
+            print(f"REGRESIÓN {msg}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
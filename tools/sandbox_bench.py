@@ -0,0 +1,98 @@
+# tools/sandbox_bench.py — costo de arranque por job: bash -lc actual vs sandbox de namespaces
+"""
+Mide el wall de lanzar un comando trivial por cada camino de ejecución, con `supervisor.run`
+(el mismo que usa el run de GozoLite) y el mismo workdir:
+
+    login      bash -lc CMD                     (camino actual, sin sandbox)
+    env        bash -c CMD + login_env cacheado (sin sandbox, sin login shell)
+    ns         launcher + plantilla (user/mount/net compartidos, mount/pid/ipc por job)
+    ns-net     ídem, pero con un net namespace nuevo por job
+
+Uso:
+    python -m tools.sandbox_bench [--runs 30] [--cmd true] [--modes login,env,ns,ns-net] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from core2.orchestrators.judge import login_env
+from core2.orchestrators.sandbox import NsSandbox
+from core2.orchestrators.supervisor import supervisor
+
+MODES = ("login", "env", "ns", "ns-net")
+
+
+def _quantile(xs: List[float], q: float) -> float:
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 2)
+
+
+def bench(mode: str, cmd: str, runs: int, workdir: str) -> Dict[str, Any]:
+    box: Optional[NsSandbox] = None
+    setup_ms = 0.0
+    if mode.startswith("ns"):
+        box = NsSandbox("ns", shared_net=(mode == "ns"))
+        started = time.perf_counter()
+        box.wrap(["true"], workdir)  # arranca la plantilla (costo único por API)
+        setup_ms = (time.perf_counter() - started) * 1000
+    env = login_env()
+    times: List[float] = []
+    try:
+        for _ in range(runs):
+            if box is not None:
+                argv, run_env = box.wrap(["bash", "-c", cmd], workdir), box.env()
+            elif mode == "env":
+                argv, run_env = ["bash", "-c", cmd], env
+            else:
+                argv, run_env = ["bash", "-lc", cmd], None
+            started = time.perf_counter()
+            res = supervisor.run(argv, cwd=workdir, env=run_env, timeout=60)
+            times.append((time.perf_counter() - started) * 1000)
+            if res.returncode != 0:
+                raise RuntimeError(f"{mode}: exit {res.returncode}: {res.stderr.strip()[-300:]}")
+    finally:
+        if box is not None:
+            box.close()
+    times.sort()
+    return {"mode": mode, "runs": runs, "setup_ms": round(setup_ms, 2), "p50_ms": _quantile(times, 0.5),
+            "p95_ms": _quantile(times, 0.95), "mean_ms": round(sum(times) / len(times), 2), "min_ms": round(times[0], 2)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Costo de arranque por job: bash -lc vs sandbox de namespaces")
+    ap.add_argument("--runs", type=int, default=30)
+    ap.add_argument("--cmd", default="true", help="comando del job (por defecto, uno que no hace nada)")
+    ap.add_argument("--modes", default=",".join(MODES), help=f"subconjunto de {','.join(MODES)}")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        ap.error(f"modos desconocidos: {unknown}")
+    login_env()  # se cachea una vez, como en la API
+    workdir = tempfile.mkdtemp(prefix="ce-bench-", dir="/tmp")
+    try:
+        rows = [bench(m, args.cmd, max(1, args.runs), workdir) for m in modes]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    base = next((r["p50_ms"] for r in rows if r["mode"] == "login"), None)
+    for r in rows:
+        r["vs_login"] = round(r["p50_ms"] / base, 4) if base else None
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"{'modo':<8}{'p50 ms':>10}{'p95 ms':>10}{'media ms':>10}{'setup ms':>10}{'vs login':>10}")
+    for r in rows:
+        vs = f"{r['vs_login']:.3f}x" if r["vs_login"] is not None else "-"
+        print(f"{r['mode']:<8}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['mean_ms']:>10}{r['setup_ms']:>10}{vs:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# tools/traffic_replay.py — re-ejecuta una captura de tráfico (security/traffic_recorder.py) y compara
+"""
+Reproduce una captura contra `MainApp.submit` (en proceso) o contra `/execute` de una API,
+respetando los tiempos de llegada grabados a 1x, a Nx o sin esperas, y reporta por lenguaje la
+latencia grabada vs la del replay (p50/p95/p99) y las diferencias de errores, exit codes y salida.
+
+Uso:
+    python -m tools.traffic_replay CAPTURA [CAPTURA ...] [--target main|http://host:8000]
+                                   [--speed 1|N|max] [--concurrency 16] [--api-key K]
+                                   [--language python] [--limit N] [--json]
+
+La latencia comparada es el wall de MainApp.submit en ambos lados; contra `/execute` el replay suma
+HTTP y la cola del scheduler (el delta incluye ese costo). Los registros con código no grabado
+(redacción por lenguaje) o entradas faltantes (datasets, archivos grandes) se saltean; los que tuvieron
+algo tapado por redacción se ejecutan pero no entran en la comparación de salida.
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from security.traffic_recorder import digest, read_capture
+from tools.audit_stats import Histogram
+
+QUANTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+REORDER_S = 120.0  # un job termina a lo sumo esto después de llegar (timeout + cola)
+
+
+def _records(paths: List[str], language: Optional[str], limit: Optional[int]) -> Iterator[Dict[str, Any]]:
+    """Registros en orden de llegada: se graban al terminar, así que se reordenan con una ventana acotada."""
+    heap: List[Tuple[float, int, Dict[str, Any]]] = []
+    n = seq = 0
+    for path in paths:
+        for rec in read_capture(path):
+            if language and rec.get("language") != language:
+                continue
+            seq += 1
+            heapq.heappush(heap, (float(rec["t"]), seq, rec))
+            while heap and heap[0][0] < float(rec["t"]) - REORDER_S:
+                yield heapq.heappop(heap)[2]
+                n += 1
+                if limit and n >= limit:
+                    return
+    while heap and not (limit and n >= limit):
+        yield heapq.heappop(heap)[2]
+        n += 1
+
+
+def _skip_reason(rec: Dict[str, Any]) -> Optional[str]:
+    if rec.get("code") is None:
+        return "code_redacted"
+    if rec.get("missing"):
+        return "missing_inputs"
+    if (rec.get("stdin") or {}).get("text") is None and rec.get("stdin"):
+        return "stdin_redacted"
+    if any(f.get("text") is None for f in (rec.get("files") or {}).values()):
+        return "files_redacted"
+    return None
+
+
+# --------- Destinos ---------
+def _main_target() -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    from main import MainApp
+    app = MainApp()
+    app.recorder = None  # el replay no se graba a sí mismo
+    tmp = tempfile.mkdtemp(prefix="gozolite-replay-")
+
+    def run(rec: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = dict(rec.get("options") or {})
+        if rec.get("files"):
+            d = tempfile.mkdtemp(dir=tmp)
+            kwargs["files"] = {}
+            for name, f in rec["files"].items():
+                p = os.path.join(d, f"{len(kwargs['files'])}.in")
+                with open(p, "w", encoding="utf-8") as fh:
+                    fh.write(f["text"])
+                kwargs["files"][name] = p
+        res = app.submit(rec["language"], rec["code"], timeout=rec.get("timeout") or 10,
+                         memory_mb=rec.get("memory_mb") or 256,
+                         stdin=(rec.get("stdin") or {}).get("text"), **kwargs)
+        return {"exit_code": res.get("exit_code"), "ok": bool(res.get("ok")), "stdout": res.get("stdout", "")}
+    return run
+
+
+def _http_target(url: str, api_key: Optional[str], concurrency: int, retries: int) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    from tools.gozolite_client import Client
+    client = Client(url, api_key=api_key, max_connections=concurrency, retries=retries)
+
+    def run(rec: Dict[str, Any]) -> Dict[str, Any]:
+        opts: Dict[str, Any] = dict(rec.get("options") or {})
+        if rec.get("stdin"):
+            opts["stdin"] = rec["stdin"]["text"]
+        if rec.get("files"):
+            opts["files"] = {name: client.upload_input(f["text"].encode("utf-8")) for name, f in rec["files"].items()}
+        for k in ("timeout", "memory_mb"):
+            if rec.get(k):
+                opts[k] = rec[k]
+        res = client.execute(rec["language"], rec["code"], **opts)
+        return {"exit_code": res.get("exit_code"), "ok": res.get("exit_code") == 0, "stdout": res.get("stdout", "")}
+    return run
+
+
+# --------- Replay ---------
+def _new_cell() -> Dict[str, Any]:
+    return {"jobs": 0, "rec_failed": 0, "replay_failed": 0, "broke": 0, "fixed": 0, "exit_changed": 0,
+            "output_changed": 0, "transport_errors": 0, "rec": Histogram(), "replay": Histogram()}
+
+
+def replay(records: Iterator[Dict[str, Any]], run: Callable[[Dict[str, Any]], Dict[str, Any]],
+           speed: float, concurrency: int) -> Dict[str, Any]:
+    """speed: 1 => tiempos reales, N => N veces más rápido, 0 => sin esperas (sólo acota `concurrency`)."""
+    cells: Dict[str, Dict[str, Any]] = OrderedDict()
+    skipped: Counter = Counter()
+    lag = Histogram()
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(concurrency)
+    t0_rec: Optional[float] = None
+    t0 = time.monotonic()
+
+    def _one(rec: Dict[str, Any], due: float) -> None:
+        started = time.monotonic()
+        try:
+            got: Optional[Dict[str, Any]] = run(rec)
+        except Exception:  # ClientError, conexión caída, etc.
+            got = None
+        wall_ms = (time.monotonic() - started) * 1000
+        slots.release()
+        recorded = rec.get("result") or {}
+        with lock:
+            lag.add(max(0.0, (started - due) * 1000))
+            c = cells.setdefault(rec["language"], _new_cell())
+            c["jobs"] += 1
+            c["rec"].add(float(recorded.get("wall_ms") or 0))
+            c["rec_failed"] += 0 if recorded.get("ok") else 1
+            if got is None:
+                c["transport_errors"] += 1
+                c["replay_failed"] += 1
+                c["broke"] += 1 if recorded.get("ok") else 0
+                return
+            c["replay"].add(wall_ms)
+            c["replay_failed"] += 0 if got["ok"] else 1
+            c["broke"] += 1 if recorded.get("ok") and not got["ok"] else 0
+            c["fixed"] += 1 if got["ok"] and not recorded.get("ok") else 0
+            c["exit_changed"] += 1 if got["exit_code"] != recorded.get("exit_code") else 0
+            if not rec.get("redacted") and digest(str(got["stdout"])) != recorded.get("stdout_sha"):
+                c["output_changed"] += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay") as pool:
+        for rec in records:
+            reason = _skip_reason(rec)
+            if reason:
+                skipped[reason] += 1
+                continue
+            if t0_rec is None:
+                t0_rec = float(rec["t"])
+            due = t0 + (float(rec["t"]) - t0_rec) / speed if speed > 0 else time.monotonic()
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            slots.acquire()  # sin cola propia: si no hay lugar, el atraso queda en `lag`
+            pool.submit(_one, rec, due)
+    return {"cells": cells, "skipped": dict(skipped), "lag": lag, "elapsed_s": time.monotonic() - t0}
+
+
+# --------- Reporte ---------
+def _summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    by_lang: Dict[str, Any] = {}
+    total = _new_cell()
+    for lang, c in result["cells"].items():
+        for k, v in c.items():
+            if isinstance(v, Histogram):
+                total[k].merge(v)
+            else:
+                total[k] += v
+        by_lang[lang] = _cell_out(c)
+    lag = result["lag"]
+    return {"total": _cell_out(total), "languages": by_lang, "skipped": result["skipped"],
+            "elapsed_s": round(result["elapsed_s"], 2),
+            "lag_ms": {name: lag.quantile(q) for name, q in QUANTILES}}
+
+
+def _cell_out(c: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {k: v for k, v in c.items() if not isinstance(v, Histogram)}
+    for name, q in QUANTILES:
+        rec, rep = c["rec"].quantile(q), c["replay"].quantile(q)
+        out[f"{name}_ms"] = {"recorded": rec, "replay": rep,
+                             "delta": (rep - rec) if rec is not None and rep is not None else None}
+    jobs = c["jobs"] or 1
+    out["error_rate"] = {"recorded": round(c["rec_failed"] / jobs, 4), "replay": round(c["replay_failed"] / jobs, 4)}
+    return out
+
+
+def _print(s: Dict[str, Any]) -> None:
+    print(f"{'lenguaje':<12}{'jobs':>6}{'p50 rec→rep':>18}{'p95 rec→rep':>18}{'p99 rec→rep':>18}"
+          f"{'err rec→rep':>16}{'broke':>7}{'fixed':>7}{'exit≠':>7}{'out≠':>6}")
+    rows = list(s["languages"].items()) + [("TOTAL", s["total"])]
+    for lang, c in rows:
+        lat = "".join(f"{str(c[f'{n}_ms']['recorded']) + '→' + str(c[f'{n}_ms']['replay']):>18}" for n, _ in QUANTILES)
+        err = f"{c['error_rate']['recorded']:.1%}→{c['error_rate']['replay']:.1%}"
+        print(f"{lang:<12}{c['jobs']:>6}{lat}{err:>16}{c['broke']:>7}{c['fixed']:>7}{c['exit_changed']:>7}{c['output_changed']:>6}")
+    if s["total"]["transport_errors"]:
+        print(f"errores de transporte: {s['total']['transport_errors']}")
+    if s["skipped"]:
+        print(f"salteados: {s['skipped']}")
+    print(f"duración: {s['elapsed_s']} s  atraso de despacho p50/p95/p99: "
+          f"{s['lag_ms']['p50']}/{s['lag_ms']['p95']}/{s['lag_ms']['p99']} ms")
+
+
+def _speed(v: str) -> float:
+    if v.lower() in ("max", "0"):
+        return 0.0
+    f = float(v.lower().rstrip("x"))
+    if f <= 0:
+        raise argparse.ArgumentTypeError("speed debe ser > 0 o 'max'")
+    return f
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Replay de una captura de tráfico de GozoLite")
+    ap.add_argument("captures", nargs="+", help="archivos de captura (GOZOLITE_CAPTURE_PATH)")
+    ap.add_argument("--target", default="main", help="'main' (MainApp.submit en proceso) o URL base de la API")
+    ap.add_argument("--speed", type=_speed, default=1.0, help="1 (tiempo real), N (N veces más rápido) o 'max'")
+    ap.add_argument("--concurrency", type=int, default=16, help="máximo de jobs en vuelo")
+    ap.add_argument("--api-key", default=None)
+    ap.add_argument("--retries", type=int, default=0, help="reintentos ante 429/503 (sólo contra la API)")
+    ap.add_argument("--language", default=None)
+    ap.add_argument("--limit", type=int, default=None)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    concurrency = max(1, args.concurrency)
+    if args.target == "main":
+        run = _main_target()
+    else:
+        run = _http_target(args.target, args.api_key, concurrency, args.retries)
+    summary = _summary(replay(_records(args.captures, args.language, args.limit), run, args.speed, concurrency))
+    if args.json:
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+    else:
+        _print(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
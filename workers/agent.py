@@ -0,0 +1,355 @@
+# workers/agent.py — runner agent: expone GozoLite por HTTP para el dispatcher de la API
+from __future__ import annotations
+
+import argparse
+import base64
+import hmac
+import ipaddress
+import json
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from core2.orchestrators.canary import CanaryMonitor
+from core2.orchestrators.dataset_store import DatasetStore
+from core2.orchestrators.gozo_lite import GozoLite
+from core2.orchestrators.input_spool import InputSpool
+from core2.orchestrators.supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+AGENT_SLOTS  = _env_int("GOZOLITE_AGENT_SLOTS", os.cpu_count() or 1)  # jobs simultáneos por agente
+WARM_TTL_S   = _env_int("GOZOLITE_AGENT_WARM_TTL_S", 300)             # un lenguaje usado hace menos de esto está "caliente"
+AGENT_TOKEN  = os.getenv("GOZOLITE_AGENT_TOKEN", "")                  # secreto compartido API <-> agentes
+SHARED_INPUTS = os.getenv("GOZOLITE_DISPATCH_SHARED_INPUTS", "0") == "1"  # agentes con el spool/datasets de la API
+TOKEN_HEADER = "X-Agent-Token"
+
+# Lenguajes que comparten runtime caliente (JVM, etc.): calentar uno calienta la familia
+LANG_FAMILY: Dict[str, str] = {"java": "jvm", "kotlin": "jvm", "scala": "jvm"}
+
+
+def family(language: str) -> str:
+    return LANG_FAMILY.get(language, language)
+
+
+# --------- Codificación del payload (bytes de proyectos y entradas viajan en base64) ---------
+def _b64_file(path: str) -> str:
+    with open(path, "rb") as fh:
+        return base64.b64encode(fh.read()).decode("ascii")
+
+
+def wire_payload(payload: Dict[str, Any], shared_inputs: bool = SHARED_INPUTS) -> Dict[str, Any]:
+    """
+    Payload para el agente: los proyectos y las entradas spooleadas (stdin_path, files, datasets y el
+    stdin_path de cada caso del juez) viajan como bytes, no como rutas del host de la API. Con
+    `shared_inputs` (agentes que montan el spool/datasets de la API) las rutas se pasan tal cual.
+    """
+    out = dict(payload)
+    project = out.get("project")
+    if isinstance(project, dict) and "_files" in project:
+        out["project"] = {
+            "_files_b64": {k: base64.b64encode(v).decode("ascii") for k, v in project["_files"].items()},
+            "entry": project.get("entry"),
+        }
+    if shared_inputs:
+        return out
+    if out.get("stdin_path"):
+        out["_stdin_b64"] = _b64_file(out.pop("stdin_path"))
+    for key in ("files", "datasets"):
+        if out.get(key):
+            out[f"_{key}_b64"] = {name: _b64_file(path) for name, path in out.pop(key).items()}
+    if out.get("cases"):
+        cases = []
+        for case in out["cases"]:
+            case = dict(case)
+            if case.get("stdin_path"):
+                case["_stdin_b64"] = _b64_file(case.pop("stdin_path"))
+            cases.append(case)
+        out["cases"] = cases
+    return out
+
+
+def unwire_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    project = payload.get("project")
+    if isinstance(project, dict) and "_files_b64" in project:
+        payload["project"] = {
+            "_files": {k: base64.b64decode(v) for k, v in project["_files_b64"].items()},
+            "entry": project.get("entry"),
+        }
+    return payload
+
+
+class RunnerAgent:
+    """
+    Agente de ejecución: corre GozoLite con `slots` jobs simultáneos y reporta carga y estado caliente
+    (familias de lenguaje usadas hace poco) para que el dispatcher enrute por afinidad.
+    """
+
+    def __init__(self, agent_id: Optional[str] = None, slots: Optional[int] = None, orchestrator: Any = None):
+        self.agent_id = agent_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.slots = max(1, slots or AGENT_SLOTS)
+        self.orch = orchestrator or GozoLite()
+        self.started = time.time()
+        self._sem = threading.BoundedSemaphore(self.slots)
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.completed = 0
+        self._last_used: Dict[str, float] = {}
+        self.canary = CanaryMonitor(self.orch) if isinstance(self.orch, GozoLite) else None
+        self.spool = InputSpool()
+        self.datasets = DatasetStore()
+
+    # --------- Entradas ---------
+    def stage(self, payload: Dict[str, Any]) -> List[str]:
+        """
+        Convierte las entradas del payload en rutas de este host y devuelve los input_id a descartar al
+        terminar. Los bytes (`_stdin_b64`, `_files_b64`, `_datasets_b64`) se guardan en el spool / store
+        del agente; una ruta recibida tal cual sólo se acepta si es una entrada de ese spool o store.
+        ValueError si no.
+        """
+        spooled: List[str] = []
+        try:
+            self._stage_one(payload, spooled)
+            for case in payload.get("cases") or []:
+                self._stage_one(case, spooled)
+        except BaseException:
+            for input_id in spooled:
+                self.spool.discard(input_id)
+            raise
+        return spooled
+
+    def _stage_one(self, target: Dict[str, Any], spooled: List[str]) -> None:
+        if target.get("stdin_path"):
+            target["stdin_path"] = self._local(target["stdin_path"], datasets=False)
+        for key, datasets in (("files", False), ("datasets", True)):
+            if target.get(key):
+                target[key] = {name: self._local(path, datasets) for name, path in target[key].items()}
+        if "_stdin_b64" in target:
+            target["stdin_path"] = self._spool(target.pop("_stdin_b64"), spooled)
+        if "_files_b64" in target:
+            target["files"] = {n: self._spool(b, spooled) for n, b in target.pop("_files_b64").items()}
+        if "_datasets_b64" in target:
+            target["datasets"] = {n: str(self.datasets.path(self.datasets.put([base64.b64decode(b)])["sha256"]))
+                                  for n, b in target.pop("_datasets_b64").items()}
+
+    def _spool(self, data_b64: str, spooled: List[str]) -> str:
+        input_id, _ = self.spool.write([base64.b64decode(data_b64)])
+        spooled.append(input_id)
+        return str(self.spool.path(input_id))
+
+    def _local(self, path: str, datasets: bool) -> str:
+        p = Path(str(path))
+        found = None
+        if p.parent.resolve() == (self.datasets.blobs if datasets else self.spool.root).resolve():
+            found = self.datasets.path(p.name) if datasets else self.spool.path(p.name)
+        if found is None:
+            raise ValueError(f"ruta de entrada no permitida: {path}")
+        return str(found)
+
+    def acquire(self) -> bool:
+        if not self._sem.acquire(blocking=False):
+            return False
+        with self._lock:
+            self.inflight += 1
+        return True
+
+    def release(self, language: str) -> None:
+        with self._lock:
+            self.inflight -= 1
+            self.completed += 1
+            self._last_used[family(language)] = time.time()
+        self._sem.release()
+
+    def health(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            warm = sorted(f for f, ts in self._last_used.items() if now - ts < WARM_TTL_S)
+            inflight, completed = self.inflight, self.completed
+        artifacts = getattr(self.orch, "artifacts", None)
+        return {
+            "ok": True,
+            "agent_id": self.agent_id,
+            "slots": self.slots,
+            "inflight": inflight,
+            "completed": completed,
+            "warm": warm,
+            "degraded": self.canary.degraded() if self.canary is not None else [],
+            "languages": sorted(getattr(self.orch, "registry", {}).keys()),
+            "cache": dict(artifacts.stats) if artifacts is not None else {},
+            "uptime_s": int(now - self.started),
+        }
+
+    # cpu_ms: CPU medido de los procesos del job, para la contabilidad por tenant del lado de la API
+    def execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        account = uuid.uuid4().hex
+        with supervisor.charge_to(account):
+            res = self.orch.execute(unwire_payload(payload))
+        res["agent"] = self.agent_id
+        res["cpu_ms"] = int(supervisor.usage(account) * 1000)
+        return res
+
+    def judge(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        account = uuid.uuid4().hex
+        with supervisor.charge_to(account):
+            res = self.orch.judge(payload)
+        res["agent"] = self.agent_id
+        res["cpu_ms"] = int(supervisor.usage(account) * 1000)
+        return res
+
+    def stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        account = uuid.uuid4().hex
+        with supervisor.charge_to(account):  # el handler consume el stream en un único hilo
+            events = self.orch.stream(unwire_payload(payload))
+            try:
+                for evt in events:
+                    if evt.get("event") == "exit":
+                        evt["agent"] = self.agent_id
+                        evt["cpu_ms"] = int(supervisor.usage(account) * 1000)
+                    yield evt
+            finally:
+                events.close()
+                supervisor.usage(account)  # descarta lo cargado tras el exit: no quedan cuentas huérfanas
+
+
+class _Handler(BaseHTTPRequestHandler):
+    agent: RunnerAgent  # asignado por make_server
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # sin log por request
+        pass
+
+    def _json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if not AGENT_TOKEN:
+            return True
+        if hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), AGENT_TOKEN):
+            return True
+        self._json(401, {"detail": "token de agente inválido"})
+        return False
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if self.path == "/health":
+            self._json(200, self.agent.health())
+        else:
+            self._json(404, {"detail": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path not in ("/execute", "/judge", "/stream"):
+            self._json(404, {"detail": "not found"})
+            return
+        if not self._authorized():
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            self._json(400, {"detail": f"payload inválido: {e}"})
+            return
+        # Sin slot libre => 503: el dispatcher reintenta en otro agente (el job no empezó)
+        if not self.agent.acquire():
+            self._json(503, {"detail": "agente ocupado", "agent_id": self.agent.agent_id})
+            return
+        language = str(payload.get("language") or "")
+        spooled: List[str] = []
+        try:
+            try:
+                spooled = self.agent.stage(payload)
+            except (ValueError, TypeError) as e:  # base64 inválido cae aquí (binascii.Error es ValueError)
+                self._json(400, {"detail": f"payload inválido: {e}"})
+                return
+            if self.path == "/stream":
+                self._stream(payload)
+            elif self.path == "/judge":
+                self._json(200, self.agent.judge(payload))
+            else:
+                self._json(200, self.agent.execute(payload))
+        finally:
+            for input_id in spooled:
+                self.agent.spool.discard(input_id)
+            self.agent.release(language)
+
+    def _stream(self, payload: Dict[str, Any]) -> None:
+        # NDJSON con chunked encoding: un evento por línea apenas se produce
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = self.agent.stream(payload)
+        try:
+            for evt in events:
+                line = json.dumps(evt, ensure_ascii=False).encode("utf-8") + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # el dispatcher cortó: events.close() mata el proceso
+        finally:
+            events.close()
+
+
+def make_server(host: str, port: int, agent: Optional[RunnerAgent] = None) -> ThreadingHTTPServer:
+    handler = type("AgentHandler", (_Handler,), {"agent": agent or RunnerAgent()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="GozoLite runner agent")
+    ap.add_argument("--host", default=os.getenv("GOZOLITE_AGENT_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=_env_int("GOZOLITE_AGENT_PORT", 8701))
+    ap.add_argument("--slots", type=int, default=AGENT_SLOTS)
+    ap.add_argument("--id", default=os.getenv("GOZOLITE_AGENT_ID"))
+    args = ap.parse_args()
+    if not AGENT_TOKEN and not _loopback(args.host):
+        ap.error(f"escuchar en {args.host} requiere GOZOLITE_AGENT_TOKEN (el agente ejecuta código arbitrario)")
+    agent = RunnerAgent(agent_id=args.id, slots=args.slots)
+    server = make_server(args.host, args.port, agent)
+    if agent.canary is not None:
+        agent.canary.start()
+    print(f"[agent] {agent.agent_id} escuchando en {args.host}:{args.port} "
+          f"(slots={args.slots})", flush=True)
+    def _term(*_: Any) -> None:
+        raise KeyboardInterrupt  # docker stop => mismo apagado ordenado que Ctrl+C
+    signal.signal(signal.SIGTERM, _term)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if agent.canary is not None:
+            agent.canary.stop()
+        supervisor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
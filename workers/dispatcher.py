@@ -0,0 +1,306 @@
+# workers/dispatcher.py — reparte jobs entre runner agents (menor carga + afinidad de lenguaje/cache)
+from __future__ import annotations
+
+import http.client
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from core2.orchestrators.artifact_cache import artifact_key
+from core2.orchestrators.supervisor import supervisor
+from .agent import AGENT_TOKEN, TOKEN_HEADER, family, wire_payload
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+HEALTH_INTERVAL_S = _env_int("GOZOLITE_DISPATCH_HEALTH_S", 2)     # sondeo de /health
+EJECT_AFTER       = _env_int("GOZOLITE_DISPATCH_EJECT_AFTER", 2)  # fallos seguidos para expulsar un agente
+RETRIES           = _env_int("GOZOLITE_DISPATCH_RETRIES", 2)      # reintentos en otro agente
+AFFINITY_KEYS     = _env_int("GOZOLITE_DISPATCH_AFFINITY_KEYS", 4096)
+HTTP_SLACK_S      = 90  # margen sobre el timeout del job (builds pesados, min_timeout por lenguaje)
+
+# Pesos de afinidad: se restan a la carga (inflight/slots) al puntuar
+SOURCE_AFFINITY = 0.5   # el agente ya compiló este mismo código (cache de artefactos caliente)
+WARM_AFFINITY   = 0.25  # el agente tiene caliente la familia del lenguaje (JVM, etc.)
+DEGRADED_PENALTY = 1.0  # el canary del lenguaje falla o va lento en ese agente: sólo si no hay otro
+
+
+class AgentUnavailable(Exception):
+    """El job no llegó a empezar en el agente (conexión rechazada, request sin enviar entero / 503): se puede reintentar."""
+
+
+class AgentBusy(AgentUnavailable):
+    """El agente respondió 503 (sin slots): no cuenta como fallo de salud."""
+
+
+class AgentState:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        parts = urlsplit(self.url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.agent_id = self.url
+        self.slots = 1
+        self.inflight = 0          # jobs en curso despachados por nosotros
+        self.warm: set = set()
+        self.degraded: set = set()
+        self.languages: set = set()
+        self.healthy = False
+        self.failures = 0
+        self.last_seen = 0.0
+
+    def load(self) -> float:
+        return self.inflight / max(1, self.slots)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url, "agent_id": self.agent_id, "healthy": self.healthy, "slots": self.slots,
+            "inflight": self.inflight, "warm": sorted(self.warm), "degraded": sorted(self.degraded),
+            "failures": self.failures,
+            "last_seen_s": round(time.time() - self.last_seen, 1) if self.last_seen else None,
+        }
+
+
+class Dispatcher:
+    """
+    Orquestador remoto con la misma interfaz que GozoLite (execute/stream/judge):
+    - elige el agente sano con menor carga, con descuento por afinidad (mismo código / familia caliente)
+      y evitando los agentes cuyo canary marca el lenguaje como degradado
+    - expulsa agentes tras EJECT_AFTER fallos seguidos y los readmite cuando /health vuelve a responder
+    - reintenta en otro agente sólo si el job no llegó a empezar (conexión rechazada, request que no se
+      terminó de enviar, 503); un timeout o un corte después de enviarlo no se reintenta: pudo haber corrido
+    """
+    MODE = "gozo-lite/remote"
+
+    def __init__(self, urls: List[str], memory: Any = None, health_interval: Optional[float] = None):
+        if not urls:
+            raise ValueError("Dispatcher requiere al menos un agente")
+        self.memory = memory
+        self.agents = [AgentState(u) for u in urls]
+        self._lock = threading.Lock()
+        self._affinity: "OrderedDict[str, str]" = OrderedDict()  # artifact key -> url del agente
+        self._interval = HEALTH_INTERVAL_S if health_interval is None else health_interval
+        self._stop = threading.Event()
+        self.check_health()
+        self._poller = threading.Thread(target=self._poll, name="dispatcher-health", daemon=True)
+        self._poller.start()
+
+    # --------- Salud ---------
+    def _poll(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.check_health()
+
+    def check_health(self) -> None:
+        for a in self.agents:
+            try:
+                info = self._request(a, "GET", "/health", None, timeout=3)
+            except Exception:
+                self._mark_failure(a)
+                continue
+            with self._lock:
+                a.agent_id = info.get("agent_id", a.url)
+                a.slots = int(info.get("slots") or 1)
+                a.warm = set(info.get("warm") or [])
+                a.degraded = set(info.get("degraded") or [])
+                a.languages = set(info.get("languages") or [])
+                a.healthy, a.failures, a.last_seen = True, 0, time.time()
+
+    def _mark_failure(self, a: AgentState) -> None:
+        with self._lock:
+            a.failures += 1
+            if a.failures >= EJECT_AFTER and a.healthy:
+                a.healthy = False
+                if self.memory is not None:
+                    self.memory.add("system", f"[Dispatcher] agente expulsado: {a.url}")
+
+    def close(self) -> None:
+        self._stop.set()
+
+    @property
+    def registry(self) -> Dict[str, None]:
+        # Unión de lenguajes de los agentes (la usa el ClampGuard de MainApp)
+        with self._lock:
+            return {lang: None for a in self.agents for lang in a.languages}
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [a.snapshot() for a in self.agents]
+
+    # --------- Ruteo ---------
+    def _pick(self, language: str, key: Optional[str], exclude: set) -> Optional[AgentState]:
+        with self._lock:
+            owner = self._affinity.get(key) if key else None
+            best: Optional[Tuple[float, int, AgentState]] = None
+            for a in self.agents:
+                if not a.healthy or a.url in exclude or a.inflight >= a.slots:
+                    continue
+                if a.languages and language not in a.languages and language != "auto":
+                    continue
+                score = a.load()
+                if owner == a.url:
+                    score -= SOURCE_AFFINITY
+                elif family(language) in a.warm:
+                    score -= WARM_AFFINITY
+                if language in a.degraded:
+                    score += DEGRADED_PENALTY
+                if best is None or (score, a.inflight) < best[:2]:
+                    best = (score, a.inflight, a)
+            if best is None:
+                return None
+            chosen = best[2]
+            chosen.inflight += 1
+            return chosen
+
+    def _done(self, a: AgentState, language: str, key: Optional[str]) -> None:
+        with self._lock:
+            a.inflight -= 1
+            a.warm.add(family(language))
+            if key:
+                self._affinity[key] = a.url
+                self._affinity.move_to_end(key)
+                while len(self._affinity) > AFFINITY_KEYS:
+                    self._affinity.popitem(last=False)
+
+    @staticmethod
+    def _key(payload: Dict[str, Any]) -> Optional[str]:
+        code = payload.get("code")
+        if not code or payload.get("project"):
+            return None
+        return artifact_key(str(payload.get("language") or ""), code)
+
+    # --------- HTTP ---------
+    def _connect(self, a: AgentState, timeout: float) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(a.host, a.port, timeout=timeout)
+
+    @staticmethod
+    def _send(conn: http.client.HTTPConnection, method: str, path: str, data: Optional[bytes]) -> None:
+        """Conecta y envía el request entero; AgentUnavailable si falla antes (el agente no tiene el job completo)."""
+        headers = {"Content-Type": "application/json"}
+        if AGENT_TOKEN:
+            headers[TOKEN_HEADER] = AGENT_TOKEN
+        try:
+            conn.request(method, path, body=data, headers=headers)
+        except OSError as e:
+            raise AgentUnavailable(str(e))
+
+    @staticmethod
+    def _response(conn: http.client.HTTPConnection) -> http.client.HTTPResponse:
+        try:
+            return conn.getresponse()
+        except OSError as e:  # timeout/corte con el request ya enviado: el job pudo haber empezado
+            raise RuntimeError(f"sin respuesta tras enviar el job: {e}")
+
+    def _request(self, a: AgentState, method: str, path: str, body: Optional[Dict[str, Any]], timeout: float) -> Dict[str, Any]:
+        conn = self._connect(a, timeout)
+        try:
+            self._send(conn, method, path, json.dumps(body).encode("utf-8") if body is not None else None)
+            resp = self._response(conn)
+            raw = resp.read()
+            if resp.status == 503:
+                raise AgentBusy("agente ocupado")
+            if resp.status != 200:
+                raise RuntimeError(f"agente respondió {resp.status}: {raw[:200]!r}")
+            return json.loads(raw)
+        finally:
+            conn.close()
+
+    def _dispatch(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        language = str(payload.get("language") or "").strip().lower()
+        key = self._key(payload)
+        timeout = float(payload.get("timeout") or 10) + HTTP_SLACK_S
+        body = wire_payload(payload)
+        tried: set = set()
+        last_err = "Sin agentes disponibles"
+        for _ in range(RETRIES + 1):
+            a = self._pick(language, key, tried)
+            if a is None:
+                break
+            tried.add(a.url)
+            try:
+                res = self._request(a, "POST", path, body, timeout)
+            except AgentUnavailable as e:
+                self._release(a, busy=isinstance(e, AgentBusy))
+                last_err = f"{a.url}: {e}"
+                continue
+            except Exception as e:
+                # El job pudo haber corrido: no se reintenta (no duplicamos efectos)
+                self._release(a, busy=False)
+                return self._fail(1, f"Agente {a.url} falló: {e}", language)
+            self._done(a, language, key)
+            supervisor.charge(float(res.get("cpu_ms") or 0) / 1000)  # CPU del agente => cuenta del tenant
+            return res
+        return self._fail(503, last_err, language)
+
+    def _release(self, a: AgentState, busy: bool) -> None:
+        with self._lock:
+            a.inflight -= 1
+        if not busy:
+            self._mark_failure(a)
+
+    def _fail(self, code: int, msg: str, language: str) -> Dict[str, Any]:
+        return {"ok": False, "exit_code": code, "stdout": "", "stderr": msg, "time_ms": 0,
+                "mode": self.MODE, "language": language or "-"}
+
+    # --------- Interfaz de orquestador ---------
+    def execute(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self._dispatch("/execute", payload)
+
+    def judge(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self._dispatch("/judge", payload)
+
+    def stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        language = str(payload.get("language") or "").strip().lower()
+        key = self._key(payload)
+        timeout = float(payload.get("timeout") or 10) + HTTP_SLACK_S
+        data = json.dumps(wire_payload(payload)).encode("utf-8")
+        tried: set = set()
+        last_err = "Sin agentes disponibles"
+        for _ in range(RETRIES + 1):
+            a = self._pick(language, key, tried)
+            if a is None:
+                break
+            tried.add(a.url)
+            conn = self._connect(a, timeout)
+            try:
+                try:
+                    self._send(conn, "POST", "/stream", data)
+                except AgentUnavailable as e:
+                    self._release(a, busy=False)
+                    last_err = f"{a.url}: {e}"
+                    continue
+                try:
+                    resp = self._response(conn)
+                except RuntimeError as e:  # el job pudo haber empezado: no se reintenta
+                    self._release(a, busy=False)
+                    yield {"event": "exit", **self._fail(1, f"Agente {a.url} falló: {e}", language)}
+                    return
+                if resp.status == 503:
+                    resp.read()
+                    self._release(a, busy=True)
+                    last_err = f"{a.url}: agente ocupado"
+                    continue
+                if resp.status != 200:
+                    self._release(a, busy=False)
+                    yield {"event": "exit", **self._fail(1, f"Agente {a.url} respondió {resp.status}", language)}
+                    return
+                try:
+                    for line in resp:
+                        if line.strip():
+                            evt = json.loads(line)
+                            if evt.get("event") == "exit":
+                                supervisor.charge(float(evt.get("cpu_ms") or 0) / 1000)
+                            yield evt
+                finally:
+                    self._done(a, language, key)
+                return
+            finally:
+                conn.close()  # si el consumidor abandona, el agente ve el corte y mata el job
+        yield {"event": "exit", **self._fail(503, last_err, language)}
+
@@ -0,0 +1,360 @@
+# workers/fair_scheduler.py — reparto justo por tenant (WFQ) delante de MainApp.submit
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from core2.orchestrators.supervisor import supervisor
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+SCHED_SLOTS      = _env_int("GOZOLITE_SCHED_SLOTS", os.cpu_count() or 1)  # jobs simultáneos en total
+QUEUE_TIMEOUT_S  = _env_int("GOZOLITE_SCHED_QUEUE_TIMEOUT_S", 60)         # espera máxima en cola
+MAX_QUEUE        = _env_int("GOZOLITE_SCHED_MAX_QUEUE", 1000)             # jobs en cola por tenant
+BUDGET_WINDOW_S  = _env_int("GOZOLITE_SCHED_BUDGET_WINDOW_S", 3600)       # ventana del presupuesto de CPU
+BATCH_AGING_S    = _env_int("GOZOLITE_SCHED_BATCH_AGING_S", 30)           # batch que espera más que esto compite como interactivo
+WAIT_SAMPLES     = 512                                                    # esperas recientes para avg/p95
+COST_ALPHA       = 0.2                                                    # EWMA del costo (CPU-s) por job
+SERVICE_ALPHA    = 0.2                                                    # EWMA de la duración (wall) por lenguaje
+DEFAULT_SERVICE_S = 1.0                                                   # duración supuesta sin historial
+
+DEFAULT_TENANT = "default"
+INTERACTIVE, BATCH = "interactive", "batch"
+LANES = (INTERACTIVE, BATCH)
+
+
+class SchedulerRejected(Exception):
+    """El job no entra a la cola (o se cansó de esperar): la API responde 429 con Retry-After."""
+
+    def __init__(self, msg: str, retry_after_s: float, reason: str = "overload"):
+        super().__init__(msg)
+        self.retry_after_s = max(1, int(math.ceil(retry_after_s)))
+        self.reason = reason  # budget | queue_full | queue_timeout | deadline
+
+
+class UnknownApiKey(Exception):
+    """API key ausente o desconocida con GOZOLITE_REQUIRE_API_KEY=1 (la API responde 401)."""
+
+
+@dataclass
+class TenantPolicy:
+    name: str
+    weight: float = 1.0
+    max_concurrency: int = 0             # 0 => sin tope propio (sólo el global)
+    cpu_budget_s: Optional[float] = None  # CPU-s por ventana (None => ilimitado)
+    api_keys: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, name: str, raw: Dict[str, Any]) -> "TenantPolicy":
+        budget = raw.get("cpu_budget_s")
+        return cls(
+            name=name,
+            weight=max(0.01, float(raw.get("weight", 1.0))),
+            max_concurrency=max(0, int(raw.get("max_concurrency", 0))),
+            cpu_budget_s=float(budget) if budget is not None else None,
+            api_keys=[str(k) for k in raw.get("api_keys") or []],
+        )
+
+
+def load_policies(spec: Optional[str] = None) -> Dict[str, TenantPolicy]:
+    """
+    GOZOLITE_TENANTS: JSON en línea o ruta a un archivo JSON, p. ej.
+      {"acme": {"weight": 3, "max_concurrency": 4, "cpu_budget_s": 600, "api_keys": ["k-acme"]},
+       "default": {"weight": 1, "max_concurrency": 2}}
+    La entrada "default" aplica a requests sin API key (o con una desconocida).
+    """
+    spec = os.getenv("GOZOLITE_TENANTS", "") if spec is None else spec
+    spec = spec.strip()
+    if not spec:
+        return {}
+    if not spec.startswith("{"):
+        with open(spec, "r", encoding="utf-8") as fh:
+            spec = fh.read()
+    raw = json.loads(spec)
+    return {str(name): TenantPolicy.from_dict(str(name), cfg or {}) for name, cfg in raw.items()}
+
+
+@dataclass
+class Ticket:
+    tenant: str
+    start_tag: float
+    enqueued: float
+    lane: str = INTERACTIVE
+    service: str = "-"                 # clave del historial de duración (lenguaje / judge:lenguaje)
+    est_s: float = DEFAULT_SERVICE_S   # duración prevista al encolar
+    deadline: Optional[float] = None   # perf_counter() en el que el resultado deja de servir
+    account: str = field(default_factory=lambda: uuid.uuid4().hex)
+    granted: Optional[float] = None
+    expired: bool = False              # descartado en cola: ya no llega a su deadline
+    event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def wait_ms(self) -> int:
+        return int(((self.granted or time.perf_counter()) - self.enqueued) * 1000)
+
+    def rank(self, now: float) -> Tuple[int, float]:
+        # Interactivo primero; un batch que envejeció en cola compite como interactivo (sin inanición)
+        urgent = self.lane == INTERACTIVE or now - self.enqueued > BATCH_AGING_S
+        return (0 if urgent else 1, self.start_tag)
+
+
+class _TenantState:
+    def __init__(self, policy: TenantPolicy):
+        self.policy = policy
+        self.queues: Dict[str, Deque[Ticket]] = {lane: deque() for lane in LANES}
+        self.running = 0
+        self.last_tag = 0.0             # tag de inicio del último job encolado
+        self.cost = 1.0                 # EWMA de CPU-s por job (lo que avanza el reloj virtual)
+        self.usage: Deque[Tuple[float, float]] = deque()  # (ts, cpu_s) dentro de la ventana
+        self.waits: Deque[int] = deque(maxlen=WAIT_SAMPLES)
+        self.submitted = self.completed = self.rejected = 0
+        self.cpu_total_s = 0.0
+        self.expired = 0
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    def window_cpu(self, now: float) -> float:
+        while self.usage and now - self.usage[0][0] > BUDGET_WINDOW_S:
+            self.usage.popleft()
+        return sum(c for _, c in self.usage)
+
+    def budget_retry_after(self, now: float) -> Optional[float]:
+        """Segundos hasta que la ventana libere presupuesto; None si todavía queda."""
+        budget = self.policy.cpu_budget_s
+        if budget is None:
+            return None
+        used = self.window_cpu(now)
+        if used < budget:
+            return None
+        for ts, cpu in self.usage:  # lo más viejo sale primero de la ventana
+            used -= cpu
+            if used < budget:
+                return ts + BUDGET_WINDOW_S - now
+        return float(BUDGET_WINDOW_S)
+
+
+class FairScheduler:
+    """
+    Cola justa ponderada (start-time fair queueing) entre tenants:
+    - cada job recibe un tag virtual = max(reloj virtual, tag previo del tenant) + costo/peso,
+      donde costo es el EWMA de CPU-s por job del tenant (medido, no estimado por request)
+    - con un slot libre se despacha el job con menor tag entre tenants bajo su max_concurrency,
+      vaciando primero el carril interactivo (los batch que envejecen suben de carril)
+    - con deadline, se predice el fin (cola por delante + duración histórica del lenguaje) y lo que
+      no llega se rechaza al encolar; lo que deja de llegar mientras espera se descarta en cola
+    - el CPU real de cada job (rusage vía supervisor) se descuenta del presupuesto del tenant;
+      sin presupuesto, los nuevos jobs se rechazan con retry_after hasta que la ventana libere
+    """
+
+    def __init__(self, slots: Optional[int] = None, policies: Optional[Dict[str, TenantPolicy]] = None,
+                 require_key: Optional[bool] = None):
+        self.slots = max(1, slots or SCHED_SLOTS)
+        self.policies = load_policies() if policies is None else policies
+        if require_key is None:
+            require_key = os.getenv("GOZOLITE_REQUIRE_API_KEY", "0").lower() in ("1", "true", "yes")
+        self.require_key = require_key
+        self._keys = {k: p.name for p in self.policies.values() for k in p.api_keys}
+        self._lock = threading.Lock()
+        self._tenants: Dict[str, _TenantState] = {}
+        self._vtime = 0.0
+        self.running = 0
+        self._running: Dict[str, Ticket] = {}    # account -> ticket en ejecución
+        self._service: Dict[str, float] = {}     # clave de servicio -> EWMA de duración (s)
+
+    # --------- Identificación ---------
+    def identify(self, api_key: Optional[str]) -> str:
+        if api_key and api_key in self._keys:
+            return self._keys[api_key]
+        if self.require_key:
+            raise UnknownApiKey("API key ausente o inválida")
+        return DEFAULT_TENANT
+
+    def _state(self, tenant: str) -> _TenantState:
+        st = self._tenants.get(tenant)
+        if st is None:
+            policy = self.policies.get(tenant) or self.policies.get(DEFAULT_TENANT) or TenantPolicy(tenant)
+            st = self._tenants[tenant] = _TenantState(policy)
+        return st
+
+    # --------- Cola ---------
+    def acquire(self, tenant: str, timeout: Optional[float] = None, lane: str = INTERACTIVE,
+                deadline_s: Optional[float] = None, service: str = "-") -> Ticket:
+        """
+        Bloquea hasta obtener un slot. `deadline_s`: plazo extremo a extremo desde ahora (cola + ejecución).
+        SchedulerRejected si no hay presupuesto, la cola está llena, no llegaría al deadline o vence la espera.
+        """
+        timeout = QUEUE_TIMEOUT_S if timeout is None else timeout
+        lane = lane if lane in LANES else INTERACTIVE
+        with self._lock:
+            st = self._state(tenant)
+            retry = st.budget_retry_after(time.time())
+            if retry is not None:
+                st.rejected += 1
+                raise SchedulerRejected(f"tenant {tenant}: presupuesto de CPU agotado "
+                                        f"({st.policy.cpu_budget_s:g}s / {BUDGET_WINDOW_S}s)", retry, "budget")
+            if st.queued() >= MAX_QUEUE:
+                st.rejected += 1
+                raise SchedulerRejected(f"tenant {tenant}: cola llena ({MAX_QUEUE})", self._drain_estimate(st),
+                                        "queue_full")
+            now = time.perf_counter()
+            est = self._service.get(service, DEFAULT_SERVICE_S)
+            start = max(self._vtime, st.last_tag)
+            ticket = Ticket(tenant=tenant, start_tag=start, enqueued=now, lane=lane, service=service, est_s=est,
+                            deadline=None if deadline_s is None else now + deadline_s)
+            if ticket.deadline is not None:
+                wait = self._predict_wait(ticket, now)
+                if now + wait + est > ticket.deadline:
+                    st.rejected += 1
+                    st.expired += 1
+                    raise SchedulerRejected(
+                        f"tenant {tenant}: no termina dentro del deadline ({deadline_s:g}s; "
+                        f"espera prevista {wait:.1f}s + ejecución {est:.1f}s)", wait, "deadline")
+                # No tiene sentido esperar más allá del último arranque que todavía llega a tiempo
+                timeout = min(timeout, max(0.0, ticket.deadline - est - now))
+            st.last_tag = start + st.cost / st.policy.weight
+            st.queues[lane].append(ticket)
+            st.submitted += 1
+            self._dispatch()
+        ticket.event.wait(timeout)
+        with self._lock:
+            if ticket.granted is not None:  # despachado (quizá justo al vencer la espera)
+                return ticket
+            if not ticket.expired:
+                st.queues[lane].remove(ticket)
+                st.rejected += 1
+                if ticket.deadline is None or time.perf_counter() + ticket.est_s <= ticket.deadline:
+                    raise SchedulerRejected(f"tenant {tenant}: sin slot tras {timeout:g}s en cola",
+                                            self._drain_estimate(st), "queue_timeout")
+                st.expired += 1
+            raise SchedulerRejected(f"tenant {tenant}: el deadline venció en cola", self._drain_estimate(st),
+                                    "deadline")
+
+    def release(self, ticket: Ticket, cpu_s: float) -> None:
+        with self._lock:
+            st = self._state(ticket.tenant)
+            st.running -= 1
+            self.running -= 1
+            self._running.pop(ticket.account, None)
+            st.completed += 1
+            st.cpu_total_s += cpu_s
+            st.usage.append((time.time(), cpu_s))
+            st.cost = (1 - COST_ALPHA) * st.cost + COST_ALPHA * max(cpu_s, 0.01)
+            took = time.perf_counter() - (ticket.granted or ticket.enqueued)
+            prev = self._service.get(ticket.service)
+            self._service[ticket.service] = took if prev is None else (1 - SERVICE_ALPHA) * prev + SERVICE_ALPHA * took
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        # Con el lock tomado: mientras haya slots, entra el mejor (carril, tag) entre tenants elegibles
+        now = time.perf_counter()
+        while self.running < self.slots:
+            best: Optional[Ticket] = None
+            best_st: Optional[_TenantState] = None
+            for st in self._tenants.values():
+                cap = st.policy.max_concurrency
+                if cap and st.running >= cap:
+                    continue
+                for q in st.queues.values():
+                    if q and (best is None or q[0].rank(now) < best.rank(now)):
+                        best, best_st = q[0], st
+            if best is None or best_st is None:
+                return
+            best_st.queues[best.lane].popleft()
+            if best.deadline is not None and now + best.est_s > best.deadline:
+                # Ya no llega: se descarta sin gastar el slot (acquire lo convierte en 429)
+                best.expired = True
+                best_st.rejected += 1
+                best_st.expired += 1
+                best.event.set()
+                continue
+            self._vtime = max(self._vtime, best.start_tag)
+            best.granted = now
+            best_st.waits.append(best.wait_ms)
+            best_st.running += 1
+            self.running += 1
+            self._running[best.account] = best
+            best.event.set()
+
+    def _predict_wait(self, ticket: Ticket, now: float) -> float:
+        """Espera prevista: lo que resta de los jobs en curso + la cola que despacharía antes, en `slots` carriles."""
+        ahead = [t for st in self._tenants.values() for q in st.queues.values() for t in q
+                 if t.rank(now) <= ticket.rank(now)]
+        if self.running < self.slots and not ahead:
+            return 0.0
+        remaining = sum(max(0.0, t.est_s - (now - (t.granted or now))) for t in self._running.values())
+        return (remaining + sum(t.est_s for t in ahead)) / self.slots
+
+    def _drain_estimate(self, st: _TenantState) -> float:
+        # Aproximación: la cola del tenant a su costo medio, repartida en sus slots alcanzables
+        lanes = min(self.slots, st.policy.max_concurrency or self.slots)
+        return max(1.0, st.queued() * st.cost / lanes)
+
+    # --------- Uso ---------
+    @contextmanager
+    def slot(self, tenant: str, timeout: Optional[float] = None, **admission: Any) -> Iterator[Ticket]:
+        """Ocupa un slot del tenant (admission: lane, deadline_s, service) y carga al salir el CPU medido."""
+        ticket = self.acquire(tenant, timeout, **admission)
+        try:
+            with supervisor.charge_to(ticket.account):
+                yield ticket
+        finally:
+            self.release(ticket, supervisor.usage(ticket.account))
+
+    def stream(self, ticket: Ticket, events: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Envuelve un stream ya admitido: carga el CPU de cada paso y libera el slot al terminar."""
+        try:
+            while True:
+                # El contexto se fija por paso: cada next() puede correr en otro hilo del threadpool
+                with supervisor.charge_to(ticket.account):
+                    try:
+                        evt = next(events)
+                    except StopIteration:
+                        return
+                yield evt
+        finally:
+            close = getattr(events, "close", None)
+            if close is not None:
+                with supervisor.charge_to(ticket.account):
+                    close()
+            self.release(ticket, supervisor.usage(ticket.account))
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            tenants = {}
+            for name, st in sorted(self._tenants.items()):
+                waits = sorted(st.waits)
+                tenants[name] = {
+                    "weight": st.policy.weight,
+                    "max_concurrency": st.policy.max_concurrency or None,
+                    "queued": st.queued(),
+                    "queued_by_lane": {lane: len(q) for lane, q in st.queues.items()},
+                    "running": st.running,
+                    "submitted": st.submitted,
+                    "completed": st.completed,
+                    "rejected": st.rejected,
+                    "deadline_rejected": st.expired,
+                    "wait_ms_avg": int(sum(waits) / len(waits)) if waits else 0,
+                    "wait_ms_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0,
+                    "oldest_wait_ms": max((q[0].wait_ms for q in st.queues.values() if q), default=0),
+                    "cpu_s_window": round(st.window_cpu(now), 3),
+                    "cpu_budget_s": st.policy.cpu_budget_s,
+                    "cpu_s_total": round(st.cpu_total_s, 3),
+                    "cost_s_per_job": round(st.cost, 3),
+                }
+            return {"slots": self.slots, "running": self.running, "budget_window_s": BUDGET_WINDOW_S,
+                    "service_s": {k: round(v, 3) for k, v in sorted(self._service.items())},
+                    "tenants": tenants}